@@ -0,0 +1,40 @@
+"""Add server_status.changed_at for ranking delta refresh
+
+Revision ID: a7d3f9b1e5c8
+Revises: b4d8f2a6c0e3
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "a7d3f9b1e5c8"
+down_revision = "b4d8f2a6c0e3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # checked_at пробер перезаписывает каждый цикл: delta-refresh по нему
+    # забирал все серверы. changed_at двигается только при смене входов ranking'а
+    op.add_column(
+        "server_status",
+        sa.Column(
+            "changed_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.func.now(),
+        ),
+    )
+    op.execute("UPDATE server_status SET changed_at = checked_at")
+    op.create_index("ix_server_status_changed_at", "server_status", ["changed_at"])
+    op.drop_index("ix_server_status_checked_at", table_name="server_status")
+
+
+def downgrade() -> None:
+    op.create_index("ix_server_status_checked_at", "server_status", ["checked_at"])
+    op.drop_index("ix_server_status_changed_at", table_name="server_status")
+    op.drop_column("server_status", "changed_at")
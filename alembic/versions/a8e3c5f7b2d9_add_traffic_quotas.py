@@ -0,0 +1,49 @@
+"""Add plan traffic quotas and usage_counters
+
+Revision ID: a8e3c5f7b2d9
+Revises: f6d2b8c4e1a7
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "a8e3c5f7b2d9"
+down_revision = "f6d2b8c4e1a7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 0 = без лимита (как max_devices)
+    op.add_column(
+        "plans",
+        sa.Column("traffic_quota_bytes", sa.BigInteger(), nullable=False, server_default="0"),
+    )
+
+    op.create_table(
+        "usage_counters",
+        sa.Column(
+            "user_id",
+            sa.Integer(),
+            sa.ForeignKey("users.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("period_start", sa.Date(), primary_key=True),
+        sa.Column("bytes_in", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("bytes_out", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.text("now()"),
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("usage_counters")
+    op.drop_column("plans", "traffic_quota_bytes")
@@ -0,0 +1,46 @@
+"""Add audit_events (partitioned by month)
+
+Revision ID: b4d8f2a6c0e3
+Revises: a3e9c5b1d7f2
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b4d8f2a6c0e3"
+down_revision = "a3e9c5b1d7f2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # op.create_table не умеет PARTITION BY — родительская таблица руками.
+    # Месячные партиции создаёт AuditService.ensure_partitions() перед вставкой
+    # и джоба audit.partitions — заранее.
+    op.execute(
+        """
+        CREATE TABLE audit_events (
+            id          bigint GENERATED BY DEFAULT AS IDENTITY,
+            created_at  timestamptz NOT NULL,
+            actor_id    integer,
+            entity_type varchar(32) NOT NULL,
+            entity_id   bigint      NOT NULL,
+            action      varchar(32) NOT NULL,
+            changes     jsonb       NOT NULL,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.create_index(
+        "ix_audit_events_entity",
+        "audit_events",
+        ["entity_type", "entity_id", "created_at", "id"],
+    )
+
+
+def downgrade() -> None:
+    # партиции удаляются вместе с родителем
+    op.drop_table("audit_events")
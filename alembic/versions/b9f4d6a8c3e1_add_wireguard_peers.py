@@ -0,0 +1,96 @@
+"""Add WireGuard peers and per-server address pools
+
+Revision ID: b9f4d6a8c3e1
+Revises: a8e3c5f7b2d9
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "b9f4d6a8c3e1"
+down_revision = "a8e3c5f7b2d9"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("servers", sa.Column("wg_public_key", sa.String(length=44), nullable=True))
+    op.add_column("servers", sa.Column("wg_subnet", sa.String(length=43), nullable=True))
+
+    op.create_table(
+        "peers",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "user_id",
+            sa.Integer(),
+            sa.ForeignKey("users.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column(
+            "device_id",
+            sa.Integer(),
+            sa.ForeignKey("devices.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column(
+            "server_id",
+            sa.Integer(),
+            sa.ForeignKey("servers.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("public_key", sa.String(length=44), nullable=False),
+        sa.Column("client_key", sa.Boolean(), nullable=False, server_default=sa.text("false")),
+        sa.Column("key_version", sa.Integer(), nullable=False, server_default="1"),
+        sa.Column("address_index", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.text("now()"),
+        ),
+        sa.Column("revoked_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_peers_user_id", "peers", ["user_id"])
+    op.create_index("ix_peers_device_id", "peers", ["device_id"])
+    op.create_index(
+        "ux_peers_device_server_active",
+        "peers",
+        ["device_id", "server_id"],
+        unique=True,
+        postgresql_where=sa.text("revoked_at IS NULL"),
+    )
+    op.create_index(
+        "ux_peers_server_address_active",
+        "peers",
+        ["server_id", "address_index"],
+        unique=True,
+        postgresql_where=sa.text("revoked_at IS NULL"),
+    )
+
+    op.create_table(
+        "server_address_pools",
+        sa.Column(
+            "server_id",
+            sa.Integer(),
+            sa.ForeignKey("servers.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("subnet", sa.String(length=43), nullable=False),
+        sa.Column("bitmap", sa.LargeBinary(), nullable=False),
+        sa.Column("allocated", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("server_address_pools")
+    op.drop_index("ux_peers_server_address_active", table_name="peers")
+    op.drop_index("ux_peers_device_server_active", table_name="peers")
+    op.drop_index("ix_peers_device_id", table_name="peers")
+    op.drop_index("ix_peers_user_id", table_name="peers")
+    op.drop_table("peers")
+    op.drop_column("servers", "wg_subnet")
+    op.drop_column("servers", "wg_public_key")
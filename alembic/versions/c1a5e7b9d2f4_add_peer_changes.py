@@ -0,0 +1,70 @@
+"""Add peer_changes feed, feed watermarks and pending-jobs-by-kind index
+
+Revision ID: c1a5e7b9d2f4
+Revises: b9f4d6a8c3e1
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c1a5e7b9d2f4"
+down_revision = "b9f4d6a8c3e1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "peer_changes",
+        sa.Column("version", sa.BigInteger(), primary_key=True),
+        sa.Column(
+            "server_id",
+            sa.Integer(),
+            sa.ForeignKey("servers.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("peer_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("op", sa.String(length=8), nullable=False),
+        sa.Column("public_key", sa.String(length=44), nullable=False),
+        sa.Column("address", sa.String(length=18), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.text("now()"),
+        ),
+    )
+    op.create_index("ix_peer_changes_server_version", "peer_changes", ["server_id", "version"])
+    op.create_index("ix_peer_changes_peer_version", "peer_changes", ["peer_id", "version"])
+
+    op.create_table(
+        "peer_feed_watermarks",
+        sa.Column(
+            "server_id",
+            sa.Integer(),
+            sa.ForeignKey("servers.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+    )
+
+    # периодические задачи: "есть ли уже queued/running задача этого типа"
+    op.create_index(
+        "ix_jobs_pending_kind",
+        "jobs",
+        ["kind"],
+        postgresql_where=sa.text("status IN ('queued', 'running')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_jobs_pending_kind", table_name="jobs")
+    op.drop_table("peer_feed_watermarks")
+    op.drop_index("ix_peer_changes_peer_version", table_name="peer_changes")
+    op.drop_index("ix_peer_changes_server_version", table_name="peer_changes")
+    op.drop_table("peer_changes")
@@ -0,0 +1,55 @@
+"""Server directory search indexes (pg_trgm + country/is_active)
+
+Revision ID: c3a9d5e7f1b2
+Revises: b7e2f4a1c9d3
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c3a9d5e7f1b2"
+down_revision = "b7e2f4a1c9d3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # ILIKE 'q%' / ILIKE '%q%' / similarity (%) по name, host, notes
+    for column in ("name", "host", "notes"):
+        op.create_index(
+            f"ix_servers_{column}_trgm",
+            "servers",
+            [column],
+            postgresql_using="gin",
+            postgresql_ops={column: "gin_trgm_ops"},
+        )
+
+    # фильтр по стране / активности среди живых серверов
+    op.create_index(
+        "ix_servers_country_active",
+        "servers",
+        ["country", "is_active"],
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+
+    # keyset-пагинация списка пользователя: owner_id = ? AND id < cursor ORDER BY id DESC
+    op.create_index(
+        "ix_servers_owner_live_id",
+        "servers",
+        ["owner_id", sa.text("id DESC")],
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_servers_owner_live_id", table_name="servers")
+    op.drop_index("ix_servers_country_active", table_name="servers")
+    for column in ("notes", "host", "name"):
+        op.drop_index(f"ix_servers_{column}_trgm", table_name="servers")
+    # расширение не удаляем: им могут пользоваться другие объекты
@@ -0,0 +1,32 @@
+"""Add server_status.load for ranking across API workers
+
+Revision ID: c6e2a8d4f0b3
+Revises: a7d3f9b1e5c8
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c6e2a8d4f0b3"
+down_revision = "a7d3f9b1e5c8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # load жил только в памяти воркера, принявшего метрики ноды:
+    # остальные воркеры ранжировали серверы с load=0
+    op.add_column("server_status", sa.Column("load", sa.Float(), nullable=True))
+    op.add_column(
+        "server_status",
+        sa.Column("load_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("server_status", "load_at")
+    op.drop_column("server_status", "load")
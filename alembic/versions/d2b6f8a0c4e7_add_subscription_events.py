@@ -0,0 +1,75 @@
+"""Add subscription_events history
+
+Revision ID: d2b6f8a0c4e7
+Revises: c1a5e7b9d2f4
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "d2b6f8a0c4e7"
+down_revision = "c1a5e7b9d2f4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "subscription_events",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column(
+            "user_id",
+            sa.Integer(),
+            sa.ForeignKey("users.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("kind", sa.String(length=16), nullable=False),
+        sa.Column("source", sa.String(length=8), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column(
+            "plan_id",
+            sa.Integer(),
+            sa.ForeignKey("plans.id", ondelete="RESTRICT"),
+            nullable=True,
+        ),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.text("now()"),
+        ),
+    )
+
+    # история до миграции неизвестна: текущее состояние — точка отсчёта (now()),
+    # запросы "на момент T" раньше миграции честно вернут пусто
+    op.execute(
+        """
+        INSERT INTO subscription_events (user_id, kind, source, status, plan_id, expires_at)
+        SELECT user_id, 'backfill', 'system', status, plan_id, expires_at
+        FROM subscriptions
+        ORDER BY id
+        """
+    )
+
+    op.create_index(
+        "ix_subscription_events_user_created",
+        "subscription_events",
+        ["user_id", "created_at", "id"],
+    )
+    op.create_index(
+        "ix_subscription_events_created_brin",
+        "subscription_events",
+        ["created_at"],
+        postgresql_using="brin",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_subscription_events_created_brin", table_name="subscription_events")
+    op.drop_index("ix_subscription_events_user_created", table_name="subscription_events")
+    op.drop_table("subscription_events")
@@ -0,0 +1,39 @@
+"""Add server_status table (health probes)
+
+Revision ID: d4b8e6f2a0c5
+Revises: c3a9d5e7f1b2
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "d4b8e6f2a0c5"
+down_revision = "c3a9d5e7f1b2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "server_status",
+        sa.Column(
+            "server_id",
+            sa.Integer(),
+            sa.ForeignKey("servers.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("checked_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_ok_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("is_up", sa.Boolean(), nullable=False),
+        sa.Column("latency_ms", sa.Integer(), nullable=True),
+        sa.Column("consecutive_failures", sa.SmallInteger(), nullable=False, server_default="0"),
+        sa.Column("last_error", sa.String(length=120), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("server_status")
@@ -0,0 +1,28 @@
+"""Indexes for best-server ranking delta refresh
+
+Revision ID: e5c1a7b9d3f4
+Revises: d4b8e6f2a0c5
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e5c1a7b9d3f4"
+down_revision = "d4b8e6f2a0c5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # ranking-индекс API-воркеров раз в несколько секунд забирает только
+    # изменившиеся строки: WHERE updated_at >= ? / checked_at >= ?
+    op.create_index("ix_servers_updated_at", "servers", ["updated_at"])
+    op.create_index("ix_server_status_checked_at", "server_status", ["checked_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_server_status_checked_at", table_name="server_status")
+    op.drop_index("ix_servers_updated_at", table_name="servers")
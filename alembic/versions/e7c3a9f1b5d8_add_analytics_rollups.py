@@ -0,0 +1,57 @@
+"""Add analytics daily rollups
+
+Revision ID: e7c3a9f1b5d8
+Revises: d2b6f8a0c4e7
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "e7c3a9f1b5d8"
+down_revision = "d2b6f8a0c4e7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "analytics_plan_daily",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column(
+            "plan_id",
+            sa.Integer(),
+            sa.ForeignKey("plans.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("active_subscribers", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("mrr_cents", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("activations", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("churned", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.text("now()"),
+        ),
+    )
+
+    op.create_table(
+        "analytics_expiry_daily",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column(
+            "plan_id",
+            sa.Integer(),
+            sa.ForeignKey("plans.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("expiring", sa.Integer(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("analytics_expiry_daily")
+    op.drop_table("analytics_plan_daily")
@@ -0,0 +1,60 @@
+"""Add server_metrics (partitioned by day) and 1m/1h rollups
+
+Revision ID: f6d2b8c4e1a7
+Revises: e5c1a7b9d3f4
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "f6d2b8c4e1a7"
+down_revision = "e5c1a7b9d3f4"
+branch_labels = None
+depends_on = None
+
+
+def _create_rollup(name: str) -> None:
+    op.create_table(
+        name,
+        sa.Column("server_id", sa.Integer(), primary_key=True),
+        sa.Column("bucket", sa.DateTime(timezone=True), primary_key=True),
+        sa.Column("samples", sa.Integer(), nullable=False),
+        sa.Column("active_peers_avg", sa.Float(), nullable=False),
+        sa.Column("active_peers_max", sa.Integer(), nullable=False),
+        sa.Column("bytes_in", sa.BigInteger(), nullable=False),
+        sa.Column("bytes_out", sa.BigInteger(), nullable=False),
+        sa.Column("cpu_avg", sa.Float(), nullable=False),
+        sa.Column("cpu_max", sa.Float(), nullable=False),
+    )
+
+
+def upgrade() -> None:
+    # op.create_table не умеет PARTITION BY — родительская таблица руками.
+    # Дневные партиции создаёт MetricsService.ensure_partitions() перед COPY.
+    op.execute(
+        """
+        CREATE TABLE server_metrics (
+            server_id    integer          NOT NULL,
+            ts           timestamptz      NOT NULL,
+            active_peers integer          NOT NULL,
+            bytes_in     bigint           NOT NULL,
+            bytes_out    bigint           NOT NULL,
+            cpu          double precision NOT NULL
+        ) PARTITION BY RANGE (ts)
+        """
+    )
+    op.create_index("ix_server_metrics_server_ts", "server_metrics", ["server_id", "ts"])
+
+    _create_rollup("server_metrics_1m")
+    _create_rollup("server_metrics_1h")
+
+
+def downgrade() -> None:
+    op.drop_table("server_metrics_1h")
+    op.drop_table("server_metrics_1m")
+    # партиции удаляются вместе с родителем
+    op.drop_table("server_metrics")
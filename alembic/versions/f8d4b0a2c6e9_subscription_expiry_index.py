@@ -0,0 +1,32 @@
+"""Partial index on active subscriptions' expires_at
+
+Revision ID: f8d4b0a2c6e9
+Revises: e7c3a9f1b5d8
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "f8d4b0a2c6e9"
+down_revision = "e7c3a9f1b5d8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # "истекает в окне" / "просрочена, но ещё active": range scan только по
+    # активным подпискам (canceled/none в индекс не попадают)
+    op.create_index(
+        "ix_subscriptions_active_expires_at",
+        "subscriptions",
+        ["expires_at"],
+        postgresql_where=sa.text("status = 'active'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_subscriptions_active_expires_at", table_name="subscriptions")
@@ -0,0 +1,278 @@
+"""
+Структурированный access log: одна JSON-строка на запрос.
+
+    {"ts": ..., "method": "GET", "route": "/billing/summary", "path": ...,
+     "status": 200, "latency_ms": 3.1, "db_time_ms": 1.2, "db_queries": 2,
+     "user_id": 42, "device_id": "..."}
+
+- route — шаблон роута (низкая кардинальность), path — фактический путь
+- db_time_ms / db_queries — время и число запросов к БД за запрос (события
+  Engine, контекст запроса — contextvar, доходит и до потоков threadpool)
+- user_id — из get_current_user, device_id — заголовок X-Device-Id
+
+Запрос только кладёт LogRecord в ограниченную очередь (QueueHandler,
+put_nowait) и никогда не ждёт: очередь полна -> запись отбрасывается и
+считается в dropped. JSON-сериализацию и запись делает поток access-log-writer
+пачками до ACCESS_LOG_BATCH_SIZE строк одним write. Под нагрузкой пачки
+набираются сами, в тишине строка уходит сразу.
+
+Вывод — stdout (ACCESS_LOG_PATH не задан) или файл. Счётчики —
+GET /admin/access-log.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler
+from typing import TextIO
+
+import orjson
+from fastapi import FastAPI
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+access_logger = logging.getLogger("app.access")
+
+DEVICE_ID_HEADER = "X-Device-Id"
+DEVICE_ID_MAX_LENGTH = 128
+_QUERY_STARTED = "access_log_query_started"
+
+
+@dataclass(slots=True)
+class RequestLog:
+    user_id: int | None = None
+    db_time: float = 0.0
+    db_queries: int = 0
+
+
+_current: ContextVar[RequestLog | None] = ContextVar("access_log_request", default=None)
+
+
+def set_user(user_id: int) -> None:
+    entry = _current.get()
+    if entry is not None:
+        entry.user_id = user_id
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current.get() is not None:
+        conn.info[_QUERY_STARTED] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    entry = _current.get()
+    started = conn.info.pop(_QUERY_STARTED, None)
+    if entry is None or started is None:
+        return
+    entry.db_time += time.perf_counter() - started
+    entry.db_queries += 1
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler, который не блокирует и не печатает traceback на полной
+    очереди, а считает потерянные записи.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        super().__init__(queue.Queue(maxsize=maxsize))
+        self._lock_dropped = threading.Lock()
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # форматирование — в потоке writer'а, не на пути запроса
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock_dropped:
+                self.dropped += 1
+
+
+class AccessLogFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = getattr(record, "access", None) or {"message": record.getMessage()}
+        ts = datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds")
+        return orjson.dumps({"ts": ts, **entry}).decode()
+
+
+class AccessLogWriter:
+    def __init__(
+        self,
+        handler: DroppingQueueHandler,
+        stream: TextIO,
+        *,
+        batch_size: int,
+        flush_interval_sec: float,
+    ) -> None:
+        self.handler = handler
+        self.stream = stream
+        self.batch_size = batch_size
+        self.flush_interval_sec = flush_interval_sec
+        self.formatter = AccessLogFormatter()
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+
+    def flush(self, *, block: bool) -> int:
+        """
+        Одна пачка: ждёт первую запись (block) и добирает готовые без ожидания.
+        Возвращает число обработанных записей.
+        """
+        q = self.handler.queue
+        try:
+            first = q.get(timeout=self.flush_interval_sec) if block else q.get_nowait()
+        except queue.Empty:
+            return 0
+
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(q.get_nowait())
+            except queue.Empty:
+                break
+
+        records = [r for r in batch if r is not None]
+        if not records:
+            return len(batch)
+        try:
+            self.stream.write("".join(self.formatter.format(r) + "\n" for r in records))
+            self.stream.flush()
+        except Exception:
+            self.failed += len(records)
+            logger.exception("Access log write failed, %d records lost", len(records))
+        else:
+            self.written += len(records)
+            self.batches += 1
+        return len(batch)
+
+    def run(self, stop: threading.Event) -> None:
+        while not stop.is_set():
+            self.flush(block=True)
+        # остаток очереди — перед выходом процесса
+        while self.flush(block=False):
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.handler.queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.handler.dropped,
+            "failed": self.failed,
+        }
+
+
+class AccessLogMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        entry = RequestLog()
+        token = _current.set(entry)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            device_id = Headers(scope=scope).get(DEVICE_ID_HEADER)
+            access_logger.info(
+                "request",
+                extra={
+                    "access": {
+                        "method": scope["method"],
+                        "route": getattr(route, "path", None),
+                        "path": scope["path"],
+                        "status": status_code,
+                        "latency_ms": round((time.perf_counter() - started) * 1000, 3),
+                        "db_time_ms": round(entry.db_time * 1000, 3),
+                        "db_queries": entry.db_queries,
+                        "user_id": entry.user_id,
+                        "device_id": device_id[:DEVICE_ID_MAX_LENGTH] if device_id else None,
+                    }
+                },
+            )
+
+
+access_log_handler = DroppingQueueHandler(maxsize=settings.access_log_queue_size)
+access_log_writer = AccessLogWriter(
+    access_log_handler,
+    sys.stdout,
+    batch_size=settings.access_log_batch_size,
+    flush_interval_sec=settings.access_log_flush_interval_sec,
+)
+
+
+def install_access_log(app: FastAPI) -> None:
+    if not settings.access_log_enabled:
+        return
+    access_logger.setLevel(logging.INFO)
+    access_logger.propagate = False
+    if access_log_handler not in access_logger.handlers:
+        access_logger.addHandler(access_log_handler)
+    app.add_middleware(AccessLogMiddleware)
+
+
+def start_access_log_writer() -> tuple[threading.Thread, threading.Event]:
+    # logging.config.fileConfig после импорта приложения (alembic env.py,
+    # uvicorn --log-config) выключает уже созданные логгеры, и наш в том числе
+    access_logger.disabled = False
+    if settings.access_log_path:
+        access_log_writer.stream = open(
+            settings.access_log_path, "a", encoding="utf-8", buffering=1024 * 1024
+        )
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=access_log_writer.run,
+        args=(stop,),
+        name="access-log-writer",
+        daemon=True,
+    )
+    thread.start()
+    return thread, stop
+
+
+def stop_access_log_writer(
+    thread: threading.Thread, stop: threading.Event, *, timeout: float = 5
+) -> None:
+    stop.set()
+    # будим поток, не дожидаясь ACCESS_LOG_FLUSH_INTERVAL_SEC (None не пишется);
+    # полная очередь и так не даст ему уснуть
+    try:
+        access_log_handler.queue.put_nowait(None)
+    except queue.Full:
+        pass
+    thread.join(timeout=timeout)
+    if access_log_writer.stream is not sys.stdout:
+        access_log_writer.stream.close()
+        access_log_writer.stream = sys.stdout
@@ -0,0 +1,201 @@
+"""
+Сжатие ответов (gzip / br / zstd) для больших JSON: /admin/billing/users,
+/admin/servers и прочие списки.
+
+- кодировка: первая из COMPRESSION_ENCODINGS (порядок сервера), которую клиент
+  принимает в Accept-Encoding с q > 0; br и zstd — только если установлены
+  brotli / zstandard (extra "compression"), иначе пропускаются
+- сжимаем только ответы целиком (Response / RowsJSONResponse) с content-type из
+  allow list и не меньше COMPRESSION_MIN_BYTES; потоковые ответы (SSE,
+  StreamingResponse) и уже закодированные идут как есть
+- тело от COMPRESSION_THREADPOOL_MIN_BYTES сжимается в threadpool: несколько
+  мегабайт brotli/gzip — это десятки миллисекунд, event loop их ждать не должен
+"""
+
+from __future__ import annotations
+
+import gzip
+from collections.abc import Callable, Iterable
+from functools import partial
+
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+Codec = Callable[[bytes], bytes]
+
+# ответы без тела: сжимать нечего
+NO_BODY_STATUSES = frozenset({204, 304})
+
+
+def make_codec(encoding: str, level: int) -> Codec | None:
+    """
+    None — кодировка неизвестна или её пакет не установлен.
+    """
+    if encoding == "gzip":
+        # mtime=0: одинаковое тело -> одинаковые байты (ETag / кэши прокси)
+        return partial(gzip.compress, compresslevel=level, mtime=0)
+    if encoding == "br":
+        try:
+            import brotli
+        except ImportError:
+            return None
+        return partial(brotli.compress, quality=level)
+    if encoding == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            return None
+
+        # ZstdCompressor не потокобезопасен, а сжатие идёт и из threadpool
+        def _zstd(body: bytes) -> bytes:
+            return zstandard.ZstdCompressor(level=level).compress(body)
+
+        return _zstd
+    return None
+
+
+def _split(value: str) -> list[str]:
+    return [item.strip().lower() for item in value.split(",") if item.strip()]
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """
+    "gzip;q=0.5, br" -> {"gzip": 0.5, "br": 1.0}. Кривой q считаем нулём.
+    """
+    accepted: dict[str, float] = {}
+    for item in header.split(","):
+        token, _, params = item.partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[token] = q
+    return accepted
+
+
+def choose_encoding(header: str, preferred: Iterable[str]) -> str | None:
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    for encoding in preferred:
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Чистый ASGI (не BaseHTTPMiddleware): http.response.start придерживаем до
+    первого тела, решаем по заголовкам и размеру, потом отправляем оба сообщения.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        codecs: dict[str, Codec],
+        content_types: frozenset[str],
+        min_bytes: int,
+        threadpool_min_bytes: int,
+    ) -> None:
+        self.app = app
+        # порядок ключей = порядок предпочтения сервера
+        self.codecs = codecs
+        self.encodings = list(codecs)
+        self.content_types = content_types
+        self.min_bytes = min_bytes
+        self.threadpool_min_bytes = threadpool_min_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(
+            Headers(scope=scope).get("accept-encoding", ""), self.encodings
+        )
+        start: Message | None = None
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if start is None:
+                await send(message)
+                return
+
+            first, start = start, None
+            if message["type"] == "http.response.body" and self._compressible(first):
+                headers = MutableHeaders(scope=first)
+                # кэши между нами и клиентом должны различать варианты ответа
+                headers.add_vary_header("Accept-Encoding")
+                body = message.get("body", b"")
+                if (
+                    encoding is not None
+                    and not message.get("more_body", False)
+                    and len(body) >= self.min_bytes
+                ):
+                    compressed = await self._compress(encoding, body)
+                    if len(compressed) < len(body):
+                        headers["Content-Encoding"] = encoding
+                        headers["Content-Length"] = str(len(compressed))
+                        message = {**message, "body": compressed}
+            await send(first)
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+    def _compressible(self, start: Message) -> bool:
+        if start["status"] in NO_BODY_STATUSES:
+            return False
+        headers = Headers(raw=start.get("headers", []))
+        if "content-encoding" in headers:
+            return False
+        media_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+        return media_type in self.content_types
+
+    async def _compress(self, encoding: str, body: bytes) -> bytes:
+        codec = self.codecs[encoding]
+        if len(body) >= self.threadpool_min_bytes:
+            return await run_in_threadpool(codec, body)
+        return codec(body)
+
+
+def configured_codecs() -> dict[str, Codec]:
+    levels = {
+        "gzip": settings.compression_gzip_level,
+        "br": settings.compression_brotli_quality,
+        "zstd": settings.compression_zstd_level,
+    }
+    codecs: dict[str, Codec] = {}
+    for encoding in _split(settings.compression_encodings):
+        codec = make_codec(encoding, levels.get(encoding, 0))
+        if codec is not None:
+            codecs[encoding] = codec
+    return codecs
+
+
+def install_compression(app: FastAPI) -> None:
+    if not settings.compression_enabled:
+        return
+    codecs = configured_codecs()
+    if not codecs:
+        return
+    app.add_middleware(
+        CompressionMiddleware,
+        codecs=codecs,
+        content_types=frozenset(_split(settings.compression_content_types)),
+        min_bytes=settings.compression_min_bytes,
+        threadpool_min_bytes=settings.compression_threadpool_min_bytes,
+    )
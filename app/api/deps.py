@@ -1,9 +1,13 @@
-from fastapi import Depends, HTTPException, status
+import hmac
+
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 
+from app.api import access_log
 from app.core.config import settings
+from app.core.security import node_token
 from app.db.models.user import User
 from app.db.session import get_db
 
@@ -29,6 +33,7 @@ def get_current_user(
     user = db.query(User).filter(User.email == email).one_or_none()
     if not user:
         raise cred_exc
+    access_log.set_user(user.id)
     return user
 
 def require_admin(user=Depends(get_current_user)):
@@ -37,4 +42,16 @@ def require_admin(user=Depends(get_current_user)):
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin only",
         )
-    return user
\ No newline at end of file
+    return user
+
+def require_node_token(server_id: int, x_node_token: str | None = Header(default=None)) -> None:
+    """
+    Аутентификация VPN-ноды (node API) токеном её сервера (node_token): нода
+    ходит только в /nodes/{свой server_id}/..., чужой server_id -> 401.
+    """
+    expected = node_token(server_id)
+    if not expected or not x_node_token or not hmac.compare_digest(x_node_token, expected):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid node token",
+        )
@@ -23,6 +23,12 @@ from app.services.admin_subscription_service import (
     AdminPlanNotFoundError,
     AdminPlanInactiveError,
 )
+from app.services.idempotency_service import IdempotencyKeyReusedError
+from app.services.wireguard_service import (
+    AddressPoolExhaustedError,
+    WireGuardKeySecretMissingError,
+    WireGuardNotConfiguredError,
+)
 
 
 def install_exception_handlers(app: FastAPI) -> None:
@@ -190,3 +196,65 @@ def install_exception_handlers(app: FastAPI) -> None:
                 },
             },
         )
+
+    # -------- wireguard --------
+
+    @app.exception_handler(WireGuardNotConfiguredError)
+    async def _wireguard_not_configured_handler(
+        request: Request,
+        exc: WireGuardNotConfiguredError,
+    ):
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT,
+            content={
+                "detail": exc.message(),
+                "code": "wireguard_not_configured",
+                "meta": {
+                    "server_id": exc.server_id,
+                },
+            },
+        )
+
+    @app.exception_handler(WireGuardKeySecretMissingError)
+    async def _wireguard_key_secret_missing_handler(
+        request: Request,
+        exc: WireGuardKeySecretMissingError,
+    ):
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={
+                "detail": exc.message(),
+                "code": "wireguard_key_secret_missing",
+            },
+        )
+
+    @app.exception_handler(AddressPoolExhaustedError)
+    async def _address_pool_exhausted_handler(
+        request: Request,
+        exc: AddressPoolExhaustedError,
+    ):
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT,
+            content={
+                "detail": exc.message(),
+                "code": "address_pool_exhausted",
+                "meta": {
+                    "server_id": exc.server_id,
+                },
+            },
+        )
+
+    # -------- idempotency --------
+
+    @app.exception_handler(IdempotencyKeyReusedError)
+    async def _idempotency_key_reused_handler(
+        request: Request,
+        exc: IdempotencyKeyReusedError,
+    ):
+        return JSONResponse(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            content={
+                "detail": exc.message(),
+                "code": "idempotency_key_reused",
+            },
+        )
@@ -0,0 +1,73 @@
+"""
+Заголовок Idempotency-Key на мутирующих роутах (см. IdempotencyService).
+
+    def renew(..., idempotency: IdempotencyRequest | None = Depends(idempotency_request)):
+        return run_idempotent(db, idempotency, current_user.id, BillingSummaryOut, action)
+
+action() выполняется внутри unit of work и возвращает то, что отдал бы роут;
+ответ сериализуется схемой и сохраняется в той же транзакции. Повтор с тем же
+ключом получает сохранённый ответ с заголовком Idempotent-Replayed: true.
+Ключ захватывается в SAVEPOINT вместе с action(): ошибка снимает и его, и
+повтор выполнится заново.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from typing import Any
+
+from fastapi import Header, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.db.uow import savepoint, unit_of_work
+from app.services.idempotency_service import (
+    IdempotencyRequest,
+    IdempotencyService,
+    request_fingerprint,
+)
+
+IDEMPOTENT_REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+async def idempotency_request(
+    request: Request,
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key", max_length=255),
+) -> IdempotencyRequest | None:
+    if not idempotency_key:
+        return None
+    # тело уже прочитано FastAPI для payload — request.body() отдаёт его из кэша
+    body = await request.body()
+    return IdempotencyRequest(
+        key=idempotency_key,
+        fingerprint=request_fingerprint(request.method, request.url.path, body),
+    )
+
+
+def run_idempotent(
+    db: Session,
+    idempotency: IdempotencyRequest | None,
+    user_id: int,
+    schema: type[BaseModel],
+    action: Callable[[], Any],
+    *,
+    status_code: int = 200,
+) -> Any:
+    with unit_of_work(db):
+        if idempotency is None:
+            return action()
+
+        service = IdempotencyService(db)
+        with savepoint(db):
+            stored = service.claim(user_id, idempotency)
+            if stored is not None:
+                return JSONResponse(
+                    stored.body,
+                    status_code=stored.status_code,
+                    headers={IDEMPOTENT_REPLAYED_HEADER: "true"},
+                )
+
+            body = schema.model_validate(action()).model_dump(mode="json")
+            service.store(user_id, idempotency, status_code, body)
+    return body
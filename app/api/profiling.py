@@ -0,0 +1,301 @@
+"""
+Сэмплирующий профайлер запросов: где медленный запрос провёл время
+(argon2 в verify_password, jwt.decode, гидрация ORM, Pydantic...).
+
+Включается PROFILE_ENABLED=true (иначе middleware даже не ставится — ноль
+накладных расходов). Профилируется запрос, если:
+- пришёл заголовок X-Profile с PROFILE_TOKEN (без токена заголовок игнорируется:
+  иначе любой клиент мог бы нагружать воркер), или
+- выпал жребий PROFILE_SAMPLE_RATE (доля запросов, 0..1)
+
+Пока в процессе есть профилируемый запрос, поток-сэмплер раз в
+PROFILE_INTERVAL_MS снимает стеки (sys._current_frames) потока event loop и
+потоков threadpool (синхронные роуты и зависимости), пропуская простаивающие.
+Стеки копятся в collapsed-формате ("a;b;c N") — его читают flamegraph.pl,
+speedscope, inferno:
+- GET /admin/debug/profile — последние PROFILE_KEEP профилей
+- GET /admin/debug/profile/{id}/collapsed — стеки одного запроса
+- GET /admin/debug/profile/collapsed — сумма по всем
+- PROFILE_DIR — ещё и файлом на каждый запрос
+Ответ профилированного запроса несёт заголовок X-Profile-Id.
+
+Потоки не привязаны к запросу: при параллельных запросах в стеки попадут и
+соседние. max_concurrency профиля показывает, сколько запросов было в полёте;
+для чистой картины — профилировать по заголовку на ненагруженном воркере.
+"""
+
+from __future__ import annotations
+
+import hmac
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from types import CodeType, FrameType
+
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# threadpool anyio, в котором FastAPI выполняет синхронные роуты/зависимости
+WORKER_THREAD_NAME = "AnyIO worker thread"
+MAX_STACK_DEPTH = 128
+# стек, листовой кадр которого — ожидание: поток простаивает, не сэмплируем
+IDLE_LEAVES = {
+    "threading.py": {"wait"},
+    "queue.py": {"get"},
+    "selectors.py": {"select"},
+    "runners.py": {"run"},
+    "base_events.py": {"run_forever", "run_until_complete", "_run_once"},
+}
+# стеки сверх лимита в суммарном профиле
+OVERFLOW_STACK = "(other)"
+
+
+@lru_cache(maxsize=16384)
+def _frame_label(code: CodeType) -> str:
+    path = code.co_filename
+    marker = path.rfind("site-packages/")
+    if marker != -1:
+        path = path[marker + len("site-packages/") :]
+    else:
+        path = os.path.relpath(path) if os.path.isabs(path) else path
+    return f"{code.co_qualname} ({path}:{code.co_firstlineno})"
+
+
+def _is_idle(frame: FrameType) -> bool:
+    names = IDLE_LEAVES.get(os.path.basename(frame.f_code.co_filename))
+    return names is not None and frame.f_code.co_name in names
+
+
+def collapse(frame: FrameType) -> str:
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join(labels)
+
+
+def format_collapsed(stacks: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+@dataclass(slots=True)
+class RequestProfile:
+    id: int
+    method: str
+    path: str
+    started_at: datetime
+    status_code: int = 0
+    duration_ms: float = 0.0
+    samples: int = 0
+    max_concurrency: int = 1
+    stacks: Counter = field(default_factory=Counter)
+    _started: float = field(default_factory=time.perf_counter)
+
+
+class Profiler:
+    def __init__(
+        self,
+        *,
+        interval_sec: float,
+        keep: int,
+        max_samples: int,
+        max_stacks: int,
+        directory: str | None = None,
+    ) -> None:
+        self.interval_sec = interval_sec
+        self.max_samples = max_samples
+        self.max_stacks = max_stacks
+        self.directory = Path(directory) if directory else None
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._active: dict[int, RequestProfile] = {}
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.recent: deque[RequestProfile] = deque(maxlen=keep)
+        self.aggregate: Counter = Counter()
+
+    # ---------- request lifecycle ----------
+    def begin(self, method: str, path: str, *, concurrency: int) -> RequestProfile:
+        profile = RequestProfile(
+            id=next(self._ids),
+            method=method,
+            path=path,
+            started_at=datetime.now(timezone.utc),
+            max_concurrency=concurrency,
+        )
+        with self._lock:
+            self._active[profile.id] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="request-profiler", daemon=True
+                )
+                self._thread.start()
+        self._wake.set()
+        return profile
+
+    def note_concurrency(self, in_flight: int) -> None:
+        if not self._active:
+            return
+        with self._lock:
+            for profile in self._active.values():
+                profile.max_concurrency = max(profile.max_concurrency, in_flight)
+
+    def end(self, profile: RequestProfile, status_code: int) -> None:
+        with self._lock:
+            self._active.pop(profile.id, None)
+            if not self._active:
+                self._wake.clear()
+            profile.status_code = status_code
+            profile.duration_ms = round((time.perf_counter() - profile._started) * 1000, 3)
+            self.recent.append(profile)
+            for stack, count in profile.stacks.items():
+                if stack in self.aggregate or len(self.aggregate) < self.max_stacks:
+                    self.aggregate[stack] += count
+                else:
+                    self.aggregate[OVERFLOW_STACK] += count
+
+    def write(self, profile: RequestProfile) -> None:
+        if self.directory is None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = f"{profile.started_at:%Y%m%dT%H%M%S}-{os.getpid()}-{profile.id}.collapsed"
+        (self.directory / name).write_text(format_collapsed(profile.stacks))
+
+    def get(self, profile_id: int) -> RequestProfile | None:
+        with self._lock:
+            return next((p for p in self.recent if p.id == profile_id), None)
+
+    def profiles(self) -> list[RequestProfile]:
+        with self._lock:
+            return list(reversed(self.recent))
+
+    def aggregate_collapsed(self) -> str:
+        with self._lock:
+            return format_collapsed(self.aggregate)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.recent.clear()
+            self.aggregate.clear()
+
+    # ---------- sampler ----------
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while True:
+            self._wake.wait()
+            self.sample(skip=own)
+            time.sleep(self.interval_sec)
+
+    def sample(self, *, skip: int | None = None) -> None:
+        frames = sys._current_frames()
+        main = threading.main_thread().ident
+        stacks = []
+        for thread in threading.enumerate():
+            if thread.ident == skip:
+                continue
+            if thread.ident != main and thread.name != WORKER_THREAD_NAME:
+                continue
+            frame = frames.get(thread.ident)
+            if frame is None or _is_idle(frame):
+                continue
+            stacks.append(collapse(frame))
+
+        with self._lock:
+            for profile in self._active.values():
+                if profile.samples >= self.max_samples:
+                    continue
+                profile.samples += 1
+                profile.stacks.update(stacks)
+
+
+class ProfilingMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        profiler: Profiler,
+        sample_rate: float,
+        token: str | None,
+    ) -> None:
+        self.app = app
+        self.profiler = profiler
+        self.sample_rate = sample_rate
+        self.token = token
+        # только из потока event loop -> без lock
+        self.in_flight = 0
+
+    def _should_profile(self, scope: Scope) -> bool:
+        if self.token:
+            header = Headers(scope=scope).get(PROFILE_HEADER)
+            if header and hmac.compare_digest(header, self.token):
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        self.in_flight += 1
+        try:
+            self.profiler.note_concurrency(self.in_flight)
+            if not self._should_profile(scope):
+                await self.app(scope, receive, send)
+                return
+            await self._profiled(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+    async def _profiled(self, scope: Scope, receive: Receive, send: Send) -> None:
+        profile = self.profiler.begin(scope["method"], scope["path"], concurrency=self.in_flight)
+        status_code = 500
+
+        async def send_with_id(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append(PROFILE_ID_HEADER, str(profile.id))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            self.profiler.end(profile, status_code)
+            if self.profiler.directory is not None:
+                await run_in_threadpool(self.profiler.write, profile)
+
+
+profiler = Profiler(
+    interval_sec=settings.profile_interval_ms / 1000,
+    keep=settings.profile_keep,
+    max_samples=settings.profile_max_samples,
+    max_stacks=settings.profile_max_stacks,
+    directory=settings.profile_dir,
+)
+
+
+def install_profiling(app: FastAPI) -> None:
+    if not settings.profile_enabled:
+        return
+    app.add_middleware(
+        ProfilingMiddleware,
+        profiler=profiler,
+        sample_rate=settings.profile_sample_rate,
+        token=settings.profile_token,
+    )
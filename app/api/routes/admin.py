@@ -1,11 +1,37 @@
-from fastapi import APIRouter, Depends
+from datetime import datetime
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
+from app.api.access_log import access_log_writer
 from app.api.deps import get_current_user, require_admin
-from app.api.schemas.admin import AdminServerOut, AdminUserOut
+from app.api.rows import RowsJSONResponse
+from app.api.schemas.admin import (
+    AccessLogStatsOut,
+    AdminServerOut,
+    AdminServerSearchOut,
+    AdminUserOut,
+    CacheStatsOut,
+    NodeTokenOut,
+    SingleFlightStatsOut,
+)
+from app.api.schemas.metrics import METRICS_SERIES_MAX_POINTS, MetricPointOut
+from app.api.schemas.server import (
+    SERVER_SEARCH_DEFAULT_LIMIT,
+    SERVER_SEARCH_MAX_LIMIT,
+    ServerStatusOut,
+)
+from app.core.security import node_token
 from app.db.models.user import User
 from app.db.session import get_db
+from app.db.uow import unit_of_work
+from app.services.billing_service import BillingService
+from app.services.metrics_service import MetricsService
+from app.services.probe_service import ProbeService
 from app.services.server_service import ServerService
+from app.services.single_flight import single_flight
+from app.services.summary_cache import summary_cache
 
 router = APIRouter(
     prefix="/admin",
@@ -16,8 +42,7 @@ router = APIRouter(
 
 @router.get("/users", response_model=list[AdminUserOut])
 def list_users(db: Session = Depends(get_db)):
-    from app.db.models.user import User as UserModel
-    return db.query(UserModel).order_by(UserModel.id).all()
+    return RowsJSONResponse(BillingService(db).list_users_admin())
 
 
 @router.get("/servers", response_model=list[AdminServerOut])
@@ -25,7 +50,82 @@ def list_all_servers(db: Session = Depends(get_db)):
     """
     Админ видит ВСЕ серверы, включая soft-deleted
     """
-    return ServerService(db).list_all_admin()
+    return RowsJSONResponse(ServerService(db).list_all_admin())
+
+
+@router.get("/servers/search", response_model=AdminServerSearchOut)
+def search_all_servers(
+    q: str | None = Query(default=None, max_length=255),
+    mode: Literal["prefix", "fuzzy"] = "prefix",
+    country: str | None = Query(default=None, min_length=2, max_length=2),
+    is_active: bool | None = None,
+    owner_id: int | None = None,
+    include_deleted: bool = True,
+    limit: int = Query(default=SERVER_SEARCH_DEFAULT_LIMIT, ge=1, le=SERVER_SEARCH_MAX_LIMIT),
+    cursor: str | None = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Админский поиск по всем серверам (по умолчанию включая soft-deleted).
+    """
+    return ServerService(db).search(
+        q=q,
+        mode=mode,
+        country=country,
+        is_active=is_active,
+        owner_id=owner_id,
+        include_deleted=include_deleted,
+        limit=limit,
+        cursor=cursor,
+    )
+
+
+@router.get("/servers/status", response_model=list[ServerStatusOut])
+def list_server_statuses(
+    only_down: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    Health-probe статусы всех серверов (only_down=true -> только недоступные).
+    """
+    return ProbeService(db).list_all(only_down=only_down)
+
+
+@router.get("/servers/{server_id}/metrics", response_model=list[MetricPointOut])
+def get_server_metrics(
+    server_id: int,
+    resolution: Literal["1m", "1h"] = "1m",
+    since: datetime | None = None,
+    until: datetime | None = None,
+    limit: int = Query(default=METRICS_SERIES_MAX_POINTS, ge=1, le=METRICS_SERIES_MAX_POINTS),
+    db: Session = Depends(get_db),
+):
+    """
+    Телеметрия сервера из rollup'ов (1m — по умолчанию последний час, 1h — неделя).
+    """
+    ServerService(db).get_any_or_404(server_id)
+    return MetricsService(db).series(
+        server_id,
+        resolution=resolution,
+        since=since,
+        until=until,
+        limit=limit,
+    )
+
+
+@router.get("/servers/{server_id}/node-token", response_model=NodeTokenOut)
+def get_server_node_token(server_id: int, db: Session = Depends(get_db)):
+    """
+    Учётные данные ноды сервера для node API (/nodes/{server_id}/...).
+    """
+    ServerService(db).get_any_or_404(server_id)
+    token = node_token(server_id)
+    if token is None:
+        raise HTTPException(
+            status_code=409,
+            detail="Node API is disabled (NODE_API_TOKEN is not set)",
+        )
+    return {"server_id": server_id, "token": token}
 
 
 @router.post("/servers/{server_id}/delete", response_model=AdminServerOut)
@@ -37,7 +137,8 @@ def admin_soft_delete_server(
     """
     Админский soft delete (идемпотентно).
     """
-    return ServerService(db).admin_soft_delete(server_id, actor_id=current_admin.id)
+    with unit_of_work(db):
+        return ServerService(db).admin_soft_delete(server_id, actor_id=current_admin.id)
 
 
 @router.post("/servers/{server_id}/restore", response_model=AdminServerOut)
@@ -49,4 +150,31 @@ def admin_restore_server(
     """
     Админский restore (идемпотентно).
     """
-    return ServerService(db).admin_restore(server_id, actor_id=current_admin.id)
+    with unit_of_work(db):
+        return ServerService(db).admin_restore(server_id, actor_id=current_admin.id)
+
+
+@router.get("/cache/billing-summary", response_model=CacheStatsOut)
+def billing_summary_cache_stats():
+    """
+    Счётчики кэша /billing/summary этого процесса (у каждого воркера свои).
+    """
+    return summary_cache.stats()
+
+
+@router.get("/single-flight", response_model=SingleFlightStatsOut)
+def single_flight_stats():
+    """
+    Счётчики single-flight этого процесса: сколько чтений получили результат
+    параллельного одинакового запроса вместо своего.
+    """
+    return single_flight.stats()
+
+
+@router.get("/access-log", response_model=AccessLogStatsOut)
+def access_log_stats():
+    """
+    Очередь access log этого процесса: записано, отброшено на полной очереди
+    (dropped), потеряно при ошибке записи (failed).
+    """
+    return access_log_writer.stats()
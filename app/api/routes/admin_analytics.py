@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.api.deps import require_admin
+from app.api.schemas.analytics import AnalyticsOut
+from app.core.config import settings
+from app.db.session import get_db
+from app.db.uow import unit_of_work
+from app.services.analytics_service import ANALYTICS_MAX_DAYS, AnalyticsService
+
+router = APIRouter(
+    prefix="/admin/analytics",
+    tags=["admin-analytics"],
+    dependencies=[Depends(require_admin)],
+)
+
+
+@router.get("", response_model=AnalyticsOut)
+def get_analytics(
+    days: int = Query(30, ge=1, le=ANALYTICS_MAX_DAYS),
+    expiring_days: int = Query(7, ge=1, le=settings.analytics_expiry_horizon_days),
+    db: Session = Depends(get_db),
+):
+    """
+    MRR, активные подписчики по планам, отток и истечения за ближайшие дни.
+    Читает дневные rollup'ы (обновляет джоба analytics.refresh).
+    """
+    return AnalyticsService(db).report(days=days, expiring_days=expiring_days)
+
+
+@router.post("/refresh", response_model=AnalyticsOut)
+def refresh_analytics(
+    days: int = Query(30, ge=1, le=ANALYTICS_MAX_DAYS),
+    expiring_days: int = Query(7, ge=1, le=settings.analytics_expiry_horizon_days),
+    db: Session = Depends(get_db),
+):
+    """
+    Внеочередной пересчёт rollup'ов (не дожидаясь джобы).
+    """
+    service = AnalyticsService(db)
+    with unit_of_work(db):
+        service.refresh()
+    return service.report(days=days, expiring_days=expiring_days)
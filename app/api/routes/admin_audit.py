@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.api.deps import require_admin
+from app.api.schemas.audit import AuditPageOut
+from app.db.session import get_db
+from app.services.audit_service import AUDIT_PAGE_MAX_LIMIT, AuditService
+
+router = APIRouter(
+    prefix="/admin/audit",
+    tags=["admin-audit"],
+    dependencies=[Depends(require_admin)],
+)
+
+
+@router.get("/{entity_type}/{entity_id}", response_model=AuditPageOut)
+def entity_history(
+    entity_type: Literal["server", "plan", "subscription"],
+    entity_id: int,
+    limit: int = Query(default=50, ge=1, le=AUDIT_PAGE_MAX_LIMIT),
+    cursor: str | None = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Журнал изменений сущности, от новых к старым (для subscription entity_id —
+    user_id). Keyset-пагинация: передай next_cursor из предыдущего ответа.
+    События пишутся пачками, последние видны с задержкой до интервала writer'а.
+    """
+    return AuditService(db).history(entity_type, entity_id, limit=limit, cursor=cursor)
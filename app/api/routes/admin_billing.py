@@ -1,12 +1,11 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm import Session
 
 from app.api.deps import require_admin
+from app.api.rows import RowsJSONResponse
 from app.api.schemas.admin_billing import AdminBillingUserOut
-from app.db.models.subscription import Subscription
-from app.db.models.user import User
 from app.db.session import get_db
 from app.services.billing_service import BillingService
 
@@ -21,26 +20,6 @@ router = APIRouter(
 def list_users_billing(db: Session = Depends(get_db)):
     """
     Админ-таблица для UI: список пользователей + billing summary.
+    Один SELECT на весь список, ответ рендерится orjson'ом (app.api.rows).
     """
-    users: list[User] = (
-        db.query(User)
-        .options(
-            selectinload(User.subscription).selectinload(Subscription.plan)
-        )
-        .order_by(User.id.asc())
-        .all()
-    )
-
-    billing = BillingService(db)
-
-    out: list[AdminBillingUserOut] = []
-    for u in users:
-        out.append(
-            AdminBillingUserOut(
-                id=u.id,
-                email=u.email,
-                role=u.role,
-                billing=billing.summary(u),
-            )
-        )
-    return out
+    return RowsJSONResponse(BillingService(db).admin_summaries())
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.api.deps import require_admin
+from app.api.profiling import format_collapsed, profiler
+from app.api.schemas.debug import ProfilerOut
+from app.core.config import settings
+
+router = APIRouter(
+    prefix="/admin/debug",
+    tags=["admin-debug"],
+    dependencies=[Depends(require_admin)],
+)
+
+
+@router.get("/profile", response_model=ProfilerOut)
+def list_profiles():
+    """
+    Последние профили запросов этого процесса (у каждого воркера свои),
+    новые первыми. Стеки — в /profile/{id}/collapsed.
+    """
+    return {
+        "enabled": settings.profile_enabled,
+        "sample_rate": settings.profile_sample_rate,
+        "interval_ms": settings.profile_interval_ms,
+        "aggregate_stacks": len(profiler.aggregate),
+        "profiles": profiler.profiles(),
+    }
+
+
+@router.get("/profile/collapsed", response_class=PlainTextResponse)
+def aggregate_profile():
+    """
+    Сумма стеков всех профилей в collapsed-формате (flamegraph.pl, speedscope).
+    """
+    return profiler.aggregate_collapsed()
+
+
+@router.get("/profile/{profile_id}/collapsed", response_class=PlainTextResponse)
+def request_profile(profile_id: int):
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return format_collapsed(profile.stacks)
@@ -5,7 +5,9 @@ from sqlalchemy.orm import Session
 
 from app.api.deps import require_admin
 from app.api.schemas.admin_plan import AdminPlanCreate, AdminPlanOut, AdminPlanUpdate
+from app.db.models.user import User
 from app.db.session import get_db
+from app.db.uow import unit_of_work
 from app.services.plan_service import PlanService
 
 router = APIRouter(
@@ -21,8 +23,13 @@ def list_plans(db: Session = Depends(get_db)):
 
 
 @router.post("", response_model=AdminPlanOut, status_code=status.HTTP_201_CREATED)
-def create_plan(payload: AdminPlanCreate, db: Session = Depends(get_db)):
-    return PlanService(db).create(payload.model_dump())
+def create_plan(
+    payload: AdminPlanCreate,
+    db: Session = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
+    with unit_of_work(db):
+        return PlanService(db).create(payload.model_dump(), actor_id=admin.id)
 
 
 @router.get("/{plan_id}", response_model=AdminPlanOut)
@@ -31,22 +38,38 @@ def get_plan(plan_id: int, db: Session = Depends(get_db)):
 
 
 @router.patch("/{plan_id}", response_model=AdminPlanOut)
-def update_plan(plan_id: int, payload: AdminPlanUpdate, db: Session = Depends(get_db)):
+def update_plan(
+    plan_id: int,
+    payload: AdminPlanUpdate,
+    db: Session = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
     svc = PlanService(db)
     plan = svc.get_or_404(plan_id)
     data = payload.model_dump(exclude_unset=True)
-    return svc.update(plan, data)
+    with unit_of_work(db):
+        return svc.update(plan, data, actor_id=admin.id)
 
 
 @router.post("/{plan_id}/activate", response_model=AdminPlanOut)
-def activate_plan(plan_id: int, db: Session = Depends(get_db)):
+def activate_plan(
+    plan_id: int,
+    db: Session = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
     svc = PlanService(db)
     plan = svc.get_or_404(plan_id)
-    return svc.activate(plan)
+    with unit_of_work(db):
+        return svc.activate(plan, actor_id=admin.id)
 
 
 @router.post("/{plan_id}/deactivate", response_model=AdminPlanOut)
-def deactivate_plan(plan_id: int, db: Session = Depends(get_db)):
+def deactivate_plan(
+    plan_id: int,
+    db: Session = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
     svc = PlanService(db)
     plan = svc.get_or_404(plan_id)
-    return svc.deactivate(plan)
+    with unit_of_work(db):
+        return svc.deactivate(plan, actor_id=admin.id)
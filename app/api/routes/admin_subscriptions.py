@@ -1,19 +1,32 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, status
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
 from app.api.deps import require_admin
+from app.api.idempotency import idempotency_request, run_idempotent
 from app.api.schemas.admin_subscription import (
     AdminCancelSubscriptionIn,
     AdminExtendSubscriptionIn,
     AdminGrantSubscriptionIn,
     AdminSubscriptionOut,
     AdminUserWithSubscriptionOut,
+    SubscriptionCountAsOfOut,
+    SubscriptionEventOut,
+    SubscriptionStateAsOfOut,
 )
 from app.db.models.user import User
 from app.db.session import get_db
 from app.services.admin_subscription_service import AdminSubscriptionService
+from app.services.idempotency_service import IdempotencyRequest
+from app.services.subscription_history_service import (
+    SUBSCRIPTION_TIMELINE_MAX_LIMIT,
+    SubscriptionHistoryService,
+    effective_status,
+)
+from app.services.subscription_service import SUBSCRIPTION_EXPIRY_MAX_LIMIT, SubscriptionService
 
 router = APIRouter(
     prefix="/admin/subscriptions",
@@ -29,43 +42,56 @@ def list_users_with_subscriptions(db: Session = Depends(get_db)):
     return users
 
 
-@router.post("/users/{user_id}/grant", response_model=AdminSubscriptionOut)
-def grant_subscription(
-    user_id: int,
-    payload: AdminGrantSubscriptionIn,
-    db: Session = Depends(get_db),
-):
-    sub = AdminSubscriptionService(db).grant(
-        user_id=user_id,
-        plan_code=payload.plan_code,
-        expires_at=payload.expires_at,
-    )
+def _subscription_out(sub) -> dict:
     # отдаем plan_code/plan_name для UI (через relationship)
-    plan = sub.plan if hasattr(sub, "plan") else None
     return {
         "user_id": sub.user_id,
         "status": sub.status,
-        "plan_code": getattr(plan, "code", None),
-        "plan_name": getattr(plan, "name", None),
+        "plan_code": getattr(sub.plan, "code", None),
+        "plan_name": getattr(sub.plan, "name", None),
         "expires_at": sub.expires_at,
     }
 
 
+@router.post("/users/{user_id}/grant", response_model=AdminSubscriptionOut)
+def grant_subscription(
+    user_id: int,
+    payload: AdminGrantSubscriptionIn,
+    db: Session = Depends(get_db),
+    admin: User = Depends(require_admin),
+    idempotency: IdempotencyRequest | None = Depends(idempotency_request),
+):
+    def grant() -> dict:
+        sub = AdminSubscriptionService(db).grant(
+            user_id=user_id,
+            plan_code=payload.plan_code,
+            expires_at=payload.expires_at,
+            actor_id=admin.id,
+        )
+        return _subscription_out(sub)
+
+    return run_idempotent(db, idempotency, admin.id, AdminSubscriptionOut, grant)
+
+
 @router.post("/users/{user_id}/extend", response_model=AdminSubscriptionOut)
 def extend_subscription(
     user_id: int,
     payload: AdminExtendSubscriptionIn,
     db: Session = Depends(get_db),
+    admin: User = Depends(require_admin),
+    idempotency: IdempotencyRequest | None = Depends(idempotency_request),
 ):
-    sub = AdminSubscriptionService(db).extend(user_id=user_id, days=payload.days)
-    plan = sub.plan if hasattr(sub, "plan") else None
-    return {
-        "user_id": sub.user_id,
-        "status": sub.status,
-        "plan_code": getattr(plan, "code", None),
-        "plan_name": getattr(plan, "name", None),
-        "expires_at": sub.expires_at,
-    }
+    """
+    С Idempotency-Key двойной клик в админке не продлевает подписку дважды.
+    """
+
+    def extend() -> dict:
+        sub = AdminSubscriptionService(db).extend(
+            user_id=user_id, days=payload.days, actor_id=admin.id
+        )
+        return _subscription_out(sub)
+
+    return run_idempotent(db, idempotency, admin.id, AdminSubscriptionOut, extend)
 
 
 @router.post("/users/{user_id}/cancel", response_model=AdminSubscriptionOut)
@@ -73,29 +99,129 @@ def cancel_subscription(
     user_id: int,
     payload: AdminCancelSubscriptionIn,
     db: Session = Depends(get_db),
+    admin: User = Depends(require_admin),
+    idempotency: IdempotencyRequest | None = Depends(idempotency_request),
 ):
-    sub = AdminSubscriptionService(db).cancel(user_id=user_id, immediately=payload.immediately)
-    plan = sub.plan if hasattr(sub, "plan") else None
-    return {
-        "user_id": sub.user_id,
-        "status": sub.status,
-        "plan_code": getattr(plan, "code", None),
-        "plan_name": getattr(plan, "name", None),
-        "expires_at": sub.expires_at,
-    }
+    def cancel() -> dict:
+        sub = AdminSubscriptionService(db).cancel(
+            user_id=user_id, immediately=payload.immediately, actor_id=admin.id
+        )
+        return _subscription_out(sub)
+
+    return run_idempotent(db, idempotency, admin.id, AdminSubscriptionOut, cancel)
 
 
 @router.post("/users/{user_id}/reactivate", response_model=AdminSubscriptionOut)
 def reactivate_subscription(
     user_id: int,
     db: Session = Depends(get_db),
+    admin: User = Depends(require_admin),
+    idempotency: IdempotencyRequest | None = Depends(idempotency_request),
 ):
-    sub = AdminSubscriptionService(db).reactivate(user_id=user_id)
-    plan = sub.plan if hasattr(sub, "plan") else None
+    def reactivate() -> dict:
+        sub = AdminSubscriptionService(db).reactivate(user_id=user_id, actor_id=admin.id)
+        return _subscription_out(sub)
+
+    return run_idempotent(db, idempotency, admin.id, AdminSubscriptionOut, reactivate)
+
+
+def _as_utc(at: datetime | None) -> datetime:
+    if at is None:
+        return datetime.now(timezone.utc)
+    # naive -> UTC (как хранится в БД)
+    return at if at.tzinfo is not None else at.replace(tzinfo=timezone.utc)
+
+
+@router.get("/users/{user_id}/history", response_model=list[SubscriptionEventOut])
+def subscription_history(
+    user_id: int,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    limit: int = Query(default=100, ge=1, le=SUBSCRIPTION_TIMELINE_MAX_LIMIT),
+    db: Session = Depends(get_db),
+):
+    """
+    Хронология подписки пользователя (subscription_events), от старых к новым.
+    """
+    return SubscriptionHistoryService(db).timeline(
+        user_id,
+        since=_as_utc(since) if since is not None else None,
+        until=_as_utc(until) if until is not None else None,
+        limit=limit,
+    )
+
+
+@router.get("/users/{user_id}/as-of", response_model=SubscriptionStateAsOfOut)
+def subscription_state_as_of(
+    user_id: int,
+    at: datetime | None = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Состояние подписки пользователя на момент at (по умолчанию — сейчас).
+    """
+    at = _as_utc(at)
+    event = SubscriptionHistoryService(db).state_as_of(user_id, at)
+    if event is None:
+        raise HTTPException(status_code=404, detail="No subscription history at this time")
     return {
-        "user_id": sub.user_id,
-        "status": sub.status,
-        "plan_code": getattr(plan, "code", None),
-        "plan_name": getattr(plan, "name", None),
-        "expires_at": sub.expires_at,
+        "user_id": user_id,
+        "at": at,
+        "status": effective_status(event.status, event.expires_at, at),
+        "plan_id": event.plan_id,
+        "expires_at": event.expires_at,
+        "event": event,
     }
+
+
+@router.get("/as-of", response_model=list[SubscriptionCountAsOfOut])
+def subscription_counts_as_of(
+    at: datetime | None = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Число подписок по (план, статус) на момент at — база для отчётов по выручке.
+    """
+    return SubscriptionHistoryService(db).counts_as_of(_as_utc(at))
+
+
+def _cursor(after: datetime | None, after_user_id: int | None) -> tuple[datetime, int] | None:
+    if after is None or after_user_id is None:
+        return None
+    return _as_utc(after), after_user_id
+
+
+@router.get("/expiring", response_model=list[AdminSubscriptionOut])
+def list_expiring_subscriptions(
+    days: int = Query(default=7, ge=1, le=365),
+    limit: int = Query(default=100, ge=1, le=SUBSCRIPTION_EXPIRY_MAX_LIMIT),
+    after: datetime | None = None,
+    after_user_id: int | None = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Активные подписки, истекающие в ближайшие days дней, по возрастанию expires_at.
+    Следующая страница: after=<expires_at>&after_user_id=<user_id> последней строки.
+    """
+    now = datetime.now(timezone.utc)
+    subs = SubscriptionService(db).expiring_between(
+        now,
+        now + timedelta(days=days),
+        limit=limit,
+        after=_cursor(after, after_user_id),
+    )
+    return [_subscription_out(sub) for sub in subs]
+
+
+@router.get("/overdue", response_model=list[AdminSubscriptionOut])
+def list_overdue_subscriptions(
+    limit: int = Query(default=100, ge=1, le=SUBSCRIPTION_EXPIRY_MAX_LIMIT),
+    after: datetime | None = None,
+    after_user_id: int | None = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Подписки со status=active, у которых expires_at уже прошёл.
+    """
+    subs = SubscriptionService(db).overdue(limit=limit, after=_cursor(after, after_user_id))
+    return [_subscription_out(sub) for sub in subs]
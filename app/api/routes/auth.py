@@ -10,6 +10,7 @@ from app.api.deps import get_current_user
 from app.core.security import create_access_token, hash_password, verify_password
 from app.db.models.user import User
 from app.db.session import get_db
+from app.db.uow import unit_of_work
 from app.services.device_service import DeviceIdRequiredError, DeviceService
 from app.services.limits import NoActiveSubscriptionError, SubscriptionExpiredError
 from app.services.subscription_service import SubscriptionService
@@ -40,15 +41,16 @@ def register(payload: RegisterIn, db: Session = Depends(get_db)):
             content={"detail": "Email already registered"},
         )
 
-    user = User(
-        email=payload.email,
-        password_hash=hash_password(payload.password),
-    )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    # user + FREE подписка — одна транзакция, один commit
+    with unit_of_work(db):
+        user = User(
+            email=payload.email,
+            password_hash=hash_password(payload.password),
+        )
+        db.add(user)
+        db.flush()  # INSERT ... RETURNING id
 
-    SubscriptionService(db).ensure_user_has_subscription(user.id)
+        SubscriptionService(db).ensure_user_has_subscription(user.id)
 
     return TokenOut(access_token=create_access_token(subject=user.email))
 
@@ -71,11 +73,12 @@ def login(
     token = create_access_token(subject=user.email)
 
     try:
-        DeviceService(db).register_or_touch_login_device(
-            user=user,
-            device_id=x_device_id,
-            device_name=x_device_name,
-        )
+        with unit_of_work(db):
+            DeviceService(db).register_or_touch_login_device(
+                user=user,
+                device_id=x_device_id,
+                device_name=x_device_name,
+            )
     except SubscriptionExpiredError:
         # ✅ expired: token выдаём, но девайс НЕ регистрируем и лимиты НЕ трогаем
         pass
@@ -4,12 +4,17 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user
+from app.api.idempotency import idempotency_request, run_idempotent
 from app.api.schemas.billing import BillingSummaryOut, PlanOut, RenewIn
 from app.db.models.user import User
-from app.db.models.device import Device
 from app.db.session import get_db
 from app.services.billing_service import BillingService
+from app.services.device_service import DeviceService
+from app.services.idempotency_service import IdempotencyRequest
+from app.services.job_handlers import DEVICES_PURGE_REVOKED
+from app.services.job_service import JobService
 from app.services.plan_service import PlanService
+from app.services.single_flight import flight_key, single_flight
 from app.services.subscription_service import SubscriptionService
 
 router = APIRouter(prefix="/billing", tags=["billing"])
@@ -19,8 +24,13 @@ router = APIRouter(prefix="/billing", tags=["billing"])
 def list_plans(db: Session = Depends(get_db)):
     """
     Публичный список доступных тарифов (только активные).
+    Одновременные запросы (всплеск после релиза клиента) делят один SELECT.
     """
-    return PlanService(db).list_active()
+    return single_flight.do(
+        flight_key("GET /billing/plans"),
+        # схемы, а не ORM-объекты: результат уходит в чужие запросы
+        lambda: [PlanOut.model_validate(p) for p in PlanService(db).list_active()],
+    )
 
 
 @router.get("/summary", response_model=BillingSummaryOut)
@@ -28,39 +38,53 @@ def billing_summary(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    return BillingService(db).summary(current_user)
+    return single_flight.do(
+        flight_key("GET /billing/summary", current_user.id),
+        lambda: BillingService(db).cached_summary(current_user),
+    )
 
 
 @router.post("/cancel", response_model=BillingSummaryOut)
 def cancel_subscription(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
+    idempotency: IdempotencyRequest | None = Depends(idempotency_request),
 ):
     """
     Отмена подписки.
 
     ВАЖНО ДЛЯ ТЕСТОВ:
     - после cancel новый девайс НЕ должен считаться превышением лимита
-    - поэтому чистим devices пользователя
+    - поэтому сразу отзываем devices пользователя (один UPDATE),
+      а физическое удаление уходит в фоновую задачу
     """
-    SubscriptionService(db).cancel_user_subscription(current_user.id)
 
-    # 🔥 КЛЮЧЕВОЙ ФИКС
-    db.query(Device).filter(Device.user_id == current_user.id).delete(
-        synchronize_session=False
-    )
-    db.commit()
+    def cancel() -> dict:
+        SubscriptionService(db).cancel_user_subscription(current_user.id)
 
-    return BillingService(db).summary(current_user)
+        # 🔥 КЛЮЧЕВОЙ ФИКС
+        revoked = DeviceService(db).revoke_all_for_user(current_user.id)
+        if revoked:
+            JobService(db).enqueue(
+                DEVICES_PURGE_REVOKED, {"user_id": current_user.id, "device_ids": revoked}
+            )
+        # внутри транзакции: кэш summary ещё не инвалидирован (это делает commit)
+        return BillingService(db).summary(current_user)
+
+    return run_idempotent(db, idempotency, current_user.id, BillingSummaryOut, cancel)
 
 
 @router.post("/resume", response_model=BillingSummaryOut)
 def resume_subscription(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
+    idempotency: IdempotencyRequest | None = Depends(idempotency_request),
 ):
-    SubscriptionService(db).resume_user_subscription(current_user.id)
-    return BillingService(db).summary(current_user)
+    def resume() -> dict:
+        SubscriptionService(db).resume_user_subscription(current_user.id)
+        return BillingService(db).summary(current_user)
+
+    return run_idempotent(db, idempotency, current_user.id, BillingSummaryOut, resume)
 
 
 @router.post("/renew", response_model=BillingSummaryOut)
@@ -68,10 +92,19 @@ def renew_subscription(
     payload: RenewIn,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
+    idempotency: IdempotencyRequest | None = Depends(idempotency_request),
 ):
-    SubscriptionService(db).renew_user_subscription(
-        current_user.id,
-        plan_code=payload.plan_code,
-        days=payload.days,
-    )
-    return BillingService(db).summary(current_user)
+    """
+    С Idempotency-Key повтор (ретрай мобильного клиента) не продлевает подписку
+    второй раз, а получает ответ первого запроса.
+    """
+
+    def renew() -> dict:
+        SubscriptionService(db).renew_user_subscription(
+            current_user.id,
+            plan_code=payload.plan_code,
+            days=payload.days,
+        )
+        return BillingService(db).summary(current_user)
+
+    return run_idempotent(db, idempotency, current_user.id, BillingSummaryOut, renew)
@@ -4,10 +4,14 @@ from fastapi import APIRouter, Depends, status
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user
+from app.api.rows import RowsJSONResponse
 from app.api.schemas.device import DeviceOut
+from app.api.schemas.wireguard import WireGuardConfigOut, WireGuardPeerIn
 from app.db.models.user import User
 from app.db.session import get_db
+from app.db.uow import unit_of_work
 from app.services.device_service import DeviceService
+from app.services.wireguard_service import WireGuardService
 
 router = APIRouter(prefix="/devices", tags=["devices"])
 
@@ -23,7 +27,8 @@ def list_devices(
     По умолчанию возвращаем только активные (revoked_at IS NULL).
     include_revoked=true -> вернуть и отозванные.
     """
-    return DeviceService(db).list_owned(current_user.id, include_revoked=include_revoked)
+    devices = DeviceService(db).list_owned(current_user.id, include_revoked=include_revoked)
+    return RowsJSONResponse(devices)
 
 
 @router.post("/{device_id}/revoke", status_code=status.HTTP_204_NO_CONTENT)
@@ -35,5 +40,27 @@ def revoke_device(
     """
     Отозвать устройство по id (освобождает слот).
     """
-    DeviceService(db).revoke_owned(device_id=device_id, owner_id=current_user.id)
+    with unit_of_work(db):
+        DeviceService(db).revoke_owned(device_id=device_id, owner_id=current_user.id)
     return None
+
+
+@router.post("/{device_id}/wireguard", response_model=WireGuardConfigOut)
+def issue_wireguard_config(
+    device_id: int,
+    payload: WireGuardPeerIn,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    WireGuard-конфиг устройства для своего сервера.
+    Повторный вызов возвращает тот же адрес и ключ (rotate=true -> новый ключ).
+    """
+    with unit_of_work(db):
+        return WireGuardService(db).issue_config(
+            user=current_user,
+            device_id=device_id,
+            server_id=payload.server_id,
+            public_key=payload.public_key,
+            rotate=payload.rotate,
+        )
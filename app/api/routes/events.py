@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_user
+from app.api.schemas.billing import BillingSummaryOut
+from app.api.schemas.device import DeviceOut
+from app.api.sse import sse_response
+from app.db.models.user import User
+from app.db.session import SessionLocal, get_db
+from app.services.billing_service import BillingService
+from app.services.device_service import DeviceService
+from app.services.event_bus import (
+    EVENT_DEVICE_ADDED,
+    EVENT_DEVICES_REVOKED,
+    EVENT_PLANS_CHANGED,
+    EVENT_RESYNC,
+    EVENT_SERVERS_CHANGED,
+    EVENT_SUBSCRIPTION_CHANGED,
+)
+from app.services.event_hub import user_topic
+
+router = APIRouter(tags=["events"])
+
+SUMMARY_EVENTS = {
+    EVENT_SUBSCRIPTION_CHANGED,
+    EVENT_SERVERS_CHANGED,
+    EVENT_PLANS_CHANGED,
+    EVENT_DEVICE_ADDED,
+    EVENT_DEVICES_REVOKED,
+    EVENT_RESYNC,
+}
+DEVICE_EVENTS = {EVENT_DEVICE_ADDED, EVENT_DEVICES_REVOKED, EVENT_RESYNC}
+
+
+def user_state(db: Session, user_id: int, kinds: set[str]) -> list[tuple[str, object]]:
+    """
+    Актуальные summary/devices для набора событий (то же, что GET /billing/summary и GET /devices).
+    """
+    user = db.get(User, user_id)
+    if user is None:
+        return []
+
+    out: list[tuple[str, object]] = []
+    if kinds & SUMMARY_EVENTS:
+        # мимо summary_cache: обработчик кэша мог ещё не получить это же событие
+        summary = BillingSummaryOut.model_validate(BillingService(db).summary(user))
+        out.append(("summary", summary.model_dump(mode="json")))
+    if kinds & DEVICE_EVENTS:
+        devices = DeviceService(db).list_owned(user_id)
+        out.append(
+            ("devices", [DeviceOut.model_validate(d).model_dump(mode="json") for d in devices])
+        )
+    return out
+
+
+def _load_user_state(user_id: int, kinds: set[str]) -> list[tuple[str, object]]:
+    # у потока своя короткая сессия на каждое обновление: соединение из пула
+    # берётся только на время чтения, а не на всё время жизни SSE
+    db = SessionLocal()
+    try:
+        return user_state(db, user_id, kinds)
+    finally:
+        db.close()
+
+
+@router.get("/events")
+async def user_events(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    SSE вместо опроса /billing/summary и /devices.
+
+    - ready, затем summary + devices (начальное состояние)
+    - дальше summary/devices приходят при изменении подписки или устройств
+    - ": ping" раз в EVENTS_HEARTBEAT_SEC
+    """
+    user_id = current_user.id
+    # сессия запроса потоку не нужна: соединение возвращаем в пул сразу
+    await run_in_threadpool(db.rollback)
+
+    async def _render(kinds: set[str]) -> list[tuple[str, object]]:
+        # чтение в threadpool: event loop обслуживает остальные соединения
+        return await run_in_threadpool(_load_user_state, user_id, kinds)
+
+    return sse_response(user_topic(user_id), {"user_id": user_id}, render=_render)
@@ -0,0 +1,92 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.api.deps import require_node_token
+from app.api.schemas.metrics import MetricsIngestIn, MetricsIngestOut
+from app.api.schemas.peer_feed import PEER_FEED_DEFAULT_LIMIT, PEER_FEED_MAX_LIMIT, PeerFeedOut
+from app.api.schemas.usage import UsageIngestIn, UsageIngestOut
+from app.api.sse import sse_response
+from app.db.models.server import Server
+from app.db.session import get_db
+from app.services.event_hub import server_topic
+from app.services.metrics_service import MetricsService
+from app.services.peer_feed_service import PeerFeedService
+from app.services.usage_service import UsageService
+
+router = APIRouter(
+    prefix="/nodes",
+    tags=["nodes"],
+    dependencies=[Depends(require_node_token)],
+)
+
+
+@router.post(
+    "/{server_id}/metrics",
+    response_model=MetricsIngestOut,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def ingest_metrics(
+    server_id: int,
+    payload: MetricsIngestIn,
+    db: Session = Depends(get_db),
+):
+    """
+    Нода присылает пачку метрик (active peers, bytes in/out, CPU).
+    Ответ сразу после постановки в буфер; в server_metrics пишет metrics writer.
+    """
+    return MetricsService(db).submit(
+        server_id,
+        [s.model_dump() for s in payload.samples],
+    )
+
+
+@router.post(
+    "/{server_id}/usage",
+    response_model=UsageIngestOut,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def ingest_usage(
+    server_id: int,
+    payload: UsageIngestIn,
+    db: Session = Depends(get_db),
+):
+    """
+    Нода присылает трафик по пользователям (дельты с прошлого отчёта).
+    Суммируется в памяти и раз в USAGE_FLUSH_INTERVAL_SEC уходит в usage_counters.
+    """
+    return UsageService(db).submit(
+        server_id,
+        [item.model_dump() for item in payload.items],
+    )
+
+
+@router.get("/{server_id}/peers", response_model=PeerFeedOut)
+def peer_feed(
+    server_id: int,
+    since: int | None = Query(default=None, ge=0),
+    limit: int = Query(default=PEER_FEED_DEFAULT_LIMIT, ge=1, le=PEER_FEED_MAX_LIMIT),
+    db: Session = Depends(get_db),
+):
+    """
+    Пиры, которых нода должна пустить.
+
+    - без since (или since старше скомпактированной части ленты) -> полный снапшот
+    - иначе только upsert/remove после since; version из ответа — следующий since
+    """
+    return PeerFeedService(db).feed(server_id, since=since, limit=limit)
+
+
+@router.get("/{server_id}/events")
+async def peer_events(server_id: int, db: Session = Depends(get_db)):
+    """
+    SSE вместо опроса: событие peers.changed -> нода запрашивает /peers?since=.
+    resync (listener переподключился или нода не успевала читать) -> тоже.
+    """
+    server = await run_in_threadpool(db.get, Server, server_id)
+    if server is None or server.deleted_at is not None:
+        raise HTTPException(status_code=404, detail="Server not found")
+    # потоку БД не нужна: завершаем read-транзакцию, соединение уходит в пул,
+    # а не висит занятым всё время жизни SSE
+    await run_in_threadpool(db.rollback)
+    return sse_response(server_topic(server_id), {"server_id": server_id})
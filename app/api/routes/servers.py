@@ -1,10 +1,27 @@
-from fastapi import APIRouter, Depends, status
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query, status
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user
-from app.api.schemas.server import ServerCreate, ServerOut, ServerUpdate
+from app.api.rows import RowsJSONResponse
+from app.api.schemas.server import (
+    SERVER_BEST_MAX_LIMIT,
+    SERVER_SEARCH_DEFAULT_LIMIT,
+    SERVER_SEARCH_MAX_LIMIT,
+    BestServerOut,
+    ServerBulkCreateIn,
+    ServerBulkCreateOut,
+    ServerCreate,
+    ServerOut,
+    ServerSearchOut,
+    ServerStatusOut,
+    ServerUpdate,
+)
 from app.db.models.user import User
 from app.db.session import get_db
+from app.db.uow import unit_of_work
+from app.services.probe_service import ProbeService
 from app.services.server_service import ServerService
 
 router = APIRouter(prefix="/servers", tags=["servers"])
@@ -18,7 +35,47 @@ def list_servers(
     """
     Пользователь видит ТОЛЬКО свои "живые" (не удалённые) серверы.
     """
-    return ServerService(db).list_owned_live(current_user.id)
+    return RowsJSONResponse(ServerService(db).list_owned_live(current_user.id))
+
+
+@router.get("/search", response_model=ServerSearchOut)
+def search_servers(
+    q: str | None = Query(default=None, max_length=255),
+    mode: Literal["prefix", "fuzzy"] = "prefix",
+    country: str | None = Query(default=None, min_length=2, max_length=2),
+    is_active: bool | None = None,
+    limit: int = Query(default=SERVER_SEARCH_DEFAULT_LIMIT, ge=1, le=SERVER_SEARCH_MAX_LIMIT),
+    cursor: str | None = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Поиск по своим "живым" серверам: name/host/country/notes.
+    Keyset-пагинация: передай next_cursor из предыдущего ответа.
+    """
+    return ServerService(db).search(
+        q=q,
+        mode=mode,
+        country=country,
+        is_active=is_active,
+        owner_id=current_user.id,
+        limit=limit,
+        cursor=cursor,
+    )
+
+
+@router.get("/best", response_model=list[BestServerOut])
+def best_servers(
+    country: str | None = Query(default=None, min_length=2, max_length=2),
+    limit: int = Query(default=1, ge=1, le=SERVER_BEST_MAX_LIMIT),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Лучшие доступные серверы: up по последнему probe, минимальные latency + load.
+    country — предпочтительная страна (остальные идут следом).
+    """
+    return ServerService(db).best_for_user(current_user.id, country=country, limit=limit)
 
 
 @router.post("", response_model=ServerOut, status_code=status.HTTP_201_CREATED)
@@ -30,11 +87,30 @@ def create_server(
     """
     Создать сервер для текущего пользователя.
     """
-    return ServerService(db).create_owned(
-        payload=payload.model_dump(),
-        owner_id=current_user.id,
-        actor_id=current_user.id,
-    )
+    with unit_of_work(db):
+        return ServerService(db).create_owned(
+            payload=payload.model_dump(),
+            owner_id=current_user.id,
+            actor_id=current_user.id,
+        )
+
+
+@router.post("/bulk", response_model=ServerBulkCreateOut)
+def bulk_create_servers(
+    payload: ServerBulkCreateIn,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Bulk-импорт серверов текущего пользователя.
+    Лимит плана проверяется на весь батч; дубли host+port -> status=conflict.
+    """
+    with unit_of_work(db):
+        return ServerService(db).create_owned_bulk(
+            payloads=[item.model_dump() for item in payload.items],
+            owner_id=current_user.id,
+            actor_id=current_user.id,
+        )
 
 
 @router.get("/{server_id}", response_model=ServerOut)
@@ -49,6 +125,19 @@ def get_server(
     return ServerService(db).get_owned_live_or_404(server_id, current_user.id)
 
 
+@router.get("/{server_id}/status", response_model=ServerStatusOut)
+def get_server_status(
+    server_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Последний результат health-probe своего сервера.
+    """
+    ServerService(db).get_owned_live_or_404(server_id, current_user.id)
+    return ProbeService(db).get_for_server(server_id)
+
+
 @router.patch("/{server_id}", response_model=ServerOut)
 def update_server(
     server_id: int,
@@ -62,7 +151,8 @@ def update_server(
     svc = ServerService(db)
     server = svc.get_owned_live_or_404(server_id, current_user.id)
     data = payload.model_dump(exclude_unset=True)
-    return svc.update_owned(server, data=data, actor_id=current_user.id)
+    with unit_of_work(db):
+        return svc.update_owned(server, data=data, actor_id=current_user.id)
 
 
 @router.delete("/{server_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -76,5 +166,6 @@ def delete_server(
     """
     svc = ServerService(db)
     server = svc.get_owned_live_or_404(server_id, current_user.id)
-    svc.soft_delete_owned(server, actor_id=current_user.id)
+    with unit_of_work(db):
+        svc.soft_delete_owned(server, actor_id=current_user.id)
     return None
@@ -0,0 +1,26 @@
+"""
+Быстрый путь рендеринга больших списков: проекции сервисов (app.db.projection,
+__slots__-dataclass'ы) -> orjson, без ORM-гидратации и без прохода через Pydantic.
+
+orjson сериализует dataclass по полям в порядке объявления; поля проекций
+названы и упорядочены как в response-схеме, поэтому JSON совпадает с тем, что
+дал бы response_model (datetime в UTC -> "...Z", как у Pydantic).
+response_model на роуте оставляем — для OpenAPI; Response, который вернул роут,
+FastAPI уже не валидирует.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import orjson
+from fastapi import Response
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+class RowsJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
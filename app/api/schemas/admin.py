@@ -33,3 +33,40 @@ class AdminServerOut(BaseModel):
     restored_by: int | None = None
 
     model_config = {"from_attributes": True}
+
+
+class AdminServerSearchOut(BaseModel):
+    items: list[AdminServerOut]
+    next_cursor: str | None = None
+
+
+class NodeTokenOut(BaseModel):
+    server_id: int
+    # заголовок X-Node-Token ноды этого сервера
+    token: str
+
+
+class CacheStatsOut(BaseModel):
+    size: int
+    hits: int
+    misses: int
+    hit_rate: float
+    invalidations: int
+    evictions: int
+
+
+class SingleFlightStatsOut(BaseModel):
+    in_flight: int
+    leaders: int
+    shared: int
+    bypassed: int
+    timeouts: int
+    coalescing_ratio: float
+
+
+class AccessLogStatsOut(BaseModel):
+    queued: int
+    written: int
+    batches: int
+    dropped: int
+    failed: int
@@ -16,6 +16,10 @@ class AdminBillingSummaryOut(BaseModel):
     servers_used: int
     devices_used: int
 
+    # 0 = без лимита
+    traffic_quota_bytes: int = 0
+    traffic_used_bytes: int = 0
+
 
 class AdminBillingUserOut(BaseModel):
     id: int
@@ -12,6 +12,7 @@ class AdminPlanBase(BaseModel):
 
     max_servers: int = Field(ge=0)  # 0 = unlimited
     max_devices: int = Field(ge=0)  # 0 = unlimited
+    traffic_quota_bytes: int = Field(default=0, ge=0)  # 0 = unlimited
 
     is_active: bool = True
 
@@ -28,6 +29,7 @@ class AdminPlanUpdate(BaseModel):
 
     max_servers: int | None = Field(default=None, ge=0)
     max_devices: int | None = Field(default=None, ge=0)
+    traffic_quota_bytes: int | None = Field(default=None, ge=0)
 
     is_active: bool | None = None
 
@@ -37,3 +37,32 @@ class AdminExtendSubscriptionIn(BaseModel):
 class AdminCancelSubscriptionIn(BaseModel):
     # если True -> сразу "canceled" и expires_at = now
     immediately: bool = True
+
+
+class SubscriptionEventOut(BaseModel):
+    id: int
+    kind: str
+    source: str
+    status: str
+    plan_id: int | None = None
+    expires_at: datetime | None = None
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SubscriptionStateAsOfOut(BaseModel):
+    user_id: int
+    at: datetime
+    # с учётом expires_at: active, истёкшая к at, -> expired
+    status: str
+    plan_id: int | None = None
+    expires_at: datetime | None = None
+    # событие, которое задаёт состояние
+    event: SubscriptionEventOut
+
+
+class SubscriptionCountAsOfOut(BaseModel):
+    plan_code: str | None = None
+    status: str
+    count: int
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+
+from pydantic import BaseModel
+
+
+class AnalyticsPlanOut(BaseModel):
+    plan_id: int
+    plan_code: str
+    currency: str
+    active_subscribers: int
+    mrr_cents: int
+
+
+class AnalyticsDayOut(BaseModel):
+    day: date
+    active_subscribers: int
+    # по валютам планов: цены в разных валютах не складываем
+    mrr_cents: dict[str, int]
+    activations: int
+    churned: int
+
+
+class AnalyticsOut(BaseModel):
+    # время последнего refresh; None — rollup ещё ни разу не считался
+    refreshed_at: datetime | None
+    days: int
+
+    active_subscribers: int
+    mrr_cents: dict[str, int]
+
+    activations: int
+    churned: int
+    # churned / активных на начало периода
+    churn_rate: float | None
+
+    expiring_days: int
+    expiring: int
+
+    plans: list[AnalyticsPlanOut]
+    daily: list[AnalyticsDayOut]
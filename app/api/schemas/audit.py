@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class AuditEventOut(BaseModel):
+    id: int
+    created_at: datetime
+    actor_id: int | None
+    entity_type: str
+    entity_id: int
+    action: str
+    # {"field": [old, new]}
+    changes: dict
+
+    model_config = {"from_attributes": True}
+
+
+class AuditPageOut(BaseModel):
+    items: list[AuditEventOut]
+    next_cursor: str | None = None
@@ -17,6 +17,10 @@ class BillingSummaryOut(BaseModel):
     servers_used: int
     devices_used: int
 
+    # 0 = без лимита
+    traffic_quota_bytes: int = 0
+    traffic_used_bytes: int = 0
+
     model_config = ConfigDict(from_attributes=True)
 
 
@@ -32,6 +36,7 @@ class PlanOut(BaseModel):
     currency: str
     max_servers: int
     max_devices: int
+    traffic_quota_bytes: int
     is_active: bool
 
     model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,25 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class RequestProfileOut(BaseModel):
+    id: int
+    method: str
+    path: str
+    status_code: int
+    started_at: datetime
+    duration_ms: float
+    samples: int
+    # сколько запросов процесс обслуживал одновременно: >1 -> в стеках и чужие
+    max_concurrency: int
+
+    model_config = {"from_attributes": True}
+
+
+class ProfilerOut(BaseModel):
+    enabled: bool
+    sample_rate: float
+    interval_ms: float
+    aggregate_stacks: int
+    profiles: list[RequestProfileOut]
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from pydantic import AwareDatetime, BaseModel, ConfigDict, Field
+
+METRICS_INGEST_MAX_SAMPLES = 1000
+METRICS_SERIES_MAX_POINTS = 5000
+
+
+class MetricSampleIn(BaseModel):
+    ts: AwareDatetime
+    active_peers: int = Field(ge=0)
+    # байты за интервал сэмпла
+    bytes_in: int = Field(ge=0)
+    bytes_out: int = Field(ge=0)
+    cpu: float = Field(ge=0, le=100)
+
+
+class MetricsIngestIn(BaseModel):
+    samples: list[MetricSampleIn] = Field(min_length=1, max_length=METRICS_INGEST_MAX_SAMPLES)
+
+
+class MetricsIngestOut(BaseModel):
+    accepted: int
+    # вне окна допустимого ts
+    rejected: int
+    # буфер переполнен
+    dropped: int
+
+
+class MetricPointOut(BaseModel):
+    bucket: datetime
+    samples: int
+    active_peers_avg: float
+    active_peers_max: int
+    bytes_in: int
+    bytes_out: int
+    cpu_avg: float
+    cpu_max: float
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from typing import Literal
+
+from pydantic import BaseModel
+
+PEER_FEED_DEFAULT_LIMIT = 1000
+PEER_FEED_MAX_LIMIT = 10000
+
+
+class PeerFeedItemOut(BaseModel):
+    op: Literal["upsert", "remove"]
+    # None в полном снапшоте
+    version: int | None = None
+    peer_id: int
+    user_id: int
+    public_key: str
+    address: str | None = None
+
+
+class PeerFeedOut(BaseModel):
+    # курсор для следующего запроса (?since=)
+    version: int
+    # true -> peers — полный список активных пиров, нода заменяет своё состояние целиком
+    full: bool
+    # есть ещё изменения после version: запросить сразу, не дожидаясь интервала
+    has_more: bool
+    peers: list[PeerFeedItemOut]
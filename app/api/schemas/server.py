@@ -1,7 +1,14 @@
 from __future__ import annotations
 
+from datetime import datetime
+from typing import Literal
+
 from pydantic import BaseModel, ConfigDict, Field
 
+# base64 от 32 байт (ключи WireGuard)
+WG_KEY_PATTERN = r"^[A-Za-z0-9+/]{42}[AEIMQUYcgkosw048]=$"
+WG_SUBNET_PATTERN = r"^\d{1,3}(\.\d{1,3}){3}/\d{1,2}$"
+
 
 class ServerBase(BaseModel):
     name: str = Field(..., max_length=120)
@@ -10,6 +17,8 @@ class ServerBase(BaseModel):
     country: str | None = Field(default=None, min_length=2, max_length=2)  # ISO2
     is_active: bool = True
     notes: str | None = None
+    wg_public_key: str | None = Field(default=None, pattern=WG_KEY_PATTERN)
+    wg_subnet: str | None = Field(default=None, pattern=WG_SUBNET_PATTERN)
 
 
 class ServerCreate(ServerBase):
@@ -22,6 +31,8 @@ class ServerUpdate(BaseModel):
     port: int | None = None
     country: str | None = None
     notes: str | None = None
+    wg_public_key: str | None = Field(default=None, pattern=WG_KEY_PATTERN)
+    wg_subnet: str | None = Field(default=None, pattern=WG_SUBNET_PATTERN)
 
 
 class ServerOut(ServerBase):
@@ -29,3 +40,67 @@ class ServerOut(ServerBase):
     owner_id: int
 
     model_config = ConfigDict(from_attributes=True)
+
+
+# ---------- bulk import ----------
+
+SERVER_BULK_MAX_ITEMS = 5000
+
+
+class ServerBulkCreateIn(BaseModel):
+    items: list[ServerCreate] = Field(..., min_length=1, max_length=SERVER_BULK_MAX_ITEMS)
+
+
+class ServerBulkItemOut(BaseModel):
+    index: int
+    # created | conflict (host+port уже занят живым сервером или повторяется в батче)
+    status: Literal["created", "conflict"]
+    server: ServerOut | None = None
+
+
+class ServerBulkCreateOut(BaseModel):
+    created: int
+    conflicts: int
+    items: list[ServerBulkItemOut]
+
+
+# ---------- directory search ----------
+
+SERVER_SEARCH_DEFAULT_LIMIT = 50
+SERVER_SEARCH_MAX_LIMIT = 200
+
+
+class ServerSearchOut(BaseModel):
+    items: list[ServerOut]
+    # None -> страниц больше нет
+    next_cursor: str | None = None
+
+
+# ---------- health probes ----------
+
+SERVER_BEST_MAX_LIMIT = 20
+
+
+class BestServerOut(BaseModel):
+    server_id: int
+    name: str
+    host: str
+    port: int
+    country: str | None = None
+    latency_ms: int | None = None
+    load: float
+    score: float
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ServerStatusOut(BaseModel):
+    server_id: int
+    is_up: bool
+    checked_at: datetime
+    last_ok_at: datetime | None = None
+    latency_ms: int | None = None
+    consecutive_failures: int
+    last_error: str | None = None
+
+    model_config = ConfigDict(from_attributes=True)
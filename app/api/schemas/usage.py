@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from pydantic import BaseModel, Field
+
+USAGE_INGEST_MAX_ITEMS = 5000
+# 1 PiB за один отчёт ноды: больше — заведомо битые данные
+USAGE_REPORT_MAX_BYTES = 2**50
+
+
+class UsageItemIn(BaseModel):
+    user_id: int
+    # байты с прошлого отчёта ноды (дельта)
+    bytes_in: int = Field(ge=0, le=USAGE_REPORT_MAX_BYTES)
+    bytes_out: int = Field(ge=0, le=USAGE_REPORT_MAX_BYTES)
+
+
+class UsageIngestIn(BaseModel):
+    items: list[UsageItemIn] = Field(min_length=1, max_length=USAGE_INGEST_MAX_ITEMS)
+
+
+class UsageIngestOut(BaseModel):
+    accepted: int
+    # неизвестный user_id
+    rejected: int
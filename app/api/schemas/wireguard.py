@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from pydantic import BaseModel, Field
+
+from app.api.schemas.server import WG_KEY_PATTERN
+
+
+class WireGuardPeerIn(BaseModel):
+    server_id: int
+    # свой ключ клиента (рекомендуется): приватный ключ не покидает устройство
+    public_key: str | None = Field(default=None, pattern=WG_KEY_PATTERN)
+    # выдать новый серверный ключ вместо текущего
+    rotate: bool = False
+
+
+class WireGuardConfigOut(BaseModel):
+    peer_id: int
+    device_id: int
+    server_id: int
+    address: str
+    public_key: str
+    # None, если ключ прислал клиент
+    private_key: str | None = None
+    # готовый wg-quick конфиг
+    config: str
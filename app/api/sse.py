@@ -0,0 +1,69 @@
+"""
+Server-Sent Events поверх подписок event_hub.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from collections.abc import AsyncIterator, Awaitable, Callable
+
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.services.event_bus import EVENT_RESYNC
+from app.services.event_hub import event_hub
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    # nginx: не буферизовать поток
+    "X-Accel-Buffering": "no",
+}
+
+# kinds событий -> [(sse event, data)]; например, актуальное состояние из БД
+SseRender = Callable[[set[str]], Awaitable[list[tuple[str, object]]]]
+
+
+def format_sse(event: str, data: object) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+async def _iter_topic(topic: str, hello: dict, render: SseRender | None) -> AsyncIterator[str]:
+    stream = event_hub.subscribe(topic, maxsize=settings.events_stream_buffer)
+    try:
+        yield format_sse("ready", hello)
+        if render is not None:
+            # начальное состояние: дальше клиент получает только изменения
+            for event, data in await render({EVENT_RESYNC}):
+                yield format_sse(event, data)
+
+        while True:
+            try:
+                message = await asyncio.wait_for(
+                    stream.queue.get(), timeout=settings.events_heartbeat_sec
+                )
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+
+            # всё, что успело накопиться, схлопываем: одно событие каждого типа
+            kinds = {message["type"]}
+            while not stream.queue.empty():
+                kinds.add(stream.queue.get_nowait()["type"])
+
+            if render is None:
+                for kind in sorted(kinds):
+                    yield format_sse(kind, {"type": kind})
+            else:
+                for event, data in await render(kinds):
+                    yield format_sse(event, data)
+    finally:
+        event_hub.unsubscribe(stream)
+
+
+def sse_response(topic: str, hello: dict, *, render: SseRender | None = None) -> StreamingResponse:
+    return StreamingResponse(
+        _iter_topic(topic, hello, render),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
@@ -64,6 +64,387 @@ class Settings(BaseSettings):
         validation_alias=AliasChoices("ACCESS_TOKEN_EXPIRE_MIN", "access_token_expire_min"),
     )
 
+    # -------- serving (python -m app.serve) --------
+    serve_host: str = Field(
+        default="0.0.0.0",
+        validation_alias=AliasChoices("SERVE_HOST", "serve_host"),
+    )
+    serve_port: int = Field(
+        default=8000,
+        validation_alias=AliasChoices("SERVE_PORT", "serve_port"),
+    )
+    # 0 -> по числу доступных процессу CPU
+    serve_workers: int = Field(
+        default=0,
+        validation_alias=AliasChoices("SERVE_WORKERS", "serve_workers"),
+    )
+    # очередь принятых ядром соединений на общем сокете (ограничена net.core.somaxconn)
+    serve_backlog: int = Field(
+        default=2048,
+        validation_alias=AliasChoices("SERVE_BACKLOG", "serve_backlog"),
+    )
+    # должен быть меньше idle timeout балансировщика перед API, иначе 502 на гонке закрытия
+    serve_keepalive_sec: int = Field(
+        default=5,
+        validation_alias=AliasChoices("SERVE_KEEPALIVE_SEC", "serve_keepalive_sec"),
+    )
+    # сколько ждать in-flight запросы на SIGTERM, потом соединения закрываются
+    serve_graceful_timeout_sec: int = Field(
+        default=30,
+        validation_alias=AliasChoices("SERVE_GRACEFUL_TIMEOUT_SEC", "serve_graceful_timeout_sec"),
+    )
+
+    # -------- background jobs --------
+    jobs_poll_interval_sec: float = Field(
+        default=1.0,
+        validation_alias=AliasChoices("JOBS_POLL_INTERVAL_SEC", "jobs_poll_interval_sec"),
+    )
+    jobs_batch_size: int = Field(
+        default=10,
+        validation_alias=AliasChoices("JOBS_BATCH_SIZE", "jobs_batch_size"),
+    )
+    jobs_stale_after_sec: int = Field(
+        default=300,
+        validation_alias=AliasChoices("JOBS_STALE_AFTER_SEC", "jobs_stale_after_sec"),
+    )
+    # запускать воркер потоком внутри API-процесса (удобно для dev / одного контейнера)
+    jobs_inprocess_worker: bool = Field(
+        default=False,
+        validation_alias=AliasChoices("JOBS_INPROCESS_WORKER", "jobs_inprocess_worker"),
+    )
+
+    # -------- server health probes --------
+    probe_interval_sec: float = Field(
+        default=30.0,
+        validation_alias=AliasChoices("PROBE_INTERVAL_SEC", "probe_interval_sec"),
+    )
+    # случайный сдвиг старта каждой проверки: не бьём все хосты в одну миллисекунду
+    probe_jitter_sec: float = Field(
+        default=5.0,
+        validation_alias=AliasChoices("PROBE_JITTER_SEC", "probe_jitter_sec"),
+    )
+    probe_timeout_sec: float = Field(
+        default=2.0,
+        validation_alias=AliasChoices("PROBE_TIMEOUT_SEC", "probe_timeout_sec"),
+    )
+    probe_concurrency: int = Field(
+        default=200,
+        validation_alias=AliasChoices("PROBE_CONCURRENCY", "probe_concurrency"),
+    )
+    # tcp: connect(); udp: datagram + ждём любой ответ (для stub/echo-эндпоинтов)
+    probe_protocol: str = Field(
+        default="tcp",
+        validation_alias=AliasChoices("PROBE_PROTOCOL", "probe_protocol"),
+    )
+
+    # -------- best-server ranking --------
+    # как часто in-memory индекс подтягивает изменения из БД (других воркеров / пробера)
+    ranking_refresh_sec: float = Field(
+        default=5.0,
+        validation_alias=AliasChoices("RANKING_REFRESH_SEC", "ranking_refresh_sec"),
+    )
+
+    # -------- node API / telemetry --------
+    # мастер-секрет node API: нода сервера шлёт X-Node-Token = HMAC(секрет, server_id)
+    # (выдаёт GET /admin/servers/{id}/node-token); пусто -> node API выключен
+    node_api_token: str | None = Field(
+        default=None,
+        validation_alias=AliasChoices("NODE_API_TOKEN", "node_api_token"),
+    )
+    # writer-поток: буфер метрик -> server_metrics (COPY), трафик -> usage_counters
+    metrics_writer_enabled: bool = Field(
+        default=True,
+        validation_alias=AliasChoices("METRICS_WRITER_ENABLED", "metrics_writer_enabled"),
+    )
+    metrics_flush_interval_sec: float = Field(
+        default=1.0,
+        validation_alias=AliasChoices("METRICS_FLUSH_INTERVAL_SEC", "metrics_flush_interval_sec"),
+    )
+    # строк на один COPY; полная пачка сбрасывается сразу, не дожидаясь интервала
+    metrics_flush_max_rows: int = Field(
+        default=5000,
+        validation_alias=AliasChoices("METRICS_FLUSH_MAX_ROWS", "metrics_flush_max_rows"),
+    )
+    # сверх этого буфер отбрасывает сэмплы (и считает их), а не растёт
+    metrics_buffer_max_rows: int = Field(
+        default=100_000,
+        validation_alias=AliasChoices("METRICS_BUFFER_MAX_ROWS", "metrics_buffer_max_rows"),
+    )
+    metrics_max_sample_age_sec: int = Field(
+        default=86_400,
+        validation_alias=AliasChoices("METRICS_MAX_SAMPLE_AGE_SEC", "metrics_max_sample_age_sec"),
+    )
+    metrics_rollup_interval_sec: float = Field(
+        default=60.0,
+        validation_alias=AliasChoices("METRICS_ROLLUP_INTERVAL_SEC", "metrics_rollup_interval_sec"),
+    )
+    # окно пересчёта rollup'ов: сэмплы, пришедшие позже, остаются только в сырых данных
+    metrics_rollup_lookback_sec: int = Field(
+        default=900,
+        validation_alias=AliasChoices("METRICS_ROLLUP_LOOKBACK_SEC", "metrics_rollup_lookback_sec"),
+    )
+    metrics_partition_days_ahead: int = Field(
+        default=2,
+        validation_alias=AliasChoices(
+            "METRICS_PARTITION_DAYS_AHEAD", "metrics_partition_days_ahead"
+        ),
+    )
+    metrics_retention_days: int = Field(
+        default=14,
+        validation_alias=AliasChoices("METRICS_RETENTION_DAYS", "metrics_retention_days"),
+    )
+    # окно агрегации трафика пользователей в памяти перед upsert в usage_counters
+    usage_flush_interval_sec: float = Field(
+        default=5.0,
+        validation_alias=AliasChoices("USAGE_FLUSH_INTERVAL_SEC", "usage_flush_interval_sec"),
+    )
+
+    # -------- WireGuard --------
+    # подсеть клиентов, если у сервера не задан wg_subnet (.1 — интерфейс ноды)
+    wg_default_subnet: str = Field(
+        default="10.8.0.0/22",
+        validation_alias=AliasChoices("WG_DEFAULT_SUBNET", "wg_default_subnet"),
+    )
+    wg_dns: str = Field(
+        default="1.1.1.1",
+        validation_alias=AliasChoices("WG_DNS", "wg_dns"),
+    )
+    wg_allowed_ips: str = Field(
+        default="0.0.0.0/0, ::/0",
+        validation_alias=AliasChoices("WG_ALLOWED_IPS", "wg_allowed_ips"),
+    )
+    wg_persistent_keepalive: int = Field(
+        default=25,
+        validation_alias=AliasChoices("WG_PERSISTENT_KEEPALIVE", "wg_persistent_keepalive"),
+    )
+    # секрет детерминированной выдачи клиентских ключей; обязателен для выдачи
+    # конфигов с нашим ключом. Смена меняет все такие ключи: после неё — задача
+    # peers.reissue_keys и повторное скачивание конфигов клиентами (см. README)
+    wg_key_secret: str | None = Field(
+        default=None,
+        validation_alias=AliasChoices("WG_KEY_SECRET", "wg_key_secret"),
+    )
+
+    # -------- peer feed (GET /nodes/{server_id}/peers) --------
+    # remove-записи старше retention удаляются компакцией; нода с более старым
+    # курсором получит полный снапшот
+    peer_feed_retention_days: int = Field(
+        default=7,
+        validation_alias=AliasChoices("PEER_FEED_RETENTION_DAYS", "peer_feed_retention_days"),
+    )
+    peer_feed_compact_sec: int = Field(
+        default=3600,
+        validation_alias=AliasChoices("PEER_FEED_COMPACT_SEC", "peer_feed_compact_sec"),
+    )
+    # как часто искать пиров с истёкшей подпиской
+    peer_expiry_sweep_sec: int = Field(
+        default=60,
+        validation_alias=AliasChoices("PEER_EXPIRY_SWEEP_SEC", "peer_expiry_sweep_sec"),
+    )
+
+    # -------- entitlement events (LISTEN/NOTIFY + SSE) --------
+    # pg_notify из сервисов + listener-поток в каждом API-процессе
+    events_enabled: bool = Field(
+        default=True,
+        validation_alias=AliasChoices("EVENTS_ENABLED", "events_enabled"),
+    )
+    # событий в очереди одного SSE-соединения; переполнение -> resync
+    events_stream_buffer: int = Field(
+        default=32,
+        validation_alias=AliasChoices("EVENTS_STREAM_BUFFER", "events_stream_buffer"),
+    )
+    # комментарий-пинг в SSE: прокси не закрывают "молчащее" соединение
+    events_heartbeat_sec: float = Field(
+        default=15.0,
+        validation_alias=AliasChoices("EVENTS_HEARTBEAT_SEC", "events_heartbeat_sec"),
+    )
+
+    # -------- billing summary cache --------
+    summary_cache_enabled: bool = Field(
+        default=True,
+        validation_alias=AliasChoices("SUMMARY_CACHE_ENABLED", "summary_cache_enabled"),
+    )
+    summary_cache_max_entries: int = Field(
+        default=10000,
+        validation_alias=AliasChoices("SUMMARY_CACHE_MAX_ENTRIES", "summary_cache_max_entries"),
+    )
+    # верхняя граница устаревания трафика в summary (инвалидации его не видят)
+    summary_cache_ttl_sec: float = Field(
+        default=30.0,
+        validation_alias=AliasChoices("SUMMARY_CACHE_TTL_SEC", "summary_cache_ttl_sec"),
+    )
+
+    # -------- analytics rollups (/admin/analytics) --------
+    analytics_refresh_sec: int = Field(
+        default=900,
+        validation_alias=AliasChoices("ANALYTICS_REFRESH_SEC", "analytics_refresh_sec"),
+    )
+    # сколько прошедших дней пересчитывать (activations/churned) каждым refresh
+    analytics_lookback_days: int = Field(
+        default=1,
+        validation_alias=AliasChoices("ANALYTICS_LOOKBACK_DAYS", "analytics_lookback_days"),
+    )
+    # горизонт "истекает в ближайшие N дней"
+    analytics_expiry_horizon_days: int = Field(
+        default=90,
+        validation_alias=AliasChoices(
+            "ANALYTICS_EXPIRY_HORIZON_DAYS", "analytics_expiry_horizon_days"
+        ),
+    )
+
+    # -------- response compression --------
+    compression_enabled: bool = Field(
+        default=True,
+        validation_alias=AliasChoices("COMPRESSION_ENABLED", "compression_enabled"),
+    )
+    # порядок предпочтения сервера; br / zstd — только с extra "compression"
+    compression_encodings: str = Field(
+        default="zstd, br, gzip",
+        validation_alias=AliasChoices("COMPRESSION_ENCODINGS", "compression_encodings"),
+    )
+    compression_content_types: str = Field(
+        default="application/json, text/plain, text/csv",
+        validation_alias=AliasChoices("COMPRESSION_CONTENT_TYPES", "compression_content_types"),
+    )
+    # меньше — отдаём как есть: выигрыш в байтах не окупает CPU и заголовки
+    compression_min_bytes: int = Field(
+        default=1024,
+        validation_alias=AliasChoices("COMPRESSION_MIN_BYTES", "compression_min_bytes"),
+    )
+    # с этого размера сжатие уходит в threadpool, чтобы не держать event loop
+    compression_threadpool_min_bytes: int = Field(
+        default=64 * 1024,
+        validation_alias=AliasChoices(
+            "COMPRESSION_THREADPOOL_MIN_BYTES", "compression_threadpool_min_bytes"
+        ),
+    )
+    compression_gzip_level: int = Field(
+        default=6,
+        validation_alias=AliasChoices("COMPRESSION_GZIP_LEVEL", "compression_gzip_level"),
+    )
+    compression_brotli_quality: int = Field(
+        default=4,
+        validation_alias=AliasChoices("COMPRESSION_BROTLI_QUALITY", "compression_brotli_quality"),
+    )
+    compression_zstd_level: int = Field(
+        default=3,
+        validation_alias=AliasChoices("COMPRESSION_ZSTD_LEVEL", "compression_zstd_level"),
+    )
+
+    # -------- idempotency keys --------
+    # сколько хранить ответ: повторы клиента укладываются в минуты, берём с запасом
+    idempotency_ttl_hours: int = Field(
+        default=24,
+        validation_alias=AliasChoices("IDEMPOTENCY_TTL_HOURS", "idempotency_ttl_hours"),
+    )
+    idempotency_purge_sec: int = Field(
+        default=3600,
+        validation_alias=AliasChoices("IDEMPOTENCY_PURGE_SEC", "idempotency_purge_sec"),
+    )
+
+    # -------- single-flight (одинаковые одновременные чтения) --------
+    single_flight_enabled: bool = Field(
+        default=True,
+        validation_alias=AliasChoices("SINGLE_FLIGHT_ENABLED", "single_flight_enabled"),
+    )
+    single_flight_max_keys: int = Field(
+        default=10000,
+        validation_alias=AliasChoices("SINGLE_FLIGHT_MAX_KEYS", "single_flight_max_keys"),
+    )
+    single_flight_max_waiters: int = Field(
+        default=1000,
+        validation_alias=AliasChoices("SINGLE_FLIGHT_MAX_WAITERS", "single_flight_max_waiters"),
+    )
+    single_flight_wait_timeout_sec: float = Field(
+        default=10.0,
+        validation_alias=AliasChoices(
+            "SINGLE_FLIGHT_WAIT_TIMEOUT_SEC", "single_flight_wait_timeout_sec"
+        ),
+    )
+
+    # -------- request profiling (/admin/debug/profile) --------
+    profile_enabled: bool = Field(
+        default=False,
+        validation_alias=AliasChoices("PROFILE_ENABLED", "profile_enabled"),
+    )
+    # доля запросов, профилируемых случайно (0..1)
+    profile_sample_rate: float = Field(
+        default=0.0,
+        validation_alias=AliasChoices("PROFILE_SAMPLE_RATE", "profile_sample_rate"),
+    )
+    # секрет заголовка X-Profile; не задан -> профилирование по заголовку выключено
+    profile_token: str | None = Field(
+        default=None,
+        validation_alias=AliasChoices("PROFILE_TOKEN", "profile_token"),
+    )
+    profile_interval_ms: float = Field(
+        default=5.0,
+        validation_alias=AliasChoices("PROFILE_INTERVAL_MS", "profile_interval_ms"),
+    )
+    profile_keep: int = Field(
+        default=50,
+        validation_alias=AliasChoices("PROFILE_KEEP", "profile_keep"),
+    )
+    profile_max_samples: int = Field(
+        default=20000,
+        validation_alias=AliasChoices("PROFILE_MAX_SAMPLES", "profile_max_samples"),
+    )
+    profile_max_stacks: int = Field(
+        default=20000,
+        validation_alias=AliasChoices("PROFILE_MAX_STACKS", "profile_max_stacks"),
+    )
+    # каталог для <время>-<pid>-<id>.collapsed на каждый профиль
+    profile_dir: str | None = Field(
+        default=None,
+        validation_alias=AliasChoices("PROFILE_DIR", "profile_dir"),
+    )
+
+    # -------- access log (JSON, одна строка на запрос) --------
+    access_log_enabled: bool = Field(
+        default=True,
+        validation_alias=AliasChoices("ACCESS_LOG_ENABLED", "access_log_enabled"),
+    )
+    # файл; не задан -> stdout
+    access_log_path: str | None = Field(
+        default=None,
+        validation_alias=AliasChoices("ACCESS_LOG_PATH", "access_log_path"),
+    )
+    access_log_queue_size: int = Field(
+        default=10000,
+        validation_alias=AliasChoices("ACCESS_LOG_QUEUE_SIZE", "access_log_queue_size"),
+    )
+    access_log_batch_size: int = Field(
+        default=500,
+        validation_alias=AliasChoices("ACCESS_LOG_BATCH_SIZE", "access_log_batch_size"),
+    )
+    access_log_flush_interval_sec: float = Field(
+        default=1.0,
+        validation_alias=AliasChoices(
+            "ACCESS_LOG_FLUSH_INTERVAL_SEC", "access_log_flush_interval_sec"
+        ),
+    )
+
+    # -------- audit log (audit_events) --------
+    # буфер событий до записи: сверх лимита новые отбрасываются и считаются
+    audit_buffer_max_rows: int = Field(
+        default=50000,
+        validation_alias=AliasChoices("AUDIT_BUFFER_MAX_ROWS", "audit_buffer_max_rows"),
+    )
+    audit_flush_max_rows: int = Field(
+        default=1000,
+        validation_alias=AliasChoices("AUDIT_FLUSH_MAX_ROWS", "audit_flush_max_rows"),
+    )
+    audit_partition_months_ahead: int = Field(
+        default=2,
+        validation_alias=AliasChoices(
+            "AUDIT_PARTITION_MONTHS_AHEAD", "audit_partition_months_ahead"
+        ),
+    )
+    audit_partition_sec: int = Field(
+        default=3600,
+        validation_alias=AliasChoices("AUDIT_PARTITION_SEC", "audit_partition_sec"),
+    )
+
 
 @lru_cache
 def get_settings() -> Settings:
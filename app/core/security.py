@@ -1,3 +1,5 @@
+import hashlib
+import hmac
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
@@ -27,3 +29,16 @@ def create_access_token(subject: str, expires_minutes: int | None = None) -> str
     )
     payload: dict[str, Any] = {"sub": subject, "exp": expire}
     return jwt.encode(payload, settings.jwt_secret, algorithm=settings.jwt_alg)
+
+
+def node_token(server_id: int) -> str | None:
+    """
+    Учётные данные ноды сервера (X-Node-Token): HMAC(NODE_API_TOKEN, server_id).
+    Токен годится только для своего server_id, в БД ничего не хранится.
+    None -> node API выключен.
+    """
+    if not settings.node_api_token:
+        return None
+    return hmac.new(
+        settings.node_api_token.encode(), f"node:{server_id}".encode(), hashlib.sha256
+    ).hexdigest()
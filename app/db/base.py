@@ -1,4 +1,6 @@
 from sqlalchemy.orm import DeclarativeBase
 
 class Base(DeclarativeBase):
-    pass
+    # server_default / onupdate значения забираем через RETURNING в том же
+    # INSERT/UPDATE, а не отдельным refresh()
+    __mapper_args__ = {"eager_defaults": True}
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+
+from sqlalchemy import BigInteger, Date, DateTime, ForeignKey, Integer, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class PlanDailyStats(Base):
+    """
+    Дневной rollup подписок по плану (пишет AnalyticsService.refresh, джоба analytics.refresh).
+
+    - active_subscribers / mrr_cents — снимок: строку текущего дня перезаписывает
+      каждый refresh, после полуночи остаётся последнее значение за день
+    - activations / churned — потоки за день, пересчитываются из subscription_events
+      за окно ANALYTICS_LOOKBACK_DAYS (закрывают вчерашний день после полуночи)
+    """
+
+    __tablename__ = "analytics_plan_daily"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    plan_id: Mapped[int] = mapped_column(
+        ForeignKey("plans.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+
+    active_subscribers: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    # price_cents плана считаем месячной ценой
+    mrr_cents: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, default=0, server_default="0"
+    )
+    activations: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    churned: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+    )
+
+
+class ExpiryDailyStats(Base):
+    """
+    Сколько активных подписок истекает в каждый из ближайших ANALYTICS_EXPIRY_HORIZON_DAYS
+    дней (UTC), по плану. Таблица целиком пересобирается каждым refresh.
+    """
+
+    __tablename__ = "analytics_expiry_daily"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    plan_id: Mapped[int] = mapped_column(
+        ForeignKey("plans.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+
+    expiring: Mapped[int] = mapped_column(Integer, nullable=False)
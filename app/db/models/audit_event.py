@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Index, Integer, String
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class AuditEvent(Base):
+    """
+    Журнал изменений (append-only): кто, когда и что поменял в сущности.
+
+    Строки пишет writer-поток пачками (см. AuditService). В Postgres таблица
+    партиционирована по месяцам (RANGE по created_at), партиции создаёт
+    AuditService. PK в БД — (id, created_at): ключ партиционирования обязан
+    входить в PK.
+    """
+
+    __tablename__ = "audit_events"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    # время мутации (не вставки: writer пишет с задержкой)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    # без FK: история переживает удаление пользователя
+    actor_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # server / plan / subscription (entity_id подписки — user_id)
+    entity_type: Mapped[str] = mapped_column(String(32), nullable=False)
+    entity_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    action: Mapped[str] = mapped_column(String(32), nullable=False)
+    # {"field": [old, new]}
+    changes: Mapped[dict] = mapped_column(JSONB, nullable=False)
+
+    __table_args__ = (
+        # история сущности с keyset-пагинацией по (created_at, id)
+        Index("ix_audit_events_entity", "entity_type", "entity_id", "created_at", "id"),
+    )
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import (
+    Boolean,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    func,
+    text,
+)
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class Peer(Base):
+    """
+    WireGuard-пир: устройство пользователя на конкретном сервере.
+    Адрес — индекс хоста в подсети сервера (см. ServerAddressPool).
+    При revoke строка остаётся (revoked_at), адрес возвращается в пул.
+    """
+
+    __tablename__ = "peers"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    device_id: Mapped[int] = mapped_column(
+        ForeignKey("devices.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    server_id: Mapped[int] = mapped_column(
+        ForeignKey("servers.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+
+    public_key: Mapped[str] = mapped_column(String(44), nullable=False)
+    # ключ прислал клиент -> приватного ключа у нас нет и в конфиг он не попадает
+    client_key: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    # номер поколения серверного ключа (rotate -> +1)
+    key_version: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+
+    address_index: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+    )
+    revoked_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # один активный пир на (устройство, сервер)
+        Index(
+            "ux_peers_device_server_active",
+            "device_id",
+            "server_id",
+            unique=True,
+            postgresql_where=text("revoked_at IS NULL"),
+        ),
+        # страховка от двойной выдачи адреса мимо пула
+        Index(
+            "ux_peers_server_address_active",
+            "server_id",
+            "address_index",
+            unique=True,
+            postgresql_where=text("revoked_at IS NULL"),
+        ),
+    )
+
+
+class ServerAddressPool(Base):
+    """
+    Занятые адреса подсети сервера — битовая карта (бит i = хост i подсети).
+    /22 -> 128 байт. Выдача/возврат адреса: row lock + O(1) битовые операции,
+    без чтения peers.
+    """
+
+    __tablename__ = "server_address_pools"
+
+    server_id: Mapped[int] = mapped_column(
+        ForeignKey("servers.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    # подсеть фиксируется при создании пула: смена Server.wg_subnet не сдвигает выданные адреса
+    subnet: Mapped[str] = mapped_column(String(43), nullable=False)
+    bitmap: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    allocated: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
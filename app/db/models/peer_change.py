@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class PeerChange(Base):
+    """
+    Лента изменений пиров для синхронизации нод (GET /nodes/{server_id}/peers?since=).
+
+    version — глобальная последовательность. Записи пишутся под row lock пула
+    адресов сервера, поэтому в пределах сервера порядок version = порядок commit:
+    нода с курсором since не пропустит изменение, закоммиченное позже.
+
+    op:
+    - upsert: пир появился или сменил ключ (нода заменяет запись по peer_id)
+    - remove: пир отозван
+    """
+
+    __tablename__ = "peer_changes"
+
+    version: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+
+    server_id: Mapped[int] = mapped_column(
+        ForeignKey("servers.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    peer_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    op: Mapped[str] = mapped_column(String(8), nullable=False)
+    public_key: Mapped[str] = mapped_column(String(44), nullable=False)
+    address: Mapped[str | None] = mapped_column(String(18), nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+    )
+
+    __table_args__ = (
+        # лента ноды: WHERE server_id = ? AND version > ? ORDER BY version
+        Index("ix_peer_changes_server_version", "server_id", "version"),
+        # компакция: более поздние записи того же пира
+        Index("ix_peer_changes_peer_version", "peer_id", "version"),
+    )
+
+
+class PeerFeedWatermark(Base):
+    """
+    До какой version лента сервера скомпактирована (старые remove удалены).
+    Нода с since ниже этой отметки получает полный снапшот вместо дельты.
+    """
+
+    __tablename__ = "peer_feed_watermarks"
+
+    server_id: Mapped[int] = mapped_column(
+        ForeignKey("servers.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False)
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import Boolean, DateTime, Integer, String, func
+from sqlalchemy import BigInteger, Boolean, DateTime, Integer, String, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -21,6 +21,13 @@ class Plan(Base):
 
     max_servers: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
     max_devices: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    # трафик (in + out) за календарный месяц; 0 = без лимита
+    traffic_quota_bytes: Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False,
+        default=0,
+        server_default="0",
+    )
 
     is_active: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
 
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String, Text, func
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, Integer, String, Text, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -21,6 +21,10 @@ class Server(Base):
     is_active: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
     notes: Mapped[str | None] = mapped_column(Text, nullable=True)
 
+    # WireGuard: публичный ключ интерфейса ноды и подсеть клиентов (None -> WG_DEFAULT_SUBNET)
+    wg_public_key: Mapped[str | None] = mapped_column(String(44), nullable=True)
+    wg_subnet: Mapped[str | None] = mapped_column(String(43), nullable=True)
+
     # soft delete
     deleted_at: Mapped[datetime | None] = mapped_column(
         DateTime(timezone=True),
@@ -39,6 +43,7 @@ class Server(Base):
         nullable=False,
         server_default=func.now(),
         onupdate=func.now(),
+        index=True,
     )
 
     # audit actors
@@ -95,3 +100,47 @@ class Server(Base):
         foreign_keys=[restored_by],
         passive_deletes=True,
     )
+
+    __table_args__ = (
+        # уникальность endpoint'а среди живых серверов владельца;
+        # используется как conflict target для bulk insert
+        Index(
+            "ux_servers_owner_host_port_active",
+            "owner_id",
+            "host",
+            "port",
+            unique=True,
+            postgresql_where=deleted_at.is_(None),
+        ),
+        # directory search (pg_trgm): ILIKE / similarity по name, host, notes
+        Index(
+            "ix_servers_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_servers_host_trgm",
+            "host",
+            postgresql_using="gin",
+            postgresql_ops={"host": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_servers_notes_trgm",
+            "notes",
+            postgresql_using="gin",
+            postgresql_ops={"notes": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_servers_country_active",
+            "country",
+            "is_active",
+            postgresql_where=deleted_at.is_(None),
+        ),
+        Index(
+            "ix_servers_owner_live_id",
+            "owner_id",
+            id.desc(),
+            postgresql_where=deleted_at.is_(None),
+        ),
+    )
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Float, Index, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class ServerMetric(Base):
+    """
+    Сырые метрики, которые присылают VPN-ноды (append-only).
+
+    В Postgres таблица партиционирована по дням (RANGE по ts), партиции
+    создаёт/удаляет MetricsService. PK нет: строки только вставляются COPY,
+    а маппинг нужен лишь для чтения — поэтому primary_key задан на уровне mapper.
+    """
+
+    __tablename__ = "server_metrics"
+
+    server_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    ts: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    active_peers: Mapped[int] = mapped_column(Integer, nullable=False)
+    # байты за интервал сэмпла (дельта, не накопительный счётчик)
+    bytes_in: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    bytes_out: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    # загрузка CPU ноды, 0..100
+    cpu: Mapped[float] = mapped_column(Float, nullable=False)
+
+    __table_args__ = (Index("ix_server_metrics_server_ts", "server_id", "ts"),)
+    __mapper_args__ = {"eager_defaults": True, "primary_key": [server_id, ts]}
+
+
+class _ServerMetricRollup:
+    server_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    bucket: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+
+    samples: Mapped[int] = mapped_column(Integer, nullable=False)
+    active_peers_avg: Mapped[float] = mapped_column(Float, nullable=False)
+    active_peers_max: Mapped[int] = mapped_column(Integer, nullable=False)
+    bytes_in: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    bytes_out: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    cpu_avg: Mapped[float] = mapped_column(Float, nullable=False)
+    cpu_max: Mapped[float] = mapped_column(Float, nullable=False)
+
+
+class ServerMetric1m(_ServerMetricRollup, Base):
+    """
+    Поминутный rollup server_metrics (для дашбордов за последние часы).
+    """
+
+    __tablename__ = "server_metrics_1m"
+
+
+class ServerMetric1h(_ServerMetricRollup, Base):
+    """
+    Почасовой rollup, считается из server_metrics_1m.
+    """
+
+    __tablename__ = "server_metrics_1h"
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, Float, ForeignKey, Integer, SmallInteger, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class ServerStatus(Base):
+    """
+    Последний результат health-probe сервера (одна строка на сервер).
+    Перезаписывается upsert'ом на каждом цикле пробера.
+    """
+
+    __tablename__ = "server_status"
+
+    server_id: Mapped[int] = mapped_column(
+        ForeignKey("servers.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+
+    checked_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    # двигается, только когда меняется вход ranking'а (is_up, корзина latency):
+    # по нему delta-refresh ranking-индекса, checked_at меняется каждый цикл
+    changed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        index=True,
+    )
+    last_ok_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    is_up: Mapped[bool] = mapped_column(nullable=False)
+    # latency последней успешной проверки
+    latency_ms: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    consecutive_failures: Mapped[int] = mapped_column(SmallInteger, nullable=False, default=0)
+    last_error: Mapped[str | None] = mapped_column(String(120), nullable=True)
+
+    # последний load ноды (cpu / 100) из телеметрии: общий для всех API-воркеров
+    load: Mapped[float | None] = mapped_column(Float, nullable=True)
+    load_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
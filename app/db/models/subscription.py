@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String, func
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, func, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -31,3 +31,12 @@ class Subscription(Base):
 
     user: Mapped["User"] = relationship("User", back_populates="subscription")
     plan: Mapped["Plan"] = relationship("Plan", back_populates="subscriptions")
+
+    __table_args__ = (
+        # истечения и просроченные active (SubscriptionService.expiring / overdue, sweep пиров)
+        Index(
+            "ix_subscriptions_active_expires_at",
+            "expires_at",
+            postgresql_where=text("status = 'active'"),
+        ),
+    )
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class SubscriptionEvent(Base):
+    """
+    Append-only история подписок: состояние ПОСЛЕ каждой мутации.
+    Пишется в той же транзакции, что и изменение subscriptions (см. SubscriptionHistoryService),
+    строки не обновляются и не удаляются.
+
+    kind: created | grant | extend | cancel | reactivate | resume | renew | backfill
+    source: user | admin | system
+    """
+
+    __tablename__ = "subscription_events"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    kind: Mapped[str] = mapped_column(String(16), nullable=False)
+    source: Mapped[str] = mapped_column(String(8), nullable=False)
+
+    status: Mapped[str] = mapped_column(String(16), nullable=False)
+    plan_id: Mapped[int | None] = mapped_column(
+        ForeignKey("plans.id", ondelete="RESTRICT"),
+        nullable=True,
+    )
+    expires_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+    )
+
+    __table_args__ = (
+        # "состояние на T": последнее событие пользователя с created_at <= T
+        Index("ix_subscription_events_user_created", "user_id", "created_at", "id"),
+        # диапазоны по времени для отчётов: таблица append-only, created_at
+        # растёт вместе с физическим порядком строк -> BRIN в десятки КБ
+        Index("ix_subscription_events_created_brin", "created_at", postgresql_using="brin"),
+    )
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+
+from sqlalchemy import BigInteger, Date, DateTime, ForeignKey, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class UsageCounter(Base):
+    """
+    Трафик пользователя за расчётный период (календарный месяц, UTC).
+    Одна строка на (user, period): проверка квоты — чтение по PK.
+    Наполняется batched upsert'ом из UsageAggregator (дельты прибавляются).
+    """
+
+    __tablename__ = "usage_counters"
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    period_start: Mapped[date] = mapped_column(Date, primary_key=True)
+
+    bytes_in: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    bytes_out: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+    )
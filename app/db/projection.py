@@ -0,0 +1,34 @@
+"""
+Проекции: SELECT только нужных колонок в лёгкие __slots__-dataclass'ы вместо
+ORM-сущностей (без identity map, без загрузки audit-колонок и длинного текста).
+
+Поля dataclass'а называются как колонки модели и идут в порядке полей
+response-схемы: такой объект валидируется схемой (from_attributes) и
+напрямую сериализуется orjson'ом (app.api.rows.RowsJSONResponse).
+"""
+
+from __future__ import annotations
+
+from dataclasses import fields
+from functools import cache
+from typing import Any, TypeVar
+
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+
+RowT = TypeVar("RowT")
+
+
+@cache
+def projection_columns(row_cls: type, model: type) -> tuple[Any, ...]:
+    return tuple(getattr(model, f.name) for f in fields(row_cls))
+
+
+def fetch_projected(db: Session, row_cls: type[RowT], model: type, stmt: Select) -> list[RowT]:
+    """
+    stmt — обычный select(Model) сервиса: WHERE / ORDER BY остаются, сущность
+    подменяется на колонки row_cls.
+    """
+    columns = projection_columns(row_cls, model)
+    rows = db.execute(stmt.with_only_columns(*columns, maintain_column_froms=True))
+    return [row_cls(*row) for row in rows]
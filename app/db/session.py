@@ -4,7 +4,14 @@ from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
 engine = create_engine(settings.database_url, pool_pre_ping=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+SessionLocal = sessionmaker(
+    bind=engine,
+    autoflush=False,
+    autocommit=False,
+    # сессия живёт один запрос: после commit данные актуальны (RETURNING),
+    # перечитывать их отдельными SELECT'ами не нужно
+    expire_on_commit=False,
+)
 
 
 def get_db():
@@ -0,0 +1,81 @@
+"""
+Unit of work: одна транзакция (и один COMMIT) на запрос.
+
+Роут оборачивает мутации в `with unit_of_work(db):`, а сервисы вместо
+`db.commit(); db.refresh(obj)` вызывают `commit_or_flush(db)`:
+- внутри unit of work -> только flush (INSERT/UPDATE ... RETURNING),
+  COMMIT будет один, на выходе из внешнего блока
+- вне unit of work (скрипты, воркер, старые вызовы) -> обычный commit
+
+refresh() не нужен: server-side defaults приходят через RETURNING
+(eager_defaults на Base), а сессия не expire'ит объекты на commit.
+
+Rollback — только на ошибку БД (транзакция после неё всё равно непригодна).
+Доменные/HTTP-исключения просто пробрасываются: несброшенное откатит
+db.close() в get_db, а сессия, подключённая к внешней транзакции (тесты),
+не теряет ранее закоммиченное. Ожидаемую ошибку БД (дубликат и т.п.) сервис
+ловит вокруг `with savepoint(db):` — откатывается только SAVEPOINT.
+
+Хуки after_commit/after_rollback (кэши, журнал) копят действия в db.info и
+должны пропускать SAVEPOINT (session.in_nested_transaction()): SQLAlchemy
+вызывает их и на RELEASE/ROLLBACK TO SAVEPOINT.
+"""
+
+from __future__ import annotations
+
+import copy
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+UOW_DEPTH_KEY = "uow_depth"
+
+
+def in_unit_of_work(db: Session) -> bool:
+    return db.info.get(UOW_DEPTH_KEY, 0) > 0
+
+
+def commit_or_flush(db: Session) -> None:
+    if in_unit_of_work(db):
+        db.flush()
+    else:
+        db.commit()
+
+
+@contextmanager
+def unit_of_work(db: Session) -> Iterator[Session]:
+    """
+    Вложенные блоки допустимы: коммитит только самый внешний.
+    Ошибка БД -> rollback всей транзакции.
+    """
+    depth = db.info.get(UOW_DEPTH_KEY, 0)
+    db.info[UOW_DEPTH_KEY] = depth + 1
+    try:
+        yield db
+        if depth == 0:
+            db.commit()
+    except SQLAlchemyError:
+        if depth == 0:
+            db.rollback()
+        raise
+    finally:
+        db.info[UOW_DEPTH_KEY] = depth
+
+
+@contextmanager
+def savepoint(db: Session) -> Iterator[Session]:
+    """
+    db.begin_nested(): исключение откатывает только изменения блока, транзакция
+    остаётся рабочей. Отложенные до COMMIT действия (db.info), добавленные в
+    блоке, откатываются вместе с ним.
+    """
+    info = {key: copy.copy(value) for key, value in db.info.items()}
+    try:
+        with db.begin_nested():
+            yield db
+    except BaseException:
+        db.info.clear()
+        db.info.update(info)
+        raise
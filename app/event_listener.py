@@ -0,0 +1,78 @@
+"""
+Listener шины entitlements (LISTEN/NOTIFY, см. app.services.event_bus).
+
+Поток внутри каждого API-процесса (EVENTS_ENABLED=true, по умолчанию), одно
+выделенное autocommit-соединение psycopg вне пула SQLAlchemy. При обрыве —
+переподключение с backoff и EVENT_RESYNC локальным обработчикам.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+
+import psycopg
+from sqlalchemy.engine import make_url
+
+import app.services.event_hub  # noqa: F401 (регистрация обработчика SSE)
+from app.core.config import settings
+from app.services.event_bus import (
+    ENTITLEMENTS_CHANNEL,
+    EVENT_RESYNC,
+    EntitlementEvent,
+    dispatch,
+)
+
+logger = logging.getLogger(__name__)
+
+# ожидание уведомлений за один заход: как быстро поток замечает stop
+LISTEN_POLL_SEC = 1.0
+RECONNECT_MAX_SEC = 30.0
+
+
+def _conninfo() -> str:
+    url = make_url(settings.database_url).set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
+def run_event_listener(stop: threading.Event) -> None:
+    backoff = 1.0
+    while not stop.is_set():
+        try:
+            with psycopg.connect(_conninfo(), autocommit=True) as conn:
+                conn.execute(f"LISTEN {ENTITLEMENTS_CHANNEL}")
+                logger.info("Listening for entitlement events")
+                backoff = 1.0
+                # события за время разрыва (или до старта) потеряны
+                dispatch(EntitlementEvent(kind=EVENT_RESYNC))
+
+                while not stop.is_set():
+                    for notify in conn.notifies(timeout=LISTEN_POLL_SEC):
+                        event = EntitlementEvent.decode(notify.payload)
+                        if event is None:
+                            logger.warning("Malformed entitlement event: %r", notify.payload)
+                            continue
+                        dispatch(event)
+        except Exception:
+            logger.exception("Entitlement listener failed, reconnecting in %.0fs", backoff)
+            stop.wait(backoff)
+            backoff = min(backoff * 2, RECONNECT_MAX_SEC)
+
+
+def start_event_listener() -> tuple[threading.Thread, threading.Event]:
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=run_event_listener,
+        args=(stop,),
+        name="event-listener",
+        daemon=True,
+    )
+    thread.start()
+    return thread, stop
+
+
+def stop_event_listener(
+    thread: threading.Thread, stop: threading.Event, *, timeout: float = 5
+) -> None:
+    stop.set()
+    thread.join(timeout=timeout)
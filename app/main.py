@@ -1,39 +1,113 @@
 from __future__ import annotations
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
+from app.api.access_log import install_access_log
+from app.api.compression import install_compression
 from app.api.error_handlers import install_exception_handlers
+from app.api.profiling import install_profiling
+from app.core.config import settings
 
 # public routes
 from app.api.routes.auth import router as auth_router
 from app.api.routes.servers import router as servers_router
 from app.api.routes.devices import router as devices_router
 from app.api.routes.billing import router as billing_router  # ✅ ВАЖНО
+from app.api.routes.events import router as events_router
+
+# node API (VPN-ноды)
+from app.api.routes.nodes import router as nodes_router
 
 # admin routes
 from app.api.routes.admin import router as admin_router
 from app.api.routes.admin_plans import router as admin_plans_router
 from app.api.routes.admin_subscriptions import router as admin_subscriptions_router
 from app.api.routes.admin_billing import router as admin_billing_router
+from app.api.routes.admin_analytics import router as admin_analytics_router
+from app.api.routes.admin_audit import router as admin_audit_router
+from app.api.routes.admin_debug import router as admin_debug_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    worker = None
+    if settings.jobs_inprocess_worker:
+        from app.worker import start_inprocess_worker
+
+        worker = start_inprocess_worker()
+
+    metrics_writer = None
+    if settings.metrics_writer_enabled:
+        from app.metrics_writer import start_metrics_writer
+
+        metrics_writer = start_metrics_writer()
+
+    access_log = None
+    if settings.access_log_enabled:
+        from app.api.access_log import start_access_log_writer
+
+        access_log = start_access_log_writer()
+
+    event_listener = None
+    if settings.events_enabled:
+        from app.event_listener import start_event_listener
+
+        event_listener = start_event_listener()
+
+    yield
+
+    if event_listener is not None:
+        from app.event_listener import stop_event_listener
+
+        stop_event_listener(*event_listener)
+
+    if metrics_writer is not None:
+        from app.metrics_writer import stop_metrics_writer
+
+        stop_metrics_writer(*metrics_writer)
+
+    if access_log is not None:
+        from app.api.access_log import stop_access_log_writer
+
+        stop_access_log_writer(*access_log)
+
+    if worker is not None:
+        thread, stop = worker
+        stop.set()
+        thread.join(timeout=10)
 
 
 def create_app() -> FastAPI:
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
 
     # error handlers first
     install_exception_handlers(app)
+    install_compression(app)
+    # снаружи сжатия: в профиль попадает и оно
+    install_profiling(app)
+    # самый внешний: latency — полное время запроса
+    install_access_log(app)
 
     # ===== public routers =====
     app.include_router(auth_router)
     app.include_router(servers_router)
     app.include_router(devices_router)
     app.include_router(billing_router)  # ✅ без этого были 404
+    app.include_router(events_router)
+
+    # ===== node API =====
+    app.include_router(nodes_router)
 
     # ===== admin routers =====
     app.include_router(admin_router)
     app.include_router(admin_plans_router)
     app.include_router(admin_subscriptions_router)
     app.include_router(admin_billing_router)
+    app.include_router(admin_analytics_router)
+    app.include_router(admin_audit_router)
+    app.include_router(admin_debug_router)
 
     @app.get("/health")
     def health():
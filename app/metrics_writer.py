@@ -0,0 +1,176 @@
+"""
+Writer телеметрии нод:
+- буфер metrics_buffer -> server_metrics (COPY), последний load -> server_status
+- окно usage_aggregator -> usage_counters (batched upsert) раз в USAGE_FLUSH_INTERVAL_SEC
+- буфер audit_buffer -> audit_events (многострочный INSERT)
+
+Работает потоком внутри каждого API-процесса (буфер живёт в памяти процесса),
+стартует из lifespan при METRICS_WRITER_ENABLED=true (по умолчанию).
+Раз в METRICS_ROLLUP_INTERVAL_SEC один из процессов (advisory lock) считает
+1m/1h rollup'ы и обслуживает дневные партиции.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.audit_service import AuditService, audit_buffer, month_start
+from app.services.metrics_service import MetricsService, metrics_buffer
+from app.services.usage_service import UsageService, usage_aggregator
+
+logger = logging.getLogger(__name__)
+
+
+def flush_once() -> int:
+    """
+    Один COPY не больше METRICS_FLUSH_MAX_ROWS строк. Возвращает число записанных.
+    При ошибке пачка теряется (метрики — не учётные данные) и считается в failed.
+    """
+    samples = metrics_buffer.drain(settings.metrics_flush_max_rows)
+    if not samples:
+        return 0
+
+    db = SessionLocal()
+    try:
+        svc = MetricsService(db)
+        written = svc.copy_samples(samples)
+        svc.record_load(samples)
+        db.commit()
+        return written
+    except Exception:
+        db.rollback()
+        metrics_buffer.record_failed(len(samples))
+        logger.exception("Metrics flush failed, %d samples lost", len(samples))
+        return 0
+    finally:
+        db.close()
+
+
+def flush_usage() -> int:
+    """
+    Сбрасывает накопленное окно трафика. Трафик — учётные данные, поэтому
+    при временной ошибке окно возвращается в агрегатор, а не теряется.
+    Ошибка данных (пользователь удалён между приёмом и flush и т.п.) при
+    повторе упадёт так же: окно пишется построчно и теряются только такие строки.
+    """
+    deltas = usage_aggregator.drain()
+    if not deltas:
+        return 0
+
+    db = SessionLocal()
+    try:
+        svc = UsageService(db)
+        try:
+            written = svc.upsert_deltas(deltas)
+        except (IntegrityError, DataError):
+            db.rollback()
+            written, rejected = svc.upsert_each(deltas)
+            logger.exception(
+                "Usage flush rejected %d counters: %s",
+                len(rejected),
+                sorted(user_id for user_id, _ in rejected),
+            )
+        db.commit()
+        return written
+    except Exception:
+        db.rollback()
+        usage_aggregator.merge(deltas)
+        logger.exception("Usage flush failed, %d counters kept for retry", len(deltas))
+        return 0
+    finally:
+        db.close()
+
+
+def flush_audit() -> int:
+    """
+    Одна пачка не больше AUDIT_FLUSH_MAX_ROWS событий. Журнал — не телеметрия:
+    при ошибке пачка возвращается в буфер.
+    """
+    records = audit_buffer.drain(settings.audit_flush_max_rows)
+    if not records:
+        return 0
+
+    db = SessionLocal()
+    try:
+        svc = AuditService(db)
+        svc.ensure_partitions(month_start(r.created_at) for r in records)
+        written = svc.insert_events(records)
+        db.commit()
+        return written
+    except Exception:
+        db.rollback()
+        audit_buffer.requeue(records)
+        logger.exception("Audit flush failed, %d events kept for retry", len(records))
+        return 0
+    finally:
+        db.close()
+
+
+def run_maintenance() -> None:
+    db = SessionLocal()
+    try:
+        MetricsService(db).run_maintenance()
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.exception("Metrics maintenance failed")
+    finally:
+        db.close()
+
+
+def run_metrics_writer(stop: threading.Event) -> None:
+    logger.info("Metrics writer started")
+
+    last_maintenance = 0.0
+    last_usage_flush = time.monotonic()
+    while not stop.is_set():
+        # просыпаемся по интервалу или сразу, как набралась полная пачка
+        metrics_buffer.ready.wait(settings.metrics_flush_interval_sec)
+        while flush_once() >= settings.metrics_flush_max_rows:
+            pass
+        while flush_audit() >= settings.audit_flush_max_rows:
+            pass
+
+        now = time.monotonic()
+        if now - last_usage_flush >= settings.usage_flush_interval_sec:
+            flush_usage()
+            last_usage_flush = now
+
+        if now - last_maintenance >= settings.metrics_rollup_interval_sec:
+            run_maintenance()
+            last_maintenance = now
+
+    # остаток буферов и окна трафика — перед выходом процесса
+    while flush_once():
+        pass
+    while flush_audit():
+        pass
+    flush_usage()
+    logger.info("Metrics writer stopped")
+
+
+def start_metrics_writer() -> tuple[threading.Thread, threading.Event]:
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=run_metrics_writer,
+        args=(stop,),
+        name="metrics-writer",
+        daemon=True,
+    )
+    thread.start()
+    return thread, stop
+
+
+def stop_metrics_writer(
+    thread: threading.Thread, stop: threading.Event, *, timeout: float = 10
+) -> None:
+    stop.set()
+    # будим поток, не дожидаясь METRICS_FLUSH_INTERVAL_SEC
+    metrics_buffer.ready.set()
+    thread.join(timeout=timeout)
@@ -0,0 +1,81 @@
+"""
+Health-prober серверов.
+
+Запуск отдельным процессом:
+    python -m app.prober
+
+Каждый цикл: загрузить активные серверы -> проверить конкурентно
+(PROBE_CONCURRENCY, PROBE_TIMEOUT_SEC, PROBE_JITTER_SEC) -> upsert в server_status.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import signal
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.probe_service import ProbeResult, ProbeService, probe_all
+
+logger = logging.getLogger(__name__)
+
+
+async def run_probe_cycle() -> list[ProbeResult]:
+    db = SessionLocal()
+    try:
+        targets = ProbeService(db).load_targets()
+    finally:
+        db.close()
+
+    results = await probe_all(
+        targets,
+        protocol=settings.probe_protocol,
+        timeout=settings.probe_timeout_sec,
+        concurrency=settings.probe_concurrency,
+        jitter_sec=settings.probe_jitter_sec,
+    )
+
+    db = SessionLocal()
+    try:
+        ProbeService(db).record_results(results)
+        db.commit()
+    finally:
+        db.close()
+
+    down = sum(1 for r in results if not r.ok)
+    logger.info("Probe cycle: %d servers, %d down", len(results), down)
+    return results
+
+
+async def run_prober(stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        try:
+            await run_probe_cycle()
+        except Exception:
+            logger.exception("Probe cycle failed")
+
+        # интервал ±10%, чтобы несколько проберов не синхронизировались
+        delay = settings.probe_interval_sec * random.uniform(0.9, 1.1)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+
+    async def _main() -> None:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        await run_prober(stop)
+
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Production-запуск API: pre-fork поверх uvicorn.
+
+    python -m app.serve [--workers N] [--host H] [--port P]
+
+- воркеров по числу доступных процессу CPU (SERVE_WORKERS=0), uvloop/httptools,
+  если установлены (uvicorn[standard]), иначе asyncio/h11
+- мастер один раз импортирует приложение, настраивает mapper'ы, прогревает
+  in-memory индекс best-server и кэш компиляции SQL, открывает сокет
+  (SERVE_BACKLOG) и только потом делает fork: воркеры стартуют без повторного
+  импорта и делят прогретую память copy-on-write (uvicorn --workers делает
+  spawn, и каждый процесс грузится с нуля)
+- SIGTERM/SIGINT -> мастер пересылает SIGTERM воркерам: uvicorn перестаёт
+  принимать соединения, ждёт in-flight запросы (SERVE_GRACEFUL_TIMEOUT_SEC),
+  затем lifespan shutdown сбрасывает буферы (metrics writer, окно трафика) и
+  останавливает фоновые потоки; кто не вышел за таймаут — SIGKILL
+- упавший воркер перезапускается
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import importlib.util
+import logging
+import os
+import signal
+import socket
+import time
+
+import uvicorn
+from sqlalchemy.orm import configure_mappers
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# воркер, упавший быстрее этого, перезапускаем с паузой (не крутим crash loop)
+RESPAWN_MIN_UPTIME_SEC = 1.0
+# сверх graceful timeout: lifespan shutdown (join потоков, flush буферов)
+SHUTDOWN_GRACE_EXTRA_SEC = 15.0
+
+
+def available_cpus() -> int:
+    # учитывает cpuset/affinity контейнера, в отличие от os.cpu_count()
+    if hasattr(os, "sched_getaffinity"):
+        return max(len(os.sched_getaffinity(0)), 1)
+    return os.cpu_count() or 1
+
+
+def worker_count(configured: int) -> int:
+    return configured if configured > 0 else available_cpus()
+
+
+def _loop_impl() -> str:
+    return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+
+
+def _http_impl() -> str:
+    return "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+
+def warm_up() -> None:
+    """
+    Всё, что воркеры иначе делали бы на первых запросах, — до fork.
+    БД недоступна -> не страшно: индекс загрузится лениво в каждом воркере.
+    """
+    import app.main  # noqa: F401 (роуты, схемы, модели)
+    from app.db.session import SessionLocal, engine
+    from app.services.plan_service import PlanService
+    from app.services.server_ranking import ranking_index
+
+    configure_mappers()
+
+    db = SessionLocal()
+    try:
+        ranking_index.refresh(db, force=True)
+        PlanService(db).list_active()
+    except Exception:
+        logger.warning("Warm-up queries failed, continuing cold", exc_info=True)
+    finally:
+        db.close()
+    # соединения мастера не должны достаться воркерам: у каждого свой пул
+    engine.dispose()
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def build_config() -> uvicorn.Config:
+    from app.main import app
+
+    return uvicorn.Config(
+        app,
+        loop=_loop_impl(),
+        http=_http_impl(),
+        lifespan="on",
+        backlog=settings.serve_backlog,
+        timeout_keep_alive=settings.serve_keepalive_sec,
+        timeout_graceful_shutdown=settings.serve_graceful_timeout_sec,
+    )
+
+
+class Supervisor:
+    def __init__(self, config: uvicorn.Config, sock: socket.socket, workers: int) -> None:
+        self.config = config
+        self.sock = sock
+        self.workers = workers
+        self.children: dict[int, float] = {}
+        self.stopping = False
+        self.deadline = 0.0
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            self._run_child()
+        self.children[pid] = time.monotonic()
+        logger.info("Started worker %s", pid)
+
+    def _run_child(self) -> None:
+        # обработчики мастера воркеру не нужны: uvicorn ставит свои
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        code = 0
+        try:
+            uvicorn.Server(self.config).run(sockets=[self.sock])
+        except BaseException:
+            logger.exception("Worker %s crashed", os.getpid())
+            code = 1
+        finally:
+            os._exit(code)
+
+    def stop(self, signum, frame) -> None:
+        if not self.stopping:
+            logger.info("Signal %s received, draining %d workers", signum, len(self.children))
+            self.stopping = True
+            self.deadline = (
+                time.monotonic() + settings.serve_graceful_timeout_sec + SHUTDOWN_GRACE_EXTRA_SEC
+            )
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+
+        while self.children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                if self.stopping and time.monotonic() > self.deadline:
+                    for child in list(self.children):
+                        logger.warning("Worker %s did not stop in time, killing", child)
+                        try:
+                            os.kill(child, signal.SIGKILL)
+                        except ProcessLookupError:
+                            pass
+                    self.deadline = float("inf")
+                time.sleep(0.2)
+                continue
+
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            logger.warning(
+                "Worker %s exited with code %s, restarting", pid, os.waitstatus_to_exitcode(status)
+            )
+            if time.monotonic() - started < RESPAWN_MIN_UPTIME_SEC:
+                time.sleep(RESPAWN_MIN_UPTIME_SEC)
+            self.spawn()
+
+        logger.info("All workers stopped")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=settings.serve_workers)
+    parser.add_argument("--host", default=settings.serve_host)
+    parser.add_argument("--port", type=int, default=settings.serve_port)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    workers = worker_count(args.workers)
+
+    warm_up()
+    config = build_config()
+    sock = bind_socket(args.host, args.port, settings.serve_backlog)
+    logger.info(
+        "Serving on %s:%s: %d workers, loop=%s, http=%s",
+        args.host,
+        args.port,
+        workers,
+        config.loop,
+        config.http,
+    )
+
+    if workers == 1:
+        uvicorn.Server(config).run(sockets=[sock])
+        return
+
+    # прогретые объекты — в permanent generation: сборщик мусора в воркерах
+    # не трогает их страницы и не ломает copy-on-write
+    gc.freeze()
+    Supervisor(config, sock, workers).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,12 @@ from sqlalchemy.orm import Session
 from app.db.models.plan import Plan
 from app.db.models.subscription import Subscription
 from app.db.models.user import User
+from app.db.uow import commit_or_flush
+from app.services.audit_service import audit_on_commit, changes_of
+from app.services.event_bus import EVENT_SUBSCRIPTION_CHANGED, publish_event
+from app.services.subscription_history_service import SubscriptionHistoryService
+from app.services.summary_cache import invalidate_summary_on_commit
+from app.services.wireguard_service import WireGuardService
 
 
 def utcnow() -> datetime:
@@ -42,6 +48,31 @@ class AdminSubscriptionService:
     def __init__(self, db: Session):
         self.db = db
 
+    def _record_change(
+        self,
+        sub: Subscription,
+        kind: str,
+        *,
+        actor_id: int | None,
+        changes: dict | None = None,
+    ) -> None:
+        """
+        В транзакции мутации: история, журнал аудита, шина entitlements,
+        кэш summary (после commit). changes — если дифф снят раньше (до flush).
+        """
+        audit_on_commit(
+            self.db,
+            "subscription",
+            kind,
+            actor_id=actor_id,
+            changes=changes if changes is not None else changes_of(sub),
+            # одна подписка на пользователя: история — по user_id
+            entity_id=sub.user_id,
+        )
+        SubscriptionHistoryService(self.db).record(sub, kind, source="admin")
+        publish_event(self.db, EVENT_SUBSCRIPTION_CHANGED, user_id=sub.user_id)
+        invalidate_summary_on_commit(self.db, sub.user_id)
+
     def get_user_or_404(self, user_id: int) -> User:
         user = self.db.query(User).filter(User.id == user_id).one_or_none()
         if not user:
@@ -62,25 +93,37 @@ class AdminSubscriptionService:
         if sub is None:
             sub = Subscription(user_id=user.id, plan_id=None, status="none", expires_at=None)
             self.db.add(sub)
-            self.db.commit()
-            self.db.refresh(sub)
+            # без отдельного commit: строка уйдёт одним flush'ем вместе с grant/extend
+            user.subscription = sub
         return sub
 
-    def grant(self, user_id: int, *, plan_code: str, expires_at: datetime | None) -> Subscription:
+    def grant(
+        self,
+        user_id: int,
+        *,
+        plan_code: str,
+        expires_at: datetime | None,
+        actor_id: int | None = None,
+    ) -> Subscription:
         user = self.get_user_or_404(user_id)
         plan = self.get_plan_by_code(plan_code)
 
         sub = self.ensure_subscription_row(user)
+        previous_plan = getattr(sub.plan, "code", None)
 
-        sub.plan_id = plan.id
+        sub.plan = plan
         sub.status = "active"
         sub.expires_at = expires_at
 
-        self.db.commit()
-        self.db.refresh(sub)
+        # plan_id выставится только на flush — план в диффе по коду
+        changes = changes_of(sub)
+        if previous_plan != plan.code:
+            changes["plan_code"] = [previous_plan, plan.code]
+        self._record_change(sub, "grant", actor_id=actor_id, changes=changes)
+        commit_or_flush(self.db)
         return sub
 
-    def extend(self, user_id: int, *, days: int) -> Subscription:
+    def extend(self, user_id: int, *, days: int, actor_id: int | None = None) -> Subscription:
         user = self.get_user_or_404(user_id)
         sub = self.ensure_subscription_row(user)
 
@@ -98,23 +141,34 @@ class AdminSubscriptionService:
         if sub.status != "active":
             sub.status = "active"
 
-        self.db.commit()
-        self.db.refresh(sub)
+        self._record_change(sub, "extend", actor_id=actor_id)
+        commit_or_flush(self.db)
         return sub
 
-    def cancel(self, user_id: int, *, immediately: bool = True) -> Subscription:
+    def cancel(
+        self,
+        user_id: int,
+        *,
+        immediately: bool = True,
+        actor_id: int | None = None,
+    ) -> Subscription:
         user = self.get_user_or_404(user_id)
         sub = self.ensure_subscription_row(user)
 
         sub.status = "canceled"
         if immediately:
             sub.expires_at = utcnow()
+        # release_for_user может сбросить изменения flush'ем — дифф до него
+        changes = changes_of(sub)
+
+        # доступ к нодам пропадает сразу: пиры -> remove в ленте
+        WireGuardService(self.db).release_for_user(user.id)
 
-        self.db.commit()
-        self.db.refresh(sub)
+        self._record_change(sub, "cancel", actor_id=actor_id, changes=changes)
+        commit_or_flush(self.db)
         return sub
 
-    def reactivate(self, user_id: int) -> Subscription:
+    def reactivate(self, user_id: int, *, actor_id: int | None = None) -> Subscription:
         user = self.get_user_or_404(user_id)
         sub = self.ensure_subscription_row(user)
 
@@ -124,6 +178,6 @@ class AdminSubscriptionService:
             return sub
 
         sub.status = "active"
-        self.db.commit()
-        self.db.refresh(sub)
+        self._record_change(sub, "reactivate", actor_id=actor_id)
+        commit_or_flush(self.db)
         return sub
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import Date, and_, case, delete, func, insert, literal_column, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, aliased
+
+from app.core.config import settings
+from app.db.models.analytics import ExpiryDailyStats, PlanDailyStats
+from app.db.models.plan import Plan
+from app.db.models.subscription import Subscription
+from app.db.models.subscription_event import SubscriptionEvent
+
+ANALYTICS_MAX_DAYS = 366
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+def _is_active(status, expires_at, at):
+    # та же "истина", что SubscriptionService.get_active_subscription, но в SQL
+    return and_(status == "active", or_(expires_at.is_(None), expires_at > at))
+
+
+class AnalyticsService:
+    """
+    Выручка и отток для /admin/analytics.
+
+    refresh() (джоба analytics.refresh) складывает всё в analytics_plan_daily /
+    analytics_expiry_daily; report() читает только их — (дни x планы) строк,
+    без сканирования subscriptions на каждый запрос дашборда.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ---------- refresh (джоба, без commit) ----------
+    def refresh(self, *, now: datetime | None = None) -> None:
+        now = now or utcnow()
+        today = now.date()
+
+        rows: dict[tuple[date, int], dict] = {}
+        lookback = settings.analytics_lookback_days
+        for day in (today - timedelta(days=i) for i in range(lookback, -1, -1)):
+            for plan_id, flows in self._flows(day, now=now).items():
+                rows[(day, plan_id)] = flows
+
+        for plan_id, price_cents, active in self._snapshot(now):
+            row = rows.setdefault((today, plan_id), {"activations": 0, "churned": 0})
+            row["active_subscribers"] = active
+            row["mrr_cents"] = active * price_cents
+
+        if rows:
+            self._upsert(rows, now=now)
+        self._rebuild_expiry(now)
+
+    def _snapshot(self, now: datetime):
+        """
+        (plan_id, price_cents, активных) по всем планам, включая планы без подписчиков:
+        у них вчерашний снимок честно обнуляется.
+        """
+        s = Subscription
+        return self.db.execute(
+            select(Plan.id, Plan.price_cents, func.count(s.id))
+            .select_from(Plan)
+            .outerjoin(s, and_(s.plan_id == Plan.id, _is_active(s.status, s.expires_at, now)))
+            .group_by(Plan.id, Plan.price_cents)
+        ).all()
+
+    def _flows(self, day: date, *, now: datetime) -> dict[int, dict]:
+        """
+        activations / churned за день по плану. Для каждого события сравниваем план,
+        на котором пользователь активен после него и до него (предыдущее событие —
+        один шаг по ix_subscription_events_user_created): смена free -> pro — это
+        отток из free и активация pro. Плюс подписки, истёкшие в этот день и так
+        и не продлённые (истечение событий не пишет).
+        """
+        start = _day_start(day)
+        end = min(start + timedelta(days=1), now)
+
+        e = SubscriptionEvent
+        prev = aliased(SubscriptionEvent)
+        prev_plan = (
+            select(case((_is_active(prev.status, prev.expires_at, e.created_at), prev.plan_id)))
+            .where(prev.user_id == e.user_id, prev.id < e.id)
+            .order_by(prev.id.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+        changes = (
+            select(
+                case(
+                    (_is_active(e.status, e.expires_at, e.created_at), e.plan_id)
+                ).label("cur_plan"),
+                prev_plan.label("prev_plan"),
+            )
+            .where(
+                e.created_at >= start,
+                e.created_at < end,
+                # backfill — точка отсчёта истории, а не изменение
+                e.kind != "backfill",
+            )
+            .subquery()
+        )
+
+        out: dict[int, dict] = defaultdict(lambda: {"activations": 0, "churned": 0})
+        rows = self.db.execute(
+            select(changes.c.cur_plan, changes.c.prev_plan, func.count())
+            .where(changes.c.cur_plan.is_distinct_from(changes.c.prev_plan))
+            .group_by(changes.c.cur_plan, changes.c.prev_plan)
+        )
+        for cur_plan, prev_plan, n in rows:
+            if cur_plan is not None:
+                out[cur_plan]["activations"] += int(n)
+            if prev_plan is not None:
+                out[prev_plan]["churned"] += int(n)
+
+        s = Subscription
+        lapsed = self.db.execute(
+            select(s.plan_id, func.count())
+            .where(s.status == "active", s.expires_at >= start, s.expires_at < end)
+            .group_by(s.plan_id)
+        )
+        for plan_id, n in lapsed:
+            out[plan_id]["churned"] += int(n)
+
+        return dict(out)
+
+    def _upsert(self, rows: dict[tuple[date, int], dict], *, now: datetime) -> None:
+        # снимок есть только у строк текущего дня: прошлые дни сохраняют свой
+        flows = ("activations", "churned")
+        groups: dict[tuple[str, ...], list[tuple[date, int]]] = defaultdict(list)
+        for key, row in sorted(rows.items()):
+            groups[tuple(row) if "active_subscribers" in row else flows].append(key)
+
+        for columns, keys in groups.items():
+            stmt = pg_insert(PlanDailyStats).values(
+                [
+                    {
+                        "day": day,
+                        "plan_id": plan_id,
+                        "updated_at": now,
+                        **{c: rows[(day, plan_id)][c] for c in columns},
+                    }
+                    for day, plan_id in keys
+                ]
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[PlanDailyStats.day, PlanDailyStats.plan_id],
+                set_={c: stmt.excluded[c] for c in (*columns, "updated_at")},
+            )
+            self.db.execute(stmt)
+
+    def _rebuild_expiry(self, now: datetime) -> None:
+        s = Subscription
+        horizon = _day_start(now.date() + timedelta(days=settings.analytics_expiry_horizon_days))
+        # литерал, а не bind-параметр: выражение повторяется в GROUP BY
+        day = func.date(func.timezone(literal_column("'UTC'"), s.expires_at), type_=Date)
+
+        self.db.execute(delete(ExpiryDailyStats).execution_options(synchronize_session=False))
+        self.db.execute(
+            insert(ExpiryDailyStats).from_select(
+                ["day", "plan_id", "expiring"],
+                select(day, s.plan_id, func.count())
+                .where(s.status == "active", s.expires_at > now, s.expires_at < horizon)
+                .group_by(day, s.plan_id),
+            )
+        )
+
+    # ---------- read ----------
+    def report(self, *, days: int, expiring_days: int, now: datetime | None = None) -> dict:
+        now = now or utcnow()
+        today = now.date()
+        first = today - timedelta(days=days - 1)
+
+        d = PlanDailyStats
+        rows = self.db.execute(
+            select(d, Plan.code, Plan.currency)
+            .join(Plan, Plan.id == d.plan_id)
+            # день до периода: база для churn_rate
+            .where(d.day >= first - timedelta(days=1), d.day <= today)
+            .order_by(d.day.asc(), d.plan_id.asc())
+        ).all()
+
+        daily: dict[date, dict] = {}
+        baseline = 0
+        refreshed_at = None
+        latest_day = None
+        for stat, _code, currency in rows:
+            if stat.day < first:
+                baseline += stat.active_subscribers
+                continue
+            day = daily.setdefault(
+                stat.day,
+                {
+                    "day": stat.day,
+                    "active_subscribers": 0,
+                    "mrr_cents": {},
+                    "activations": 0,
+                    "churned": 0,
+                },
+            )
+            day["active_subscribers"] += stat.active_subscribers
+            day["mrr_cents"][currency] = day["mrr_cents"].get(currency, 0) + stat.mrr_cents
+            day["activations"] += stat.activations
+            day["churned"] += stat.churned
+            latest_day = stat.day
+            if refreshed_at is None or stat.updated_at > refreshed_at:
+                refreshed_at = stat.updated_at
+
+        plans = [
+            {
+                "plan_id": stat.plan_id,
+                "plan_code": code,
+                "currency": currency,
+                "active_subscribers": stat.active_subscribers,
+                "mrr_cents": stat.mrr_cents,
+            }
+            for stat, code, currency in rows
+            if stat.day == latest_day
+        ]
+
+        churned = sum(d["churned"] for d in daily.values())
+        latest = daily.get(latest_day, {"active_subscribers": 0, "mrr_cents": {}})
+
+        expiring = self.db.scalar(
+            select(func.coalesce(func.sum(ExpiryDailyStats.expiring), 0)).where(
+                ExpiryDailyStats.day >= today,
+                ExpiryDailyStats.day < today + timedelta(days=expiring_days),
+            )
+        )
+
+        return {
+            "refreshed_at": refreshed_at,
+            "days": days,
+            "active_subscribers": latest["active_subscribers"],
+            "mrr_cents": latest["mrr_cents"],
+            "activations": sum(d["activations"] for d in daily.values()),
+            "churned": churned,
+            "churn_rate": churned / baseline if baseline else None,
+            "expiring_days": expiring_days,
+            "expiring": int(expiring),
+            "plans": plans,
+            "daily": list(daily.values()),
+        }
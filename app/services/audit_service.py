@@ -0,0 +1,267 @@
+"""
+Журнал изменений audit_events: кто, когда и что поменял (серверы, планы,
+админские операции с подписками).
+
+Запись:
+- сервис в транзакции мутации вызывает audit_on_commit() с диффом
+  changes_of(entity) — {"field": [old, new]} по истории атрибутов ORM, поэтому
+  до flush
+- после COMMIT события уходят в audit_buffer (rollback их выбрасывает: в журнал
+  попадает только то, что реально произошло)
+- writer-поток (app.metrics_writer) пишет буфер пачками до AUDIT_FLUSH_MAX_ROWS
+  строк одним многострочным INSERT. При ошибке БД пачка возвращается в буфер;
+  буфер ограничен AUDIT_BUFFER_MAX_ROWS, сверх него события теряются (dropped).
+  Цена батчинга: события, не записанные к падению процесса, теряются
+
+Чтение — история сущности с keyset-пагинацией по (created_at, id), см. history().
+Таблица партиционирована по месяцам: партиции создаются перед вставкой и
+джобой audit.partitions на AUDIT_PARTITION_MONTHS_AHEAD месяцев вперёд.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass, replace
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+from enum import Enum
+from typing import Any
+
+from fastapi import HTTPException
+from sqlalchemy import event, insert, inspect, select, text, tuple_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models.audit_event import AuditEvent
+from app.services.cursor import decode_cursor, encode_cursor
+
+AUDIT_PAGE_MAX_LIMIT = 200
+
+# служебные поля: меняются при каждой мутации, актор и так в событии
+AUDIT_IGNORED_FIELDS = frozenset({"updated_at", "updated_by"})
+
+_PENDING_KEY = "audit_pending"
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def month_start(at: datetime | date) -> date:
+    return date(at.year, at.month, 1)
+
+
+def next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"audit_events_p{month:%Y%m}"
+
+
+@dataclass(frozen=True, slots=True)
+class AuditRecord:
+    created_at: datetime
+    actor_id: int | None
+    entity_type: str
+    # None -> id ещё не назначен (INSERT не было), берётся из entity после COMMIT
+    entity_id: int | None
+    action: str
+    changes: dict
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def changes_of(entity: object, *, exclude: frozenset[str] = AUDIT_IGNORED_FIELDS) -> dict:
+    """
+    {"field": [old, new]} по несброшенным (до flush) изменениям колонок.
+    Для нового объекта old = None.
+    """
+    state = inspect(entity)
+    changes = {}
+    for attr in state.mapper.column_attrs:
+        if attr.key in exclude:
+            continue
+        history = state.attrs[attr.key].history
+        if not history.has_changes():
+            continue
+        old = history.deleted[0] if history.deleted else None
+        new = history.added[0] if history.added else None
+        if old != new:
+            changes[attr.key] = [_jsonable(old), _jsonable(new)]
+    return changes
+
+
+def audit_on_commit(
+    db: Session,
+    entity_type: str,
+    action: str,
+    *,
+    actor_id: int | None,
+    changes: dict,
+    entity: object | None = None,
+    entity_id: int | None = None,
+) -> None:
+    """
+    Событие уйдёт в журнал после COMMIT сессии. entity вместо entity_id —
+    для объектов, которым id назначит INSERT.
+    """
+    record = AuditRecord(
+        created_at=utcnow(),
+        actor_id=actor_id,
+        entity_type=entity_type,
+        entity_id=entity_id,
+        action=action,
+        changes=changes,
+    )
+    db.info.setdefault(_PENDING_KEY, []).append((record, entity))
+
+
+class AuditBuffer:
+    """
+    Буфер закоммиченных событий между запросами и writer-потоком.
+    """
+
+    def __init__(self, *, max_rows: int) -> None:
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._rows: deque[AuditRecord] = deque()
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, records: Iterable[AuditRecord]) -> None:
+        with self._lock:
+            for record in records:
+                if len(self._rows) >= self.max_rows:
+                    self.dropped += 1
+                    continue
+                self._rows.append(record)
+
+    def drain(self, limit: int) -> list[AuditRecord]:
+        with self._lock:
+            n = min(limit, len(self._rows))
+            return [self._rows.popleft() for _ in range(n)]
+
+    def requeue(self, records: list[AuditRecord]) -> None:
+        """
+        Вернуть незаписанную пачку в начало (порядок сохраняется).
+        """
+        with self._lock:
+            room = max(self.max_rows - len(self._rows), 0)
+            self.dropped += max(len(records) - room, 0)
+            self._rows.extendleft(reversed(records[:room]))
+
+
+audit_buffer = AuditBuffer(max_rows=settings.audit_buffer_max_rows)
+
+
+@event.listens_for(Session, "after_commit")
+def _buffer_pending(session: Session) -> None:
+    if session.in_nested_transaction():
+        return
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    records = []
+    for record, entity in pending:
+        if entity is not None:
+            # identity — из ключа, без SQL (в after_commit его делать нельзя)
+            identity = inspect(entity).identity
+            if identity is None:
+                continue
+            record = replace(record, entity_id=identity[0])
+        records.append(record)
+    audit_buffer.add(records)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session: Session) -> None:
+    if session.in_nested_transaction():
+        return
+    session.info.pop(_PENDING_KEY, None)
+
+
+class AuditService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ---------- writer ----------
+    def ensure_partitions(self, months: Iterable[date]) -> None:
+        for month in sorted(set(months)):
+            start = datetime.combine(month, time.min, tzinfo=timezone.utc)
+            end = datetime.combine(next_month(month), time.min, tzinfo=timezone.utc)
+            # DDL не принимает bind-параметры; значения — даты, не пользовательский ввод
+            self.db.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {partition_name(month)} "
+                    f"PARTITION OF audit_events "
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                )
+            )
+
+    def ensure_partitions_ahead(self, *, now: datetime | None = None) -> None:
+        month = month_start(now or utcnow())
+        months = [month]
+        for _ in range(settings.audit_partition_months_ahead):
+            month = next_month(month)
+            months.append(month)
+        self.ensure_partitions(months)
+
+    def insert_events(self, records: list[AuditRecord]) -> int:
+        """
+        Один executemany (многострочный INSERT), без commit.
+        """
+        if not records:
+            return 0
+        self.db.execute(insert(AuditEvent), [asdict(r) for r in records])
+        return len(records)
+
+    # ---------- read ----------
+    def history(
+        self,
+        entity_type: str,
+        entity_id: int,
+        *,
+        limit: int = 50,
+        cursor: str | None = None,
+    ) -> dict:
+        """
+        События сущности от новых к старым. Предикат по created_at из cursor
+        отсекает и более новые партиции.
+        """
+        stmt = select(AuditEvent).where(
+            AuditEvent.entity_type == entity_type,
+            AuditEvent.entity_id == entity_id,
+        )
+        if cursor:
+            after = decode_cursor(cursor)
+            try:
+                after_ts = datetime.fromisoformat(after["ts"])
+            except (KeyError, TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            stmt = stmt.where(
+                AuditEvent.created_at <= after_ts,
+                tuple_(AuditEvent.created_at, AuditEvent.id) < tuple_(after_ts, after["id"]),
+            )
+        stmt = stmt.order_by(AuditEvent.created_at.desc(), AuditEvent.id.desc())
+
+        # +1 строка: понять, есть ли следующая страница, без COUNT(*)
+        events = self.db.scalars(stmt.limit(limit + 1)).all()
+        next_cursor = None
+        if len(events) > limit:
+            events = events[:limit]
+            last = events[-1]
+            next_cursor = encode_cursor({"ts": last.created_at.isoformat(), "id": last.id})
+        return {"items": events, "next_cursor": next_cursor}
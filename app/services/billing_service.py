@@ -1,28 +1,66 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from datetime import datetime, timezone
 
-from sqlalchemy import func
+from sqlalchemy import and_, func, select
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.db.models.device import Device
+from app.db.models.plan import Plan
 from app.db.models.server import Server
 from app.db.models.subscription import Subscription
+from app.db.models.usage_counter import UsageCounter
 from app.db.models.user import User
+from app.db.projection import fetch_projected
+from app.services.limits import get_traffic_used
+from app.services.summary_cache import summary_cache
+from app.services.usage_service import period_start
+
+
+@dataclass(frozen=True, slots=True)
+class AdminUserRow:
+    """
+    Проекция для AdminUserOut: без password_hash.
+    """
+
+    id: int
+    email: str
+    role: str
+    created_at: datetime
 
 
 class BillingService:
     """
     One-call summary for UI:
     - plan/limits
-    - usage counters
+    - usage counters (серверы, устройства, трафик за месяц)
     - subscription status/expiry
     """
 
     def __init__(self, db: Session):
         self.db = db
 
-    def summary(self, user: User) -> dict:
+    def cached_summary(self, user: User) -> dict:
+        """
+        summary() через кэш (app.services.summary_cache). Инвалидацию делают
+        сервисы, меняющие подписку/устройства/серверы, после commit.
+        """
+        if not settings.summary_cache_enabled:
+            return self.summary(user)
+
+        cached, token = summary_cache.get(user.id)
+        if cached is not None:
+            return cached
+        value = self.summary(user)
+        summary_cache.put(user.id, value, token=token)
+        return value
+
+    def summary(self, user: User, *, traffic_used: int | None = None) -> dict:
+        """
+        traffic_used можно передать заранее (админ-список читает счётчики одним запросом).
+        """
         # --- usage counters ---
         servers_used = (
             self.db.query(func.count(Server.id))
@@ -42,39 +80,141 @@ class BillingService:
             .scalar()
         )
 
-        # --- defaults (FREE / fallback) ---
-        status = "none"
-        plan_code = "free"
-        plan_name = "Free"
+        sub: Subscription | None = getattr(user, "subscription", None)
+        plan = sub.plan if sub is not None else None
+        return build_summary(
+            status=sub.status if sub is not None else None,
+            expires_at=sub.expires_at if sub is not None else None,
+            plan=(
+                (plan.code, plan.name, plan.max_servers, plan.max_devices, plan.traffic_quota_bytes)
+                if plan is not None
+                else None
+            ),
+            servers_used=servers_used,
+            devices_used=devices_used,
+            traffic_used=get_traffic_used(self.db, user) if traffic_used is None else traffic_used,
+        )
+
+    def list_users_admin(self) -> list[AdminUserRow]:
+        return fetch_projected(self.db, AdminUserRow, User, select(User).order_by(User.id))
+
+    def admin_summaries(self) -> list[dict]:
+        """
+        Все пользователи + summary одним SELECT'ом (для /admin/billing/users):
+        счётчики серверов/устройств — сгруппированные подзапросы, трафик — строка
+        текущего периода. Строки — кортежи, без ORM-объектов.
+        """
+        servers = (
+            select(Server.owner_id.label("user_id"), func.count().label("n"))
+            .where(Server.deleted_at.is_(None))
+            .group_by(Server.owner_id)
+            .subquery()
+        )
+        devices = (
+            select(Device.user_id.label("user_id"), func.count().label("n"))
+            .where(Device.revoked_at.is_(None))
+            .group_by(Device.user_id)
+            .subquery()
+        )
+        rows = self.db.execute(
+            select(
+                User.id,
+                User.email,
+                User.role,
+                Subscription.status,
+                Subscription.expires_at,
+                Plan.code,
+                Plan.name,
+                Plan.max_servers,
+                Plan.max_devices,
+                Plan.traffic_quota_bytes,
+                servers.c.n,
+                devices.c.n,
+                UsageCounter.bytes_in + UsageCounter.bytes_out,
+            )
+            .outerjoin(Subscription, Subscription.user_id == User.id)
+            .outerjoin(Plan, Plan.id == Subscription.plan_id)
+            .outerjoin(servers, servers.c.user_id == User.id)
+            .outerjoin(devices, devices.c.user_id == User.id)
+            .outerjoin(
+                UsageCounter,
+                and_(UsageCounter.user_id == User.id, UsageCounter.period_start == period_start()),
+            )
+            .order_by(User.id.asc())
+        )
+
+        now = datetime.now(timezone.utc)
+        return [
+            {
+                "id": user_id,
+                "email": email,
+                "role": role,
+                "billing": build_summary(
+                    status=status,
+                    expires_at=expires_at,
+                    plan=(
+                        (code, name, max_servers, max_devices, quota)
+                        if code is not None
+                        else None
+                    ),
+                    servers_used=servers_used,
+                    devices_used=devices_used,
+                    traffic_used=traffic_used,
+                    now=now,
+                ),
+            }
+            for (
+                user_id, email, role, status, expires_at,
+                code, name, max_servers, max_devices, quota,
+                servers_used, devices_used, traffic_used,
+            ) in rows
+        ]
+
+
+def build_summary(
+    *,
+    status: str | None,
+    expires_at: datetime | None,
+    plan: tuple[str, str, int, int, int] | None,
+    servers_used: int | None,
+    devices_used: int | None,
+    traffic_used: int | None,
+    now: datetime | None = None,
+) -> dict:
+    """
+    plan = (code, name, max_servers, max_devices, traffic_quota_bytes); status=None — подписки нет.
+    """
+    # --- defaults (FREE / fallback) ---
+    summary_status = "none"
+    plan_code = "free"
+    plan_name = "Free"
+    max_servers = 1
+    max_devices = 1
+    traffic_quota_bytes = 0
+
+    if status is not None:
+        summary_status = status
+
+        # 🔹 UI-логика: active + expires_at в прошлом → expired
+        if status == "active" and expires_at is not None:
+            if expires_at <= (now or datetime.now(timezone.utc)):
+                summary_status = "expired"
+
+        # показываем план даже если expired / canceled
+        if plan is not None:
+            plan_code, plan_name, max_servers, max_devices, traffic_quota_bytes = plan
+    else:
         expires_at = None
-        max_servers = 1
-        max_devices = 1
 
-        sub: Subscription | None = getattr(user, "subscription", None)
-        if sub:
-            status = sub.status
-            expires_at = sub.expires_at
-
-            # 🔹 UI-логика: active + expires_at в прошлом → expired
-            if status == "active" and expires_at is not None:
-                now = datetime.now(timezone.utc)
-                if expires_at <= now:
-                    status = "expired"
-
-            # показываем план даже если expired / canceled
-            if sub.plan is not None:
-                plan_code = sub.plan.code
-                plan_name = sub.plan.name
-                max_servers = sub.plan.max_servers
-                max_devices = sub.plan.max_devices
-
-        return {
-            "status": status,
-            "plan_code": plan_code,
-            "plan_name": plan_name,
-            "expires_at": expires_at,
-            "max_servers": max_servers,
-            "max_devices": max_devices,
-            "servers_used": int(servers_used or 0),
-            "devices_used": int(devices_used or 0),
-        }
+    return {
+        "status": summary_status,
+        "plan_code": plan_code,
+        "plan_name": plan_name,
+        "expires_at": expires_at,
+        "max_servers": max_servers,
+        "max_devices": max_devices,
+        "servers_used": int(servers_used or 0),
+        "devices_used": int(devices_used or 0),
+        "traffic_quota_bytes": int(traffic_quota_bytes or 0),
+        "traffic_used_bytes": int(traffic_used or 0),
+    }
@@ -0,0 +1,39 @@
+"""
+Непрозрачный cursor keyset-пагинации: base64url(JSON) с ключом последней
+строки страницы. Клиент передаёт его как есть, сервер не делает OFFSET.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+
+from fastapi import HTTPException
+
+BIGINT_MIN = -(2**63)
+BIGINT_MAX = 2**63 - 1
+
+
+def is_bigint(value: object) -> bool:
+    """
+    Целое в диапазоне BIGINT. bool отсекаем: иначе true/false стали бы id 1/0,
+    а число вне диапазона — 500 от драйвера БД вместо 400.
+    """
+    return type(value) is int and BIGINT_MIN <= value <= BIGINT_MAX
+
+
+def encode_cursor(data: dict) -> str:
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        if not isinstance(data, dict) or not is_bigint(data.get("id")):
+            raise ValueError("bad cursor")
+        return data
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
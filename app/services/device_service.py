@@ -3,12 +3,17 @@ from __future__ import annotations
 from dataclasses import dataclass
 from datetime import datetime, timezone
 
-from sqlalchemy import func
+from sqlalchemy import Select, delete, func, select, update
 from sqlalchemy.orm import Session
 
 from app.db.models.device import Device
 from app.db.models.user import User
+from app.db.projection import fetch_projected
+from app.db.uow import commit_or_flush
+from app.services.event_bus import EVENT_DEVICE_ADDED, EVENT_DEVICES_REVOKED, publish_event
 from app.services.limits import LimitExceededError, NoActiveSubscriptionError, get_active_plan_for_user
+from app.services.summary_cache import invalidate_summary_on_commit
+from app.services.wireguard_service import WireGuardService
 
 
 @dataclass
@@ -17,6 +22,20 @@ class DeviceIdRequiredError(Exception):
         return "X-Device-Id header is required"
 
 
+@dataclass(frozen=True, slots=True)
+class DeviceRow:
+    """
+    Проекция для DeviceOut (поля в порядке схемы).
+    """
+
+    id: int
+    device_id: str
+    device_name: str | None
+    last_seen_at: datetime
+    revoked_at: datetime | None
+    created_at: datetime
+
+
 class DeviceService:
     def __init__(self, db: Session):
         self.db = db
@@ -56,7 +75,7 @@ class DeviceService:
             existing.last_seen_at = now
             if device_name is not None and device_name.strip():
                 existing.device_name = device_name.strip()
-            self.db.commit()
+            commit_or_flush(self.db)
             return
 
         plan = get_active_plan_for_user(self.db, user.id)
@@ -86,14 +105,22 @@ class DeviceService:
             last_seen_at=now,
         )
         self.db.add(new_dev)
-        self.db.commit()
+        publish_event(self.db, EVENT_DEVICE_ADDED, user_id=user.id)
+        invalidate_summary_on_commit(self.db, user.id)
+        commit_or_flush(self.db)
 
     # ---------- USER UX ----------
-    def list_owned(self, owner_id: int, *, include_revoked: bool = False) -> list[Device]:
-        q = self.db.query(Device).filter(Device.user_id == owner_id)
+    @staticmethod
+    def owned_query(owner_id: int, *, include_revoked: bool = False) -> Select:
+        q = select(Device).where(Device.user_id == owner_id)
         if not include_revoked:
-            q = q.filter(Device.revoked_at.is_(None))
-        return q.order_by(Device.last_seen_at.desc(), Device.id.desc()).all()
+            q = q.where(Device.revoked_at.is_(None))
+        return q.order_by(Device.last_seen_at.desc(), Device.id.desc())
+
+    def list_owned(self, owner_id: int, *, include_revoked: bool = False) -> list[DeviceRow]:
+        return fetch_projected(
+            self.db, DeviceRow, Device, self.owned_query(owner_id, include_revoked=include_revoked)
+        )
 
     def revoke_owned(self, *, device_id: int, owner_id: int) -> None:
         dev = (
@@ -108,4 +135,48 @@ class DeviceService:
 
         if dev.revoked_at is None:
             dev.revoked_at = func.now()
-            self.db.commit()
+            WireGuardService(self.db).release_for_devices([dev.id])
+            publish_event(self.db, EVENT_DEVICES_REVOKED, user_id=owner_id)
+            invalidate_summary_on_commit(self.db, owner_id)
+            commit_or_flush(self.db)
+
+    # ---------- BULK ----------
+    def revoke_all_for_user(self, user_id: int) -> list[int]:
+        """
+        Отзывает все активные устройства пользователя одним UPDATE (без commit).
+        Слоты и WireGuard-адреса освобождаются сразу; физическое удаление — фоновой задачей.
+        Возвращает id отозванных сейчас устройств (для payload этой задачи).
+        """
+        WireGuardService(self.db).release_for_user(user_id)
+        revoked = list(
+            self.db.scalars(
+                update(Device)
+                .where(Device.user_id == user_id, Device.revoked_at.is_(None))
+                .values(revoked_at=func.now())
+                .returning(Device.id)
+                .execution_options(synchronize_session=False)
+            )
+        )
+        if revoked:
+            publish_event(self.db, EVENT_DEVICES_REVOKED, user_id=user_id)
+            invalidate_summary_on_commit(self.db, user_id)
+        return revoked
+
+    def purge_revoked(self, user_id: int, device_ids: list[int]) -> int:
+        """
+        Удаляет переданные отозванные устройства пользователя (без commit).
+        Только их: устройства, отозванные раньше через /devices/{id}/revoke,
+        остаются в истории (include_revoked).
+        """
+        if not device_ids:
+            return 0
+        result = self.db.execute(
+            delete(Device)
+            .where(
+                Device.user_id == user_id,
+                Device.id.in_(device_ids),
+                Device.revoked_at.is_not(None),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return int(result.rowcount or 0)
@@ -0,0 +1,98 @@
+"""
+Шина изменений доступа (entitlements) поверх Postgres LISTEN/NOTIFY.
+
+- publish_event() делает pg_notify в текущей транзакции сервиса: событие уходит
+  подписчикам только после COMMIT и пропадает при rollback, отдельный outbox не нужен
+- в каждом API-процессе app.event_listener держит одно соединение с LISTEN
+  и раздаёт события локальным обработчикам (@on_entitlement_event):
+  сброс кэшей, push в открытые SSE-потоки (app.services.event_hub)
+
+NOTIFY не хранит события: после переподключения listener рассылает EVENT_RESYNC,
+и обработчики сбрасывают всё, что могли пропустить.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+ENTITLEMENTS_CHANNEL = "entitlements"
+
+EVENT_SUBSCRIPTION_CHANGED = "subscription.changed"
+EVENT_DEVICES_REVOKED = "devices.revoked"
+EVENT_DEVICE_ADDED = "devices.added"
+EVENT_PEERS_CHANGED = "peers.changed"
+EVENT_SERVERS_CHANGED = "servers.changed"
+# лимиты/квоты плана: касается всех подписчиков плана
+EVENT_PLANS_CHANGED = "plans.changed"
+# локальное: listener переподключился, часть событий могла потеряться
+EVENT_RESYNC = "resync"
+
+
+@dataclass(frozen=True, slots=True)
+class EntitlementEvent:
+    kind: str
+    user_id: int | None = None
+    server_id: int | None = None
+
+    def encode(self) -> str:
+        # короткий payload: одинаковые NOTIFY в одной транзакции Postgres схлопывает
+        return json.dumps(
+            {"k": self.kind, "u": self.user_id, "s": self.server_id},
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def decode(cls, payload: str) -> "EntitlementEvent | None":
+        try:
+            data = json.loads(payload)
+            return cls(kind=str(data["k"]), user_id=data.get("u"), server_id=data.get("s"))
+        except (ValueError, KeyError, TypeError):
+            return None
+
+
+EventHandler = Callable[[EntitlementEvent], None]
+
+# обработчики этого процесса; наполняется через @on_entitlement_event
+EVENT_HANDLERS: list[EventHandler] = []
+
+
+def on_entitlement_event(fn: EventHandler) -> EventHandler:
+    EVENT_HANDLERS.append(fn)
+    return fn
+
+
+def publish_event(
+    db: Session,
+    kind: str,
+    *,
+    user_id: int | None = None,
+    server_id: int | None = None,
+) -> None:
+    """
+    Без commit: уведомление доставляется вместе с commit транзакции.
+    """
+    if not settings.events_enabled:
+        return
+    event = EntitlementEvent(kind=kind, user_id=user_id, server_id=server_id)
+    db.execute(select(func.pg_notify(ENTITLEMENTS_CHANNEL, event.encode())))
+
+
+def dispatch(event: EntitlementEvent) -> None:
+    """
+    Вызывается из потока listener'а. Падение одного обработчика не мешает остальным.
+    """
+    for handler in list(EVENT_HANDLERS):
+        try:
+            handler(event)
+        except Exception:
+            logger.exception("Entitlement event handler %r failed", handler)
@@ -0,0 +1,130 @@
+"""
+Раздача событий шины в открытые SSE-соединения процесса.
+
+Все соединения одного процесса слушают ОДНО соединение с БД (app.event_listener):
+hub лишь раскладывает событие по подпискам нужного топика (server:<id>, user:<id>).
+Изменение плана (без user_id) уходит во все user-подписки: подписчиков плана hub
+не знает, а лишний пересчёт summary дешевле пропущенных лимитов.
+
+Буфер каждой подписки ограничен EVENTS_STREAM_BUFFER: медленный клиент не копит
+события в памяти — при переполнении очередь сбрасывается и клиент получает
+resync (перечитать состояние целиком), что для "что-то изменилось" эквивалентно.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import defaultdict
+
+from app.services.event_bus import (
+    EVENT_PLANS_CHANGED,
+    EVENT_RESYNC,
+    EntitlementEvent,
+    on_entitlement_event,
+)
+
+USER_TOPIC_PREFIX = "user:"
+
+
+def server_topic(server_id: int) -> str:
+    return f"server:{server_id}"
+
+
+def user_topic(user_id: int) -> str:
+    return f"{USER_TOPIC_PREFIX}{user_id}"
+
+
+class EventStream:
+    __slots__ = ("topic", "queue")
+
+    def __init__(self, topic: str, *, maxsize: int) -> None:
+        self.topic = topic
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=maxsize)
+
+    def put(self, message: dict) -> None:
+        # только из потока event loop'а
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": EVENT_RESYNC})
+            return
+        self.queue.put_nowait(message)
+
+
+class EventHub:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._streams: dict[str, set[EventStream]] = defaultdict(set)
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._streams.values())
+
+    # ---------- event loop side ----------
+    def subscribe(self, topic: str, *, maxsize: int) -> EventStream:
+        stream = EventStream(topic, maxsize=maxsize)
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._streams[topic].add(stream)
+        return stream
+
+    def unsubscribe(self, stream: EventStream) -> None:
+        with self._lock:
+            streams = self._streams.get(stream.topic)
+            if streams is not None:
+                streams.discard(stream)
+                if not streams:
+                    del self._streams[stream.topic]
+
+    def _deliver(self, topic: str | None, message: dict, prefix: bool = False) -> None:
+        with self._lock:
+            if topic is None:
+                streams = [s for group in self._streams.values() for s in group]
+            elif prefix:
+                streams = [
+                    s
+                    for name, group in self._streams.items()
+                    if name.startswith(topic)
+                    for s in group
+                ]
+            else:
+                streams = list(self._streams.get(topic, ()))
+        for stream in streams:
+            stream.put(message)
+
+    # ---------- any thread ----------
+    def publish(self, topic: str | None, message: dict, *, prefix: bool = False) -> None:
+        """
+        topic=None -> во все подписки, prefix=True -> во все топики с началом topic.
+        Потокобезопасно (вызывается из listener'а).
+        """
+        with self._lock:
+            loop = self._loop
+            exact = topic is not None and not prefix
+            if loop is None or (exact and topic not in self._streams):
+                return
+        try:
+            loop.call_soon_threadsafe(self._deliver, topic, message, prefix)
+        except RuntimeError:
+            # loop уже закрыт (shutdown)
+            pass
+
+
+event_hub = EventHub()
+
+
+@on_entitlement_event
+def _fan_out(event: EntitlementEvent) -> None:
+    message = {"type": event.kind}
+    if event.kind == EVENT_RESYNC:
+        event_hub.publish(None, message)
+        return
+    if event.kind == EVENT_PLANS_CHANGED:
+        event_hub.publish(USER_TOPIC_PREFIX, message, prefix=True)
+        return
+    if event.server_id is not None:
+        event_hub.publish(server_topic(event.server_id), message)
+    if event.user_id is not None:
+        event_hub.publish(user_topic(event.user_id), message)
@@ -0,0 +1,97 @@
+"""
+Idempotency-Key для мутирующих запросов (биллинг, админка подписок).
+
+Ключ живёт в транзакции самого запроса:
+1. INSERT ... ON CONFLICT DO NOTHING — параллельный дубликат с тем же ключом
+   ждёт на блокировке вставленной строки (уникальный индекс), пока первый
+   запрос не закоммитит или не откатит транзакцию
+2. строка наша -> выполняем мутацию и пишем ответ в ту же строку (один COMMIT)
+3. строка чужая -> она уже закоммичена вместе с ответом: отдаём его повторно
+
+Ошибка мутации откатывает и ключ, поэтому клиент может повторять запрос
+агрессивно, с короткими таймаутами: двойного продления не будет.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models.idempotency_key import IdempotencyKey
+
+
+@dataclass
+class IdempotencyKeyReusedError(Exception):
+    key: str
+
+    def message(self) -> str:
+        return f"Idempotency-Key was already used for a different request: {self.key}"
+
+
+@dataclass(frozen=True, slots=True)
+class IdempotencyRequest:
+    key: str
+    fingerprint: str
+
+
+@dataclass(frozen=True, slots=True)
+class StoredResponse:
+    status_code: int
+    body: Any
+
+
+def request_fingerprint(method: str, path: str, body: bytes) -> str:
+    digest = hashlib.sha256(f"{method.upper()} {path}\n".encode())
+    digest.update(body)
+    return digest.hexdigest()
+
+
+class IdempotencyService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def claim(self, user_id: int, request: IdempotencyRequest) -> StoredResponse | None:
+        """
+        None -> ключ наш, выполняем запрос и вызываем store() в той же транзакции.
+        Иначе — сохранённый ответ первого запроса.
+        """
+        claimed = self.db.execute(
+            pg_insert(IdempotencyKey)
+            .values(user_id=user_id, key=request.key, fingerprint=request.fingerprint)
+            .on_conflict_do_nothing(index_elements=[IdempotencyKey.user_id, IdempotencyKey.key])
+            .returning(IdempotencyKey.id)
+        ).scalar_one_or_none()
+        if claimed is not None:
+            return None
+
+        row = self.db.execute(
+            select(
+                IdempotencyKey.fingerprint,
+                IdempotencyKey.status_code,
+                IdempotencyKey.response_body,
+            ).where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == request.key)
+        ).one()
+        if row.fingerprint != request.fingerprint:
+            raise IdempotencyKeyReusedError(key=request.key)
+        # закоммиченная строка всегда с ответом (store() в той же транзакции, что и INSERT)
+        return StoredResponse(status_code=row.status_code, body=row.response_body)
+
+    def store(self, user_id: int, request: IdempotencyRequest, status_code: int, body: Any) -> None:
+        self.db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == request.key)
+            .values(status_code=status_code, response_body=body)
+        )
+
+    def purge_expired(self, now: datetime | None = None) -> int:
+        now = now or datetime.now(timezone.utc)
+        cutoff = now - timedelta(hours=settings.idempotency_ttl_hours)
+        result = self.db.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < cutoff))
+        return result.rowcount
@@ -0,0 +1,64 @@
+"""
+Обработчики фоновых задач.
+
+Импорт модуля регистрирует их в JOB_HANDLERS (см. app.worker).
+Обработчики не коммитят — это делает JobService.run_claimed().
+"""
+
+from __future__ import annotations
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services.analytics_service import AnalyticsService
+from app.services.audit_service import AuditService
+from app.services.device_service import DeviceService
+from app.services.idempotency_service import IdempotencyService
+from app.services.job_service import job_handler
+from app.services.peer_feed_service import PeerFeedService
+from app.services.wireguard_service import WireGuardService
+
+DEVICES_PURGE_REVOKED = "devices.purge_revoked"
+PEERS_EXPIRE_SWEEP = "peers.expire_sweep"
+PEERS_COMPACT_FEED = "peers.compact_feed"
+ANALYTICS_REFRESH = "analytics.refresh"
+IDEMPOTENCY_PURGE = "idempotency.purge"
+AUDIT_PARTITIONS = "audit.partitions"
+# разовая, ставится вручную после смены WG_KEY_SECRET (см. README)
+PEERS_REISSUE_KEYS = "peers.reissue_keys"
+
+
+@job_handler(DEVICES_PURGE_REVOKED)
+def purge_revoked_devices(db: Session, payload: dict) -> None:
+    device_ids = [int(i) for i in payload.get("device_ids", ())]
+    DeviceService(db).purge_revoked(int(payload["user_id"]), device_ids)
+
+
+@job_handler(PEERS_EXPIRE_SWEEP, every_sec=settings.peer_expiry_sweep_sec)
+def expire_peers(db: Session, payload: dict) -> None:
+    WireGuardService(db).release_expired()
+
+
+@job_handler(PEERS_REISSUE_KEYS)
+def reissue_peer_keys(db: Session, payload: dict) -> None:
+    WireGuardService(db).reissue_derived_keys()
+
+
+@job_handler(PEERS_COMPACT_FEED, every_sec=settings.peer_feed_compact_sec)
+def compact_peer_feed(db: Session, payload: dict) -> None:
+    PeerFeedService(db).compact()
+
+
+@job_handler(ANALYTICS_REFRESH, every_sec=settings.analytics_refresh_sec)
+def refresh_analytics(db: Session, payload: dict) -> None:
+    AnalyticsService(db).refresh()
+
+
+@job_handler(IDEMPOTENCY_PURGE, every_sec=settings.idempotency_purge_sec)
+def purge_idempotency_keys(db: Session, payload: dict) -> None:
+    IdempotencyService(db).purge_expired()
+
+
+@job_handler(AUDIT_PARTITIONS, every_sec=settings.audit_partition_sec)
+def ensure_audit_partitions(db: Session, payload: dict) -> None:
+    AuditService(db).ensure_partitions_ahead()
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import logging
+import random
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.db.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Session, dict], None]
+
+# kind -> handler(db, payload); наполняется через @job_handler
+JOB_HANDLERS: dict[str, JobHandler] = {}
+# kind -> интервал (сек) для периодических задач (@job_handler(..., every_sec=))
+PERIODIC_JOBS: dict[str, float] = {}
+
+# pg_try_advisory_xact_lock: периодические задачи ставит один воркер из всех
+JOBS_PERIODIC_LOCK_ID = 0x6A6F6273
+
+# backoff между попытками: 2, 4, 8 ... но не больше 10 минут
+RETRY_BASE_SEC = 2
+RETRY_MAX_SEC = 600
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def job_handler(kind: str, *, every_sec: float | None = None) -> Callable[[JobHandler], JobHandler]:
+    """
+    Регистрирует обработчик задач типа `kind`.
+    Обработчик НЕ коммитит сам — commit делает JobService.run_claimed().
+
+    every_sec — периодическая задача: воркер ставит её сам (JobService.ensure_periodic).
+    """
+
+    def _decorator(fn: JobHandler) -> JobHandler:
+        if kind in JOB_HANDLERS:
+            raise RuntimeError(f"Job handler already registered: {kind}")
+        JOB_HANDLERS[kind] = fn
+        if every_sec is not None:
+            PERIODIC_JOBS[kind] = every_sec
+        return fn
+
+    return _decorator
+
+
+class JobService:
+    """
+    Очередь отложенных задач поверх таблицы jobs.
+
+    - enqueue() только добавляет строку в текущую транзакцию:
+      задача появится ровно тогда, когда закоммитится основная мутация
+    - claim() забирает пачку через FOR UPDATE SKIP LOCKED,
+      поэтому несколько воркеров не мешают друг другу
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ---------- producer ----------
+    def enqueue(
+        self,
+        kind: str,
+        payload: dict | None = None,
+        *,
+        delay_sec: float = 0,
+        max_attempts: int = 5,
+    ) -> Job:
+        job = Job(
+            kind=kind,
+            payload=payload or {},
+            status="queued",
+            attempts=0,
+            max_attempts=max_attempts,
+            run_at=utcnow() + timedelta(seconds=delay_sec),
+        )
+        self.db.add(job)
+        return job
+
+    # ---------- consumer ----------
+    def claim(self, worker_id: str, *, limit: int = 10) -> list[Job]:
+        jobs = list(
+            self.db.scalars(
+                select(Job)
+                .where(Job.status == "queued", Job.run_at <= utcnow())
+                .order_by(Job.run_at.asc(), Job.id.asc())
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+        )
+
+        now = utcnow()
+        for job in jobs:
+            job.status = "running"
+            job.locked_at = now
+            job.locked_by = worker_id
+            job.attempts += 1
+
+        self.db.commit()
+        return jobs
+
+    def requeue_stale(self, *, older_than_sec: int) -> int:
+        """
+        running-задачи, чей воркер пропал, возвращаем в очередь.
+        """
+        result = self.db.execute(
+            update(Job)
+            .where(
+                Job.status == "running",
+                Job.locked_at < utcnow() - timedelta(seconds=older_than_sec),
+            )
+            .values(status="queued", locked_at=None, locked_by=None)
+        )
+        self.db.commit()
+        return int(result.rowcount or 0)
+
+    def ensure_periodic(self) -> int:
+        """
+        Ставит периодические задачи, у которых нет queued/running экземпляра
+        (index-only по ix_jobs_pending_kind). Следующий запуск — через every_sec,
+        поэтому интервал отсчитывается от завершения предыдущего.
+        Возвращает число поставленных задач.
+        """
+        if not PERIODIC_JOBS:
+            return 0
+
+        locked = self.db.scalar(select(func.pg_try_advisory_xact_lock(JOBS_PERIODIC_LOCK_ID)))
+        if not locked:
+            self.db.rollback()
+            return 0
+
+        pending = set(
+            self.db.scalars(
+                select(Job.kind)
+                .where(Job.kind.in_(PERIODIC_JOBS), Job.status.in_(("queued", "running")))
+                .distinct()
+            )
+        )
+        created = 0
+        for kind, every_sec in sorted(PERIODIC_JOBS.items()):
+            if kind not in pending:
+                self.enqueue(kind, delay_sec=every_sec)
+                created += 1
+
+        self.db.commit()
+        return created
+
+    def run_claimed(self, jobs: list[Job]) -> int:
+        """
+        Выполняет уже захваченные задачи. Возвращает число успешных.
+        Каждая задача — в своей транзакции: падение одной не откатывает другие.
+        """
+        done = 0
+        for job in jobs:
+            handler = JOB_HANDLERS.get(job.kind)
+            try:
+                if handler is None:
+                    raise LookupError(f"No handler for job kind: {job.kind}")
+                handler(self.db, dict(job.payload or {}))
+                job.status = "done"
+                job.finished_at = utcnow()
+                job.last_error = None
+                self.db.commit()
+                done += 1
+            except Exception as e:
+                self.db.rollback()
+                logger.exception("Job %s (%s) failed", job.id, job.kind)
+                self._mark_failed(job, e)
+        return done
+
+    def run_pending(self, worker_id: str, *, limit: int = 10) -> int:
+        return self.run_claimed(self.claim(worker_id, limit=limit))
+
+    # ---------- helpers ----------
+    def _mark_failed(self, job: Job, error: Exception) -> None:
+        job.last_error = f"{type(error).__name__}: {error}"[:2000]
+        job.locked_at = None
+        job.locked_by = None
+
+        if job.attempts >= job.max_attempts:
+            job.status = "failed"
+            job.finished_at = utcnow()
+        else:
+            backoff = min(RETRY_BASE_SEC * (2 ** (job.attempts - 1)), RETRY_MAX_SEC)
+            # jitter, чтобы упавшие пачкой задачи не ретраились синхронно
+            job.status = "queued"
+            job.run_at = utcnow() + timedelta(seconds=backoff * random.uniform(0.5, 1.5))
+
+        self.db.commit()
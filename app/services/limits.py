@@ -11,6 +11,7 @@ from app.db.models.plan import Plan
 from app.db.models.server import Server
 from app.db.models.subscription import Subscription
 from app.db.models.user import User
+from app.services.usage_service import UsageService
 
 
 # -------------------- domain errors --------------------
@@ -118,7 +119,11 @@ def get_active_plan_for_user(db: Session, user_or_id: int | User) -> Plan:
     return plan
 
 
-def enforce_max_servers(db: Session, user_or_id: int | User) -> None:
+def enforce_max_servers(db: Session, user_or_id: int | User, *, adding: int = 1) -> None:
+    """
+    Проверяет, что пользователь может создать ещё `adding` серверов.
+    Для bulk-импорта лимит проверяется один раз на весь батч.
+    """
     user = _resolve_user(db, user_or_id)
     plan = get_active_plan_for_user(db, user)
 
@@ -130,7 +135,7 @@ def enforce_max_servers(db: Session, user_or_id: int | User) -> None:
     used_i = int(used or 0)
     limit_i = int(plan.max_servers or 0)
 
-    if used_i >= limit_i:
+    if used_i + adding > limit_i:
         raise LimitExceededError(
             resource="servers",
             limit=limit_i,
@@ -156,3 +161,31 @@ def enforce_max_devices(db: Session, user_or_id: int | User) -> None:
             limit=limit_i,
             current=used_i,
         )
+
+
+def get_traffic_used(db: Session, user_or_id: int | User) -> int:
+    """
+    Трафик пользователя (in + out) за текущий период — чтение одной строки по PK.
+    """
+    user_id = user_or_id.id if isinstance(user_or_id, User) else user_or_id
+    return UsageService(db).used_bytes(user_id)
+
+
+def enforce_traffic_quota(db: Session, user_or_id: int | User) -> None:
+    """
+    Квота трафика плана на текущий месяц (traffic_quota_bytes <= 0 -> без лимита).
+    """
+    user = _resolve_user(db, user_or_id)
+    plan = get_active_plan_for_user(db, user)
+
+    quota = int(plan.traffic_quota_bytes or 0)
+    if quota <= 0:
+        return
+
+    used = get_traffic_used(db, user)
+    if used >= quota:
+        raise LimitExceededError(
+            resource="traffic",
+            limit=quota,
+            current=used,
+        )
@@ -0,0 +1,339 @@
+from __future__ import annotations
+
+import logging
+import threading
+from collections import deque
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+
+from fastapi import HTTPException
+from sqlalchemy import DateTime, Float, bindparam, case, func, or_, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models.server import Server
+from app.db.models.server_metric import ServerMetric, ServerMetric1h, ServerMetric1m
+from app.db.models.server_status import ServerStatus
+
+logger = logging.getLogger(__name__)
+
+# pg_try_advisory_xact_lock: rollup/партиции обслуживает один процесс из всех
+METRICS_MAINTENANCE_LOCK_ID = 0x6D657472
+
+_COPY_COLUMNS = ("server_id", "ts", "active_peers", "bytes_in", "bytes_out", "cpu")
+_ROLLUP_COLUMNS = (
+    "samples",
+    "active_peers_avg",
+    "active_peers_max",
+    "bytes_in",
+    "bytes_out",
+    "cpu_avg",
+    "cpu_max",
+)
+# load в пределах одной корзины не двигает server_status.changed_at:
+# 0.05 * LOAD_WEIGHT_MS = 10 мс score, как корзина latency у пробера
+RANKING_LOAD_BUCKET = 0.05
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def partition_name(day: date) -> str:
+    return f"server_metrics_p{day:%Y%m%d}"
+
+
+@dataclass(frozen=True, slots=True)
+class MetricSample:
+    server_id: int
+    ts: datetime
+    active_peers: int
+    bytes_in: int
+    bytes_out: int
+    cpu: float
+
+
+class MetricsBuffer:
+    """
+    Буфер между ingest-эндпоинтом и writer-потоком (app.metrics_writer).
+
+    - ограничен max_rows: при переполнении новые сэмплы отбрасываются и считаются
+    - ready выставляется, когда набралась полная пачка: writer не ждёт интервал
+    """
+
+    def __init__(self, *, max_rows: int, batch_rows: int) -> None:
+        self.max_rows = max_rows
+        self.batch_rows = batch_rows
+        self.ready = threading.Event()
+        self._lock = threading.Lock()
+        self._rows: deque[MetricSample] = deque()
+        self.dropped = 0
+        self.failed = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, samples: Iterable[MetricSample]) -> int:
+        accepted = 0
+        with self._lock:
+            for sample in samples:
+                if len(self._rows) >= self.max_rows:
+                    self.dropped += 1
+                    continue
+                self._rows.append(sample)
+                accepted += 1
+            if len(self._rows) >= self.batch_rows:
+                self.ready.set()
+        return accepted
+
+    def drain(self, limit: int) -> list[MetricSample]:
+        with self._lock:
+            n = min(limit, len(self._rows))
+            out = [self._rows.popleft() for _ in range(n)]
+            if len(self._rows) < self.batch_rows:
+                self.ready.clear()
+        return out
+
+    def record_failed(self, n: int) -> None:
+        with self._lock:
+            self.failed += n
+
+
+metrics_buffer = MetricsBuffer(
+    max_rows=settings.metrics_buffer_max_rows,
+    batch_rows=settings.metrics_flush_max_rows,
+)
+
+
+class MetricsService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ---------- ingest (request path: без записи в БД) ----------
+    def submit(self, server_id: int, samples: list[dict], *, now: datetime | None = None) -> dict:
+        """
+        Принимает пачку метрик ноды в буфер. Запись в server_metrics делает writer.
+        Сэмплы вне окна [now - METRICS_MAX_SAMPLE_AGE_SEC, now + 5 мин] отклоняются:
+        под них может не быть партиции, а в rollup они всё равно не попадут.
+        """
+        server = self.db.get(Server, server_id)
+        if server is None or server.deleted_at is not None:
+            raise HTTPException(status_code=404, detail="Server not found")
+
+        now = now or utcnow()
+        oldest = now - timedelta(seconds=settings.metrics_max_sample_age_sec)
+        newest = now + timedelta(minutes=5)
+
+        rows = [
+            MetricSample(server_id=server_id, **s)
+            for s in samples
+            if oldest <= s["ts"] <= newest
+        ]
+        rejected = len(samples) - len(rows)
+        accepted = metrics_buffer.add(rows)
+
+        return {
+            "accepted": accepted,
+            "rejected": rejected,
+            "dropped": len(rows) - accepted,
+        }
+
+    # ---------- writer ----------
+    def ensure_partitions(self, days: Iterable[date]) -> None:
+        for day in sorted(set(days)):
+            start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+            end = start + timedelta(days=1)
+            # DDL не принимает bind-параметры; значения — даты, не пользовательский ввод
+            self.db.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {partition_name(day)} "
+                    f"PARTITION OF server_metrics "
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                )
+            )
+
+    def copy_samples(self, samples: list[MetricSample]) -> int:
+        """
+        COPY FROM STDIN в server_metrics (без commit): один протокольный поток
+        вместо INSERT на строку или многострочного VALUES.
+        """
+        if not samples:
+            return 0
+
+        self.ensure_partitions(s.ts.astimezone(timezone.utc).date() for s in samples)
+
+        raw = self.db.connection().connection.driver_connection
+        columns = ", ".join(_COPY_COLUMNS)
+        with raw.cursor() as cur:
+            with cur.copy(f"COPY server_metrics ({columns}) FROM STDIN") as copy:
+                for s in samples:
+                    copy.write_row(
+                        (s.server_id, s.ts, s.active_peers, s.bytes_in, s.bytes_out, s.cpu)
+                    )
+        return len(samples)
+
+    def record_load(self, samples: list[MetricSample]) -> int:
+        """
+        Последний load каждого сервера из пачки -> server_status (без commit).
+        Оттуда его читает refresh ranking-индекса во всех API-воркерах.
+        Сэмпл старше уже записанного не перетирает load; сервер, который пробер
+        ещё не проверял (нет строки статуса), пропускается.
+        """
+        latest: dict[int, MetricSample] = {}
+        for s in samples:
+            seen = latest.get(s.server_id)
+            if seen is None or s.ts > seen.ts:
+                latest[s.server_id] = s
+        if not latest:
+            return 0
+
+        status = ServerStatus.__table__
+        new_load = bindparam("new_load", type_=Float)
+        new_ts = bindparam("new_ts", type_=DateTime(timezone=True))
+        bucket_changed = func.floor(new_load / RANKING_LOAD_BUCKET).is_distinct_from(
+            func.floor(status.c.load / RANKING_LOAD_BUCKET)
+        )
+        stmt = (
+            update(status)
+            .where(
+                status.c.server_id == bindparam("sid"),
+                or_(status.c.load_at.is_(None), status.c.load_at < new_ts),
+            )
+            .values(
+                load=new_load,
+                load_at=new_ts,
+                changed_at=case((bucket_changed, func.now()), else_=status.c.changed_at),
+            )
+        )
+        self.db.execute(
+            stmt,
+            [
+                {"sid": s.server_id, "new_load": s.cpu / 100.0, "new_ts": s.ts}
+                for s in latest.values()
+            ],
+        )
+        return len(latest)
+
+    # ---------- rollups ----------
+    def _upsert_rollup(self, model, select_stmt) -> None:
+        stmt = pg_insert(model).from_select(["server_id", "bucket", *_ROLLUP_COLUMNS], select_stmt)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[model.server_id, model.bucket],
+            set_={c: stmt.excluded[c] for c in _ROLLUP_COLUMNS},
+        )
+        self.db.execute(stmt)
+
+    def rollup(self, *, since: datetime, until: datetime) -> None:
+        """
+        Пересчитывает 1m-бакеты из сырых строк и 1h-бакеты из 1m за окно [since, until).
+        Бакеты перезаписываются целиком, поэтому повторный запуск идемпотентен.
+        """
+        since_1m = since.replace(second=0, microsecond=0)
+        bucket = func.date_trunc("minute", ServerMetric.ts)
+        self._upsert_rollup(
+            ServerMetric1m,
+            select(
+                ServerMetric.server_id,
+                bucket,
+                func.count(),
+                func.avg(ServerMetric.active_peers),
+                func.max(ServerMetric.active_peers),
+                func.sum(ServerMetric.bytes_in),
+                func.sum(ServerMetric.bytes_out),
+                func.avg(ServerMetric.cpu),
+                func.max(ServerMetric.cpu),
+            )
+            .where(ServerMetric.ts >= since_1m, ServerMetric.ts < until)
+            .group_by(ServerMetric.server_id, bucket),
+        )
+
+        since_1h = since.replace(minute=0, second=0, microsecond=0)
+        m = ServerMetric1m
+        bucket = func.date_trunc("hour", m.bucket)
+        samples = func.sum(m.samples)
+        self._upsert_rollup(
+            ServerMetric1h,
+            select(
+                m.server_id,
+                bucket,
+                samples,
+                func.sum(m.active_peers_avg * m.samples) / samples,
+                func.max(m.active_peers_max),
+                func.sum(m.bytes_in),
+                func.sum(m.bytes_out),
+                func.sum(m.cpu_avg * m.samples) / samples,
+                func.max(m.cpu_max),
+            )
+            .where(m.bucket >= since_1h, m.bucket < until)
+            .group_by(m.server_id, bucket),
+        )
+
+    def drop_partitions_before(self, day: date) -> list[str]:
+        names = self.db.scalars(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = 'server_metrics'"
+            )
+        ).all()
+
+        dropped = []
+        cutoff = partition_name(day)
+        for name in sorted(names):
+            # имена одной длины, дата в YYYYMMDD -> строковое сравнение = по дате
+            if len(name) == len(cutoff) and name < cutoff:
+                self.db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                dropped.append(name)
+        return dropped
+
+    def run_maintenance(self, *, now: datetime | None = None) -> bool:
+        """
+        Партиции на METRICS_PARTITION_DAYS_AHEAD дней вперёд, rollup за окно
+        METRICS_ROLLUP_LOOKBACK_SEC, удаление партиций старше METRICS_RETENTION_DAYS.
+        Без commit. False — обслуживанием уже занят другой процесс.
+        """
+        locked = self.db.scalar(select(func.pg_try_advisory_xact_lock(METRICS_MAINTENANCE_LOCK_ID)))
+        if not locked:
+            return False
+
+        now = now or utcnow()
+        today = now.date()
+        self.ensure_partitions(
+            today + timedelta(days=i) for i in range(settings.metrics_partition_days_ahead + 1)
+        )
+        self.rollup(
+            since=now - timedelta(seconds=settings.metrics_rollup_lookback_sec),
+            until=now + timedelta(minutes=1),
+        )
+        retention = timedelta(days=settings.metrics_retention_days)
+        dropped = self.drop_partitions_before(today - retention)
+        if dropped:
+            logger.info("Dropped metrics partitions: %s", ", ".join(dropped))
+        return True
+
+    # ---------- read ----------
+    def series(
+        self,
+        server_id: int,
+        *,
+        resolution: str = "1m",
+        since: datetime | None = None,
+        until: datetime | None = None,
+        limit: int = 5000,
+    ) -> list:
+        model = ServerMetric1m if resolution == "1m" else ServerMetric1h
+        until = until or utcnow()
+        if since is None:
+            since = until - (timedelta(hours=1) if resolution == "1m" else timedelta(days=7))
+
+        return list(
+            self.db.scalars(
+                select(model)
+                .where(model.server_id == server_id, model.bucket >= since, model.bucket < until)
+                .order_by(model.bucket.asc())
+                .limit(limit)
+            )
+        )
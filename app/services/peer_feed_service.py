@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, aliased
+
+from app.core.config import settings
+from app.db.models.peer import Peer, ServerAddressPool
+from app.db.models.peer_change import PeerChange, PeerFeedWatermark
+from app.db.models.server import Server
+from app.services.event_bus import EVENT_PEERS_CHANGED, publish_event
+
+PEER_OP_UPSERT = "upsert"
+PEER_OP_REMOVE = "remove"
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class PeerFeedService:
+    """
+    Инкрементальная синхронизация пиров для нод.
+
+    - record() пишет изменение в peer_changes в той же транзакции, что и мутация пира
+      (вызывать под row lock пула адресов сервера, см. WireGuardService)
+    - feed(): since >= watermark -> только изменения после since (index range scan),
+      иначе полный снапшот активных пиров сервера
+    - compact(): оставляет последнюю запись на пир, старые remove удаляет
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ---------- write ----------
+    def record(self, peer: Peer, op: str, *, address: str | None) -> None:
+        self.db.add(
+            PeerChange(
+                server_id=peer.server_id,
+                peer_id=peer.id,
+                user_id=peer.user_id,
+                op=op,
+                public_key=peer.public_key,
+                address=address,
+            )
+        )
+        # ноды, подписанные на GET /nodes/{server_id}/events, сразу идут за дельтой
+        publish_event(self.db, EVENT_PEERS_CHANGED, server_id=peer.server_id)
+
+    # ---------- read ----------
+    def feed(self, server_id: int, *, since: int | None, limit: int) -> dict:
+        server = self.db.get(Server, server_id)
+        if server is None or server.deleted_at is not None:
+            raise HTTPException(status_code=404, detail="Server not found")
+
+        watermark = self.db.get(PeerFeedWatermark, server_id)
+        if since is None or (watermark is not None and since < watermark.version):
+            return self._snapshot(server_id)
+
+        rows = list(
+            self.db.scalars(
+                select(PeerChange)
+                .where(PeerChange.server_id == server_id, PeerChange.version > since)
+                .order_by(PeerChange.version.asc())
+                .limit(limit + 1)
+            )
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        return {
+            "full": False,
+            "version": rows[-1].version if rows else since,
+            "has_more": has_more,
+            "peers": [
+                {
+                    "op": c.op,
+                    "version": c.version,
+                    "peer_id": c.peer_id,
+                    "user_id": c.user_id,
+                    "public_key": c.public_key,
+                    "address": c.address,
+                }
+                for c in rows
+            ],
+        }
+
+    def _snapshot(self, server_id: int) -> dict:
+        # версию читаем ДО пиров: изменение между запросами нода получит
+        # ещё раз со следующей дельтой, а upsert/remove идемпотентны
+        version = self.db.scalar(
+            select(func.coalesce(func.max(PeerChange.version), 0)).where(
+                PeerChange.server_id == server_id
+            )
+        )
+
+        pool = self.db.get(ServerAddressPool, server_id)
+        network = None
+        if pool is not None:
+            from app.services.wireguard_service import parse_subnet
+
+            network = parse_subnet(pool.subnet)
+
+        peers = self.db.execute(
+            select(Peer.id, Peer.user_id, Peer.public_key, Peer.address_index).where(
+                Peer.server_id == server_id,
+                Peer.revoked_at.is_(None),
+            )
+        )
+        return {
+            "full": True,
+            "version": int(version),
+            "has_more": False,
+            "peers": [
+                {
+                    "op": PEER_OP_UPSERT,
+                    "version": None,
+                    "peer_id": p.id,
+                    "user_id": p.user_id,
+                    "public_key": p.public_key,
+                    "address": str(network[p.address_index]) if network is not None else None,
+                }
+                for p in peers
+            ],
+        }
+
+    # ---------- compaction ----------
+    def compact(self, *, retention_days: int | None = None, now: datetime | None = None) -> int:
+        """
+        1) удаляет записи, перекрытые более поздней записью того же пира
+           (нода применяет upsert/remove по peer_id — последнего состояния достаточно)
+        2) удаляет remove старше retention и поднимает watermark сервера:
+           ноды с since ниже него перейдут на полный снапшот
+        Без commit. Возвращает число удалённых строк.
+        """
+        if retention_days is None:
+            retention_days = settings.peer_feed_retention_days
+        cutoff = (now or utcnow()) - timedelta(days=retention_days)
+
+        newer = aliased(PeerChange)
+        superseded = self.db.execute(
+            delete(PeerChange)
+            .where(
+                select(newer.version)
+                .where(newer.peer_id == PeerChange.peer_id, newer.version > PeerChange.version)
+                .exists()
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+        expired = self.db.execute(
+            delete(PeerChange)
+            .where(PeerChange.op == PEER_OP_REMOVE, PeerChange.created_at < cutoff)
+            .returning(PeerChange.server_id, PeerChange.version)
+            .execution_options(synchronize_session=False)
+        ).all()
+
+        watermarks: dict[int, int] = {}
+        for server_id, version in expired:
+            watermarks[server_id] = max(version, watermarks.get(server_id, 0))
+
+        if watermarks:
+            stmt = pg_insert(PeerFeedWatermark).values(
+                [{"server_id": s, "version": v} for s, v in sorted(watermarks.items())]
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[PeerFeedWatermark.server_id],
+                set_={"version": func.greatest(PeerFeedWatermark.version, stmt.excluded.version)},
+            )
+            self.db.execute(stmt)
+
+        return int(superseded.rowcount or 0) + len(expired)
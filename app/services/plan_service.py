@@ -8,6 +8,10 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.db.models.plan import Plan
+from app.db.uow import commit_or_flush, savepoint
+from app.services.audit_service import audit_on_commit, changes_of
+from app.services.event_bus import EVENT_PLANS_CHANGED, publish_event
+from app.services.summary_cache import invalidate_summary_on_commit
 
 logger = logging.getLogger(__name__)
 
@@ -56,6 +60,16 @@ class PlanService:
             detail="Integrity constraint failed",
         )
 
+    def _audit(self, plan: Plan, action: str, actor_id: int | None) -> None:
+        audit_on_commit(
+            self.db,
+            "plan",
+            action,
+            actor_id=actor_id,
+            changes=changes_of(plan),
+            entity=plan,
+        )
+
     def _ensure_not_system_plan(self, plan: Plan) -> None:
         if plan.code in SYSTEM_PLAN_CODES:
             raise SystemPlanProtectedError(plan_code=plan.code)
@@ -79,47 +93,53 @@ class PlanService:
             raise HTTPException(status_code=404, detail="Plan not found")
         return plan
 
-    def create(self, data: dict) -> Plan:
+    def create(self, data: dict, *, actor_id: int | None = None) -> Plan:
         plan = Plan(**data)
-        self.db.add(plan)
+        # дубликат code откатывает только SAVEPOINT (с аудитом), не транзакцию запроса
         try:
-            self.db.commit()
+            with savepoint(self.db):
+                self.db.add(plan)
+                self._audit(plan, "create", actor_id)
+                self.db.flush()
         except IntegrityError as e:
-            self.db.rollback()
             self._handle_integrity_error(e, unique_msg="Plan code already exists")
-        self.db.refresh(plan)
+        commit_or_flush(self.db)
         return plan
 
-    def update(self, plan: Plan, data: dict) -> Plan:
+    def update(self, plan: Plan, data: dict, *, actor_id: int | None = None) -> Plan:
         # SaaS правило: code — стабильный идентификатор, не меняем
         if "code" in data and data["code"] != plan.code:
             raise PlanCodeImmutableError(current=plan.code, requested=str(data["code"]))
 
-        for k, v in data.items():
-            setattr(plan, k, v)
-
         try:
-            self.db.commit()
+            with savepoint(self.db):
+                for k, v in data.items():
+                    setattr(plan, k, v)
+                self._audit(plan, "update", actor_id)
+
+                # лимиты/квота плана видны в billing summary всех его подписчиков
+                publish_event(self.db, EVENT_PLANS_CHANGED)
+                invalidate_summary_on_commit(self.db, None)
+                self.db.flush()
         except IntegrityError as e:
-            self.db.rollback()
             self._handle_integrity_error(e, unique_msg="Plan code already exists")
+        commit_or_flush(self.db)
 
-        self.db.refresh(plan)
         return plan
 
-    def activate(self, plan: Plan) -> Plan:
+    def activate(self, plan: Plan, *, actor_id: int | None = None) -> Plan:
         if plan.is_active:
             return plan
         plan.is_active = True
-        self.db.commit()
-        self.db.refresh(plan)
+        self._audit(plan, "activate", actor_id)
+        commit_or_flush(self.db)
         return plan
 
-    def deactivate(self, plan: Plan) -> Plan:
+    def deactivate(self, plan: Plan, *, actor_id: int | None = None) -> Plan:
         self._ensure_not_system_plan(plan)
         if not plan.is_active:
             return plan
         plan.is_active = False
-        self.db.commit()
-        self.db.refresh(plan)
+        self._audit(plan, "deactivate", actor_id)
+        commit_or_flush(self.db)
         return plan
@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from fastapi import HTTPException
+from sqlalchemy import case, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.db.models.server import Server
+from app.db.models.server_status import ServerStatus
+
+logger = logging.getLogger(__name__)
+
+# строк на один upsert статусов
+STATUS_UPSERT_CHUNK_SIZE = 1000
+# потолок счётчика падений подряд: колонка SMALLINT
+CONSECUTIVE_FAILURES_MAX = 32767
+# latency в пределах одной корзины не двигает changed_at (дрожание сети
+# не должно гонять ranking-индекс API-воркеров по всем серверам)
+RANKING_LATENCY_BUCKET_MS = 10
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass(frozen=True, slots=True)
+class ProbeTarget:
+    server_id: int
+    host: str
+    port: int
+
+
+@dataclass(frozen=True, slots=True)
+class ProbeResult:
+    server_id: int
+    ok: bool
+    checked_at: datetime
+    latency_ms: int | None = None
+    error: str | None = None
+
+
+# -------------------- low-level probes --------------------
+
+async def probe_tcp(host: str, port: int, *, timeout: float) -> float:
+    """
+    TCP connect до host:port. Возвращает latency в секундах.
+    """
+    started = time.perf_counter()
+    _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=timeout)
+    latency = time.perf_counter() - started
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return latency
+
+
+class _UdpProbeProtocol(asyncio.DatagramProtocol):
+    def __init__(self, waiter: asyncio.Future) -> None:
+        self.waiter = waiter
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        if not self.waiter.done():
+            self.waiter.set_result(None)
+
+    def error_received(self, exc: Exception) -> None:
+        # ICMP port unreachable приходит сюда как ConnectionRefusedError
+        if not self.waiter.done():
+            self.waiter.set_exception(exc)
+
+
+async def probe_udp(host: str, port: int, *, timeout: float, payload: bytes = b"\x00") -> float:
+    """
+    UDP: отправляем датаграмму и ждём любой ответ. Возвращает latency в секундах.
+    Подходит для эндпоинтов, которые отвечают на probe (stub / echo / health-port).
+    """
+    loop = asyncio.get_running_loop()
+    waiter: asyncio.Future = loop.create_future()
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: _UdpProbeProtocol(waiter),
+        remote_addr=(host, port),
+    )
+    try:
+        started = time.perf_counter()
+        transport.sendto(payload)
+        await asyncio.wait_for(waiter, timeout=timeout)
+        return time.perf_counter() - started
+    finally:
+        transport.close()
+
+
+PROBES = {
+    "tcp": probe_tcp,
+    "udp": probe_udp,
+}
+
+
+async def probe_one(
+    target: ProbeTarget,
+    *,
+    protocol: str,
+    timeout: float,
+    semaphore: asyncio.Semaphore,
+    jitter_sec: float = 0.0,
+) -> ProbeResult:
+    if jitter_sec > 0:
+        await asyncio.sleep(random.uniform(0, jitter_sec))
+
+    probe = PROBES[protocol]
+    async with semaphore:
+        try:
+            latency = await probe(target.host, target.port, timeout=timeout)
+        except asyncio.TimeoutError:
+            return ProbeResult(target.server_id, ok=False, checked_at=utcnow(), error="timeout")
+        except OSError as e:
+            error = type(e).__name__ if not e.strerror else f"{type(e).__name__}: {e.strerror}"
+            return ProbeResult(target.server_id, ok=False, checked_at=utcnow(), error=error[:120])
+
+    return ProbeResult(
+        target.server_id,
+        ok=True,
+        checked_at=utcnow(),
+        latency_ms=max(int(round(latency * 1000)), 0),
+    )
+
+
+async def probe_all(
+    targets: list[ProbeTarget],
+    *,
+    protocol: str = "tcp",
+    timeout: float = 2.0,
+    concurrency: int = 200,
+    jitter_sec: float = 0.0,
+) -> list[ProbeResult]:
+    """
+    Проверяет все цели конкурентно:
+    - не больше `concurrency` одновременных соединений
+    - у каждой проверки свой timeout
+    - старт каждой проверки размазан случайным jitter в [0, jitter_sec]
+    """
+    if protocol not in PROBES:
+        raise ValueError(f"Unknown probe protocol: {protocol}")
+
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    return list(
+        await asyncio.gather(
+            *(
+                probe_one(
+                    t,
+                    protocol=protocol,
+                    timeout=timeout,
+                    semaphore=semaphore,
+                    jitter_sec=jitter_sec,
+                )
+                for t in targets
+            )
+        )
+    )
+
+
+# -------------------- persistence --------------------
+
+class ProbeService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def load_targets(self) -> list[ProbeTarget]:
+        """
+        Проверяем только активные и не удалённые серверы.
+        """
+        rows = self.db.execute(
+            select(Server.id, Server.host, Server.port).where(
+                Server.deleted_at.is_(None),
+                Server.is_active.is_(True),
+            )
+        )
+        return [ProbeTarget(server_id=r.id, host=r.host, port=r.port) for r in rows]
+
+    def record_results(self, results: list[ProbeResult]) -> None:
+        """
+        Batched upsert в server_status (без commit).
+        consecutive_failures и last_ok_at считаются в самом UPDATE, без чтения.
+        """
+        for start in range(0, len(results), STATUS_UPSERT_CHUNK_SIZE):
+            chunk = results[start : start + STATUS_UPSERT_CHUNK_SIZE]
+            stmt = pg_insert(ServerStatus).values(
+                [
+                    {
+                        "server_id": r.server_id,
+                        "checked_at": r.checked_at,
+                        "last_ok_at": r.checked_at if r.ok else None,
+                        "is_up": r.ok,
+                        "latency_ms": r.latency_ms,
+                        "consecutive_failures": 0 if r.ok else 1,
+                        "last_error": r.error,
+                        "changed_at": func.now(),
+                    }
+                    for r in chunk
+                ]
+            )
+            excluded = stmt.excluded
+            bucket = RANKING_LATENCY_BUCKET_MS
+            latency_changed = (excluded.latency_ms // bucket).is_distinct_from(
+                ServerStatus.latency_ms // bucket
+            )
+            ranking_changed = excluded.is_up.is_distinct_from(ServerStatus.is_up) | (
+                excluded.is_up & latency_changed
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[ServerStatus.server_id],
+                set_={
+                    "checked_at": excluded.checked_at,
+                    "is_up": excluded.is_up,
+                    "last_ok_at": case(
+                        (excluded.is_up, excluded.checked_at),
+                        else_=ServerStatus.last_ok_at,
+                    ),
+                    # latency оставляем от последней успешной проверки
+                    "latency_ms": case(
+                        (excluded.is_up, excluded.latency_ms),
+                        else_=ServerStatus.latency_ms,
+                    ),
+                    "consecutive_failures": case(
+                        (excluded.is_up, 0),
+                        # least() до +1: сложение в SMALLINT переполняется само по себе
+                        else_=func.least(
+                            ServerStatus.consecutive_failures, CONSECUTIVE_FAILURES_MAX - 1
+                        )
+                        + 1,
+                    ),
+                    "last_error": excluded.last_error,
+                    # время БД, а не checked_at: цикл пробера коммитится целиком
+                    # в конце и может быть дольше REFRESH_OVERLAP ranking-индекса
+                    "changed_at": case(
+                        (ranking_changed, func.now()),
+                        else_=ServerStatus.changed_at,
+                    ),
+                },
+            )
+            self.db.execute(stmt)
+
+    def get_for_server(self, server_id: int) -> ServerStatus:
+        status = self.db.get(ServerStatus, server_id)
+        if status is None:
+            raise HTTPException(status_code=404, detail="Server status not available yet")
+        return status
+
+    def list_all(self, *, only_down: bool = False) -> list[ServerStatus]:
+        stmt = select(ServerStatus)
+        if only_down:
+            stmt = stmt.where(ServerStatus.is_up.is_(False))
+        return list(self.db.scalars(stmt.order_by(ServerStatus.server_id.asc())))
@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left, insort
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models.server import Server
+from app.db.models.server_status import ServerStatus
+
+# сервер ещё не проверялся пробером: не лучший, но и не исключаем
+UNKNOWN_LATENCY_MS = 500
+# load в [0, 1] -> штраф в "миллисекундах"
+LOAD_WEIGHT_MS = 200.0
+# запас при delta-refresh: транзакции, закоммиченные позже своего now()
+REFRESH_OVERLAP = timedelta(seconds=30)
+
+_PENDING_KEY = "ranking_pending"
+
+
+@dataclass(slots=True)
+class RankedServer:
+    server_id: int
+    owner_id: int
+    name: str
+    host: str
+    port: int
+    country: str | None
+    is_active: bool = True
+    is_up: bool = True
+    latency_ms: int | None = None
+    load: float = 0.0
+    score: float = field(default=0.0)
+
+    def compute_score(self) -> float:
+        latency = self.latency_ms if self.latency_ms is not None else UNKNOWN_LATENCY_MS
+        return float(latency) + LOAD_WEIGHT_MS * min(max(self.load, 0.0), 1.0)
+
+    @property
+    def rankable(self) -> bool:
+        return self.is_active and self.is_up
+
+
+@dataclass(slots=True)
+class _OwnerIndex:
+    # id живых серверов по возрастанию: первые max_servers — в рамках плана
+    ids: list[int] = field(default_factory=list)
+    # (score, server_id) только для rankable серверов
+    ranked: list[tuple[float, int]] = field(default_factory=list)
+    by_country: dict[str | None, list[tuple[float, int]]] = field(default_factory=dict)
+
+
+class ServerRankingIndex:
+    """
+    In-memory индекс "лучший сервер" для GET /servers/best.
+
+    - lookup: O(k log n) по заранее отсортированным спискам владельца
+    - изменения серверов этого процесса применяются после commit (after_commit)
+    - изменения из других процессов/пробера подтягиваются delta-refresh'ем
+      по servers.updated_at и server_status.changed_at раз в RANKING_REFRESH_SEC
+      (changed_at двигают только смена is_up, корзины latency у пробера и
+      корзины load у metrics writer'а, поэтому latency в индексе точна до
+      RANKING_LATENCY_BUCKET_MS, а load — до RANKING_LOAD_BUCKET)
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._entries: dict[int, RankedServer] = {}
+        self._owners: dict[int, _OwnerIndex] = {}
+        self._loaded = False
+        self._watermark: datetime | None = None
+        self._last_refresh = 0.0
+
+    # ---------- mutations ----------
+    def upsert(self, entry: RankedServer) -> None:
+        with self._lock:
+            self._remove_locked(entry.server_id)
+            entry.score = entry.compute_score()
+            self._entries[entry.server_id] = entry
+
+            owner = self._owners.setdefault(entry.owner_id, _OwnerIndex())
+            insort(owner.ids, entry.server_id)
+            if entry.rankable:
+                key = (entry.score, entry.server_id)
+                insort(owner.ranked, key)
+                insort(owner.by_country.setdefault(entry.country, []), key)
+
+    def upsert_keep_probe(self, entry: RankedServer) -> None:
+        """
+        upsert строки сервера без потери probe/load-данных, уже лежащих в индексе.
+        """
+        with self._lock:
+            previous = self._entries.get(entry.server_id)
+            if previous is not None:
+                entry = replace(
+                    entry,
+                    is_up=previous.is_up,
+                    latency_ms=previous.latency_ms,
+                    load=previous.load,
+                )
+            self.upsert(entry)
+
+    def remove(self, server_id: int) -> None:
+        with self._lock:
+            self._remove_locked(server_id)
+
+    def update_probe(self, server_id: int, *, is_up: bool, latency_ms: int | None) -> None:
+        with self._lock:
+            entry = self._entries.get(server_id)
+            if entry is not None:
+                self.upsert(replace(entry, is_up=is_up, latency_ms=latency_ms))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._owners.clear()
+            self._loaded = False
+            self._watermark = None
+            self._last_refresh = 0.0
+
+    def _remove_locked(self, server_id: int) -> None:
+        old = self._entries.pop(server_id, None)
+        if old is None:
+            return
+        owner = self._owners.get(old.owner_id)
+        if owner is None:
+            return
+        _discard(owner.ids, server_id)
+        if old.rankable:
+            key = (old.score, server_id)
+            _discard(owner.ranked, key)
+            bucket = owner.by_country.get(old.country)
+            if bucket is not None:
+                _discard(bucket, key)
+                if not bucket:
+                    del owner.by_country[old.country]
+        if not owner.ids:
+            del self._owners[old.owner_id]
+
+    # ---------- lookup ----------
+    def best(
+        self,
+        owner_id: int,
+        *,
+        max_servers: int,
+        country: str | None = None,
+        limit: int = 1,
+    ) -> list[RankedServer]:
+        """
+        Лучшие серверы владельца:
+        - только active + up (по последнему probe)
+        - только в рамках плана: первые max_servers по id
+          (после даунгрейда лишние серверы не выдаются)
+        - сначала предпочтительная страна, затем остальные; внутри — по score
+        """
+        with self._lock:
+            owner = self._owners.get(owner_id)
+            if owner is None or max_servers <= 0:
+                return []
+
+            entitled_upto = None
+            if max_servers <= len(owner.ids):
+                entitled_upto = owner.ids[max_servers - 1]
+
+            def _entitled(server_id: int) -> bool:
+                return entitled_upto is None or server_id <= entitled_upto
+
+            out: list[RankedServer] = []
+            preferred = country.upper() if country else None
+            if preferred is not None:
+                for _, server_id in owner.by_country.get(preferred, ()):
+                    if len(out) >= limit:
+                        return out
+                    if _entitled(server_id):
+                        out.append(self._entries[server_id])
+
+            for _, server_id in owner.ranked:
+                if len(out) >= limit:
+                    break
+                entry = self._entries[server_id]
+                if preferred is not None and entry.country == preferred:
+                    continue
+                if _entitled(server_id):
+                    out.append(entry)
+            return out
+
+    # ---------- sync with DB ----------
+    def _is_fresh(self) -> bool:
+        age = time.monotonic() - self._last_refresh
+        return self._loaded and age < settings.ranking_refresh_sec
+
+    def refresh(self, db: Session, *, force: bool = False) -> None:
+        """
+        Первый вызов — полная загрузка, дальше — только изменившиеся строки.
+        Запрос к БД идёт без основного lock: lookup'ы в это время не ждут.
+        """
+        if not force and self._is_fresh():
+            return
+        # refresh уже идёт в другом потоке -> отдаём текущие данные
+        if not self._refresh_lock.acquire(blocking=force or not self._loaded):
+            return
+        try:
+            if not force and self._is_fresh():
+                return
+
+            db_now = db.scalar(select(func.now()))
+            stmt = select(
+                Server.id,
+                Server.owner_id,
+                Server.name,
+                Server.host,
+                Server.port,
+                Server.country,
+                Server.is_active,
+                Server.deleted_at,
+                ServerStatus.is_up,
+                ServerStatus.latency_ms,
+                ServerStatus.load,
+            ).outerjoin(ServerStatus, ServerStatus.server_id == Server.id)
+
+            if not self._loaded:
+                stmt = stmt.where(Server.deleted_at.is_(None))
+            else:
+                since = self._watermark - REFRESH_OVERLAP
+                stmt = stmt.where((Server.updated_at >= since) | (ServerStatus.changed_at >= since))
+
+            rows = db.execute(stmt).all()
+
+            with self._lock:
+                for row in rows:
+                    if row.deleted_at is not None:
+                        self._remove_locked(row.id)
+                        continue
+                    self.upsert(
+                        RankedServer(
+                            server_id=row.id,
+                            owner_id=row.owner_id,
+                            name=row.name,
+                            host=row.host,
+                            port=row.port,
+                            country=row.country,
+                            is_active=row.is_active,
+                            is_up=True if row.is_up is None else row.is_up,
+                            latency_ms=row.latency_ms,
+                            load=row.load if row.load is not None else 0.0,
+                        )
+                    )
+                self._loaded = True
+                self._watermark = db_now
+                self._last_refresh = time.monotonic()
+        finally:
+            self._refresh_lock.release()
+
+
+def _discard(items: list, value) -> None:
+    i = bisect_left(items, value)
+    if i < len(items) and items[i] == value:
+        del items[i]
+
+
+ranking_index = ServerRankingIndex()
+
+
+# ---------- write-path hooks (после commit, чтобы не ловить откаченные изменения) ----------
+
+def schedule_server_sync(db: Session, server: Server | dict) -> None:
+    """
+    Запомнить изменение сервера; в индекс оно попадёт после commit сессии.
+    Вызывать после flush (нужен id). Принимает ORM-объект или строку RETURNING.
+    """
+    get = server.get if isinstance(server, dict) else lambda k, d=None: getattr(server, k, d)
+    if get("deleted_at") is not None:
+        change: int | RankedServer = int(get("id"))
+    else:
+        change = RankedServer(
+            server_id=get("id"),
+            owner_id=get("owner_id"),
+            name=get("name"),
+            host=get("host"),
+            port=get("port"),
+            country=get("country"),
+            is_active=bool(get("is_active", True)),
+        )
+    db.info.setdefault(_PENDING_KEY, []).append(change)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session: Session) -> None:
+    if session.in_nested_transaction():
+        return
+    for change in session.info.pop(_PENDING_KEY, ()):
+        if isinstance(change, int):
+            ranking_index.remove(change)
+        else:
+            ranking_index.upsert_keep_probe(change)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session: Session) -> None:
+    if session.in_nested_transaction():
+        return
+    session.info.pop(_PENDING_KEY, None)
@@ -1,14 +1,26 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
 
 from fastapi import HTTPException, status
-from sqlalchemy import func
+from sqlalchemy import Integer, Select, func, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.db.models.server import Server
-from app.services.limits import enforce_max_servers
+from app.db.projection import fetch_projected
+from app.db.uow import commit_or_flush, savepoint
+from app.services.audit_service import audit_on_commit, changes_of
+from app.services.cursor import decode_cursor, encode_cursor, is_bigint
+from app.services.event_bus import EVENT_SERVERS_CHANGED, publish_event
+from app.services.limits import enforce_max_servers, get_active_plan_for_user
+from app.services.server_ranking import RankedServer, ranking_index, schedule_server_sync
+from app.services.summary_cache import invalidate_summary_on_commit
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +30,60 @@ try:
 except Exception:  # pragma: no cover
     UniqueViolation = None  # type: ignore
 
+# строк на один INSERT: держимся далеко от лимита 65535 bind-параметров
+SERVER_BULK_CHUNK_SIZE = 1000
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# ---------- search helpers ----------
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+@dataclass(frozen=True, slots=True)
+class ServerRow:
+    """
+    Проекция для ServerOut (поля в порядке схемы): без audit-колонок и deleted_at.
+    """
+
+    name: str
+    host: str
+    port: int
+    country: str | None
+    is_active: bool
+    notes: str | None
+    wg_public_key: str | None
+    wg_subnet: str | None
+    id: int
+    owner_id: int
+
+
+@dataclass(frozen=True, slots=True)
+class AdminServerRow:
+    """
+    Проекция для AdminServerOut: без WireGuard-полей.
+    """
+
+    id: int
+    name: str
+    host: str
+    port: int
+    country: str | None
+    is_active: bool
+    notes: str | None
+    owner_id: int
+    deleted_at: datetime | None
+    created_at: datetime | None
+    updated_at: datetime | None
+    created_by: int | None
+    updated_by: int | None
+    deleted_by: int | None
+    restored_by: int | None
+
 
 class ServerService:
     def __init__(self, db: Session):
@@ -44,6 +110,68 @@ class ServerService:
             detail="Integrity constraint failed",
         )
 
+    def _save(self, server: Server) -> None:
+        """
+        flush (нужен id) -> отметить для ranking-индекса -> commit/flush.
+        В индекс изменение попадёт только после успешного commit.
+        """
+        self.db.flush()
+        schedule_server_sync(self.db, server)
+        commit_or_flush(self.db)
+
+    @contextmanager
+    def _saving(self, server: Server, *, unique_msg: str) -> Iterator[None]:
+        """
+        _save для изменений, которые могут упасть по unique (host+port).
+        Изменения блока и flush — в SAVEPOINT: IntegrityError откатывает только
+        их (вместе с отложенными событиями/аудитом) и превращается в 409/400,
+        транзакция запроса остаётся целой.
+        """
+        try:
+            with savepoint(self.db):
+                yield
+                self.db.flush()
+        except IntegrityError as e:
+            self._handle_integrity_error(e, unique_msg=unique_msg)
+        self._save(server)
+
+    def _audit(self, server: Server, action: str, actor_id: int) -> None:
+        """
+        До _save: дифф берётся из несброшенных изменений.
+        """
+        audit_on_commit(
+            self.db,
+            "server",
+            action,
+            actor_id=actor_id,
+            changes=changes_of(server),
+            entity=server,
+        )
+
+    def _owner_servers_changed(self, owner_id: int) -> None:
+        """
+        Число живых серверов владельца изменилось (servers_used в billing summary).
+        """
+        publish_event(self.db, EVENT_SERVERS_CHANGED, user_id=owner_id)
+        invalidate_summary_on_commit(self.db, owner_id)
+
+    def _live_endpoints(
+        self, owner_id: int, endpoints: set[tuple[str, int]]
+    ) -> set[tuple[str, int]]:
+        """
+        Какие из (host, port) уже заняты живыми серверами владельца.
+        """
+        if not endpoints:
+            return set()
+        rows = self.db.execute(
+            select(Server.host, Server.port).where(
+                Server.owner_id == owner_id,
+                Server.deleted_at.is_(None),
+                tuple_(Server.host, Server.port).in_(endpoints),
+            )
+        )
+        return {(host, port) for host, port in rows}
+
     def _enforce_create_limits(self, owner_id: int) -> None:
         """
         Enforcement лимитов для создания сервера (Variant C).
@@ -52,15 +180,122 @@ class ServerService:
         enforce_max_servers(self.db, owner_id)
 
     # ---------- USER ----------
-    def list_owned_live(self, owner_id: int) -> list[Server]:
+    @staticmethod
+    def owned_live_query(owner_id: int) -> Select:
         """
         Пользователь видит только свои активные (не удалённые) серверы.
         """
         return (
-            self.db.query(Server)
-            .filter(Server.owner_id == owner_id, Server.deleted_at.is_(None))
+            select(Server)
+            .where(Server.owner_id == owner_id, Server.deleted_at.is_(None))
             .order_by(Server.id.desc())
-            .all()
+        )
+
+    def list_owned_live(self, owner_id: int) -> list[ServerRow]:
+        return fetch_projected(self.db, ServerRow, Server, self.owned_live_query(owner_id))
+
+    def search(
+        self,
+        *,
+        q: str | None = None,
+        mode: str = "prefix",
+        country: str | None = None,
+        is_active: bool | None = None,
+        owner_id: int | None = None,
+        include_deleted: bool = False,
+        limit: int = 50,
+        cursor: str | None = None,
+    ) -> dict:
+        """
+        Поиск по каталогу серверов (name, host, country, notes).
+
+        - mode=prefix: name/host ILIKE 'q%', notes ILIKE '%q%'
+        - mode=fuzzy: pg_trgm similarity (оператор %), сортировка по релевантности
+        - country: точное совпадение ISO2; q из двух букв тоже матчит country
+        - keyset-пагинация: cursor из ответа, без OFFSET
+        Все предикаты покрыты GIN trgm / ix_servers_country_active / ix_servers_owner_live_id.
+        """
+        stmt = select(Server)
+        if owner_id is not None:
+            stmt = stmt.where(Server.owner_id == owner_id)
+        if not include_deleted:
+            stmt = stmt.where(Server.deleted_at.is_(None))
+        if country:
+            stmt = stmt.where(Server.country == country.upper())
+        if is_active is not None:
+            stmt = stmt.where(Server.is_active.is_(is_active))
+
+        term = (q or "").strip()
+        rank = None
+        if term:
+            if mode == "fuzzy":
+                # similarity в [0, 1] -> целое 0..1000: стабильное сравнение в cursor
+                rank = func.round(
+                    func.greatest(
+                        func.similarity(Server.name, term),
+                        func.similarity(Server.host, term),
+                        func.similarity(func.coalesce(Server.notes, ""), term),
+                    )
+                    * 1000
+                ).cast(Integer)
+                conditions = [
+                    Server.name.op("%")(term),
+                    Server.host.op("%")(term),
+                    Server.notes.op("%")(term),
+                ]
+            else:
+                pattern = _escape_like(term)
+                conditions = [
+                    Server.name.ilike(f"{pattern}%", escape="\\"),
+                    Server.host.ilike(f"{pattern}%", escape="\\"),
+                    Server.notes.ilike(f"%{pattern}%", escape="\\"),
+                ]
+            if len(term) == 2 and term.isalpha():
+                conditions.append(Server.country == term.upper())
+            stmt = stmt.where(or_(*conditions))
+
+        after = decode_cursor(cursor) if cursor else None
+
+        if rank is not None:
+            stmt = stmt.add_columns(rank.label("rank"))
+            if after is not None:
+                # cursor — ввод клиента; у cursor'а prefix-поиска rank нет
+                after_rank = after.get("r")
+                if not is_bigint(after_rank):
+                    raise HTTPException(status_code=400, detail="Invalid cursor")
+                stmt = stmt.where(tuple_(rank, Server.id) < tuple_(after_rank, after["id"]))
+            stmt = stmt.order_by(rank.desc(), Server.id.desc())
+        else:
+            if after is not None:
+                stmt = stmt.where(Server.id < after["id"])
+            stmt = stmt.order_by(Server.id.desc())
+
+        # +1 строка: понять, есть ли следующая страница, без COUNT(*)
+        rows = self.db.execute(stmt.limit(limit + 1)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        next_cursor = None
+        if has_more and rows:
+            last = rows[-1]
+            data = {"id": last[0].id}
+            if rank is not None:
+                data["r"] = int(last.rank or 0)
+            next_cursor = encode_cursor(data)
+
+        return {"items": [row[0] for row in rows], "next_cursor": next_cursor}
+
+    def best_for_user(
+        self, user_id: int, *, country: str | None = None, limit: int = 1
+    ) -> list[RankedServer]:
+        """
+        Лучшие серверы пользователя из in-memory ranking-индекса (без запроса к servers).
+        Учитываются только серверы в пределах max_servers текущего плана.
+        """
+        plan = get_active_plan_for_user(self.db, user_id)
+        ranking_index.refresh(self.db)
+        return ranking_index.best(
+            user_id, max_servers=plan.max_servers, country=country, limit=limit
         )
 
     def get_owned_live_or_404(self, server_id: int, owner_id: int) -> Server:
@@ -93,55 +328,146 @@ class ServerService:
             created_by=actor_id,
             updated_by=actor_id,
         )
-        self.db.add(server)
+        with self._saving(server, unique_msg="Server endpoint already exists (host+port)"):
+            self.db.add(server)
+            self._owner_servers_changed(owner_id)
+            self._audit(server, "create", actor_id)
+
+        return server
+
+    def create_owned_bulk(self, payloads: list[dict], owner_id: int, actor_id: int) -> dict:
+        """
+        Bulk-импорт серверов пользователя.
+
+        - лимит плана проверяется один раз на весь батч
+        - вставка: multi-row INSERT ... ON CONFLICT DO NOTHING
+          по ux_servers_owner_host_port_active, одним commit'ом
+        - на каждый элемент возвращаем created / conflict
+        """
+        if not payloads:
+            return {"created": 0, "conflicts": 0, "items": []}
+
+        # повторы host+port внутри батча сразу считаем конфликтом
+        seen: set[tuple[str, int]] = set()
+        unique: list[dict] = []
+        for payload in payloads:
+            key = (payload["host"], payload["port"])
+            if key not in seen:
+                seen.add(key)
+                unique.append(payload)
 
+        # 🔒 enforce plan limits (один раз на весь батч): уже живые у владельца
+        # host+port уйдут в conflict и слота не займут
+        existing = self._live_endpoints(owner_id, seen)
+        adding = len(seen - existing)
+        if adding:
+            enforce_max_servers(self.db, owner_id, adding=adding)
+
+        # RETURNING сразу отдаёт колонки для ответа: без refresh и без
+        # повторной загрузки expired-объектов после commit
+        created: dict[tuple[str, int], dict] = {}
         try:
-            self.db.commit()
+            with savepoint(self.db):
+                for start in range(0, len(unique), SERVER_BULK_CHUNK_SIZE):
+                    rows = [
+                        {
+                            **payload,
+                            "owner_id": owner_id,
+                            "created_by": actor_id,
+                            "updated_by": actor_id,
+                        }
+                        for payload in unique[start : start + SERVER_BULK_CHUNK_SIZE]
+                    ]
+                    stmt = (
+                        pg_insert(Server)
+                        .values(rows)
+                        .on_conflict_do_nothing(
+                            index_elements=[Server.owner_id, Server.host, Server.port],
+                            index_where=Server.deleted_at.is_(None),
+                        )
+                        .returning(
+                            Server.id,
+                            Server.name,
+                            Server.host,
+                            Server.port,
+                            Server.country,
+                            Server.is_active,
+                            Server.notes,
+                            Server.wg_public_key,
+                            Server.wg_subnet,
+                            Server.owner_id,
+                        )
+                    )
+                    for row in self.db.execute(stmt).mappings():
+                        item = dict(row)
+                        created[(item["host"], item["port"])] = item
+                        schedule_server_sync(self.db, item)
+                        audit_on_commit(
+                            self.db,
+                            "server",
+                            "create",
+                            actor_id=actor_id,
+                            changes={k: [None, v] for k, v in item.items() if k != "id"},
+                            entity_id=item["id"],
+                        )
+                    self._owner_servers_changed(owner_id)
         except IntegrityError as e:
-            self.db.rollback()
             self._handle_integrity_error(
                 e,
                 unique_msg="Server endpoint already exists (host+port)",
             )
+        commit_or_flush(self.db)
 
-        self.db.refresh(server)
-        return server
+        items: list[dict] = []
+        claimed: set[tuple[str, int]] = set()
+        for idx, payload in enumerate(payloads):
+            key = (payload["host"], payload["port"])
+            server = created.get(key)
+            if server is not None and key not in claimed:
+                claimed.add(key)
+                items.append({"index": idx, "status": "created", "server": server})
+            else:
+                items.append({"index": idx, "status": "conflict", "server": None})
+
+        return {
+            "created": len(created),
+            "conflicts": len(payloads) - len(created),
+            "items": items,
+        }
 
     def update_owned(self, server: Server, data: dict, actor_id: int) -> Server:
         """
         Обновить сервер пользователя.
         """
-        for k, v in data.items():
-            setattr(server, k, v)
-        server.updated_by = actor_id
+        with self._saving(server, unique_msg="Server endpoint already exists (host+port)"):
+            for k, v in data.items():
+                setattr(server, k, v)
+            server.updated_by = actor_id
+            self._audit(server, "update", actor_id)
 
-        try:
-            self.db.commit()
-        except IntegrityError as e:
-            self.db.rollback()
-            self._handle_integrity_error(
-                e,
-                unique_msg="Server endpoint already exists (host+port)",
-            )
-
-        self.db.refresh(server)
         return server
 
     def soft_delete_owned(self, server: Server, actor_id: int) -> None:
         """
         Soft delete сервера пользователя.
         """
-        server.deleted_at = func.now()
+        server.deleted_at = utcnow()  # значение известно сразу, без refresh
         server.deleted_by = actor_id
         server.updated_by = actor_id
-        self.db.commit()
+        self._owner_servers_changed(server.owner_id)
+        self._audit(server, "delete", actor_id)
+        self._save(server)
 
     # ---------- ADMIN ----------
-    def list_all_admin(self) -> list[Server]:
+    @staticmethod
+    def all_admin_query() -> Select:
         """
         Админ видит все серверы, включая удалённые.
         """
-        return self.db.query(Server).order_by(Server.id.desc()).all()
+        return select(Server).order_by(Server.id.desc())
+
+    def list_all_admin(self) -> list[AdminServerRow]:
+        return fetch_projected(self.db, AdminServerRow, Server, self.all_admin_query())
 
     def get_any_or_404(self, server_id: int) -> Server:
         """
@@ -160,12 +486,13 @@ class ServerService:
         if server.deleted_at is not None:
             return server
 
-        server.deleted_at = func.now()
+        server.deleted_at = utcnow()  # значение известно сразу, без refresh
         server.deleted_by = actor_id
         server.updated_by = actor_id
+        self._owner_servers_changed(server.owner_id)
+        self._audit(server, "delete", actor_id)
 
-        self.db.commit()
-        self.db.refresh(server)
+        self._save(server)
         return server
 
     def admin_restore(self, server_id: int, actor_id: int) -> Server:
@@ -177,18 +504,14 @@ class ServerService:
         if server.deleted_at is None:
             return server
 
-        server.deleted_at = None
-        server.restored_by = actor_id
-        server.updated_by = actor_id
-
-        try:
-            self.db.commit()
-        except IntegrityError as e:
-            self.db.rollback()
-            self._handle_integrity_error(
-                e,
-                unique_msg="Cannot restore: active server with same host+port already exists",
-            )
+        with self._saving(
+            server,
+            unique_msg="Cannot restore: active server with same host+port already exists",
+        ):
+            server.deleted_at = None
+            server.restored_by = actor_id
+            server.updated_by = actor_id
+            self._owner_servers_changed(server.owner_id)
+            self._audit(server, "restore", actor_id)
 
-        self.db.refresh(server)
         return server
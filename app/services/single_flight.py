@@ -0,0 +1,136 @@
+"""
+Single-flight: одинаковые одновременные чтения делят одно вычисление.
+
+Ключ — (роут, принципал, параметры), см. flight_key(). Первый запрос с ключом
+(leader) считает результат, остальные, пришедшие пока он в полёте, ждут его и
+получают тот же объект (или то же исключение). После завершения ключ сразу
+удаляется: это не кэш, результат не переживает вычисление.
+
+Результат отдаётся нескольким запросам сразу, поэтому fn должна возвращать
+данные, которые никто не мутирует и которые не привязаны к сессии БД лидера:
+схемы / dict'ы, а не ORM-объекты.
+
+Границы памяти:
+- не больше SINGLE_FLIGHT_MAX_KEYS ключей в полёте
+- не больше SINGLE_FLIGHT_MAX_WAITERS ожидающих на ключ
+сверх них запрос просто считает сам (bypassed). Ожидание ограничено
+SINGLE_FLIGHT_WAIT_TIMEOUT_SEC: зависший лидер не держит остальных.
+
+Роуты синхронные (threadpool), поэтому примитивы — threading.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections.abc import Callable, Hashable
+from typing import Any, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.waiters = 0
+
+
+def flight_key(route: str, principal: int | None = None, **params: Hashable) -> tuple:
+    return route, principal, tuple(sorted(params.items()))
+
+
+class SingleFlight:
+    def __init__(
+        self,
+        *,
+        enabled: bool = True,
+        max_keys: int,
+        max_waiters: int,
+        wait_timeout_sec: float,
+    ) -> None:
+        self.enabled = enabled
+        self.max_keys = max_keys
+        self.max_waiters = max_waiters
+        self.wait_timeout_sec = wait_timeout_sec
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self.leaders = 0
+        self.shared = 0
+        self.bypassed = 0
+        self.timeouts = 0
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        if not self.enabled:
+            return fn()
+
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                if len(self._calls) >= self.max_keys:
+                    self.bypassed += 1
+                    leader = None
+                else:
+                    leader = self._calls[key] = _Call()
+                    self.leaders += 1
+            elif call.waiters >= self.max_waiters:
+                self.bypassed += 1
+                leader = call = None
+            else:
+                call.waiters += 1
+                leader = None
+
+        if leader is not None:
+            return self._lead(key, leader, fn)
+        if call is None:
+            return fn()
+        return self._wait(call, fn)
+
+    def _lead(self, key: Hashable, call: _Call, fn: Callable[[], T]) -> T:
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                # новые запросы с этим ключом начнут своё вычисление
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _wait(self, call: _Call, fn: Callable[[], T]) -> T:
+        if not call.done.wait(self.wait_timeout_sec):
+            with self._lock:
+                self.timeouts += 1
+            return fn()
+        with self._lock:
+            self.shared += 1
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self.leaders + self.shared + self.bypassed + self.timeouts
+            return {
+                "in_flight": len(self._calls),
+                "leaders": self.leaders,
+                "shared": self.shared,
+                "bypassed": self.bypassed,
+                "timeouts": self.timeouts,
+                # доля запросов, получивших чужой результат вместо своего вычисления
+                "coalescing_ratio": round(self.shared / requests, 4) if requests else 0.0,
+            }
+
+
+single_flight = SingleFlight(
+    enabled=settings.single_flight_enabled,
+    max_keys=settings.single_flight_max_keys,
+    max_waiters=settings.single_flight_max_waiters,
+    wait_timeout_sec=settings.single_flight_wait_timeout_sec,
+)
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from sqlalchemy import case, func, literal, select
+from sqlalchemy.orm import Session
+
+from app.db.models.plan import Plan
+from app.db.models.subscription import Subscription
+from app.db.models.subscription_event import SubscriptionEvent
+
+SUBSCRIPTION_TIMELINE_MAX_LIMIT = 500
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def effective_status(status: str, expires_at: datetime | None, at: datetime) -> str:
+    """
+    Истечение не пишет событий: active с expires_at <= at на момент at — expired
+    (как в billing summary).
+    """
+    if status == "active" and expires_at is not None and expires_at <= at:
+        return "expired"
+    return status
+
+
+class SubscriptionHistoryService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ---------- write ----------
+    def record(self, sub: Subscription, kind: str, *, source: str) -> None:
+        """
+        Состояние подписки после мутации (без commit — в транзакции мутации).
+        """
+        plan_id = sub.plan.id if sub.plan is not None else sub.plan_id
+        self.db.add(
+            SubscriptionEvent(
+                user_id=sub.user_id,
+                kind=kind,
+                source=source,
+                status=sub.status,
+                plan_id=plan_id,
+                expires_at=sub.expires_at,
+            )
+        )
+
+    # ---------- read ----------
+    def timeline(
+        self,
+        user_id: int,
+        *,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        limit: int = 100,
+    ) -> list[SubscriptionEvent]:
+        stmt = select(SubscriptionEvent).where(SubscriptionEvent.user_id == user_id)
+        if since is not None:
+            stmt = stmt.where(SubscriptionEvent.created_at >= since)
+        if until is not None:
+            stmt = stmt.where(SubscriptionEvent.created_at < until)
+        return list(
+            self.db.scalars(
+                stmt.order_by(
+                    SubscriptionEvent.created_at.asc(), SubscriptionEvent.id.asc()
+                ).limit(limit)
+            )
+        )
+
+    def state_as_of(self, user_id: int, at: datetime) -> SubscriptionEvent | None:
+        """
+        Последнее событие пользователя не позже at: один backward scan
+        по ix_subscription_events_user_created, LIMIT 1.
+        """
+        return self.db.scalars(
+            select(SubscriptionEvent)
+            .where(SubscriptionEvent.user_id == user_id, SubscriptionEvent.created_at <= at)
+            .order_by(SubscriptionEvent.created_at.desc(), SubscriptionEvent.id.desc())
+            .limit(1)
+        ).one_or_none()
+
+    def counts_as_of(self, at: datetime) -> list[dict]:
+        """
+        Подписки на момент at по (план, статус) — для отчётов по выручке.
+        DISTINCT ON (user_id) по тому же индексу: последняя строка каждого пользователя.
+        """
+        e = SubscriptionEvent
+        latest = (
+            select(e.user_id, e.status, e.plan_id, e.expires_at)
+            .where(e.created_at <= at)
+            .distinct(e.user_id)
+            .order_by(e.user_id, e.created_at.desc(), e.id.desc())
+            .subquery()
+        )
+
+        # истечение не пишет событий: active с expires_at <= at считаем expired
+        status = case(
+            (
+                (latest.c.status == "active")
+                & latest.c.expires_at.is_not(None)
+                & (latest.c.expires_at <= at),
+                literal("expired"),
+            ),
+            else_=latest.c.status,
+        ).label("status")
+
+        rows = self.db.execute(
+            select(Plan.code, status, func.count())
+            .select_from(latest)
+            .outerjoin(Plan, Plan.id == latest.c.plan_id)
+            .group_by(Plan.code, status)
+            .order_by(Plan.code, status)
+        )
+        return [{"plan_code": code, "status": st, "count": int(n)} for code, st, n in rows]
@@ -3,10 +3,17 @@ from __future__ import annotations
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 
-from sqlalchemy.orm import Session
+from sqlalchemy import Select, select, tuple_
+from sqlalchemy.orm import Session, selectinload
 
 from app.db.models.plan import Plan
 from app.db.models.subscription import Subscription
+from app.db.uow import commit_or_flush
+from app.services.event_bus import EVENT_SUBSCRIPTION_CHANGED, publish_event
+from app.services.subscription_history_service import SubscriptionHistoryService
+from app.services.summary_cache import invalidate_summary_on_commit
+
+SUBSCRIPTION_EXPIRY_MAX_LIMIT = 500
 
 
 @dataclass
@@ -41,6 +48,14 @@ class SubscriptionService:
     def __init__(self, db: Session):
         self.db = db
 
+    def _record_change(self, sub: Subscription, kind: str, *, source: str = "user") -> None:
+        """
+        В транзакции мутации: история, шина entitlements, кэш summary (после commit).
+        """
+        SubscriptionHistoryService(self.db).record(sub, kind, source=source)
+        publish_event(self.db, EVENT_SUBSCRIPTION_CHANGED, user_id=sub.user_id)
+        invalidate_summary_on_commit(self.db, sub.user_id)
+
     def ensure_user_has_subscription(self, user_id: int) -> Subscription:
         """
         Variant C: любой user должен иметь subscription (хотя бы FREE).
@@ -53,13 +68,13 @@ class SubscriptionService:
 
         sub = Subscription(
             user_id=user_id,
-            plan_id=free_plan.id,
+            plan=free_plan,
             status="active",
             expires_at=None,
         )
         self.db.add(sub)
-        self.db.commit()
-        self.db.refresh(sub)
+        self._record_change(sub, "created", source="system")
+        commit_or_flush(self.db)
         return sub
 
     def get_subscription(self, user_id: int) -> Subscription:
@@ -93,8 +108,8 @@ class SubscriptionService:
         """
         sub = self.get_subscription(user_id)
         sub.status = "canceled"
-        self.db.commit()
-        self.db.refresh(sub)
+        self._record_change(sub, "cancel")
+        commit_or_flush(self.db)
         return sub
 
     def resume_user_subscription(self, user_id: int) -> Subscription:
@@ -109,8 +124,8 @@ class SubscriptionService:
             raise SubscriptionExpiredError()
 
         sub.status = "active"
-        self.db.commit()
-        self.db.refresh(sub)
+        self._record_change(sub, "resume")
+        commit_or_flush(self.db)
         return sub
 
     def renew_user_subscription(self, user_id: int, *, plan_code: str, days: int = 30) -> Subscription:
@@ -136,10 +151,61 @@ class SubscriptionService:
         if sub.expires_at is not None and sub.expires_at > now:
             base = sub.expires_at  # продлеваем от текущего срока, если ещё не истекла
 
-        sub.plan_id = plan.id
+        sub.plan = plan
         sub.status = "active"
         sub.expires_at = base + timedelta(days=days)
 
-        self.db.commit()
-        self.db.refresh(sub)
+        self._record_change(sub, "renew")
+        commit_or_flush(self.db)
         return sub
+
+    # ---------- expiry (ix_subscriptions_active_expires_at) ----------
+    def expiring_between(
+        self,
+        start: datetime | None,
+        end: datetime,
+        *,
+        limit: int,
+        after: tuple[datetime, int] | None = None,
+    ) -> list[Subscription]:
+        """
+        Активные подписки с start < expires_at <= end (start=None -> без нижней границы),
+        по возрастанию (expires_at, user_id). Keyset-пагинация: after = пара последней строки.
+        Бессрочные (expires_at IS NULL) сюда не попадают.
+        """
+        q = (
+            select(Subscription)
+            .where(Subscription.status == "active", Subscription.expires_at <= end)
+            .options(selectinload(Subscription.plan))
+            .order_by(Subscription.expires_at.asc(), Subscription.user_id.asc())
+            .limit(limit)
+        )
+        if start is not None:
+            q = q.where(Subscription.expires_at > start)
+        if after is not None:
+            q = q.where(tuple_(Subscription.expires_at, Subscription.user_id) > tuple_(*after))
+        return list(self.db.scalars(q))
+
+    def overdue(
+        self,
+        *,
+        now: datetime | None = None,
+        limit: int,
+        after: tuple[datetime, int] | None = None,
+    ) -> list[Subscription]:
+        """
+        Истекли по expires_at, но всё ещё status=active (истечение само статус не меняет).
+        """
+        return self.expiring_between(
+            None, now or datetime.now(timezone.utc), limit=limit, after=after
+        )
+
+    @staticmethod
+    def overdue_user_ids(now: datetime) -> Select:
+        """
+        Подзапрос user_id просроченных active-подписок — для sweep'ов (IN (...)).
+        """
+        return select(Subscription.user_id).where(
+            Subscription.status == "active",
+            Subscription.expires_at <= now,
+        )
@@ -0,0 +1,198 @@
+"""
+Кэш GET /billing/summary по user_id.
+
+- заполняется на чтении (BillingService.cached_summary)
+- write-through: сервисы, меняющие подписку/устройства/серверы пользователя,
+  вызывают invalidate_summary_on_commit() -> запись удаляется после commit
+  (после rollback — нет); ответы мутирующих роутов сразу кладут свежий summary
+- другие процессы узнают об изменении через шину entitlements (app.services.event_bus)
+- TTL ограничивает устаревание того, что инвалидации не видят:
+  трафик (usage writer) и наступление expires_at (TTL не дальше expires_at)
+
+Бэкенд подменяемый (SummaryCacheBackend): по умолчанию LRU в памяти процесса,
+общий (Redis/memcached) подключается через summary_cache.set_backend().
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Protocol
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services.event_bus import (
+    EVENT_PLANS_CHANGED,
+    EVENT_RESYNC,
+    EntitlementEvent,
+    on_entitlement_event,
+)
+
+_PENDING_KEY = "summary_cache_pending"
+
+# счётчики инвалидаций по полосам user_id: load, начатый до инвалидации,
+# не кладёт в кэш устаревший summary (гонка чтения с параллельной записью)
+_STRIPES = 256
+
+
+class SummaryCacheBackend(Protocol):
+    def get(self, user_id: int) -> dict | None: ...
+
+    def set(self, user_id: int, value: dict, *, ttl_sec: float) -> None: ...
+
+    def delete(self, user_id: int) -> None: ...
+
+    def clear(self) -> None: ...
+
+    def __len__(self) -> int: ...
+
+
+class LocalLRUBackend:
+    """
+    OrderedDict как LRU: get/set/delete — O(1), при переполнении вытесняется
+    давно не читанная запись.
+    """
+
+    def __init__(self, *, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._data: OrderedDict[int, tuple[float, dict]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, user_id: int) -> dict | None:
+        with self._lock:
+            item = self._data.get(user_id)
+            if item is None:
+                return None
+            expires, value = item
+            if expires <= time.monotonic():
+                del self._data[user_id]
+                return None
+            self._data.move_to_end(user_id)
+            return value
+
+    def set(self, user_id: int, value: dict, *, ttl_sec: float) -> None:
+        with self._lock:
+            self._data[user_id] = (time.monotonic() + ttl_sec, value)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, user_id: int) -> None:
+        with self._lock:
+            self._data.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class SummaryCache:
+    def __init__(self, backend: SummaryCacheBackend) -> None:
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._generations = [0] * _STRIPES
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def set_backend(self, backend: SummaryCacheBackend) -> None:
+        self.backend = backend
+
+    # ---------- read path ----------
+    def get(self, user_id: int) -> tuple[dict | None, int]:
+        """
+        (summary | None, token). token передаётся в put() после загрузки.
+        """
+        token = self._generations[user_id % _STRIPES]
+        value = self.backend.get(user_id)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value, token
+
+    def put(self, user_id: int, value: dict, *, token: int | None = None) -> None:
+        if token is not None and token != self._generations[user_id % _STRIPES]:
+            # пока считали, пользователь изменился: не кэшируем
+            return
+
+        ttl = float(settings.summary_cache_ttl_sec)
+        expires_at = value.get("expires_at")
+        if isinstance(expires_at, datetime):
+            until_expiry = (expires_at - datetime.now(timezone.utc)).total_seconds()
+            if until_expiry > 0:
+                # status active -> expired сменится без записи в БД
+                ttl = min(ttl, until_expiry)
+        self.backend.set(user_id, value, ttl_sec=ttl)
+
+    # ---------- invalidation ----------
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._generations[user_id % _STRIPES] += 1
+            self.invalidations += 1
+        self.backend.delete(user_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generations = [g + 1 for g in self._generations]
+            self.invalidations += 1
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.backend),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "evictions": getattr(self.backend, "evictions", 0),
+            }
+
+
+summary_cache = SummaryCache(LocalLRUBackend(max_entries=settings.summary_cache_max_entries))
+
+
+def invalidate_summary_on_commit(db: Session, user_id: int | None) -> None:
+    """
+    user_id=None -> весь кэш (например, изменились лимиты плана).
+    """
+    db.info.setdefault(_PENDING_KEY, set()).add(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session: Session) -> None:
+    if session.in_nested_transaction():
+        return
+    pending = session.info.pop(_PENDING_KEY, ())
+    if None in pending:
+        summary_cache.clear()
+        return
+    for user_id in pending:
+        summary_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session: Session) -> None:
+    if session.in_nested_transaction():
+        return
+    session.info.pop(_PENDING_KEY, None)
+
+
+@on_entitlement_event
+def _invalidate_from_bus(event: EntitlementEvent) -> None:
+    if event.kind in (EVENT_RESYNC, EVENT_PLANS_CHANGED):
+        summary_cache.clear()
+    elif event.user_id is not None:
+        summary_cache.invalidate(event.user_id)
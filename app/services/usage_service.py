@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import threading
+from collections.abc import Iterable
+from datetime import date, datetime, timezone
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
+
+from app.db.models.server import Server
+from app.db.models.usage_counter import UsageCounter
+from app.db.models.user import User
+from app.db.uow import savepoint
+
+# строк на один upsert счётчиков
+USAGE_UPSERT_CHUNK_SIZE = 1000
+# счётчики — BIGINT: суммы упираются в потолок, а не роняют upsert
+BIGINT_MAX = 2**63 - 1
+
+# (user_id, period_start) -> [bytes_in, bytes_out]
+UsageDeltas = dict[tuple[int, date], list[int]]
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _capped_add(column, delta):
+    # least() до сложения: сумма не выходит за BIGINT даже на миг
+    return func.least(column, BIGINT_MAX - delta) + delta
+
+
+def period_start(at: datetime | None = None) -> date:
+    """
+    Расчётный период трафика — календарный месяц (UTC).
+    """
+    at = (at or utcnow()).astimezone(timezone.utc)
+    return date(at.year, at.month, 1)
+
+
+class UsageAggregator:
+    """
+    Суммирует отчёты нод в памяти до следующего flush (окно USAGE_FLUSH_INTERVAL_SEC):
+    сколько бы нод ни прислали трафик пользователя, в БД уйдёт одна строка upsert'а.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._deltas: UsageDeltas = {}
+
+    def __len__(self) -> int:
+        return len(self._deltas)
+
+    def add(self, user_id: int, bytes_in: int, bytes_out: int, *, period: date) -> None:
+        with self._lock:
+            acc = self._deltas.setdefault((user_id, period), [0, 0])
+            acc[0] = min(acc[0] + bytes_in, BIGINT_MAX)
+            acc[1] = min(acc[1] + bytes_out, BIGINT_MAX)
+
+    def drain(self) -> UsageDeltas:
+        with self._lock:
+            deltas, self._deltas = self._deltas, {}
+        return deltas
+
+    def merge(self, deltas: UsageDeltas) -> None:
+        """
+        Вернуть неудачно сброшенное окно: оно уйдёт со следующим flush.
+        """
+        with self._lock:
+            for key, (bytes_in, bytes_out) in deltas.items():
+                acc = self._deltas.setdefault(key, [0, 0])
+                acc[0] = min(acc[0] + bytes_in, BIGINT_MAX)
+                acc[1] = min(acc[1] + bytes_out, BIGINT_MAX)
+
+
+usage_aggregator = UsageAggregator()
+
+
+class UsageService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ---------- ingest (request path: без записи в БД) ----------
+    def submit(self, server_id: int, items: list[dict], *, now: datetime | None = None) -> dict:
+        """
+        Нода присылает дельты трафика по пользователям с прошлого отчёта.
+        Неизвестные user_id отклоняются (иначе upsert всего окна упадёт на FK).
+        """
+        server = self.db.get(Server, server_id)
+        if server is None or server.deleted_at is not None:
+            raise HTTPException(status_code=404, detail="Server not found")
+
+        user_ids = {item["user_id"] for item in items}
+        known = set(self.db.scalars(select(User.id).where(User.id.in_(user_ids))))
+
+        period = period_start(now)
+        accepted = 0
+        for item in items:
+            if item["user_id"] not in known:
+                continue
+            usage_aggregator.add(
+                item["user_id"], item["bytes_in"], item["bytes_out"], period=period
+            )
+            accepted += 1
+
+        return {"accepted": accepted, "rejected": len(items) - accepted}
+
+    # ---------- writer ----------
+    def upsert_deltas(self, deltas: UsageDeltas) -> int:
+        """
+        Batched upsert окна в usage_counters (без commit): bytes += дельта.
+        """
+        rows = [
+            {
+                "user_id": user_id,
+                "period_start": period,
+                "bytes_in": bytes_in,
+                "bytes_out": bytes_out,
+            }
+            for (user_id, period), (bytes_in, bytes_out) in sorted(deltas.items())
+        ]
+        # сортировка по PK: параллельные flush'и разных процессов берут
+        # row lock'и в одном порядке и не дедлочатся
+        for start in range(0, len(rows), USAGE_UPSERT_CHUNK_SIZE):
+            stmt = pg_insert(UsageCounter).values(rows[start : start + USAGE_UPSERT_CHUNK_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[UsageCounter.user_id, UsageCounter.period_start],
+                set_={
+                    "bytes_in": _capped_add(UsageCounter.bytes_in, stmt.excluded.bytes_in),
+                    "bytes_out": _capped_add(UsageCounter.bytes_out, stmt.excluded.bytes_out),
+                    "updated_at": func.now(),
+                },
+            )
+            self.db.execute(stmt)
+        return len(rows)
+
+    def upsert_each(self, deltas: UsageDeltas) -> tuple[int, UsageDeltas]:
+        """
+        Построчный upsert, каждая строка в SAVEPOINT — когда пачка отвергнута.
+        Строки, которые БД не примет и при повторе (пользователь удалён -> FK,
+        битое значение), отбрасываются, остальные пишутся.
+        Возвращает (записано, отброшенные).
+        """
+        written = 0
+        rejected: UsageDeltas = {}
+        for key, value in sorted(deltas.items()):
+            try:
+                with savepoint(self.db):
+                    self.upsert_deltas({key: value})
+            except (IntegrityError, DataError):
+                rejected[key] = value
+            else:
+                written += 1
+        return written, rejected
+
+    # ---------- read ----------
+    def used_bytes(self, user_id: int, *, at: datetime | None = None) -> int:
+        """
+        Трафик за текущий период: одно чтение по PK.
+        Не сброшенное ещё окно агрегатора (до USAGE_FLUSH_INTERVAL_SEC) не учитывается.
+        """
+        counter = self.db.get(UsageCounter, (user_id, period_start(at)))
+        if counter is None:
+            return 0
+        return int(counter.bytes_in) + int(counter.bytes_out)
+
+    def used_bytes_for_users(
+        self, user_ids: Iterable[int], *, at: datetime | None = None
+    ) -> dict[int, int]:
+        ids = list(user_ids)
+        if not ids:
+            return {}
+        rows = self.db.execute(
+            select(
+                UsageCounter.user_id,
+                UsageCounter.bytes_in + UsageCounter.bytes_out,
+            ).where(
+                UsageCounter.user_id.in_(ids),
+                UsageCounter.period_start == period_start(at),
+            )
+        )
+        return {user_id: int(total) for user_id, total in rows}
@@ -0,0 +1,430 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+import ipaddress
+from base64 import b64encode
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from cryptography.hazmat.primitives.asymmetric.x25519 import X25519PrivateKey
+from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models.device import Device
+from app.db.models.peer import Peer, ServerAddressPool
+from app.db.models.server import Server
+from app.db.models.user import User
+from app.db.uow import commit_or_flush
+from app.services.limits import enforce_traffic_quota
+from app.services.peer_feed_service import PEER_OP_REMOVE, PEER_OP_UPSERT, PeerFeedService
+from app.services.subscription_service import SubscriptionService
+
+# /16 -> 8 КБ битмапа; /30 -> 2 клиентских адреса
+WG_MIN_PREFIX = 16
+WG_MAX_PREFIX = 30
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# -------------------- domain errors --------------------
+
+@dataclass
+class AddressPoolExhaustedError(Exception):
+    server_id: int
+
+    def message(self) -> str:
+        return "No free addresses in server subnet"
+
+
+@dataclass
+class WireGuardNotConfiguredError(Exception):
+    server_id: int
+
+    def message(self) -> str:
+        return "Server WireGuard key is not configured"
+
+
+@dataclass
+class WireGuardKeySecretMissingError(Exception):
+    def message(self) -> str:
+        return "WireGuard client key secret is not configured"
+
+
+# -------------------- keys --------------------
+
+def _key_secret() -> bytes:
+    # только отдельный WG_KEY_SECRET: производный от JWT_SECRET ключ менял бы все
+    # клиентские ключи при ротации JWT, а утечка JWT_SECRET раскрывала бы их
+    if not settings.wg_key_secret:
+        raise WireGuardKeySecretMissingError()
+    return settings.wg_key_secret.encode()
+
+
+def derive_keypair(device_id: int, server_id: int, version: int) -> tuple[str, str]:
+    """
+    Клиентская пара ключей (private, public) в base64, как у `wg genkey | wg pubkey`.
+
+    Ключ детерминирован: HMAC(WG_KEY_SECRET, device:server:version). Приватные
+    ключи не хранятся в БД, а повторная выдача конфига даёт тот же ключ.
+    Без WG_KEY_SECRET — WireGuardKeySecretMissingError.
+    """
+    return _derive_keypair(_key_secret(), device_id, server_id, version)
+
+
+@lru_cache(maxsize=4096)
+def _derive_keypair(
+    secret: bytes, device_id: int, server_id: int, version: int
+) -> tuple[str, str]:
+    # скалярное умножение X25519 кэшируется: повторные скачивания конфига его не делают
+    message = f"{device_id}:{server_id}:{version}".encode()
+    seed = bytearray(hmac.new(secret, message, hashlib.sha256).digest())
+    # clamping по RFC 7748 — так же, как wg genkey
+    seed[0] &= 248
+    seed[31] &= 127
+    seed[31] |= 64
+
+    public = X25519PrivateKey.from_private_bytes(bytes(seed)).public_key()
+    public_raw = public.public_bytes(Encoding.Raw, PublicFormat.Raw)
+    return b64encode(bytes(seed)).decode(), b64encode(public_raw).decode()
+
+
+# -------------------- address bitmap --------------------
+
+def parse_subnet(subnet: str) -> ipaddress.IPv4Network:
+    try:
+        network = ipaddress.IPv4Network(subnet, strict=False)
+    except ValueError:
+        raise HTTPException(status_code=409, detail="Invalid server WireGuard subnet")
+    if not WG_MIN_PREFIX <= network.prefixlen <= WG_MAX_PREFIX:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Server WireGuard subnet must be between /{WG_MIN_PREFIX} and /{WG_MAX_PREFIX}",
+        )
+    return network
+
+
+class AddressBitmap:
+    """
+    Битовая карта адресов подсети поверх int: бит i = хост i занят.
+
+    - allocate: младший нулевой бит = (~x & (x + 1)), без обхода по адресам
+    - release: сброс бита
+    Оба действия — фиксированное число операций над int, таблицу peers не читают.
+    """
+
+    __slots__ = ("bits", "size")
+
+    def __init__(self, data: bytes, size: int) -> None:
+        self.bits = int.from_bytes(data, "little")
+        self.size = size
+
+    @classmethod
+    def for_network(cls, network: ipaddress.IPv4Network) -> "AddressBitmap":
+        size = network.num_addresses
+        bitmap = cls(b"", size)
+        # адрес сети, .1 (интерфейс ноды) и broadcast не выдаём
+        for reserved in (0, 1, size - 1):
+            bitmap.bits |= 1 << reserved
+        return bitmap
+
+    def allocate(self) -> int | None:
+        lowest_free = ~self.bits & (self.bits + 1)
+        index = lowest_free.bit_length() - 1
+        if index >= self.size:
+            return None
+        self.bits |= lowest_free
+        return index
+
+    def release(self, index: int) -> bool:
+        mask = 1 << index
+        if not self.bits & mask:
+            return False
+        self.bits &= ~mask
+        return True
+
+    def to_bytes(self) -> bytes:
+        return self.bits.to_bytes((self.size + 7) // 8, "little")
+
+
+# -------------------- service --------------------
+
+class WireGuardService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _lock_pool(self, server: Server) -> ServerAddressPool:
+        """
+        Пул адресов сервера под row lock (создаётся при первой выдаче).
+        Выдачи на один сервер сериализуются, на разные — не мешают друг другу.
+        """
+        network = parse_subnet(server.wg_subnet or settings.wg_default_subnet)
+        self.db.execute(
+            pg_insert(ServerAddressPool)
+            .values(
+                server_id=server.id,
+                subnet=str(network),
+                bitmap=AddressBitmap.for_network(network).to_bytes(),
+                allocated=0,
+            )
+            .on_conflict_do_nothing(index_elements=[ServerAddressPool.server_id])
+        )
+        return self.db.scalars(
+            select(ServerAddressPool)
+            .where(ServerAddressPool.server_id == server.id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        ).one()
+
+    def _get_owned_device_or_404(self, device_id: int, user_id: int) -> Device:
+        device = (
+            self.db.query(Device)
+            .filter(
+                Device.id == device_id,
+                Device.user_id == user_id,
+                Device.revoked_at.is_(None),
+            )
+            .one_or_none()
+        )
+        if device is None:
+            raise HTTPException(status_code=404, detail="Device not found")
+        return device
+
+    def _get_owned_server_or_404(self, server_id: int, user_id: int) -> Server:
+        server = (
+            self.db.query(Server)
+            .filter(
+                Server.id == server_id,
+                Server.owner_id == user_id,
+                Server.deleted_at.is_(None),
+            )
+            .one_or_none()
+        )
+        if server is None:
+            raise HTTPException(status_code=404, detail="Server not found")
+        return server
+
+    def issue_config(
+        self,
+        *,
+        user: User,
+        device_id: int,
+        server_id: int,
+        public_key: str | None = None,
+        rotate: bool = False,
+    ) -> dict:
+        """
+        Конфиг WireGuard для устройства на сервере (идемпотентно: один активный пир
+        на пару device+server, повторный вызов отдаёт тот же адрес и ключ).
+
+        - public_key от клиента -> используем его, PrivateKey в конфиг не попадает
+        - иначе ключ выдаём мы (derive_keypair); rotate=true -> новое поколение ключа
+        """
+        device = self._get_owned_device_or_404(device_id, user.id)
+        server = self._get_owned_server_or_404(server_id, user.id)
+        if not server.wg_public_key:
+            raise WireGuardNotConfiguredError(server_id=server.id)
+
+        # активная подписка + квота трафика
+        enforce_traffic_quota(self.db, user)
+
+        peer = (
+            self.db.query(Peer)
+            .filter(
+                Peer.device_id == device.id,
+                Peer.server_id == server.id,
+                Peer.revoked_at.is_(None),
+            )
+            .one_or_none()
+        )
+
+        if peer is None:
+            pool = self._lock_pool(server)
+            bitmap = AddressBitmap(pool.bitmap, parse_subnet(pool.subnet).num_addresses)
+            index = bitmap.allocate()
+            if index is None:
+                raise AddressPoolExhaustedError(server_id=server.id)
+            pool.bitmap = bitmap.to_bytes()
+            pool.allocated += 1
+
+            peer = Peer(
+                user_id=user.id,
+                device_id=device.id,
+                server_id=server.id,
+                public_key=public_key or derive_keypair(device.id, server.id, 1)[1],
+                client_key=public_key is not None,
+                key_version=1,
+                address_index=index,
+            )
+            self.db.add(peer)
+            self.db.flush()  # peer.id для ленты
+            self._record(peer, PEER_OP_UPSERT, pool)
+        elif public_key is not None and public_key != peer.public_key:
+            pool = self._lock_pool(server)
+            peer.public_key = public_key
+            peer.client_key = True
+            self._record(peer, PEER_OP_UPSERT, pool)
+        elif rotate:
+            pool = self._lock_pool(server)
+            peer.key_version += 1
+            peer.client_key = False
+            peer.public_key = derive_keypair(device.id, server.id, peer.key_version)[1]
+            self._record(peer, PEER_OP_UPSERT, pool)
+
+        commit_or_flush(self.db)
+        return self.render(peer, server)
+
+    def _record(self, peer: Peer, op: str, pool: ServerAddressPool | None) -> None:
+        """
+        Запись в ленту пиров. Вызывать под row lock пула (_lock_pool / _release):
+        изменения одного сервера получают version в порядке commit.
+        """
+        address = None
+        if pool is not None:
+            address = str(parse_subnet(pool.subnet)[peer.address_index])
+        PeerFeedService(self.db).record(peer, op, address=address)
+
+    def render(self, peer: Peer, server: Server) -> dict:
+        pool = self.db.get(ServerAddressPool, server.id)
+        address = parse_subnet(pool.subnet)[peer.address_index]
+
+        private_key = None
+        if not peer.client_key:
+            private_key = derive_keypair(peer.device_id, peer.server_id, peer.key_version)[0]
+
+        lines = ["[Interface]"]
+        if private_key is not None:
+            lines.append(f"PrivateKey = {private_key}")
+        lines += [
+            f"Address = {address}/32",
+            f"DNS = {settings.wg_dns}",
+            "",
+            "[Peer]",
+            f"PublicKey = {server.wg_public_key}",
+            f"AllowedIPs = {settings.wg_allowed_ips}",
+            f"Endpoint = {server.host}:{server.port}",
+            f"PersistentKeepalive = {settings.wg_persistent_keepalive}",
+        ]
+
+        return {
+            "peer_id": peer.id,
+            "device_id": peer.device_id,
+            "server_id": peer.server_id,
+            "address": str(address),
+            "public_key": peer.public_key,
+            "private_key": private_key,
+            "config": "\n".join(lines) + "\n",
+        }
+
+    # ---------- release (revoke устройства / отмена подписки) ----------
+    def _release(self, peers: list[Peer]) -> int:
+        """
+        Отзывает пиров и возвращает их адреса в пулы (без commit).
+        Пулы лочим в порядке server_id — параллельные revoke не дедлочатся.
+        """
+        by_server: dict[int, list[Peer]] = defaultdict(list)
+        for peer in peers:
+            by_server[peer.server_id].append(peer)
+
+        now = utcnow()
+        for server_id in sorted(by_server):
+            pool = self.db.scalars(
+                select(ServerAddressPool)
+                .where(ServerAddressPool.server_id == server_id)
+                .with_for_update()
+                .execution_options(populate_existing=True)
+            ).one_or_none()
+
+            bitmap = None
+            if pool is not None:
+                bitmap = AddressBitmap(pool.bitmap, parse_subnet(pool.subnet).num_addresses)
+
+            for peer in by_server[server_id]:
+                peer.revoked_at = now
+                self._record(peer, PEER_OP_REMOVE, pool)
+                if bitmap is not None and bitmap.release(peer.address_index):
+                    pool.allocated -= 1
+
+            if pool is not None:
+                pool.bitmap = bitmap.to_bytes()
+
+        return len(peers)
+
+    # ---------- ротация WG_KEY_SECRET ----------
+    def reissue_derived_keys(self) -> int:
+        """
+        Новое поколение ключа для всех активных пиров с выданным нами ключом
+        (без commit). Запускать после смены WG_KEY_SECRET: public_key в БД и
+        в ленте нод пересчитывается из нового секрета, клиенты перекачивают конфиг.
+        Пиры со своим ключом клиента не затрагиваются.
+        """
+        peers = list(
+            self.db.scalars(
+                select(Peer)
+                .where(Peer.revoked_at.is_(None), Peer.client_key.is_(False))
+                .order_by(Peer.server_id.asc(), Peer.id.asc())
+            )
+        )
+        by_server: dict[int, list[Peer]] = defaultdict(list)
+        for peer in peers:
+            by_server[peer.server_id].append(peer)
+
+        for server_id in sorted(by_server):
+            # row lock пула: version ленты в порядке commit, как у выдачи
+            pool = self.db.scalars(
+                select(ServerAddressPool)
+                .where(ServerAddressPool.server_id == server_id)
+                .with_for_update()
+                .execution_options(populate_existing=True)
+            ).one_or_none()
+            for peer in by_server[server_id]:
+                peer.key_version += 1
+                peer.public_key = derive_keypair(peer.device_id, server_id, peer.key_version)[1]
+                self._record(peer, PEER_OP_UPSERT, pool)
+
+        return len(peers)
+
+    def release_for_devices(self, device_ids: list[int]) -> int:
+        peers = list(
+            self.db.scalars(
+                select(Peer).where(Peer.device_id.in_(device_ids), Peer.revoked_at.is_(None))
+            )
+        )
+        return self._release(peers)
+
+    def release_for_user(self, user_id: int) -> int:
+        peers = list(
+            self.db.scalars(
+                select(Peer).where(Peer.user_id == user_id, Peer.revoked_at.is_(None))
+            )
+        )
+        return self._release(peers)
+
+    def release_expired(self, *, now: datetime | None = None, limit: int = 500) -> int:
+        """
+        Пиры пользователей, чья подписка истекла по expires_at (истечение само по себе
+        ничего не пишет — его находит периодический sweep). Просроченные находим
+        range scan'ом по ix_subscriptions_active_expires_at; отмена (status != active)
+        отзывает пиров сразу, в той же транзакции.
+        """
+        now = now or utcnow()
+        peers = list(
+            self.db.scalars(
+                select(Peer)
+                .where(
+                    Peer.revoked_at.is_(None),
+                    Peer.user_id.in_(SubscriptionService.overdue_user_ids(now)),
+                )
+                .order_by(Peer.id.asc())
+                .limit(limit)
+            )
+        )
+        return self._release(peers)
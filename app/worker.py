@@ -0,0 +1,101 @@
+"""
+Воркер фоновых задач (таблица jobs).
+
+Запуск отдельным процессом:
+    python -m app.worker
+
+Или потоком внутри API-процесса: JOBS_INPROCESS_WORKER=true (см. app.main).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+
+import app.services.job_handlers  # noqa: F401 (регистрация обработчиков)
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.job_service import JobService
+
+logger = logging.getLogger(__name__)
+
+# как часто проверять, что периодические задачи стоят в очереди
+PERIODIC_CHECK_SEC = 30.0
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"[:64]
+
+
+def run_worker(stop: threading.Event, *, worker_id: str | None = None) -> None:
+    """
+    Основной цикл: requeue зависших -> периодические задачи -> claim пачки -> выполнение.
+    Если очередь пуста — спим poll interval (прерывается через stop).
+    """
+    worker_id = worker_id or default_worker_id()
+    logger.info("Job worker %s started", worker_id)
+
+    last_requeue = 0.0
+    last_periodic = 0.0
+    while not stop.is_set():
+        processed = 0
+        db = SessionLocal()
+        try:
+            svc = JobService(db)
+
+            now = time.monotonic()
+            if now - last_requeue >= settings.jobs_stale_after_sec:
+                svc.requeue_stale(older_than_sec=settings.jobs_stale_after_sec)
+                last_requeue = now
+
+            if now - last_periodic >= PERIODIC_CHECK_SEC:
+                svc.ensure_periodic()
+                last_periodic = now
+
+            jobs = svc.claim(worker_id, limit=settings.jobs_batch_size)
+            processed = len(jobs)
+            svc.run_claimed(jobs)
+        except Exception:
+            logger.exception("Job worker %s iteration failed", worker_id)
+        finally:
+            db.close()
+
+        # полная пачка -> вероятно, есть ещё: сразу следующая итерация
+        if processed < settings.jobs_batch_size:
+            stop.wait(settings.jobs_poll_interval_sec)
+
+    logger.info("Job worker %s stopped", worker_id)
+
+
+def start_inprocess_worker() -> tuple[threading.Thread, threading.Event]:
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=run_worker,
+        args=(stop,),
+        name="job-worker",
+        daemon=True,
+    )
+    thread.start()
+    return thread, stop
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    stop = threading.Event()
+
+    def _handle_signal(signum, frame):
+        logger.info("Signal %s received, stopping job worker", signum)
+        stop.set()
+
+    signal.signal(signal.SIGTERM, _handle_signal)
+    signal.signal(signal.SIGINT, _handle_signal)
+
+    run_worker(stop)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Сжатие больших ответов: CPU на сжатие против переданных байт (app.api.compression).
+
+Запуск (нужен Postgres с накатанными миграциями, DATABASE_URL из .env):
+    python -m benchmarks.compression [--rows 5000] [--repeat 10] [--mbps 100]
+
+Тела ответов — настоящие байты /admin/servers и /admin/billing/users на
+засеянных данных (сеются и откатываются как в list_rendering.py). br / zstd
+меряются, только если установлены brotli / zstandard (extra "compression").
+"total" = сжатие + передача сжатого тела по каналу --mbps: где уровень перестаёт
+окупаться.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from sqlalchemy import create_engine
+
+from app.api.compression import Codec, make_codec
+from app.api.rows import RowsJSONResponse
+from app.core.config import settings
+from app.services.billing_service import BillingService
+from app.services.server_service import ServerService
+from benchmarks.list_rendering import _seed
+from benchmarks.roundtrips import rollback_session
+
+LEVELS: dict[str, tuple[int, ...]] = {
+    "gzip": (1, 6, 9),
+    "br": (1, 4, 6, 11),
+    "zstd": (1, 3, 9, 19),
+}
+
+
+def _best(codec: Codec, body: bytes, repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        started = time.process_time()
+        size = len(codec(body))
+        best = min(best, time.process_time() - started)
+    return best, size
+
+
+def _report(name: str, body: bytes, repeat: int, mbps: float) -> None:
+    bytes_per_sec = mbps * 1_000_000 / 8
+    print(f"\n{name}: {len(body) / 1024:.0f} KiB")
+    print(f"{'codec':<10}{'KiB':>9}{'ratio':>8}{'cpu, ms':>10}{'MB/s':>8}{'total, ms':>11}")
+    print(
+        f"{'identity':<10}{len(body) / 1024:>9.0f}{1:>8.1f}{0:>10.1f}{'':>8}"
+        f"{len(body) / bytes_per_sec * 1000:>11.1f}"
+    )
+    for encoding, levels in LEVELS.items():
+        for level in levels:
+            codec = make_codec(encoding, level)
+            if codec is None:
+                break
+            cpu, size = _best(codec, body, repeat)
+            total = cpu + size / bytes_per_sec
+            print(
+                f"{f'{encoding}-{level}':<10}{size / 1024:>9.0f}{len(body) / size:>8.1f}"
+                f"{cpu * 1000:>10.1f}{len(body) / cpu / 1e6 if cpu else float('inf'):>8.0f}"
+                f"{total * 1000:>11.1f}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--mbps", type=float, default=100.0, help="пропускная способность канала")
+    args = parser.parse_args()
+
+    engine = create_engine(settings.database_url, future=True)
+    with rollback_session(engine) as db:
+        _seed(db, args.rows)
+        bodies = {
+            "/admin/servers": RowsJSONResponse(ServerService(db).list_all_admin()).body,
+            "/admin/billing/users": RowsJSONResponse(BillingService(db).admin_summaries()).body,
+        }
+
+    for name, body in bodies.items():
+        _report(name, body, args.repeat, args.mbps)
+
+
+if __name__ == "__main__":
+    main()
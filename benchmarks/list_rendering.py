@@ -0,0 +1,156 @@
+"""
+Рендеринг больших списков: ORM-объекты + Pydantic response_model (как было)
+против проекций в __slots__-dataclass'ы (app.db.projection) + orjson (app.api.rows).
+
+Запуск (нужен Postgres с накатанными миграциями, DATABASE_URL из .env):
+    python -m benchmarks.list_rendering [--rows 5000] [--repeat 20]
+
+Данные сеются внутри внешней транзакции и откатываются в конце (см. roundtrips.py).
+Время — лучшее из repeat прогонов, от запроса в БД до готовых байт ответа.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+import uuid
+from collections.abc import Callable
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session, selectinload
+
+from app.api.rows import RowsJSONResponse
+from app.api.schemas.admin import AdminUserOut
+from app.api.schemas.admin_billing import AdminBillingUserOut
+from app.api.schemas.server import ServerOut
+from app.core.config import settings
+from app.db.models.server import Server
+from app.db.models.subscription import Subscription
+from app.db.models.user import User
+from app.services.billing_service import BillingService
+from app.services.server_service import ServerService
+from app.services.usage_service import UsageService
+from benchmarks.roundtrips import rollback_session
+
+
+def _seed(db: Session, rows: int) -> int:
+    owner = User(email=f"bench-{uuid.uuid4().hex[:12]}@example.com", password_hash="x")
+    db.add(owner)
+    db.flush()
+    db.execute(
+        insert(Server),
+        [
+            {
+                "name": f"bench-{i}",
+                "host": f"bench-{i}.example.com",
+                "port": 51820,
+                "country": "DE",
+                "is_active": True,
+                "owner_id": owner.id,
+                "created_by": owner.id,
+            }
+            for i in range(rows)
+        ],
+    )
+    db.execute(
+        insert(User),
+        [
+            {"email": f"bench-{uuid.uuid4().hex[:12]}@example.com", "password_hash": "x"}
+            for _ in range(rows)
+        ],
+    )
+    db.flush()
+    return owner.id
+
+
+def _dump(schema, objs) -> bytes:
+    adapter = TypeAdapter(list[schema])
+    return adapter.dump_json(adapter.validate_python(objs, from_attributes=True))
+
+
+# ---------- как было: ORM + response_model ----------
+
+def orm_servers(db: Session, owner_id: int) -> bytes:
+    return _dump(ServerOut, db.scalars(ServerService.owned_live_query(owner_id)).all())
+
+
+def orm_users(db: Session, owner_id: int) -> bytes:
+    return _dump(AdminUserOut, db.query(User).order_by(User.id).all())
+
+
+def orm_billing(db: Session, owner_id: int) -> bytes:
+    users = (
+        db.query(User)
+        .options(selectinload(User.subscription).selectinload(Subscription.plan))
+        .order_by(User.id.asc())
+        .all()
+    )
+    billing = BillingService(db)
+    traffic = UsageService(db).used_bytes_for_users(u.id for u in users)
+    out = [
+        {
+            "id": u.id,
+            "email": u.email,
+            "role": u.role,
+            "billing": billing.summary(u, traffic_used=traffic.get(u.id, 0)),
+        }
+        for u in users
+    ]
+    return TypeAdapter(list[AdminBillingUserOut]).dump_json(out)
+
+
+# ---------- проекции + orjson ----------
+
+def rows_servers(db: Session, owner_id: int) -> bytes:
+    return RowsJSONResponse(ServerService(db).list_owned_live(owner_id)).body
+
+
+def rows_users(db: Session, owner_id: int) -> bytes:
+    return RowsJSONResponse(BillingService(db).list_users_admin()).body
+
+
+def rows_billing(db: Session, owner_id: int) -> bytes:
+    return RowsJSONResponse(BillingService(db).admin_summaries()).body
+
+
+CASES: list[tuple[str, Callable[[Session, int], bytes], Callable[[Session, int], bytes]]] = [
+    ("/servers", orm_servers, rows_servers),
+    ("/admin/users", orm_users, rows_users),
+    ("/admin/billing/users", orm_billing, rows_billing),
+]
+
+
+def _best(db: Session, fn: Callable[[Session, int], bytes], owner_id: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        # identity map не должна отдавать уже гидрированные объекты
+        db.expunge_all()
+        started = time.perf_counter()
+        fn(db, owner_id)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(settings.database_url, future=True)
+    with rollback_session(engine) as db:
+        owner_id = _seed(db, args.rows)
+
+        print(f"{'endpoint':<24}{'orm, ms':>10}{'rows, ms':>10}{'speedup':>9}")
+        for name, before, after in CASES:
+            t_before = _best(db, before, owner_id, args.repeat)
+            t_after = _best(db, after, owner_id, args.repeat)
+            print(
+                f"{name:<24}{t_before * 1000:>10.1f}{t_after * 1000:>10.1f}"
+                f"{t_before / t_after:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
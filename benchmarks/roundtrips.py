@@ -0,0 +1,180 @@
+"""
+Round-trips на мутацию: старый паттерн (commit + refresh на каждом шаге)
+против unit of work (flush + RETURNING, один commit).
+
+Запуск (нужен Postgres с накатанными миграциями, DATABASE_URL из .env):
+    python -m benchmarks.roundtrips
+
+Все изменения делаются внутри внешней транзакции и откатываются в конце,
+как в тестах (conftest.py). Считаем каждый statement, ушедший в БД,
+включая SAVEPOINT/RELEASE, которыми сессия эмулирует commit внутри
+внешней транзакции: для обоих вариантов накладные расходы одинаковые.
+"""
+
+from __future__ import annotations
+
+import uuid
+from collections.abc import Callable
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.db.models.plan import Plan
+from app.db.models.subscription import Subscription
+from app.db.models.user import User
+from app.db.uow import unit_of_work
+from app.services.admin_subscription_service import AdminSubscriptionService
+from app.services.plan_service import PlanService
+from app.services.subscription_service import SubscriptionService
+
+
+class StatementCounter:
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self.count += 1
+
+
+@contextmanager
+def rollback_session(engine):
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = sessionmaker(
+        bind=connection,
+        autoflush=False,
+        expire_on_commit=False,
+        join_transaction_mode="create_savepoint",
+    )()
+    try:
+        yield session
+    finally:
+        session.close()
+        transaction.rollback()
+        connection.close()
+
+
+def _seed_user(db: Session) -> User:
+    user = User(email=f"bench-{uuid.uuid4().hex[:12]}@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    SubscriptionService(db).ensure_user_has_subscription(user.id)
+    db.flush()
+    return user
+
+
+# ---------- старый паттерн (как было до unit of work) ----------
+
+def legacy_register(db: Session) -> None:
+    user = User(email=f"bench-{uuid.uuid4().hex[:12]}@example.com", password_hash="x")
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+
+    free_plan = db.scalars(select(Plan).where(Plan.code == "free")).one()
+    sub = Subscription(user_id=user.id, plan_id=free_plan.id, status="active")
+    db.add(sub)
+    db.commit()
+    db.refresh(sub)
+
+
+def legacy_renew(db: Session, user: User) -> None:
+    plan = db.scalars(select(Plan).where(Plan.code == "basic")).one()
+    sub = db.scalars(select(Subscription).where(Subscription.user_id == user.id)).one()
+    sub.plan_id = plan.id
+    sub.status = "active"
+    sub.expires_at = datetime.now(timezone.utc) + timedelta(days=30)
+    db.commit()
+    db.refresh(sub)
+
+
+def legacy_plan_update(db: Session, plan: Plan) -> None:
+    plan.name = f"{plan.name}!"
+    db.commit()
+    db.refresh(plan)
+
+
+def legacy_admin_grant(db: Session, user: User) -> None:
+    user = db.get(User, user.id)
+    plan = db.scalars(select(Plan).where(Plan.code == "pro")).one()
+    sub = user.subscription
+    sub.plan_id = plan.id
+    sub.status = "active"
+    sub.expires_at = None
+    db.commit()
+    db.refresh(sub)
+
+
+# ---------- unit of work ----------
+
+def uow_register(db: Session) -> None:
+    with unit_of_work(db):
+        user = User(email=f"bench-{uuid.uuid4().hex[:12]}@example.com", password_hash="x")
+        db.add(user)
+        db.flush()
+        SubscriptionService(db).ensure_user_has_subscription(user.id)
+
+
+def uow_renew(db: Session, user: User) -> None:
+    with unit_of_work(db):
+        SubscriptionService(db).renew_user_subscription(user.id, plan_code="basic", days=30)
+
+
+def uow_plan_update(db: Session, plan: Plan) -> None:
+    with unit_of_work(db):
+        PlanService(db).update(plan, {"name": f"{plan.name}!"})
+
+
+def uow_admin_grant(db: Session, user: User) -> None:
+    with unit_of_work(db):
+        AdminSubscriptionService(db).grant(user.id, plan_code="pro", expires_at=None)
+
+
+def _measure(engine, counter: StatementCounter, fn: Callable[[Session], None]) -> int:
+    with rollback_session(engine) as db:
+        user = _seed_user(db)
+        plan = db.scalars(select(Plan).where(Plan.code == "basic")).one()
+        db.expire_all()
+
+        counter.count = 0
+        fn(db, user=user, plan=plan)
+        return counter.count
+
+
+CASES: list[tuple[str, Callable, Callable]] = [
+    ("register", lambda db, **_: legacy_register(db), lambda db, **_: uow_register(db)),
+    (
+        "renew",
+        lambda db, user, **_: legacy_renew(db, user),
+        lambda db, user, **_: uow_renew(db, user),
+    ),
+    (
+        "plan update",
+        lambda db, plan, **_: legacy_plan_update(db, plan),
+        lambda db, plan, **_: uow_plan_update(db, plan),
+    ),
+    (
+        "admin grant",
+        lambda db, user, **_: legacy_admin_grant(db, user),
+        lambda db, user, **_: uow_admin_grant(db, user),
+    ),
+]
+
+
+def main() -> None:
+    engine = create_engine(settings.database_url, future=True)
+    counter = StatementCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+
+    print(f"{'mutation':<14}{'before':>8}{'after':>8}")
+    for name, before, after in CASES:
+        n_before = _measure(engine, counter, before)
+        n_after = _measure(engine, counter, after)
+        print(f"{name:<14}{n_before:>8}{n_after:>8}")
+
+
+if __name__ == "__main__":
+    main()
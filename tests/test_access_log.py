@@ -0,0 +1,81 @@
+import io
+import logging
+
+import orjson
+
+from tests.test_server_limits import _create_plan, _ensure_active_subscription, _login, _register
+
+
+class _Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.entries = []
+
+    def emit(self, record):
+        self.entries.append(record.access)
+
+
+def test_request_is_logged_with_route_user_and_db_time(client, db_session):
+    from app.api.access_log import access_logger
+    from app.db.models.user import User
+
+    password = "StrongPass123!"
+    email = "access_log@example.com"
+    _register(client, email=email, password=password)
+    user = db_session.query(User).filter(User.email == email).one()
+    plan = _create_plan(db_session, code="p_access_log", max_servers=1, max_devices=1)
+    _ensure_active_subscription(db_session, user_id=user.id, plan_id=plan.id)
+    token = _login(client, email=email, password=password, device_id="dev-access-log")
+
+    capture = _Capture()
+    access_logger.addHandler(capture)
+    try:
+        r = client.get(
+            "/billing/summary",
+            headers={"Authorization": f"Bearer {token}", "X-Device-Id": "dev-access-log"},
+        )
+        assert r.status_code == 200, r.text
+        assert client.get("/billing/nope").status_code == 404
+    finally:
+        access_logger.removeHandler(capture)
+
+    summary, missing = capture.entries
+    assert summary["method"] == "GET"
+    assert summary["route"] == summary["path"] == "/billing/summary"
+    assert summary["status"] == 200
+    assert summary["user_id"] == user.id
+    assert summary["device_id"] == "dev-access-log"
+    assert summary["db_queries"] > 0
+    assert 0 < summary["db_time_ms"] <= summary["latency_ms"]
+
+    assert missing["route"] is None
+    assert missing["path"] == "/billing/nope"
+    assert missing["status"] == 404
+    assert missing["user_id"] is None
+
+
+def test_full_queue_drops_and_writer_flushes_in_batches():
+    from app.api.access_log import AccessLogWriter, DroppingQueueHandler
+
+    handler = DroppingQueueHandler(maxsize=3)
+    logger = logging.getLogger("tests.access_log")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    try:
+        for i in range(5):
+            logger.info("request", extra={"access": {"status": 200, "n": i}})
+    finally:
+        logger.removeHandler(handler)
+    assert handler.dropped == 2
+
+    stream = io.StringIO()
+    writer = AccessLogWriter(handler, stream, batch_size=2, flush_interval_sec=0.01)
+    assert writer.flush(block=False) == 2
+    assert writer.flush(block=False) == 1
+    assert writer.flush(block=True) == 0
+
+    lines = [orjson.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line["n"] for line in lines] == [0, 1, 2]
+    assert all("ts" in line and line["status"] == 200 for line in lines)
+    assert writer.stats() == {"queued": 0, "written": 3, "batches": 2, "dropped": 2, "failed": 0}
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+
+from tests.test_server_limits import _create_plan, _login, _register
+
+
+def test_admin_analytics_rollups(client, db_session):
+    from app.db.models.analytics import ExpiryDailyStats, PlanDailyStats
+    from app.db.models.user import User
+
+    password = "StrongPass123!"
+    _register(client, email="analytics_admin@example.com", password=password)
+    admin = db_session.query(User).filter(User.email == "analytics_admin@example.com").one()
+    admin.role = "admin"
+    db_session.commit()
+    token = _login(
+        client, email="analytics_admin@example.com", password=password, device_id="dev-analytics"
+    )
+    headers = {"Authorization": f"Bearer {token}"}
+
+    plan = _create_plan(db_session, code="p_analytics", max_servers=1, max_devices=1)
+    plan.price_cents = 1000
+    db_session.commit()
+
+    user_ids = []
+    for i in range(3):
+        email = f"analytics_{i}@example.com"
+        _register(client, email=email, password=password)
+        user_ids.append(db_session.query(User).filter(User.email == email).one().id)
+
+    expires = datetime.now(timezone.utc) + timedelta(days=3)
+    for user_id, expires_at in zip(user_ids, (None, expires.isoformat(), None)):
+        r = client.post(
+            f"/admin/subscriptions/users/{user_id}/grant",
+            json={"plan_code": "p_analytics", "expires_at": expires_at},
+            headers=headers,
+        )
+        assert r.status_code == 200, r.text
+    r = client.post(f"/admin/subscriptions/users/{user_ids[2]}/cancel", json={}, headers=headers)
+    assert r.status_code == 200, r.text
+
+    # до первого refresh rollup'ов нет — дашборд пустой, но отвечает
+    r = client.get("/admin/analytics", headers=headers)
+    assert r.status_code == 200, r.text
+
+    r = client.post("/admin/analytics/refresh", params={"expiring_days": 7}, headers=headers)
+    assert r.status_code == 200, r.text
+    report = r.json()
+    assert report["refreshed_at"] is not None
+    assert report["expiring"] >= 1
+
+    by_plan = {p["plan_code"]: p for p in report["plans"]}
+    assert by_plan["p_analytics"]["active_subscribers"] == 2
+    assert by_plan["p_analytics"]["mrr_cents"] == 2000
+    assert report["mrr_cents"]["USD"] >= 2000
+
+    today = datetime.now(timezone.utc).date()
+    stats = db_session.get(PlanDailyStats, (today, plan.id))
+    db_session.refresh(stats)
+    # три grant'а (переход с free), один cancel
+    assert (stats.activations, stats.churned) == (3, 1)
+
+    expiring = db_session.get(ExpiryDailyStats, (expires.date(), plan.id))
+    assert expiring is not None and expiring.expiring == 1
+
+    # повторный refresh идемпотентен, GET читает те же rollup'ы
+    r = client.post("/admin/analytics/refresh", headers=headers)
+    assert r.status_code == 200, r.text
+    r = client.get("/admin/analytics", params={"days": 7}, headers=headers)
+    assert r.status_code == 200, r.text
+    again = {p["plan_code"]: p for p in r.json()["plans"]}
+    assert again["p_analytics"] == by_plan["p_analytics"]
+    assert r.json()["daily"][-1]["day"] == today.isoformat()
+
+    token = _login(
+        client, email="analytics_0@example.com", password=password, device_id="dev-analytics-user"
+    )
+    r = client.get("/admin/analytics", headers={"Authorization": f"Bearer {token}"})
+    assert r.status_code == 403, r.text
@@ -0,0 +1,146 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from tests.test_server_limits import _create_plan, _ensure_active_subscription, _login, _register
+
+
+def _audit_page(client, db_session, headers, url, *, expected, **params):
+    """
+    События пишет writer-поток (он крутится и в lifespan тестового клиента);
+    остаток буфера дописываем сами, пока не появятся все ожидаемые.
+    """
+    from app.services.audit_service import AuditService, audit_buffer
+
+    deadline = time.monotonic() + 5
+    while True:
+        records = audit_buffer.drain(100_000)
+        if records:
+            AuditService(db_session).insert_events(records)
+            db_session.commit()
+        r = client.get(url, params=params, headers=headers)
+        assert r.status_code == 200, r.text
+        page = r.json()
+        if len(page["items"]) >= expected or time.monotonic() > deadline:
+            return page
+        time.sleep(0.05)
+
+
+def test_mutations_are_audited_with_diffs_and_paginated(client, db_session):
+    from app.db.models.user import User
+    from app.services.audit_service import audit_buffer
+
+    audit_buffer.drain(100_000)
+
+    password = "StrongPass123!"
+    _register(client, email="audit_admin@example.com", password=password)
+    admin = db_session.query(User).filter(User.email == "audit_admin@example.com").one()
+    admin.role = "admin"
+    db_session.commit()
+    plan = _create_plan(db_session, code="p_audit", max_servers=5, max_devices=1)
+    _ensure_active_subscription(db_session, user_id=admin.id, plan_id=plan.id)
+    token = _login(
+        client, email="audit_admin@example.com", password=password, device_id="dev-audit"
+    )
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # ---- план: create -> update -> deactivate
+    r = client.post(
+        "/admin/plans",
+        json={
+            "code": "p_audit_new",
+            "name": "Audit",
+            "price_cents": 500,
+            "currency": "USD",
+            "max_servers": 1,
+            "max_devices": 1,
+        },
+        headers=headers,
+    )
+    assert r.status_code == 201, r.text
+    plan_id = r.json()["id"]
+    r = client.patch(f"/admin/plans/{plan_id}", json={"price_cents": 700}, headers=headers)
+    assert r.status_code == 200, r.text
+    assert client.post(f"/admin/plans/{plan_id}/deactivate", headers=headers).status_code == 200
+
+    # ---- сервер: create -> update -> delete -> restore; дубль host+port откатывается
+    payload = {"name": "a1", "host": "audit.example.com", "port": 51820}
+    r = client.post("/servers", json=payload, headers=headers)
+    assert r.status_code == 201, r.text
+    server_id = r.json()["id"]
+    r = client.post("/servers", json={**payload, "name": "a2"}, headers=headers)
+    assert r.status_code == 409, r.text
+    r = client.patch(f"/servers/{server_id}", json={"name": "a1-renamed"}, headers=headers)
+    assert r.status_code == 200, r.text
+    assert client.delete(f"/servers/{server_id}", headers=headers).status_code == 204
+    assert client.post(f"/admin/servers/{server_id}/restore", headers=headers).status_code == 200
+
+    # ---- подписка другого пользователя
+    _register(client, email="audit_target@example.com", password=password)
+    target = db_session.query(User).filter(User.email == "audit_target@example.com").one()
+    r = client.post(
+        f"/admin/subscriptions/users/{target.id}/grant",
+        json={
+            "plan_code": "p_audit",
+            "expires_at": (datetime.now(timezone.utc) + timedelta(days=10)).isoformat(),
+        },
+        headers=headers,
+    )
+    assert r.status_code == 200, r.text
+
+    plan_url = f"/admin/audit/plan/{plan_id}"
+    events = _audit_page(client, db_session, headers, plan_url, expected=3)["items"]
+    assert [e["action"] for e in events] == ["deactivate", "update", "create"]
+    assert all(e["actor_id"] == admin.id for e in events)
+    assert events[1]["changes"] == {"price_cents": [500, 700]}
+    assert events[2]["changes"]["code"] == [None, "p_audit_new"]
+
+    # keyset-пагинация
+    page = client.get(plan_url, params={"limit": 2}, headers=headers).json()
+    assert [e["action"] for e in page["items"]] == ["deactivate", "update"]
+    params = {"limit": 2, "cursor": page["next_cursor"]}
+    page = client.get(plan_url, params=params, headers=headers).json()
+    assert [e["action"] for e in page["items"]] == ["create"]
+    assert page["next_cursor"] is None
+
+    server_url = f"/admin/audit/server/{server_id}"
+    events = _audit_page(client, db_session, headers, server_url, expected=4)["items"]
+    # конфликтный create откатился вместе со своим событием
+    assert [e["action"] for e in events] == ["restore", "delete", "update", "create"]
+    assert events[2]["changes"] == {"name": ["a1", "a1-renamed"]}
+    assert events[1]["changes"]["deleted_by"] == [None, admin.id]
+    assert events[0]["changes"]["deleted_at"][1] is None
+
+    subscription_url = f"/admin/audit/subscription/{target.id}"
+    (grant,) = _audit_page(client, db_session, headers, subscription_url, expected=1)["items"]
+    assert grant["action"] == "grant"
+    # при регистрации у пользователя уже есть free
+    assert grant["changes"]["plan_code"] == ["free", "p_audit"]
+    assert grant["changes"]["expires_at"][1] is not None
+
+    r = client.get(plan_url, params={"cursor": "garbage"}, headers=headers)
+    assert r.status_code == 400, r.text
+
+
+def test_audit_buffer_is_bounded_and_requeues_in_order():
+    from app.services.audit_service import AuditBuffer, AuditRecord
+
+    def record(n):
+        return AuditRecord(
+            created_at=datetime.now(timezone.utc),
+            actor_id=None,
+            entity_type="plan",
+            entity_id=n,
+            action="update",
+            changes={},
+        )
+
+    buffer = AuditBuffer(max_rows=3)
+    buffer.add(record(n) for n in range(4))
+    assert len(buffer) == 3 and buffer.dropped == 1
+
+    batch = buffer.drain(2)
+    buffer.add([record(9)])
+    # неудачная пачка возвращается в начало; места осталось на одно событие
+    buffer.requeue(batch)
+    assert [r.entity_id for r in buffer.drain(10)] == [0, 2, 9]
+    assert buffer.dropped == 2
@@ -0,0 +1,60 @@
+import gzip
+
+from tests.test_server_limits import _create_plan, _ensure_active_subscription, _login, _register
+
+
+def test_choose_encoding_respects_q_and_server_order():
+    from app.api.compression import choose_encoding
+
+    preferred = ["zstd", "br", "gzip"]
+    assert choose_encoding("gzip, br", preferred) == "br"
+    assert choose_encoding("br;q=0, gzip;q=0.5", preferred) == "gzip"
+    assert choose_encoding("*;q=0.1, zstd;q=0", preferred) == "br"
+    assert choose_encoding("identity", preferred) is None
+    assert choose_encoding("", preferred) is None
+
+
+def test_large_admin_payload_is_compressed(client, db_session):
+    from app.db.models.user import User
+
+    password = "StrongPass123!"
+    email = "compress@example.com"
+    _register(client, email=email, password=password)
+    user = db_session.query(User).filter(User.email == email).one()
+    plan = _create_plan(db_session, code="p_compress", max_servers=10, max_devices=2)
+    _ensure_active_subscription(db_session, user_id=user.id, plan_id=plan.id)
+    token = _login(client, email=email, password=password, device_id="dev-compress")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    for i in range(8):
+        r = client.post(
+            "/servers",
+            json={"name": f"compress-{i}", "host": f"compress-{i}.example.com", "country": "DE"},
+            headers=headers,
+        )
+        assert r.status_code == 201, r.text
+
+    user.role = "admin"
+    db_session.commit()
+
+    plain = client.get("/admin/servers", headers={**headers, "Accept-Encoding": "identity"})
+    assert plain.status_code == 200, plain.text
+    assert "content-encoding" not in plain.headers
+    assert "Accept-Encoding" in plain.headers["vary"]
+    assert len(plain.content) >= 1024
+
+    # stream=True: читаем байты как пришли, без автоматической распаковки httpx
+    with client.stream(
+        "GET", "/admin/servers", headers={**headers, "Accept-Encoding": "gzip"}
+    ) as r:
+        assert r.status_code == 200
+        assert r.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in r.headers["vary"]
+        raw = b"".join(r.iter_raw())
+    assert int(r.headers["content-length"]) == len(raw) < len(plain.content)
+    assert gzip.decompress(raw) == plain.content
+
+    # маленькие ответы не сжимаем
+    r = client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert r.status_code == 200
+    assert "content-encoding" not in r.headers
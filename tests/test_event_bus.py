@@ -0,0 +1,145 @@
+import asyncio
+
+from sqlalchemy import event
+
+from tests.test_peer_feed import NODE_TOKEN, WG_KEY_SECRET, _setup_wg_user
+
+
+def test_event_payload_roundtrip_and_handler_isolation(monkeypatch):
+    from app.services import event_bus
+    from app.services.event_bus import EVENT_DEVICES_REVOKED, EntitlementEvent
+
+    ev = EntitlementEvent(kind=EVENT_DEVICES_REVOKED, user_id=7)
+    assert EntitlementEvent.decode(ev.encode()) == ev
+    assert EntitlementEvent.decode("not json") is None
+    assert EntitlementEvent.decode('{"u": 1}') is None
+
+    seen = []
+
+    def _boom(e):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(event_bus, "EVENT_HANDLERS", [_boom, seen.append])
+    event_bus.dispatch(ev)
+    assert seen == [ev]
+
+
+def test_event_hub_fans_out_with_bounded_buffers():
+    from app.services.event_bus import EVENT_PEERS_CHANGED, EVENT_RESYNC, EntitlementEvent, dispatch
+    from app.services.event_hub import event_hub, server_topic
+
+    async def _run():
+        fast = event_hub.subscribe(server_topic(1), maxsize=2)
+        other = event_hub.subscribe(server_topic(2), maxsize=2)
+        try:
+            dispatch(EntitlementEvent(kind=EVENT_PEERS_CHANGED, server_id=1))
+            await asyncio.sleep(0)
+            assert fast.queue.get_nowait() == {"type": EVENT_PEERS_CHANGED}
+            assert other.queue.empty()
+
+            # клиент не читает: очередь не растёт, а схлопывается в resync
+            for _ in range(5):
+                dispatch(EntitlementEvent(kind=EVENT_PEERS_CHANGED, server_id=1))
+            await asyncio.sleep(0)
+            assert fast.queue.qsize() <= 2
+            queued = [fast.queue.get_nowait() for _ in range(fast.queue.qsize())]
+            assert {"type": EVENT_RESYNC} in queued
+
+            dispatch(EntitlementEvent(kind=EVENT_RESYNC))
+            await asyncio.sleep(0)
+            assert other.queue.get_nowait() == {"type": EVENT_RESYNC}
+        finally:
+            event_hub.unsubscribe(fast)
+            event_hub.unsubscribe(other)
+
+    asyncio.run(_run())
+    assert len(event_hub) == 0
+
+
+def test_entitlement_changes_are_notified_in_transaction(client, db_session, monkeypatch):
+    from app.core.config import settings
+    from app.services.event_bus import ENTITLEMENTS_CHANNEL, EntitlementEvent
+
+    monkeypatch.setattr(settings, "node_api_token", NODE_TOKEN)
+    monkeypatch.setattr(settings, "wg_key_secret", WG_KEY_SECRET)
+    user, headers, (dev1, dev2), server_id = _setup_wg_user(
+        client, db_session, email="bus@example.com"
+    )
+    r = client.post(f"/devices/{dev1}/wireguard", json={"server_id": server_id}, headers=headers)
+    assert r.status_code == 200, r.text
+
+    notified: list[EntitlementEvent] = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if "pg_notify" in statement:
+            if not isinstance(parameters, (tuple, list)):
+                parameters = tuple(parameters.values())
+            channel, payload = parameters
+            assert channel == ENTITLEMENTS_CHANNEL
+            notified.append(EntitlementEvent.decode(payload))
+
+    bind = db_session.get_bind()
+    event.listen(bind, "before_cursor_execute", _capture)
+    try:
+        r = client.post(f"/devices/{dev2}/revoke", headers=headers)
+        assert r.status_code == 204, r.text
+        assert [(e.kind, e.user_id) for e in notified] == [("devices.revoked", user.id)]
+        notified.clear()
+
+        user.role = "admin"
+        db_session.commit()
+        r = client.post(f"/admin/subscriptions/users/{user.id}/cancel", json={}, headers=headers)
+        assert r.status_code == 200, r.text
+        kinds = {(e.kind, e.user_id, e.server_id) for e in notified}
+        assert ("peers.changed", None, server_id) in kinds
+        assert ("subscription.changed", user.id, None) in kinds
+    finally:
+        event.remove(bind, "before_cursor_execute", _capture)
+
+
+def test_sse_stream_sends_ready_heartbeat_and_events(monkeypatch):
+    from app.api.sse import sse_response
+    from app.core.config import settings
+    from app.services.event_bus import EVENT_PEERS_CHANGED, EntitlementEvent, dispatch
+    from app.services.event_hub import event_hub, server_topic
+
+    monkeypatch.setattr(settings, "events_heartbeat_sec", 0.05)
+
+    async def _run():
+        body = sse_response(server_topic(5), {"server_id": 5}).body_iterator
+        chunks = [await body.__anext__(), await body.__anext__()]
+        dispatch(EntitlementEvent(kind=EVENT_PEERS_CHANGED, server_id=5))
+        chunks.append(await body.__anext__())
+        await body.aclose()
+        return chunks
+
+    assert asyncio.run(_run()) == [
+        'event: ready\ndata: {"server_id":5}\n\n',
+        ": ping\n\n",
+        'event: peers.changed\ndata: {"type":"peers.changed"}\n\n',
+    ]
+    # отключение клиента снимает подписку
+    assert len(event_hub) == 0
+
+
+def test_plan_change_reaches_every_user_stream():
+    from app.services.event_bus import EVENT_PLANS_CHANGED, EntitlementEvent, dispatch
+    from app.services.event_hub import event_hub, server_topic, user_topic
+
+    async def _run():
+        alice = event_hub.subscribe(user_topic(1), maxsize=2)
+        bob = event_hub.subscribe(user_topic(2), maxsize=2)
+        node = event_hub.subscribe(server_topic(1), maxsize=2)
+        try:
+            # PlanService.update публикует событие без user_id / server_id
+            dispatch(EntitlementEvent(kind=EVENT_PLANS_CHANGED))
+            await asyncio.sleep(0)
+            assert alice.queue.get_nowait() == {"type": EVENT_PLANS_CHANGED}
+            assert bob.queue.get_nowait() == {"type": EVENT_PLANS_CHANGED}
+            assert node.queue.empty()
+        finally:
+            for stream in (alice, bob, node):
+                event_hub.unsubscribe(stream)
+
+    asyncio.run(_run())
+    assert len(event_hub) == 0
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta, timezone
+
+from tests.test_server_limits import _create_plan, _ensure_active_subscription, _login, _register
+
+
+def test_renew_with_idempotency_key_extends_once(client, db_session):
+    from app.db.models.idempotency_key import IdempotencyKey
+    from app.db.models.subscription import Subscription
+    from app.db.models.user import User
+
+    password = "StrongPass123!"
+    email = "idem_renew@example.com"
+    _register(client, email=email, password=password)
+    user = db_session.query(User).filter(User.email == email).one()
+    plan = _create_plan(db_session, code="p_idem", max_servers=1, max_devices=2)
+    _ensure_active_subscription(db_session, user_id=user.id, plan_id=plan.id)
+    token = _login(client, email=email, password=password, device_id="dev-idem")
+    auth = {"Authorization": f"Bearer {token}"}
+
+    def expires_at():
+        db_session.expire_all()
+        sub = db_session.query(Subscription).filter(Subscription.user_id == user.id).one()
+        return sub.expires_at
+
+    before = expires_at()
+    headers = {**auth, "Idempotency-Key": "renew-1"}
+    first = client.post("/billing/renew", json={"plan_code": "p_idem", "days": 30}, headers=headers)
+    assert first.status_code == 200, first.text
+    assert "idempotent-replayed" not in first.headers
+    after_first = expires_at()
+    assert after_first > before
+
+    # ретрай: тот же ответ, срок не сдвинулся второй раз
+    retry = client.post("/billing/renew", json={"plan_code": "p_idem", "days": 30}, headers=headers)
+    assert retry.status_code == 200, retry.text
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json() == first.json()
+    assert expires_at() == after_first
+
+    # тот же ключ с другим запросом — ошибка клиента
+    r = client.post("/billing/renew", json={"plan_code": "p_idem", "days": 7}, headers=headers)
+    assert r.status_code == 422, r.text
+    assert r.json()["code"] == "idempotency_key_reused"
+
+    # без ключа — как раньше, каждый запрос продлевает
+    r = client.post("/billing/renew", json={"plan_code": "p_idem", "days": 30}, headers=auth)
+    assert r.status_code == 200, r.text
+    assert expires_at() > after_first
+
+    # ошибка откатывает и ключ: повтор выполнится заново, а не вернёт 404 из кэша
+    failing = {**auth, "Idempotency-Key": "renew-missing-plan"}
+    r = client.post("/billing/renew", json={"plan_code": "p_idem_missing"}, headers=failing)
+    assert r.status_code == 404, r.text
+    keys = db_session.query(IdempotencyKey.key).filter(IdempotencyKey.user_id == user.id).all()
+    assert [k for (k,) in keys] == ["renew-1"]
+
+
+def test_admin_extend_with_idempotency_key_and_purge(client, db_session):
+    from app.db.models.idempotency_key import IdempotencyKey
+    from app.db.models.user import User
+    from app.services.idempotency_service import IdempotencyService
+
+    password = "StrongPass123!"
+    _register(client, email="idem_admin@example.com", password=password)
+    admin = db_session.query(User).filter(User.email == "idem_admin@example.com").one()
+    admin.role = "admin"
+    db_session.commit()
+    token = _login(
+        client, email="idem_admin@example.com", password=password, device_id="dev-idem-admin"
+    )
+    auth = {"Authorization": f"Bearer {token}"}
+
+    _register(client, email="idem_target@example.com", password=password)
+    target = db_session.query(User).filter(User.email == "idem_target@example.com").one()
+    _create_plan(db_session, code="p_idem_admin", max_servers=1, max_devices=1)
+    r = client.post(
+        f"/admin/subscriptions/users/{target.id}/grant",
+        json={
+            "plan_code": "p_idem_admin",
+            "expires_at": (datetime.now(timezone.utc) + timedelta(days=10)).isoformat(),
+        },
+        headers=auth,
+    )
+    assert r.status_code == 200, r.text
+
+    # двойной клик
+    headers = {**auth, "Idempotency-Key": "extend-click"}
+    url = f"/admin/subscriptions/users/{target.id}/extend"
+    first = client.post(url, json={"days": 5}, headers=headers)
+    second = client.post(url, json={"days": 5}, headers=headers)
+    assert first.status_code == second.status_code == 200, second.text
+    assert second.headers["idempotent-replayed"] == "true"
+    assert second.json() == first.json()
+
+    r = client.get(f"/admin/subscriptions/users/{target.id}/history", headers=auth)
+    assert r.status_code == 200, r.text
+    assert [e["kind"] for e in r.json()].count("extend") == 1
+
+    # ключ привязан к запросу: с другим URL — тоже reuse
+    r = client.post(
+        f"/admin/subscriptions/users/{admin.id}/extend", json={"days": 5}, headers=headers
+    )
+    assert r.status_code == 422, r.text
+
+    # старые ключи чистит idempotency.purge
+    db_session.query(IdempotencyKey).filter(IdempotencyKey.user_id == admin.id).update(
+        {IdempotencyKey.created_at: datetime.now(timezone.utc) - timedelta(days=2)}
+    )
+    db_session.commit()
+    assert IdempotencyService(db_session).purge_expired() >= 1
+    db_session.commit()
+    assert db_session.query(IdempotencyKey).filter(IdempotencyKey.user_id == admin.id).count() == 0
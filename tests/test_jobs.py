@@ -0,0 +1,78 @@
+from tests.test_server_limits import _create_plan, _ensure_active_subscription, _login, _register
+
+
+def test_cancel_defers_device_purge_to_job(client, db_session):
+    from app.db.models.device import Device
+    from app.db.models.job import Job
+    from app.db.models.user import User
+    from app.services.job_handlers import DEVICES_PURGE_REVOKED
+    from app.services.job_service import JobService
+
+    plan = _create_plan(db_session, code="p_jobs", max_servers=1, max_devices=1)
+
+    email = "jobs@example.com"
+    password = "StrongPass123!"
+    _register(client, email=email, password=password)
+
+    user = db_session.query(User).filter(User.email == email).one()
+    _ensure_active_subscription(db_session, user_id=user.id, plan_id=plan.id)
+
+    # отозванный раньше девайс — история, cancel его не удаляет
+    token = _login(client, email=email, password=password, device_id="dev-jobs-0")
+    headers = {"Authorization": f"Bearer {token}"}
+    old_id = client.get("/devices", headers=headers).json()[0]["id"]
+    r = client.post(f"/devices/{old_id}/revoke", headers=headers)
+    assert r.status_code == 204, r.text
+
+    token = _login(client, email=email, password=password, device_id="dev-jobs-1")
+
+    r = client.post("/billing/cancel", headers={"Authorization": f"Bearer {token}"})
+    assert r.status_code == 200, r.text
+    assert r.json()["devices_used"] == 0
+
+    # девайс отозван сразу, но строка ещё есть — удалит задача
+    device = db_session.query(Device).filter(Device.device_id == "dev-jobs-1").one()
+    assert device.revoked_at is not None
+
+    job = db_session.query(Job).filter(Job.kind == DEVICES_PURGE_REVOKED).one()
+    assert job.status == "queued"
+    assert job.payload == {"user_id": user.id, "device_ids": [device.id]}
+
+    assert JobService(db_session).run_pending("test-worker") == 1
+
+    db_session.refresh(job)
+    assert job.status == "done"
+    assert job.attempts == 1
+    remaining = db_session.query(Device).filter(Device.user_id == user.id).all()
+    assert [d.id for d in remaining] == [old_id]
+
+
+def test_failed_job_is_retried_then_marked_failed(db_session, monkeypatch):
+    from app.db.models.job import Job
+    from app.services import job_service
+    from app.services.job_service import JobService
+
+    def _boom(db, payload):
+        raise RuntimeError("boom")
+
+    monkeypatch.setitem(job_service.JOB_HANDLERS, "test.boom", _boom)
+
+    svc = JobService(db_session)
+    job = svc.enqueue("test.boom", {"x": 1}, max_attempts=2)
+    db_session.commit()
+
+    assert svc.run_pending("test-worker") == 0
+    db_session.refresh(job)
+    assert job.status == "queued"
+    assert job.attempts == 1
+    assert "boom" in job.last_error
+
+    # не ждём backoff: двигаем run_at в прошлое
+    job.run_at = job.created_at
+    db_session.commit()
+
+    assert svc.run_pending("test-worker") == 0
+    db_session.refresh(job)
+    assert job.status == "failed"
+    assert job.attempts == 2
+    assert db_session.query(Job).filter(Job.status == "queued").count() == 0
@@ -0,0 +1,96 @@
+from dataclasses import fields
+
+from pydantic import TypeAdapter
+
+from tests.test_server_limits import _create_plan, _ensure_active_subscription, _login, _register
+
+
+def _dump(schema, objs) -> bytes:
+    # как response_model: валидация из ORM-атрибутов -> JSON
+    adapter = TypeAdapter(list[schema])
+    return adapter.dump_json(adapter.validate_python(objs, from_attributes=True))
+
+
+def test_projection_rows_follow_schema_fields():
+    from app.api.schemas.admin import AdminServerOut, AdminUserOut
+    from app.api.schemas.device import DeviceOut
+    from app.api.schemas.server import ServerOut
+    from app.services.billing_service import AdminUserRow
+    from app.services.device_service import DeviceRow
+    from app.services.server_service import AdminServerRow, ServerRow
+
+    # orjson пишет поля dataclass'а в порядке объявления -> он должен совпадать со схемой
+    for row_cls, schema in [
+        (ServerRow, ServerOut),
+        (AdminServerRow, AdminServerOut),
+        (DeviceRow, DeviceOut),
+        (AdminUserRow, AdminUserOut),
+    ]:
+        assert [f.name for f in fields(row_cls)] == list(schema.model_fields)
+        assert not hasattr(row_cls(*[None] * len(fields(row_cls))), "__dict__")
+
+
+def test_row_rendering_matches_response_model(client, db_session):
+    from app.api.schemas.admin import AdminServerOut, AdminUserOut
+    from app.api.schemas.admin_billing import AdminBillingUserOut
+    from app.api.schemas.device import DeviceOut
+    from app.api.schemas.server import ServerOut
+    from app.db.models.device import Device
+    from app.db.models.user import User
+    from app.services.billing_service import BillingService
+    from app.services.device_service import DeviceService
+    from app.services.server_service import ServerService
+
+    password = "StrongPass123!"
+    email = "rows@example.com"
+    _register(client, email=email, password=password)
+    user = db_session.query(User).filter(User.email == email).one()
+    plan = _create_plan(db_session, code="p_rows", max_servers=5, max_devices=2)
+    _ensure_active_subscription(db_session, user_id=user.id, plan_id=plan.id)
+    token = _login(client, email=email, password=password, device_id="dev-rows")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    for i in range(3):
+        r = client.post(
+            "/servers",
+            json={"name": f"rows-{i}", "host": f"rows-{i}.example.com", "country": "DE"},
+            headers=headers,
+        )
+        assert r.status_code == 201, r.text
+
+    # тот же JSON байт в байт, что дал бы response_model из ORM-объектов
+    r = client.get("/servers", headers=headers)
+    assert r.status_code == 200, r.text
+    assert r.headers["content-type"] == "application/json"
+    servers = db_session.scalars(ServerService.owned_live_query(user.id)).all()
+    assert r.content == _dump(ServerOut, servers)
+    assert len(r.json()) == 3
+
+    r = client.get("/devices", headers=headers)
+    assert r.status_code == 200, r.text
+    devices = db_session.scalars(DeviceService.owned_query(user.id)).all()
+    assert all(isinstance(d, Device) for d in devices)
+    assert r.content == _dump(DeviceOut, devices)
+
+    user.role = "admin"
+    db_session.commit()
+    db_session.expire_all()
+
+    r = client.get("/admin/users", headers=headers)
+    assert r.status_code == 200, r.text
+    users = db_session.query(User).order_by(User.id).all()
+    assert r.content == _dump(AdminUserOut, users)
+
+    r = client.get("/admin/servers", headers=headers)
+    assert r.status_code == 200, r.text
+    servers = db_session.scalars(ServerService.all_admin_query()).all()
+    assert r.content == _dump(AdminServerOut, servers)
+
+    r = client.get("/admin/billing/users", headers=headers)
+    assert r.status_code == 200, r.text
+    billing = BillingService(db_session)
+    expected = [
+        {"id": u.id, "email": u.email, "role": u.role, "billing": billing.summary(u)} for u in users
+    ]
+    adapter = TypeAdapter(list[AdminBillingUserOut])
+    assert r.content == adapter.dump_json(adapter.validate_python(expected))
@@ -0,0 +1,200 @@
+from datetime import datetime, timedelta, timezone
+
+from tests.test_server_limits import _create_plan, _ensure_active_subscription, _login, _register
+
+NODE_TOKEN = "node-secret"
+WG_KEY_SECRET = "wg-key-secret"
+
+
+def _setup_wg_user(client, db_session, *, email: str, devices: int = 2):
+    from app.db.models.user import User
+    from app.services.wireguard_service import derive_keypair
+
+    plan = _create_plan(
+        db_session, code=f"p_{email.split('@')[0]}", max_servers=1, max_devices=devices
+    )
+
+    password = "StrongPass123!"
+    _register(client, email=email, password=password)
+    user = db_session.query(User).filter(User.email == email).one()
+    _ensure_active_subscription(db_session, user_id=user.id, plan_id=plan.id)
+
+    token = None
+    for i in range(devices):
+        t = _login(client, email=email, password=password, device_id=f"{email}-dev-{i}")
+        token = token or t
+    headers = {"Authorization": f"Bearer {token}"}
+    device_ids = [d["id"] for d in client.get("/devices", headers=headers).json()]
+
+    r = client.post(
+        "/servers",
+        json={"name": "wg", "host": "vpn.example.com", "wg_public_key": derive_keypair(0, 0, 0)[1]},
+        headers=headers,
+    )
+    assert r.status_code == 201, r.text
+    return user, headers, device_ids, r.json()["id"]
+
+
+def _feed(client, server_id: int, **params):
+    from app.core.security import node_token
+
+    r = client.get(
+        f"/nodes/{server_id}/peers", params=params, headers={"X-Node-Token": node_token(server_id)}
+    )
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_peer_feed_returns_snapshot_then_deltas(client, db_session, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "node_api_token", NODE_TOKEN)
+    monkeypatch.setattr(settings, "wg_key_secret", WG_KEY_SECRET)
+    _, headers, (dev1, dev2), server_id = _setup_wg_user(
+        client, db_session, email="feed@example.com"
+    )
+
+    r = client.get(f"/nodes/{server_id}/peers")
+    assert r.status_code == 401, r.text
+
+    empty = _feed(client, server_id)
+    assert empty == {"version": 0, "full": True, "has_more": False, "peers": []}
+
+    r = client.post(f"/devices/{dev1}/wireguard", json={"server_id": server_id}, headers=headers)
+    assert r.status_code == 200, r.text
+    first = r.json()
+
+    delta = _feed(client, server_id, since=0)
+    assert delta["full"] is False
+    assert [(p["op"], p["peer_id"], p["address"]) for p in delta["peers"]] == [
+        ("upsert", first["peer_id"], "10.8.0.2")
+    ]
+    cursor = delta["version"]
+    assert delta["peers"][0]["version"] == cursor
+
+    # повторная выдача без изменений ленту не трогает
+    client.post(f"/devices/{dev1}/wireguard", json={"server_id": server_id}, headers=headers)
+    assert _feed(client, server_id, since=cursor)["peers"] == []
+
+    r = client.post(f"/devices/{dev2}/wireguard", json={"server_id": server_id}, headers=headers)
+    assert r.status_code == 200, r.text
+    second = r.json()
+    r = client.post(
+        f"/devices/{dev1}/wireguard",
+        json={"server_id": server_id, "rotate": True},
+        headers=headers,
+    )
+    assert r.status_code == 200, r.text
+    rotated = r.json()
+    r = client.post(f"/devices/{dev2}/revoke", headers=headers)
+    assert r.status_code == 204, r.text
+
+    page = _feed(client, server_id, since=cursor, limit=2)
+    assert page["has_more"] is True
+    assert [(p["op"], p["peer_id"]) for p in page["peers"]] == [
+        ("upsert", second["peer_id"]),
+        ("upsert", first["peer_id"]),
+    ]
+    assert page["peers"][1]["public_key"] == rotated["public_key"]
+
+    rest = _feed(client, server_id, since=page["version"])
+    assert rest["has_more"] is False
+    assert [(p["op"], p["peer_id"]) for p in rest["peers"]] == [("remove", second["peer_id"])]
+
+    snapshot = _feed(client, server_id)
+    assert snapshot["full"] is True
+    assert snapshot["version"] == rest["version"]
+    assert [(p["peer_id"], p["public_key"], p["address"]) for p in snapshot["peers"]] == [
+        (first["peer_id"], rotated["public_key"], "10.8.0.2")
+    ]
+
+
+def test_peer_feed_removes_on_cancel_and_expiry(client, db_session, monkeypatch):
+    from app.core.config import settings
+    from app.db.models.subscription import Subscription
+    from app.services.wireguard_service import WireGuardService
+
+    monkeypatch.setattr(settings, "node_api_token", NODE_TOKEN)
+    monkeypatch.setattr(settings, "wg_key_secret", WG_KEY_SECRET)
+    user, headers, (dev1,), server_id = _setup_wg_user(
+        client, db_session, email="feed_cancel@example.com", devices=1
+    )
+    r = client.post(f"/devices/{dev1}/wireguard", json={"server_id": server_id}, headers=headers)
+    assert r.status_code == 200, r.text
+    peer_id = r.json()["peer_id"]
+    cursor = _feed(client, server_id)["version"]
+
+    # отмена админом: устройства остаются, но доступ к нодам пропадает сразу
+    user.role = "admin"
+    db_session.commit()
+    r = client.post(
+        f"/admin/subscriptions/users/{user.id}/cancel",
+        json={"immediately": False},
+        headers=headers,
+    )
+    assert r.status_code == 200, r.text
+
+    delta = _feed(client, server_id, since=cursor)
+    assert [(p["op"], p["peer_id"]) for p in delta["peers"]] == [("remove", peer_id)]
+    assert _feed(client, server_id)["peers"] == []
+
+    # истечение по expires_at находит периодический sweep
+    sub = db_session.query(Subscription).filter(Subscription.user_id == user.id).one()
+    sub.status = "active"
+    db_session.commit()
+    r = client.post(f"/devices/{dev1}/wireguard", json={"server_id": server_id}, headers=headers)
+    assert r.status_code == 200, r.text
+    cursor = _feed(client, server_id)["version"]
+
+    sub.expires_at = datetime.now(timezone.utc) - timedelta(minutes=1)
+    db_session.commit()
+
+    assert WireGuardService(db_session).release_expired() == 1
+    db_session.commit()
+
+    delta = _feed(client, server_id, since=cursor)
+    assert [p["op"] for p in delta["peers"]] == ["remove"]
+
+
+def test_peer_feed_compaction_forces_full_resync(client, db_session, monkeypatch):
+    from app.core.config import settings
+    from app.db.models.peer_change import PeerChange
+    from app.services.peer_feed_service import PeerFeedService
+
+    monkeypatch.setattr(settings, "node_api_token", NODE_TOKEN)
+    monkeypatch.setattr(settings, "wg_key_secret", WG_KEY_SECRET)
+    _, headers, (dev1, dev2), server_id = _setup_wg_user(
+        client, db_session, email="feed_compact@example.com"
+    )
+
+    for dev in (dev1, dev2):
+        r = client.post(f"/devices/{dev}/wireguard", json={"server_id": server_id}, headers=headers)
+        assert r.status_code == 200, r.text
+    client.post(
+        f"/devices/{dev1}/wireguard",
+        json={"server_id": server_id, "rotate": True},
+        headers=headers,
+    )
+    r = client.post(f"/devices/{dev2}/revoke", headers=headers)
+    assert r.status_code == 204, r.text
+
+    latest = _feed(client, server_id, since=0)["version"]
+
+    # upsert'ы, перекрытые более поздней записью того же пира, и remove старше retention
+    deleted = PeerFeedService(db_session).compact(
+        retention_days=0, now=datetime.now(timezone.utc) + timedelta(seconds=1)
+    )
+    db_session.commit()
+    assert deleted >= 3
+    remaining = db_session.query(PeerChange).filter(PeerChange.server_id == server_id)
+    assert [c.op for c in remaining] == ["upsert"]
+
+    # курсор до удалённого remove -> полный снапшот, иначе нода не узнает об отзыве
+    stale = _feed(client, server_id, since=0)
+    assert stale["full"] is True
+    assert stale["version"] < latest
+    assert len(stale["peers"]) == 1
+
+    fresh = _feed(client, server_id, since=latest)
+    assert fresh["full"] is False
+    assert fresh["peers"] == []
@@ -0,0 +1,72 @@
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from tests.test_server_limits import _login, _register
+
+
+def _burn_cpu(seconds: float) -> int:
+    deadline = time.perf_counter() + seconds
+    n = 0
+    while time.perf_counter() < deadline:
+        n += 1
+    return n
+
+
+def test_profiled_request_is_sampled_and_exposed(client, db_session):
+    from app.api.profiling import PROFILE_ID_HEADER, ProfilingMiddleware, profiler
+    from app.db.models.user import User
+
+    profiler.reset()
+    app = FastAPI()
+
+    @app.get("/slow")
+    def slow():
+        return {"n": _burn_cpu(0.2)}
+
+    app.add_middleware(ProfilingMiddleware, profiler=profiler, sample_rate=0.0, token="s3cret")
+    with TestClient(app) as debug_client:
+        # без заголовка / с чужим токеном — не профилируется
+        assert PROFILE_ID_HEADER not in debug_client.get("/slow").headers
+        r = debug_client.get("/slow", headers={"X-Profile": "wrong"})
+        assert PROFILE_ID_HEADER not in r.headers
+
+        r = debug_client.get("/slow", headers={"X-Profile": "s3cret"})
+        assert r.status_code == 200, r.text
+        profile_id = int(r.headers[PROFILE_ID_HEADER])
+
+    password = "StrongPass123!"
+    _register(client, email="profile_admin@example.com", password=password)
+    admin = db_session.query(User).filter(User.email == "profile_admin@example.com").one()
+    admin.role = "admin"
+    db_session.commit()
+    token = _login(
+        client, email="profile_admin@example.com", password=password, device_id="dev-profile"
+    )
+    headers = {"Authorization": f"Bearer {token}"}
+
+    r = client.get("/admin/debug/profile", headers=headers)
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert [p["id"] for p in body["profiles"]] == [profile_id]
+    profile = body["profiles"][0]
+    assert profile["path"] == "/slow"
+    assert profile["status_code"] == 200
+    assert profile["samples"] > 0
+    assert body["aggregate_stacks"] > 0
+
+    r = client.get(f"/admin/debug/profile/{profile_id}/collapsed", headers=headers)
+    assert r.status_code == 200, r.text
+    lines = r.text.splitlines()
+    assert any("_burn_cpu" in line for line in lines)
+    # collapsed: "frame;frame;... count"
+    stack, count = lines[0].rsplit(" ", 1)
+    assert ";" in stack and int(count) > 0
+
+    r = client.get("/admin/debug/profile/collapsed", headers=headers)
+    assert r.status_code == 200, r.text
+    assert "_burn_cpu" in r.text
+
+    r = client.get("/admin/debug/profile/999999/collapsed", headers=headers)
+    assert r.status_code == 404, r.text
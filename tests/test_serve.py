@@ -0,0 +1,13 @@
+def test_worker_count_and_shared_socket():
+    from app.serve import available_cpus, bind_socket, worker_count
+
+    assert worker_count(3) == 3
+    assert worker_count(0) == available_cpus() >= 1
+
+    # сокет открывает мастер, воркеры наследуют его через fork
+    sock = bind_socket("127.0.0.1", 0, backlog=16)
+    try:
+        assert sock.getsockname()[1] > 0
+        assert sock.get_inheritable()
+    finally:
+        sock.close()
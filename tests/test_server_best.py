@@ -0,0 +1,105 @@
+from datetime import datetime, timezone
+
+from tests.test_server_limits import _create_plan, _ensure_active_subscription, _login, _register
+
+
+def _setup_user(client, db_session, *, email: str, plan_code: str, max_servers: int):
+    from app.db.models.user import User
+
+    plan = _create_plan(db_session, code=plan_code, max_servers=max_servers)
+
+    password = "StrongPass123!"
+    _register(client, email=email, password=password)
+    user = db_session.query(User).filter(User.email == email).one()
+    _ensure_active_subscription(db_session, user_id=user.id, plan_id=plan.id)
+
+    token = _login(client, email=email, password=password, device_id="dev-best")
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_best_servers_ranked_by_latency_and_country(client, db_session):
+    from app.services.probe_service import ProbeResult, ProbeService
+    from app.services.server_ranking import ranking_index
+
+    ranking_index.clear()
+    try:
+        headers = _setup_user(
+            client, db_session, email="best@example.com", plan_code="p_best", max_servers=5
+        )
+
+        ids = {}
+        for name, host, country in [
+            ("fast", "10.0.0.1", "DE"),
+            ("slow", "10.0.0.2", "NL"),
+            ("down", "10.0.0.3", "NL"),
+            ("mid", "10.0.0.4", "NL"),
+        ]:
+            r = client.post(
+                "/servers",
+                json={"name": name, "host": host, "country": country},
+                headers=headers,
+            )
+            assert r.status_code == 201, r.text
+            ids[name] = r.json()["id"]
+
+        now = datetime.now(timezone.utc)
+        ProbeService(db_session).record_results(
+            [
+                ProbeResult(ids["fast"], ok=True, checked_at=now, latency_ms=10),
+                ProbeResult(ids["slow"], ok=True, checked_at=now, latency_ms=300),
+                ProbeResult(ids["down"], ok=False, checked_at=now, error="timeout"),
+                ProbeResult(ids["mid"], ok=True, checked_at=now, latency_ms=50),
+            ]
+        )
+        db_session.commit()
+        ranking_index.refresh(db_session, force=True)
+
+        r = client.get("/servers/best", params={"limit": 10}, headers=headers)
+        assert r.status_code == 200, r.text
+        assert [x["server_id"] for x in r.json()] == [ids["fast"], ids["mid"], ids["slow"]]
+
+        r = client.get("/servers/best", params={"country": "nl", "limit": 2}, headers=headers)
+        assert r.status_code == 200, r.text
+        assert [x["server_id"] for x in r.json()] == [ids["mid"], ids["slow"]]
+
+        # удалённый сервер пропадает из выдачи сразу после commit
+        r = client.delete(f"/servers/{ids['fast']}", headers=headers)
+        assert r.status_code == 204, r.text
+        r = client.get("/servers/best", headers=headers)
+        assert r.status_code == 200, r.text
+        assert [x["server_id"] for x in r.json()] == [ids["mid"]]
+    finally:
+        ranking_index.clear()
+
+
+def test_best_servers_respect_plan_entitlement(client, db_session):
+    from app.services.server_ranking import ranking_index
+
+    ranking_index.clear()
+    try:
+        headers = _setup_user(
+            client, db_session, email="best2@example.com", plan_code="p_best2", max_servers=2
+        )
+
+        ids = []
+        for i in range(2):
+            payload = {"name": f"s{i}", "host": f"10.1.0.{i}"}
+            r = client.post("/servers", json=payload, headers=headers)
+            assert r.status_code == 201, r.text
+            ids.append(r.json()["id"])
+
+        r = client.get("/servers/best", params={"limit": 5}, headers=headers)
+        assert r.status_code == 200, r.text
+        assert sorted(x["server_id"] for x in r.json()) == sorted(ids)
+
+        # после даунгрейда выдаются только первые max_servers серверов
+        from app.db.models.plan import Plan
+
+        db_session.query(Plan).filter(Plan.code == "p_best2").one().max_servers = 1
+        db_session.commit()
+
+        r = client.get("/servers/best", params={"limit": 5}, headers=headers)
+        assert r.status_code == 200, r.text
+        assert [x["server_id"] for x in r.json()] == [ids[0]]
+    finally:
+        ranking_index.clear()
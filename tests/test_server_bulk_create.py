@@ -0,0 +1,116 @@
+from tests.test_server_limits import _create_plan, _ensure_active_subscription, _login, _register
+
+
+def test_bulk_create_reports_created_and_conflicts(client, db_session):
+    plan = _create_plan(db_session, code="p_bulk", max_servers=5)
+
+    email = "bulk@example.com"
+    password = "StrongPass123!"
+    _register(client, email=email, password=password)
+
+    from app.db.models.user import User
+    user = db_session.query(User).filter(User.email == email).one()
+    _ensure_active_subscription(db_session, user_id=user.id, plan_id=plan.id)
+
+    token = _login(client, email=email, password=password, device_id="dev-bulk")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # уже существующий endpoint -> в батче будет conflict
+    r0 = client.post(
+        "/servers",
+        json={"name": "s0", "host": "9.9.9.1", "port": 51820},
+        headers=headers,
+    )
+    assert r0.status_code == 201, r0.text
+
+    r = client.post(
+        "/servers/bulk",
+        json={
+            "items": [
+                {"name": "s1", "host": "9.9.9.1", "port": 51820},
+                {"name": "s2", "host": "9.9.9.2", "port": 51820},
+                {"name": "s3", "host": "9.9.9.2", "port": 51820},
+                {"name": "s4", "host": "9.9.9.3", "port": 51821},
+            ]
+        },
+        headers=headers,
+    )
+    assert r.status_code == 200, r.text
+    body = r.json()
+
+    assert body["created"] == 2
+    assert body["conflicts"] == 2
+    assert [x["status"] for x in body["items"]] == ["conflict", "created", "conflict", "created"]
+    assert body["items"][1]["server"]["host"] == "9.9.9.2"
+    assert body["items"][3]["server"]["owner_id"] == user.id
+
+    r_list = client.get("/servers", headers=headers)
+    assert r_list.status_code == 200, r_list.text
+    assert len(r_list.json()) == 3
+
+
+def test_bulk_create_checks_limit_for_whole_batch(client, db_session):
+    plan = _create_plan(db_session, code="p_bulk_limit", max_servers=2)
+
+    email = "bulk_limit@example.com"
+    password = "StrongPass123!"
+    _register(client, email=email, password=password)
+
+    from app.db.models.user import User
+    user = db_session.query(User).filter(User.email == email).one()
+    _ensure_active_subscription(db_session, user_id=user.id, plan_id=plan.id)
+
+    token = _login(client, email=email, password=password, device_id="dev-bulk-limit")
+
+    r = client.post(
+        "/servers/bulk",
+        json={
+            "items": [
+                {"name": "s1", "host": "8.8.8.1"},
+                {"name": "s2", "host": "8.8.8.2"},
+                {"name": "s3", "host": "8.8.8.3"},
+            ]
+        },
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert r.status_code == 403, r.text
+    body = r.json()
+    assert body["code"] == "plan_limit_exceeded"
+    assert body["meta"]["resource"] == "servers"
+    assert body["meta"]["limit"] == 2
+    assert body["meta"]["current"] == 0
+
+    r_list = client.get("/servers", headers={"Authorization": f"Bearer {token}"})
+    assert r_list.json() == []
+
+
+def test_bulk_create_limit_ignores_endpoints_the_owner_already_has(client, db_session):
+    plan = _create_plan(db_session, code="p_bulk_existing", max_servers=2)
+
+    email = "bulk_existing@example.com"
+    password = "StrongPass123!"
+    _register(client, email=email, password=password)
+
+    from app.db.models.user import User
+    user = db_session.query(User).filter(User.email == email).one()
+    _ensure_active_subscription(db_session, user_id=user.id, plan_id=plan.id)
+
+    token = _login(client, email=email, password=password, device_id="dev-bulk-existing")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    r0 = client.post("/servers", json={"name": "s0", "host": "7.7.7.1"}, headers=headers)
+    assert r0.status_code == 201, r0.text
+
+    # повтор уже живого endpoint'а слот не занимает: 1 + 1 новый <= 2
+    r = client.post(
+        "/servers/bulk",
+        json={
+            "items": [
+                {"name": "s0", "host": "7.7.7.1"},
+                {"name": "s1", "host": "7.7.7.2"},
+            ]
+        },
+        headers=headers,
+    )
+    assert r.status_code == 200, r.text
+    assert [x["status"] for x in r.json()["items"]] == ["conflict", "created"]
@@ -0,0 +1,172 @@
+from datetime import datetime, timedelta, timezone
+
+from tests.test_server_limits import _create_plan, _ensure_active_subscription, _login, _register
+
+NODE_TOKEN = "node-secret"
+
+
+def _setup_admin_with_server(client, db_session, *, email: str):
+    from app.db.models.user import User
+
+    plan = _create_plan(db_session, code=f"p_{email.split('@')[0]}", max_servers=1)
+
+    password = "StrongPass123!"
+    _register(client, email=email, password=password)
+    admin = db_session.query(User).filter(User.email == email).one()
+    admin.role = "admin"
+    db_session.commit()
+    _ensure_active_subscription(db_session, user_id=admin.id, plan_id=plan.id)
+
+    token = _login(client, email=email, password=password, device_id="dev-metrics")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    r = client.post("/servers", json={"name": "node-1", "host": "10.2.0.1"}, headers=headers)
+    assert r.status_code == 201, r.text
+    return headers, r.json()["id"]
+
+
+def test_node_metrics_ingest_auth_and_validation(client, db_session, monkeypatch):
+    from app.core.config import settings
+    from app.core.security import node_token
+
+    monkeypatch.setattr(settings, "node_api_token", NODE_TOKEN)
+    admin_headers, server_id = _setup_admin_with_server(
+        client, db_session, email="metrics@example.com"
+    )
+
+    # учётные данные ноды выдаёт админ: свои у каждого сервера
+    r = client.get(f"/admin/servers/{server_id}/node-token", headers=admin_headers)
+    assert r.status_code == 200, r.text
+    assert r.json() == {"server_id": server_id, "token": node_token(server_id)}
+
+    now = datetime.now(timezone.utc)
+    sample = {
+        "ts": now.isoformat(),
+        "active_peers": 3,
+        "bytes_in": 100,
+        "bytes_out": 200,
+        "cpu": 12.5,
+    }
+    stale = {**sample, "ts": (now - timedelta(days=30)).isoformat()}
+
+    r = client.post(f"/nodes/{server_id}/metrics", json={"samples": [sample]})
+    assert r.status_code == 401, r.text
+
+    r = client.post(
+        f"/nodes/{server_id}/metrics",
+        json={"samples": [sample]},
+        headers={"X-Node-Token": "wrong"},
+    )
+    assert r.status_code == 401, r.text
+
+    # токен чужого сервера не подходит
+    r = client.post(
+        f"/nodes/{server_id}/metrics",
+        json={"samples": [sample]},
+        headers={"X-Node-Token": node_token(server_id + 1)},
+    )
+    assert r.status_code == 401, r.text
+
+    node_headers = {"X-Node-Token": node_token(server_id)}
+    r = client.post(
+        f"/nodes/{server_id}/metrics",
+        json={"samples": [sample, stale]},
+        headers=node_headers,
+    )
+    assert r.status_code == 202, r.text
+    assert r.json() == {"accepted": 1, "rejected": 1, "dropped": 0}
+
+    r = client.post(
+        f"/nodes/{server_id}/metrics",
+        json={"samples": [{**sample, "cpu": 150}]},
+        headers=node_headers,
+    )
+    assert r.status_code == 422, r.text
+
+    r = client.post(
+        "/nodes/999999/metrics",
+        json={"samples": [sample]},
+        headers={"X-Node-Token": node_token(999999)},
+    )
+    assert r.status_code == 404, r.text
+
+
+def test_metrics_copy_rollup_and_admin_series(client, db_session):
+    from app.services.metrics_service import MetricSample, MetricsService
+
+    headers, server_id = _setup_admin_with_server(
+        client, db_session, email="metrics_admin@example.com"
+    )
+
+    base = datetime.now(timezone.utc).replace(second=0, microsecond=0) - timedelta(minutes=5)
+    samples = [
+        MetricSample(server_id, base + timedelta(seconds=10), 2, 100, 1000, 10.0),
+        MetricSample(server_id, base + timedelta(seconds=40), 4, 300, 3000, 30.0),
+        MetricSample(server_id, base + timedelta(minutes=1, seconds=5), 6, 50, 500, 50.0),
+    ]
+
+    svc = MetricsService(db_session)
+    assert svc.copy_samples(samples) == 3
+    svc.rollup(since=base, until=base + timedelta(minutes=2))
+    # повторный rollup того же окна ничего не удваивает
+    svc.rollup(since=base, until=base + timedelta(minutes=2))
+    db_session.commit()
+
+    r = client.get(
+        f"/admin/servers/{server_id}/metrics",
+        params={"resolution": "1m", "since": (base - timedelta(minutes=1)).isoformat()},
+        headers=headers,
+    )
+    assert r.status_code == 200, r.text
+    points = r.json()
+    assert [p["samples"] for p in points] == [2, 1]
+    assert points[0]["active_peers_avg"] == 3
+    assert points[0]["active_peers_max"] == 4
+    assert points[0]["bytes_in"] == 400
+    assert points[0]["cpu_max"] == 30
+
+    r = client.get(
+        f"/admin/servers/{server_id}/metrics",
+        params={"resolution": "1h", "since": (base - timedelta(hours=2)).isoformat()},
+        headers=headers,
+    )
+    assert r.status_code == 200, r.text
+    hourly = r.json()
+    assert sum(p["samples"] for p in hourly) == 3
+    assert sum(p["bytes_out"] for p in hourly) == 4500
+
+
+def test_metrics_load_reaches_ranking_of_every_worker(client, db_session):
+    from app.db.models.server import Server
+    from app.services.metrics_service import MetricSample, MetricsService
+    from app.services.probe_service import ProbeResult, ProbeService
+    from app.services.server_ranking import ServerRankingIndex
+
+    _, server_id = _setup_admin_with_server(client, db_session, email="metrics_load@example.com")
+    owner_id = db_session.get(Server, server_id).owner_id
+
+    now = datetime.now(timezone.utc)
+    ProbeService(db_session).record_results(
+        [ProbeResult(server_id, ok=True, checked_at=now, latency_ms=20)]
+    )
+    db_session.commit()
+
+    # индекс воркера, который метрики ноды не принимал
+    index = ServerRankingIndex()
+    index.refresh(db_session, force=True)
+    assert index.best(owner_id, max_servers=1)[0].load == 0.0
+
+    svc = MetricsService(db_session)
+    samples = [
+        MetricSample(server_id, now - timedelta(seconds=30), 1, 0, 0, 80.0),
+        MetricSample(server_id, now - timedelta(seconds=10), 1, 0, 0, 40.0),
+    ]
+    svc.copy_samples(samples)
+    assert svc.record_load(samples) == 1
+    # опоздавший сэмпл не перетирает более свежий load
+    svc.record_load([MetricSample(server_id, now - timedelta(minutes=1), 1, 0, 0, 90.0)])
+    db_session.commit()
+
+    index.refresh(db_session, force=True)
+    db_session.commit()
+    assert index.best(owner_id, max_servers=1)[0].load == 0.4
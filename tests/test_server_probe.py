@@ -0,0 +1,187 @@
+import asyncio
+import socket
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+
+from tests.test_server_limits import _create_plan, _ensure_active_subscription, _login, _register
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class _UdpEcho(asyncio.DatagramProtocol):
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.transport.sendto(data, addr)
+
+
+def test_probe_all_against_local_stub_listeners():
+    from app.services.probe_service import ProbeTarget, probe_all
+
+    async def _run():
+        async def _on_conn(reader, writer):
+            writer.close()
+
+        tcp_server = await asyncio.start_server(_on_conn, "127.0.0.1", 0)
+        tcp_port = tcp_server.sockets[0].getsockname()[1]
+
+        loop = asyncio.get_running_loop()
+        udp_transport, _ = await loop.create_datagram_endpoint(
+            _UdpEcho, local_addr=("127.0.0.1", 0)
+        )
+        udp_port = udp_transport.get_extra_info("sockname")[1]
+
+        closed_port = _free_port()
+        try:
+            tcp = await probe_all(
+                [
+                    ProbeTarget(1, "127.0.0.1", tcp_port),
+                    ProbeTarget(2, "127.0.0.1", closed_port),
+                ],
+                protocol="tcp",
+                timeout=1.0,
+                concurrency=2,
+                jitter_sec=0.05,
+            )
+            udp = await probe_all(
+                [ProbeTarget(3, "127.0.0.1", udp_port)],
+                protocol="udp",
+                timeout=1.0,
+            )
+        finally:
+            tcp_server.close()
+            await tcp_server.wait_closed()
+            udp_transport.close()
+        return tcp, udp
+
+    tcp, udp = asyncio.run(_run())
+
+    by_id = {r.server_id: r for r in tcp + udp}
+    assert by_id[1].ok is True
+    assert by_id[1].latency_ms is not None
+    assert by_id[2].ok is False
+    assert by_id[2].error
+    assert by_id[3].ok is True
+
+
+def test_record_results_tracks_failures_and_status_endpoint(client, db_session):
+    from app.db.models.user import User
+    from app.services.probe_service import ProbeResult, ProbeService
+
+    plan = _create_plan(db_session, code="p_probe", max_servers=1)
+
+    email = "probe@example.com"
+    password = "StrongPass123!"
+    _register(client, email=email, password=password)
+
+    user = db_session.query(User).filter(User.email == email).one()
+    _ensure_active_subscription(db_session, user_id=user.id, plan_id=plan.id)
+
+    token = _login(client, email=email, password=password, device_id="dev-probe")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    r = client.post("/servers", json={"name": "s1", "host": "127.0.0.1"}, headers=headers)
+    assert r.status_code == 201, r.text
+    server_id = r.json()["id"]
+
+    r_none = client.get(f"/servers/{server_id}/status", headers=headers)
+    assert r_none.status_code == 404, r_none.text
+
+    svc = ProbeService(db_session)
+    assert server_id in {t.server_id for t in svc.load_targets()}
+
+    now = datetime.now(timezone.utc)
+    svc.record_results([ProbeResult(server_id, ok=True, checked_at=now, latency_ms=12)])
+    svc.record_results([ProbeResult(server_id, ok=False, checked_at=now, error="timeout")])
+    svc.record_results([ProbeResult(server_id, ok=False, checked_at=now, error="timeout")])
+    db_session.commit()
+
+    r = client.get(f"/servers/{server_id}/status", headers=headers)
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["is_up"] is False
+    assert body["consecutive_failures"] == 2
+    assert body["latency_ms"] == 12
+    assert body["last_ok_at"] is not None
+    assert body["last_error"] == "timeout"
+
+    # долго лежащий сервер: счётчик упирается в потолок SMALLINT, а не ломает upsert
+    from app.db.models.server_status import ServerStatus
+    from app.services.probe_service import CONSECUTIVE_FAILURES_MAX
+
+    db_session.get(ServerStatus, server_id).consecutive_failures = CONSECUTIVE_FAILURES_MAX
+    db_session.commit()
+    svc.record_results([ProbeResult(server_id, ok=False, checked_at=now, error="timeout")])
+    db_session.commit()
+    db_session.expire_all()
+    assert db_session.get(ServerStatus, server_id).consecutive_failures == CONSECUTIVE_FAILURES_MAX
+
+    # changed_at (delta-refresh ranking'а) двигают только is_up и корзина latency
+    # (now() в тесте постоянен: одна внешняя транзакция -> сравниваем с меткой)
+    marker = now - timedelta(days=1)
+
+    def moves_changed_at(offset: int, **result) -> bool:
+        db_session.execute(
+            update(ServerStatus)
+            .where(ServerStatus.server_id == server_id)
+            .values(changed_at=marker)
+        )
+        at = now + timedelta(seconds=offset)
+        svc.record_results([ProbeResult(server_id, checked_at=at, **result)])
+        db_session.commit()
+        db_session.expire_all()
+        return db_session.get(ServerStatus, server_id).changed_at != marker
+
+    assert not moves_changed_at(1, ok=False, error="timeout")
+    assert moves_changed_at(2, ok=True, latency_ms=14)
+    assert not moves_changed_at(3, ok=True, latency_ms=17)
+    assert moves_changed_at(4, ok=True, latency_ms=21)
+
+
+def test_ranking_refresh_sees_status_committed_after_long_cycle(client, db_session):
+    from app.db.models.server import Server
+    from app.db.models.user import User
+    from app.services.probe_service import ProbeResult, ProbeService
+    from app.services.server_ranking import REFRESH_OVERLAP, ServerRankingIndex
+
+    plan = _create_plan(db_session, code="p_probe_slow", max_servers=1)
+
+    email = "probe_slow@example.com"
+    password = "StrongPass123!"
+    _register(client, email=email, password=password)
+
+    user = db_session.query(User).filter(User.email == email).one()
+    _ensure_active_subscription(db_session, user_id=user.id, plan_id=plan.id)
+
+    token = _login(client, email=email, password=password, device_id="dev-probe-slow")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    r = client.post("/servers", json={"name": "slow", "host": "127.0.0.2"}, headers=headers)
+    assert r.status_code == 201, r.text
+    server_id = r.json()["id"]
+
+    index = ServerRankingIndex()
+    index.refresh(db_session, force=True)
+    db_session.commit()
+    assert [e.server_id for e in index.best(user.id, max_servers=1)] == [server_id]
+
+    # probe отработал в начале цикла, а результат закоммичен намного позже;
+    # сам сервер давно не менялся, в delta-refresh его приносит только статус
+    checked_at = datetime.now(timezone.utc) - 10 * REFRESH_OVERLAP
+    db_session.execute(
+        update(Server).where(Server.id == server_id).values(updated_at=checked_at)
+    )
+    ProbeService(db_session).record_results(
+        [ProbeResult(server_id, ok=False, checked_at=checked_at, error="timeout")]
+    )
+    db_session.commit()
+
+    index.refresh(db_session, force=True)
+    db_session.commit()
+    assert index.best(user.id, max_servers=1) == []
@@ -0,0 +1,116 @@
+from tests.test_server_limits import _create_plan, _ensure_active_subscription, _login, _register
+
+
+def _setup_user_with_servers(client, db_session, *, code: str, email: str, servers: list[dict]):
+    plan = _create_plan(db_session, code=code, max_servers=len(servers) + 1)
+
+    password = "StrongPass123!"
+    _register(client, email=email, password=password)
+
+    from app.db.models.user import User
+    user = db_session.query(User).filter(User.email == email).one()
+    _ensure_active_subscription(db_session, user_id=user.id, plan_id=plan.id)
+
+    token = _login(client, email=email, password=password, device_id=f"dev-{code}")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    r = client.post("/servers/bulk", json={"items": servers}, headers=headers)
+    assert r.status_code == 200, r.text
+    assert r.json()["created"] == len(servers)
+    return headers
+
+
+def test_search_prefix_country_and_keyset_pagination(client, db_session):
+    headers = _setup_user_with_servers(
+        client,
+        db_session,
+        code="p_search",
+        email="search@example.com",
+        servers=[
+            {"name": "frankfurt-1", "host": "de1.vpn.example", "country": "DE"},
+            {"name": "frankfurt-2", "host": "de2.vpn.example", "country": "DE"},
+            {"name": "amsterdam-1", "host": "nl1.vpn.example", "country": "NL"},
+            {
+                "name": "paris-1",
+                "host": "fr1.vpn.example",
+                "country": "FR",
+                "notes": "near Frankfurt PoP",
+            },
+        ],
+    )
+
+    # prefix по name + infix по notes
+    r = client.get("/servers/search", params={"q": "frank"}, headers=headers)
+    assert r.status_code == 200, r.text
+    names = [x["name"] for x in r.json()["items"]]
+    assert names == ["paris-1", "frankfurt-2", "frankfurt-1"]
+
+    # q из двух букв матчит country
+    r = client.get("/servers/search", params={"q": "nl"}, headers=headers)
+    assert [x["name"] for x in r.json()["items"]] == ["amsterdam-1"]
+
+    r = client.get("/servers/search", params={"country": "de"}, headers=headers)
+    assert {x["name"] for x in r.json()["items"]} == {"frankfurt-1", "frankfurt-2"}
+
+    # keyset: 4 сервера по 3 на страницу
+    r1 = client.get("/servers/search", params={"limit": 3}, headers=headers)
+    page1 = r1.json()
+    assert len(page1["items"]) == 3
+    assert page1["next_cursor"]
+
+    r2 = client.get(
+        "/servers/search",
+        params={"limit": 3, "cursor": page1["next_cursor"]},
+        headers=headers,
+    )
+    page2 = r2.json()
+    assert [x["name"] for x in page2["items"]] == ["frankfurt-1"]
+    assert page2["next_cursor"] is None
+
+    r_bad = client.get("/servers/search", params={"cursor": "???"}, headers=headers)
+    assert r_bad.status_code == 400, r_bad.text
+
+    from app.services.cursor import encode_cursor
+
+    # id из cursor'а: только целое в диапазоне BIGINT
+    for bad_id in (True, 2**63, -(2**63) - 1, 1.5):
+        r_bad = client.get(
+            "/servers/search", params={"cursor": encode_cursor({"id": bad_id})}, headers=headers
+        )
+        assert r_bad.status_code == 400, r_bad.text
+
+
+def test_search_fuzzy_ranks_by_similarity(client, db_session):
+    from app.services.cursor import encode_cursor
+
+    headers = _setup_user_with_servers(
+        client,
+        db_session,
+        code="p_search_fuzzy",
+        email="search_fuzzy@example.com",
+        servers=[
+            {"name": "stockholm-edge", "host": "se1.vpn.example", "country": "SE"},
+            {"name": "stokholm", "host": "se2.vpn.example", "country": "SE"},
+            {"name": "tokyo-1", "host": "jp1.vpn.example", "country": "JP"},
+        ],
+    )
+
+    r = client.get(
+        "/servers/search",
+        params={"q": "stokholm", "mode": "fuzzy"},
+        headers=headers,
+    )
+    assert r.status_code == 200, r.text
+    names = [x["name"] for x in r.json()["items"]]
+    assert names[0] == "stokholm"
+    assert "stockholm-edge" in names
+    assert "tokyo-1" not in names
+
+    # rank в cursor'е не целое / нет вовсе -> 400, а не 500
+    for bad in ({"id": 1, "r": "x"}, {"id": 1}, {"id": 1, "r": True}, {"id": 1, "r": 2**63}):
+        r_bad = client.get(
+            "/servers/search",
+            params={"q": "stokholm", "mode": "fuzzy", "cursor": encode_cursor(bad)},
+            headers=headers,
+        )
+        assert r_bad.status_code == 400, r_bad.text
@@ -0,0 +1,115 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tests.test_server_limits import _create_plan, _login, _register
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_concurrent_identical_calls_share_one_computation():
+    from app.services.single_flight import SingleFlight, flight_key
+
+    flight = SingleFlight(max_keys=10, max_waiters=3, wait_timeout_sec=5)
+    release = threading.Event()
+    calls = []
+
+    def load():
+        calls.append(1)
+        n = len(calls)
+        release.wait(5)
+        return {"plans": n}
+
+    key = flight_key("GET /billing/plans")
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        leader = pool.submit(flight.do, key, load)
+        _wait_for(lambda: flight.stats()["in_flight"] == 1)
+        # 3 ждут лидера, 4-й упирается в max_waiters и считает сам
+        futures = [pool.submit(flight.do, key, load) for _ in range(4)]
+        _wait_for(lambda: len(calls) == 2)
+        release.set()
+        results = [leader.result()] + [f.result() for f in futures]
+
+    assert len(calls) == 2
+    # лидер и трое ожидающих получили один и тот же объект
+    assert sum(r is results[0] for r in results) == 4
+    stats = flight.stats()
+    assert stats == {
+        "in_flight": 0,
+        "leaders": 1,
+        "shared": 3,
+        "bypassed": 1,
+        "timeouts": 0,
+        "coalescing_ratio": 0.6,
+    }
+
+    # ключ не кэшируется: следующий вызов считает заново
+    assert flight.do(key, lambda: "fresh") == "fresh"
+    # другой принципал / параметры -> другой ключ
+    assert flight_key("GET /billing/summary", 1) != flight_key("GET /billing/summary", 2)
+    assert flight_key("r", a=1, b=2) == flight_key("r", b=2, a=1)
+
+
+def test_leader_error_is_shared_and_key_released():
+    from app.services.single_flight import SingleFlight
+
+    flight = SingleFlight(max_keys=1, max_waiters=10, wait_timeout_sec=5)
+    started = threading.Event()
+    release = threading.Event()
+
+    def fail():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("db down")
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        leader = pool.submit(flight.do, "k", fail)
+        started.wait(5)
+        follower = pool.submit(flight.do, "k", lambda: "not called")
+        _wait_for(lambda: flight._calls["k"].waiters == 1)
+        # max_keys=1: другой ключ не коалесцируется, пока "k" в полёте
+        assert flight.do("other", lambda: "own") == "own"
+        release.set()
+        for f in (leader, follower):
+            try:
+                f.result()
+            except RuntimeError as exc:
+                assert str(exc) == "db down"
+            else:
+                raise AssertionError("expected RuntimeError")
+
+    assert flight.stats()["in_flight"] == 0
+    assert flight.stats()["bypassed"] == 1
+
+
+def test_plans_and_summary_go_through_single_flight(client, db_session):
+    from app.db.models.user import User
+
+    _create_plan(db_session, code="p_flight", max_servers=1, max_devices=1)
+    r = client.get("/billing/plans")
+    assert r.status_code == 200, r.text
+    assert "p_flight" in [p["code"] for p in r.json()]
+
+    password = "StrongPass123!"
+    _register(client, email="flight_admin@example.com", password=password)
+    admin = db_session.query(User).filter(User.email == "flight_admin@example.com").one()
+    admin.role = "admin"
+    db_session.commit()
+    token = _login(
+        client, email="flight_admin@example.com", password=password, device_id="dev-flight"
+    )
+    headers = {"Authorization": f"Bearer {token}"}
+
+    r = client.get("/billing/summary", headers=headers)
+    assert r.status_code == 200, r.text
+
+    r = client.get("/admin/single-flight", headers=headers)
+    assert r.status_code == 200, r.text
+    stats = r.json()
+    assert stats["in_flight"] == 0
+    assert stats["leaders"] >= 2
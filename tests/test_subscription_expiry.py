@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta, timezone
+
+from tests.test_server_limits import _create_plan, _login, _register
+
+
+def test_admin_expiring_and_overdue_subscriptions(client, db_session):
+    from app.db.models.user import User
+
+    password = "StrongPass123!"
+    _register(client, email="expiry_admin@example.com", password=password)
+    admin = db_session.query(User).filter(User.email == "expiry_admin@example.com").one()
+    admin.role = "admin"
+    db_session.commit()
+    token = _login(
+        client, email="expiry_admin@example.com", password=password, device_id="dev-expiry"
+    )
+    headers = {"Authorization": f"Bearer {token}"}
+
+    _create_plan(db_session, code="p_expiry", max_servers=1, max_devices=1)
+
+    now = datetime.now(timezone.utc)
+    expiries = {
+        "soon": now + timedelta(days=2),
+        "later": now + timedelta(days=5),
+        "far": now + timedelta(days=20),
+        "overdue": now - timedelta(hours=1),
+        "lifetime": None,
+    }
+    ids = {}
+    for name, expires_at in expiries.items():
+        email = f"expiry_{name}@example.com"
+        _register(client, email=email, password=password)
+        ids[name] = db_session.query(User).filter(User.email == email).one().id
+        r = client.post(
+            f"/admin/subscriptions/users/{ids[name]}/grant",
+            json={
+                "plan_code": "p_expiry",
+                "expires_at": expires_at.isoformat() if expires_at else None,
+            },
+            headers=headers,
+        )
+        assert r.status_code == 200, r.text
+    ours = set(ids.values())
+
+    r = client.get("/admin/subscriptions/expiring", params={"days": 7}, headers=headers)
+    assert r.status_code == 200, r.text
+    expiring = [s for s in r.json() if s["user_id"] in ours]
+    assert [s["user_id"] for s in expiring] == [ids["soon"], ids["later"]]
+    assert expiring[0]["plan_code"] == "p_expiry"
+
+    # keyset-пагинация по (expires_at, user_id)
+    seen = []
+    params = {"days": 7, "limit": 1}
+    while True:
+        r = client.get("/admin/subscriptions/expiring", params=params, headers=headers)
+        assert r.status_code == 200, r.text
+        page = r.json()
+        if not page:
+            break
+        assert len(page) == 1
+        seen.append(page[0]["user_id"])
+        params.update(after=page[0]["expires_at"], after_user_id=page[0]["user_id"])
+    assert [u for u in seen if u in ours] == [ids["soon"], ids["later"]]
+
+    r = client.get("/admin/subscriptions/overdue", headers=headers)
+    assert r.status_code == 200, r.text
+    overdue = [s["user_id"] for s in r.json() if s["user_id"] in ours]
+    assert overdue == [ids["overdue"]]
+
+    # после cancel просроченная подписка больше не active -> не overdue
+    r = client.post(f"/admin/subscriptions/users/{ids['overdue']}/cancel", json={}, headers=headers)
+    assert r.status_code == 200, r.text
+    r = client.get("/admin/subscriptions/overdue", headers=headers)
+    assert r.status_code == 200, r.text
+    assert ids["overdue"] not in {s["user_id"] for s in r.json()}
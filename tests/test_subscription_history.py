@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta, timezone
+
+from tests.test_server_limits import _create_plan, _login, _register
+
+
+def _setup_admin(client, db_session, *, email: str):
+    from app.db.models.user import User
+
+    password = "StrongPass123!"
+    _register(client, email=email, password=password)
+    admin = db_session.query(User).filter(User.email == email).one()
+    admin.role = "admin"
+    db_session.commit()
+    token = _login(client, email=email, password=password, device_id="dev-history-admin")
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_subscription_events_timeline_and_state_as_of(client, db_session):
+    from app.db.models.user import User
+
+    headers = _setup_admin(client, db_session, email="history_admin@example.com")
+    plan = _create_plan(db_session, code="p_hist", max_servers=1, max_devices=1)
+
+    email = "history@example.com"
+    _register(client, email=email, password="StrongPass123!")
+    user = db_session.query(User).filter(User.email == email).one()
+
+    expires = datetime.now(timezone.utc) + timedelta(days=10)
+    r = client.post(
+        f"/admin/subscriptions/users/{user.id}/grant",
+        json={"plan_code": "p_hist", "expires_at": expires.isoformat()},
+        headers=headers,
+    )
+    assert r.status_code == 200, r.text
+    r = client.post(
+        f"/admin/subscriptions/users/{user.id}/extend", json={"days": 5}, headers=headers
+    )
+    assert r.status_code == 200, r.text
+    r = client.post(
+        f"/admin/subscriptions/users/{user.id}/cancel",
+        json={"immediately": False},
+        headers=headers,
+    )
+    assert r.status_code == 200, r.text
+
+    r = client.get(f"/admin/subscriptions/users/{user.id}/history", headers=headers)
+    assert r.status_code == 200, r.text
+    events = r.json()
+    granted = [e for e in events if e["kind"] != "created"]
+    assert [(e["kind"], e["source"], e["status"]) for e in granted] == [
+        ("grant", "admin", "active"),
+        ("extend", "admin", "active"),
+        ("cancel", "admin", "canceled"),
+    ]
+    assert granted[0]["plan_id"] == plan.id
+    assert granted[1]["expires_at"] > granted[0]["expires_at"]
+
+    # запросы в тесте идут подряд: отодвигаем extend в прошлое, чтобы его момент был однозначен
+    from app.db.models.subscription_event import SubscriptionEvent
+
+    extend_event = db_session.get(SubscriptionEvent, granted[1]["id"])
+    extend_event.created_at = extend_event.created_at - timedelta(minutes=1)
+    db_session.commit()
+
+    # на момент extend — ещё active, после cancel — canceled
+    r = client.get(
+        f"/admin/subscriptions/users/{user.id}/as-of",
+        params={"at": extend_event.created_at.isoformat()},
+        headers=headers,
+    )
+    assert r.status_code == 200, r.text
+    state = r.json()
+    assert state["status"] == "active"
+    assert state["event"]["id"] == granted[1]["id"]
+
+    r = client.get(f"/admin/subscriptions/users/{user.id}/as-of", headers=headers)
+    assert r.status_code == 200, r.text
+    assert r.json()["status"] == "canceled"
+
+    # истечение событий не пишет: as-of после expires_at -> expired
+    r = client.get(
+        f"/admin/subscriptions/users/{user.id}/as-of",
+        params={"at": (expires + timedelta(days=30)).isoformat()},
+        headers=headers,
+    )
+    assert r.status_code == 200, r.text
+    assert r.json()["status"] == "canceled"
+
+    r = client.get(
+        f"/admin/subscriptions/users/{user.id}/as-of",
+        params={"at": "2000-01-01T00:00:00Z"},
+        headers=headers,
+    )
+    assert r.status_code == 404, r.text
+
+
+def test_subscription_counts_as_of(client, db_session):
+    from app.db.models.user import User
+
+    headers = _setup_admin(client, db_session, email="history_counts_admin@example.com")
+    _create_plan(db_session, code="p_hist_counts", max_servers=1, max_devices=1)
+
+    past = datetime.now(timezone.utc) - timedelta(days=1)
+    user_ids = []
+    for i in range(3):
+        email = f"history_counts_{i}@example.com"
+        _register(client, email=email, password="StrongPass123!")
+        user_ids.append(db_session.query(User).filter(User.email == email).one().id)
+
+    for user_id in user_ids[:2]:
+        r = client.post(
+            f"/admin/subscriptions/users/{user_id}/grant",
+            json={"plan_code": "p_hist_counts", "expires_at": None},
+            headers=headers,
+        )
+        assert r.status_code == 200, r.text
+    r = client.post(
+        f"/admin/subscriptions/users/{user_ids[2]}/grant",
+        json={"plan_code": "p_hist_counts", "expires_at": past.isoformat()},
+        headers=headers,
+    )
+    assert r.status_code == 200, r.text
+    r = client.post(f"/admin/subscriptions/users/{user_ids[1]}/cancel", json={}, headers=headers)
+    assert r.status_code == 200, r.text
+
+    r = client.get("/admin/subscriptions/as-of", headers=headers)
+    assert r.status_code == 200, r.text
+    counts = {(c["plan_code"], c["status"]): c["count"] for c in r.json()}
+    assert counts[("p_hist_counts", "active")] == 1
+    assert counts[("p_hist_counts", "canceled")] == 1
+    assert counts[("p_hist_counts", "expired")] == 1
@@ -0,0 +1,100 @@
+import time
+
+from tests.test_server_limits import _create_plan, _ensure_active_subscription, _login, _register
+
+
+def test_lru_backend_evicts_and_expires():
+    from app.services.summary_cache import LocalLRUBackend
+
+    backend = LocalLRUBackend(max_entries=2)
+    backend.set(1, {"v": 1}, ttl_sec=60)
+    backend.set(2, {"v": 2}, ttl_sec=60)
+    assert backend.get(1) == {"v": 1}  # 1 -> свежий
+    backend.set(3, {"v": 3}, ttl_sec=60)
+
+    assert backend.get(2) is None
+    assert backend.evictions == 1
+    assert len(backend) == 2
+
+    backend.set(4, {"v": 4}, ttl_sec=0.01)
+    time.sleep(0.02)
+    assert backend.get(4) is None
+
+
+def test_load_started_before_invalidation_is_not_cached():
+    from app.services.summary_cache import LocalLRUBackend, SummaryCache
+
+    cache = SummaryCache(LocalLRUBackend(max_entries=10))
+    value, token = cache.get(5)
+    assert value is None
+
+    cache.invalidate(5)  # параллельная запись закоммитилась, пока считали summary
+    cache.put(5, {"status": "active"}, token=token)
+    assert cache.get(5)[0] is None
+
+    _, token = cache.get(5)
+    cache.put(5, {"status": "active"}, token=token)
+    assert cache.get(5)[0] == {"status": "active"}
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 3
+
+
+def test_billing_summary_is_cached_and_invalidated_by_writes(client, db_session):
+    from app.db.models.user import User
+    from app.services.summary_cache import summary_cache
+
+    plan = _create_plan(db_session, code="p_cache", max_servers=2, max_devices=2)
+    email = "cache@example.com"
+    password = "StrongPass123!"
+    _register(client, email=email, password=password)
+    user = db_session.query(User).filter(User.email == email).one()
+    _ensure_active_subscription(db_session, user_id=user.id, plan_id=plan.id)
+    summary_cache.invalidate(user.id)
+
+    token = _login(client, email=email, password=password, device_id="dev-cache-1")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    before = summary_cache.stats()
+    first = client.get("/billing/summary", headers=headers).json()
+    assert client.get("/billing/summary", headers=headers).json() == first
+    after = summary_cache.stats()
+    assert after["hits"] - before["hits"] == 1
+    assert after["misses"] - before["misses"] == 1
+    assert first["servers_used"] == 0
+    assert first["devices_used"] == 1
+
+    # ServerService: create/delete
+    r = client.post("/servers", json={"name": "c1", "host": "cache.example.com"}, headers=headers)
+    assert r.status_code == 201, r.text
+    server_id = r.json()["id"]
+    assert client.get("/billing/summary", headers=headers).json()["servers_used"] == 1
+
+    r = client.delete(f"/servers/{server_id}", headers=headers)
+    assert r.status_code == 204, r.text
+    assert client.get("/billing/summary", headers=headers).json()["servers_used"] == 0
+
+    # DeviceService: register/revoke
+    _login(client, email=email, password=password, device_id="dev-cache-2")
+    assert client.get("/billing/summary", headers=headers).json()["devices_used"] == 2
+    devices = client.get("/devices", headers=headers).json()
+    dev2 = next(d["id"] for d in devices if d["device_id"] == "dev-cache-2")
+    r = client.post(f"/devices/{dev2}/revoke", headers=headers)
+    assert r.status_code == 204, r.text
+    assert client.get("/billing/summary", headers=headers).json()["devices_used"] == 1
+
+    # AdminSubscriptionService + PlanService
+    user.role = "admin"
+    db_session.commit()
+    r = client.post(f"/admin/subscriptions/users/{user.id}/cancel", json={}, headers=headers)
+    assert r.status_code == 200, r.text
+    assert client.get("/billing/summary", headers=headers).json()["status"] == "canceled"
+
+    r = client.patch(f"/admin/plans/{plan.id}", json={"max_devices": 7}, headers=headers)
+    assert r.status_code == 200, r.text
+    assert client.get("/billing/summary", headers=headers).json()["max_devices"] == 7
+
+    r = client.get("/admin/cache/billing-summary", headers=headers)
+    assert r.status_code == 200, r.text
+    stats = r.json()
+    assert stats["hits"] >= 1
+    assert 0 < stats["hit_rate"] <= 1
@@ -0,0 +1,132 @@
+import pytest
+
+from tests.test_server_limits import _create_plan, _ensure_active_subscription, _login, _register
+
+NODE_TOKEN = "node-secret"
+
+
+def test_node_usage_is_aggregated_and_enforced(client, db_session, monkeypatch):
+    from app.core.config import settings
+    from app.core.security import node_token
+    from app.db.models.plan import Plan
+    from app.db.models.user import User
+    from app.services.limits import LimitExceededError, enforce_traffic_quota
+    from app.services.usage_service import UsageService, period_start, usage_aggregator
+
+    monkeypatch.setattr(settings, "node_api_token", NODE_TOKEN)
+    # окно сбрасываем руками ниже, а не writer-потоком
+    monkeypatch.setattr(settings, "usage_flush_interval_sec", 3600.0)
+    usage_aggregator.drain()
+
+    plan = _create_plan(db_session, code="p_traffic", max_servers=1)
+    plan.traffic_quota_bytes = 1000
+    db_session.commit()
+
+    email = "traffic@example.com"
+    password = "StrongPass123!"
+    _register(client, email=email, password=password)
+    user = db_session.query(User).filter(User.email == email).one()
+    _ensure_active_subscription(db_session, user_id=user.id, plan_id=plan.id)
+
+    token = _login(client, email=email, password=password, device_id="dev-traffic")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    r = client.post("/servers", json={"name": "node", "host": "10.3.0.1"}, headers=headers)
+    assert r.status_code == 201, r.text
+    server_id = r.json()["id"]
+
+    node_headers = {"X-Node-Token": node_token(server_id)}
+    r = client.post(
+        f"/nodes/{server_id}/usage",
+        json={
+            "items": [
+                {"user_id": user.id, "bytes_in": 400, "bytes_out": 200},
+                {"user_id": 999999, "bytes_in": 1, "bytes_out": 1},
+            ]
+        },
+        headers=node_headers,
+    )
+    assert r.status_code == 202, r.text
+    assert r.json() == {"accepted": 1, "rejected": 1}
+
+    r = client.post(
+        f"/nodes/{server_id}/usage",
+        json={"items": [{"user_id": user.id, "bytes_in": 300, "bytes_out": 200}]},
+        headers=node_headers,
+    )
+    assert r.status_code == 202, r.text
+
+    # два отчёта -> одна строка окна
+    deltas = usage_aggregator.drain()
+    assert deltas == {(user.id, period_start()): [700, 400]}
+
+    svc = UsageService(db_session)
+    assert svc.upsert_deltas(deltas) == 1
+    assert svc.upsert_deltas({(user.id, period_start()): [0, 100]}) == 1
+    db_session.commit()
+
+    r = client.get("/billing/summary", headers=headers)
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["traffic_quota_bytes"] == 1000
+    assert body["traffic_used_bytes"] == 1200
+
+    with pytest.raises(LimitExceededError) as exc:
+        enforce_traffic_quota(db_session, user.id)
+    assert exc.value.resource == "traffic"
+
+    # 0 -> без лимита
+    db_session.get(Plan, plan.id).traffic_quota_bytes = 0
+    db_session.commit()
+    enforce_traffic_quota(db_session, user.id)
+
+
+def test_usage_flush_drops_only_rejected_rows_and_caps_counters(client, db_session, monkeypatch):
+    from app.api.schemas.usage import USAGE_REPORT_MAX_BYTES
+    from app.core.config import settings
+    from app.core.security import node_token
+    from app.db.models.usage_counter import UsageCounter
+    from app.db.models.user import User
+    from app.services.usage_service import BIGINT_MAX, UsageService, period_start
+
+    monkeypatch.setattr(settings, "node_api_token", NODE_TOKEN)
+    plan = _create_plan(db_session, code="p_traffic_rows", max_servers=1)
+
+    email = "traffic_rows@example.com"
+    password = "StrongPass123!"
+    _register(client, email=email, password=password)
+    user = db_session.query(User).filter(User.email == email).one()
+    _ensure_active_subscription(db_session, user_id=user.id, plan_id=plan.id)
+
+    token = _login(client, email=email, password=password, device_id="dev-traffic-rows")
+    r = client.post(
+        "/servers",
+        json={"name": "node", "host": "10.3.0.2"},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert r.status_code == 201, r.text
+    server_id = r.json()["id"]
+
+    # заведомо битый отчёт отсекается на входе
+    item = {"user_id": user.id, "bytes_in": USAGE_REPORT_MAX_BYTES + 1, "bytes_out": 0}
+    r = client.post(
+        f"/nodes/{server_id}/usage",
+        json={"items": [item]},
+        headers={"X-Node-Token": node_token(server_id)},
+    )
+    assert r.status_code == 422, r.text
+
+    # пользователь удалён между приёмом и flush: теряется только его строка
+    period = period_start()
+    svc = UsageService(db_session)
+    written, rejected = svc.upsert_each({(user.id, period): [10, 20], (999999, period): [1, 1]})
+    assert written == 1
+    assert rejected == {(999999, period): [1, 1]}
+    db_session.commit()
+
+    # счётчик упирается в потолок BIGINT, а не роняет upsert
+    svc.upsert_deltas({(user.id, period): [BIGINT_MAX, 0]})
+    db_session.commit()
+    db_session.expire_all()
+    counter = db_session.get(UsageCounter, (user.id, period))
+    assert (counter.bytes_in, counter.bytes_out) == (BIGINT_MAX, 20)
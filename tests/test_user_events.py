@@ -0,0 +1,64 @@
+import asyncio
+
+from tests.test_server_limits import _create_plan, _ensure_active_subscription, _login, _register
+
+
+def test_user_state_renders_summary_and_devices(client, db_session):
+    from app.api.routes.events import user_state
+    from app.db.models.user import User
+
+    plan = _create_plan(db_session, code="p_events", max_servers=1, max_devices=2)
+    email = "events@example.com"
+    password = "StrongPass123!"
+    _register(client, email=email, password=password)
+    user = db_session.query(User).filter(User.email == email).one()
+    _ensure_active_subscription(db_session, user_id=user.id, plan_id=plan.id)
+    token = _login(client, email=email, password=password, device_id="dev-events")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    state = dict(user_state(db_session, user.id, {"resync"}))
+    assert state["summary"] == client.get("/billing/summary", headers=headers).json()
+    assert state["devices"] == client.get("/devices", headers=headers).json()
+
+    assert [e for e, _ in user_state(db_session, user.id, {"subscription.changed"})] == ["summary"]
+    revoked = user_state(db_session, user.id, {"devices.revoked"})
+    assert [e for e, _ in revoked] == ["summary", "devices"]
+    assert user_state(db_session, 10**9, {"resync"}) == []
+
+
+def test_user_stream_coalesces_queued_events():
+    from app.api.sse import sse_response
+    from app.services.event_bus import (
+        EVENT_DEVICES_REVOKED,
+        EVENT_SUBSCRIPTION_CHANGED,
+        EntitlementEvent,
+        dispatch,
+    )
+    from app.services.event_hub import event_hub, user_topic
+
+    renders: list[set[str]] = []
+
+    async def _render(kinds):
+        renders.append(set(kinds))
+        return [("summary", {"kinds": sorted(kinds)})]
+
+    async def _run():
+        body = sse_response(user_topic(42), {"user_id": 42}, render=_render).body_iterator
+        chunks = [await body.__anext__(), await body.__anext__()]
+
+        # пачка событий, пока клиент не читал, -> одно обновление
+        for kind in (EVENT_SUBSCRIPTION_CHANGED, EVENT_SUBSCRIPTION_CHANGED, EVENT_DEVICES_REVOKED):
+            dispatch(EntitlementEvent(kind=kind, user_id=42))
+        dispatch(EntitlementEvent(kind=EVENT_DEVICES_REVOKED, user_id=43))
+        await asyncio.sleep(0)
+        chunks.append(await body.__anext__())
+        await body.aclose()
+        return chunks
+
+    chunks = asyncio.run(_run())
+    assert chunks[0] == 'event: ready\ndata: {"user_id":42}\n\n'
+    assert renders == [{"resync"}, {EVENT_SUBSCRIPTION_CHANGED, EVENT_DEVICES_REVOKED}]
+    assert chunks[2] == (
+        'event: summary\ndata: {"kinds":["devices.revoked","subscription.changed"]}\n\n'
+    )
+    assert len(event_hub) == 0
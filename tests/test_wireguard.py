@@ -0,0 +1,171 @@
+from tests.test_server_limits import _create_plan, _ensure_active_subscription, _login, _register
+
+WG_KEY_SECRET = "wg-key-secret"
+
+
+def test_address_bitmap_allocates_lowest_free_and_reuses_released():
+    import ipaddress
+
+    from app.services.wireguard_service import AddressBitmap
+
+    bitmap = AddressBitmap.for_network(ipaddress.IPv4Network("10.9.0.0/29"))
+    # .0 сеть, .1 нода, .7 broadcast
+    assert [bitmap.allocate() for _ in range(6)] == [2, 3, 4, 5, 6, None]
+
+    assert bitmap.release(3) is True
+    assert bitmap.release(3) is False
+
+    restored = AddressBitmap(bitmap.to_bytes(), 8)
+    assert restored.allocate() == 3
+    assert restored.allocate() is None
+
+
+def test_issue_config_allocates_addresses_and_frees_on_revoke(client, db_session, monkeypatch):
+    from app.core.config import settings
+    from app.services.wireguard_service import derive_keypair
+
+    monkeypatch.setattr(settings, "wg_key_secret", WG_KEY_SECRET)
+
+    plan = _create_plan(db_session, code="p_wg", max_servers=1, max_devices=2)
+
+    email = "wg@example.com"
+    password = "StrongPass123!"
+    _register(client, email=email, password=password)
+
+    from app.db.models.user import User
+
+    user = db_session.query(User).filter(User.email == email).one()
+    _ensure_active_subscription(db_session, user_id=user.id, plan_id=plan.id)
+
+    token = _login(client, email=email, password=password, device_id="dev-wg-1")
+    _login(client, email=email, password=password, device_id="dev-wg-2")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    devices = {d["device_id"]: d["id"] for d in client.get("/devices", headers=headers).json()}
+    dev1, dev2 = devices["dev-wg-1"], devices["dev-wg-2"]
+
+    r = client.post("/servers", json={"name": "wg", "host": "vpn.example.com"}, headers=headers)
+    assert r.status_code == 201, r.text
+    server_id = r.json()["id"]
+
+    # без ключа ноды конфиг не собрать
+    r = client.post(f"/devices/{dev1}/wireguard", json={"server_id": server_id}, headers=headers)
+    assert r.status_code == 409, r.text
+    assert r.json()["code"] == "wireguard_not_configured"
+
+    server_key = derive_keypair(0, 0, 0)[1]
+    r = client.patch(f"/servers/{server_id}", json={"wg_public_key": server_key}, headers=headers)
+    assert r.status_code == 200, r.text
+
+    r = client.post(f"/devices/{dev1}/wireguard", json={"server_id": server_id}, headers=headers)
+    assert r.status_code == 200, r.text
+    first = r.json()
+    assert first["address"] == "10.8.0.2"
+    assert first["private_key"] is not None
+    assert derive_keypair(dev1, server_id, 1) == (first["private_key"], first["public_key"])
+    assert f"PublicKey = {server_key}" in first["config"]
+    assert "Endpoint = vpn.example.com:51820" in first["config"]
+
+    # идемпотентно: тот же адрес и ключ
+    r = client.post(f"/devices/{dev1}/wireguard", json={"server_id": server_id}, headers=headers)
+    assert r.status_code == 200, r.text
+    assert r.json() == first
+
+    r = client.post(
+        f"/devices/{dev1}/wireguard",
+        json={"server_id": server_id, "rotate": True},
+        headers=headers,
+    )
+    assert r.status_code == 200, r.text
+    rotated = r.json()
+    assert rotated["address"] == first["address"]
+    assert rotated["public_key"] != first["public_key"]
+
+    # свой ключ клиента: PrivateKey в конфиг не попадает
+    client_key = derive_keypair(1, 1, 1)[1]
+    r = client.post(
+        f"/devices/{dev2}/wireguard",
+        json={"server_id": server_id, "public_key": client_key},
+        headers=headers,
+    )
+    assert r.status_code == 200, r.text
+    second = r.json()
+    assert second["address"] == "10.8.0.3"
+    assert second["public_key"] == client_key
+    assert second["private_key"] is None
+    assert "PrivateKey" not in second["config"]
+
+    # revoke освобождает адрес — следующий пир получает его снова
+    r = client.post(f"/devices/{dev1}/revoke", headers=headers)
+    assert r.status_code == 204, r.text
+
+    token3 = _login(client, email=email, password=password, device_id="dev-wg-3")
+    devices = {d["device_id"]: d["id"] for d in client.get("/devices", headers=headers).json()}
+    r = client.post(
+        f"/devices/{devices['dev-wg-3']}/wireguard",
+        json={"server_id": server_id},
+        headers={"Authorization": f"Bearer {token3}"},
+    )
+    assert r.status_code == 200, r.text
+    assert r.json()["address"] == "10.8.0.2"
+
+
+def test_issued_keys_require_dedicated_secret_and_reissue_on_rotation(
+    client, db_session, monkeypatch
+):
+    from app.core.config import settings
+    from app.services.job_handlers import PEERS_REISSUE_KEYS
+    from app.services.job_service import JOB_HANDLERS
+    from app.services.wireguard_service import derive_keypair
+
+    monkeypatch.setattr(settings, "wg_key_secret", WG_KEY_SECRET)
+    server_key = derive_keypair(0, 0, 0)[1]
+
+    plan = _create_plan(db_session, code="p_wg_secret", max_servers=1, max_devices=2)
+    email = "wg_secret@example.com"
+    password = "StrongPass123!"
+    _register(client, email=email, password=password)
+
+    from app.db.models.user import User
+
+    user = db_session.query(User).filter(User.email == email).one()
+    _ensure_active_subscription(db_session, user_id=user.id, plan_id=plan.id)
+    token = _login(client, email=email, password=password, device_id="dev-wg-secret")
+    headers = {"Authorization": f"Bearer {token}"}
+    dev = client.get("/devices", headers=headers).json()[0]["id"]
+
+    r = client.post(
+        "/servers",
+        json={"name": "wg", "host": "vpn-secret.example.com", "wg_public_key": server_key},
+        headers=headers,
+    )
+    assert r.status_code == 201, r.text
+    server_id = r.json()["id"]
+
+    # без WG_KEY_SECRET ключ не выдаём (и не выводим из JWT_SECRET)
+    monkeypatch.setattr(settings, "wg_key_secret", None)
+    r = client.post(f"/devices/{dev}/wireguard", json={"server_id": server_id}, headers=headers)
+    assert r.status_code == 503, r.text
+    assert r.json()["code"] == "wireguard_key_secret_missing"
+
+    monkeypatch.setattr(settings, "wg_key_secret", WG_KEY_SECRET)
+    r = client.post(f"/devices/{dev}/wireguard", json={"server_id": server_id}, headers=headers)
+    assert r.status_code == 200, r.text
+    before = r.json()
+    # секрет JWT на ключи клиентов не влияет
+    jwt_secret = settings.jwt_secret
+    monkeypatch.setattr(settings, "jwt_secret", jwt_secret + "-rotated")
+    assert derive_keypair(dev, server_id, 1)[1] == before["public_key"]
+    monkeypatch.setattr(settings, "jwt_secret", jwt_secret)
+
+    # ротация WG_KEY_SECRET: разовая задача перевыпускает ключи
+    monkeypatch.setattr(settings, "wg_key_secret", WG_KEY_SECRET + "-rotated")
+    JOB_HANDLERS[PEERS_REISSUE_KEYS](db_session, {})
+    db_session.commit()
+
+    r = client.post(f"/devices/{dev}/wireguard", json={"server_id": server_id}, headers=headers)
+    assert r.status_code == 200, r.text
+    after = r.json()
+    assert after["address"] == before["address"]
+    assert after["public_key"] != before["public_key"]
+    assert derive_keypair(dev, server_id, 2) == (after["private_key"], after["public_key"])